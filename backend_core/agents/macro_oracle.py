@@ -1,17 +1,23 @@
 import requests
 import time
 
+try:
+    from core.trend_service import TrendService
+except ImportError:
+    TrendService = None
+
 class MacroOracle:
     """
     Agente Macro & Sentimento (The Oracle)
     Missão: Monitorar o 'clima' do mercado para definir o viés (Bias) direcional.
     """
-    def __init__(self, data_client=None):
+    def __init__(self, data_client=None, trend_service=None):
         self.fng_url = "https://api.alternative.me/fng/"
         self.last_check = 0
         self.cache = {}
         self.cache_ttl = 3600 # 1 hour cache for F&G
         self.data = data_client # BackpackData dependency
+        self.trend = trend_service or (TrendService(data_client) if data_client and TrendService else None)
 
     def analyze_btc_lighthouse(self):
         """
@@ -22,13 +28,21 @@ class MacroOracle:
             return "NEUTRAL"
             
         try:
-            # Fetch 4h klines (limit 100 to calculate EMA50)
-            klines = self.data.get_klines("BTC_USDC", interval="4h", limit=100)
-            if not klines:
-                return "NEUTRAL"
-                
-            closes = [float(k['close']) for k in klines]
-            volumes = [float(k['volume']) for k in klines]
+            if self.trend:
+                # 4h derivado do stream de 1m (memória), sem baixar o intervalo a cada chamada
+                bars = self.trend.bars("BTC_USDC", "4h", n=100)
+                if bars is None:
+                    return "NEUTRAL"
+                closes = bars['close'].tolist()
+                volumes = bars['volume'].tolist()
+            else:
+                # Fetch 4h klines (limit 100 to calculate EMA50)
+                klines = self.data.get_klines("BTC_USDC", interval="4h", limit=100)
+                if not klines:
+                    return "NEUTRAL"
+                    
+                closes = [float(k['close']) for k in klines]
+                volumes = [float(k['volume']) for k in klines]
             import pandas as pd
             import numpy as np
             
@@ -47,9 +61,15 @@ class MacroOracle:
                 return pd.Series(series).rolling(window=period).mean().iloc[-1]
             
             # Calculate indicators
-            ema20 = ema(closes, 20)
-            ema50 = ema(closes, 50)
-            ema100 = ema(closes, 100)
+            if self.trend:
+                # EMAs incrementais (atualizadas só quando fecha vela)
+                ema20 = self.trend.ema("BTC_USDC", "4h", 20)
+                ema50 = self.trend.ema("BTC_USDC", "4h", 50)
+                ema100 = self.trend.ema("BTC_USDC", "4h", 100)
+            else:
+                ema20 = ema(closes, 20)
+                ema50 = ema(closes, 50)
+                ema100 = ema(closes, 100)
             rsi_val = rsi(closes)
             current_volume = volumes[-1]
             volume_ma20 = volume_ma(volumes, 20)
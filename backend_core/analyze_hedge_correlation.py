@@ -11,6 +11,7 @@ sys.path.append(os.path.join(os.getcwd(), 'core'))
 sys.path.append(os.path.join(os.getcwd(), '_LEGACY_V1_ARCHIVE'))
 
 from core.backpack_transport import BackpackTransport
+from core.portfolio_risk import PortfolioRiskEngine
 from backpack_data import BackpackData
 from backpack_auth import BackpackAuth
 
@@ -29,12 +30,9 @@ async def analyze_correlation():
     # Buscar dados (Limit 500 para ter relevância estatística)
     print(f" Baixando dados de {target} e Hedges...")
     
-    klines_target = data_client.get_klines(target, "15m", limit=500)
-    if not klines_target: return
-    
-    df_target = pd.DataFrame(klines_target)
-    df_target['close'] = df_target['close'].astype(float)
-    returns_target = df_target['close'].pct_change().dropna()
+    # Histórico incremental em data/candles (só baixa velas novas desde a última execução)
+    engine = PortfolioRiskEngine(interval="15m", lookback=500)
+    engine.refresh(data_client, [target] + hedge_assets)
     
     print(f"{'HEDGE ASSET':<15} | {'CORRELAÇÃO':<10} | {'BETA':<10} | {'VOLATILIDADE':<12}")
     print("-" * 60)
@@ -43,31 +41,10 @@ async def analyze_correlation():
     best_corr = 0
     
     for asset in hedge_assets:
-        klines_hedge = data_client.get_klines(asset, "15m", limit=500)
-        if not klines_hedge: continue
-        
-        df_hedge = pd.DataFrame(klines_hedge)
-        df_hedge['close'] = df_hedge['close'].astype(float)
-        returns_hedge = df_hedge['close'].pct_change().dropna()
-        
-        # Alinhar tamanhos (Interseção de índices se necessário, mas aqui assume sequencial igual)
-        min_len = min(len(returns_target), len(returns_hedge))
-        r_target = returns_target.iloc[-min_len:]
-        r_hedge = returns_hedge.iloc[-min_len:]
-        
-        # Correlação
-        correlation = r_target.corr(r_hedge)
-        
-        # Beta (Covariância / Variância do Mercado)
-        covariance = np.cov(r_target, r_hedge)[0][1]
-        variance = np.var(r_hedge)
-        beta = covariance / variance
-        
-        # Volatilidade Relativa
-        vol_target = r_target.std()
-        vol_hedge = r_hedge.std()
-        vol_ratio = vol_target / vol_hedge
+        stats = engine.beta(target, asset)
+        if not stats: continue
         
+        correlation, beta, vol_ratio = stats['correlation'], stats['beta'], stats['vol_ratio']
         print(f"{asset:<15} | {correlation:<10.4f} | {beta:<10.4f} | {vol_ratio:<12.2f}x")
         
         if correlation > best_corr:
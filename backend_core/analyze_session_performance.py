@@ -12,6 +12,7 @@ sys.path.append(os.path.join(os.getcwd(), '_LEGACY_V1_ARCHIVE'))
 
 from backpack_data import BackpackData
 from backpack_auth import BackpackAuth
+from fill_analytics import FillAnalytics, local_time
 
 async def analyze_performance():
     print(f"\n RELATÓRIO DE PERFORMANCE DIÁRIA (SESSION REPORT)")
@@ -30,79 +31,34 @@ async def analyze_performance():
         print(" Nenhum trade encontrado no histórico recente.")
         return
 
-    # 2. Processar Dados
-    df = pd.DataFrame(fills)
+    # 2. Processar Dados (frame colunar + PnL realizado por pareamento FIFO; a API não manda realizedPnl)
+    analytics = FillAnalytics.from_fills(fills)
     
-    # Filtrar apenas trades de HOJE (2026-01-25)
-    # Assumindo que a API retorna timestamp ou date string. 
-    # Vamos converter colunas relevantes.
-    # Campos comuns: 'symbol', 'side', 'price', 'quantity', 'fee', 'realizedPnl', 'timestamp'
-    
-    # Check columns available
-    # print(df.columns) 
-    
-    # Normalizar timestamp
-    # Se for timestamp ms, converter. Se for string, parse.
-    # Vamos assumir que existe um campo de tempo. Se não, usamos todos.
-    
-    trades_today = []
-    today_str = datetime.now().strftime('%Y-%m-%d')
-    
-    total_volume = 0.0
-    total_pnl = 0.0
-    total_fees = 0.0
-    trades_count = 0
-    
-    symbol_stats = {}
+    # Filtro de Data: dia atual (meia-noite local)
+    today_start = int(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()) * 10**9
+    frame = analytics.frame(today_start)
+    realized = analytics.realized_by_fill(today_start, column='gross_pnl')
     
     print(f"{'HORA':<10} | {'SYMBOL':<15} | {'SIDE':<6} | {'PRICE':<10} | {'QTY':<8} | {'PNL':<10} | {'VALOR':<10}")
     print("-" * 80)
     
-    for fill in fills:
-        # Tentar extrair data
-        ts = fill.get('timestamp', fill.get('time', None))
-        if ts:
-            try:
-                # Tenta converter se for string iso
-                dt = datetime.fromisoformat(str(ts).replace('Z', '+00:00'))
-            except:
-                try:
-                    # Tenta converter se for timestamp ms
-                    dt = datetime.fromtimestamp(int(ts)/1000)
-                except:
-                    dt = datetime.now() # Fallback
-        else:
-            dt = datetime.now()
-            
-        # Filtro de Data (Dia Atual - UTC ou Local?)
-        # Vamos pegar tudo das últimas 24h para garantir
-        if dt.date() == datetime.now().date():
-            trades_count += 1
-            
-            symbol = fill.get('symbol')
-            side = fill.get('side')
-            price = float(fill.get('price', 0))
-            qty = float(fill.get('quantity', 0))
-            fee = float(fill.get('fee', 0))
-            pnl = float(fill.get('realizedPnl', 0))
-            
-            val = price * qty
-            total_volume += val
-            total_pnl += pnl
-            total_fees += fee
-            
-            # Stats por Símbolo
-            if symbol not in symbol_stats:
-                symbol_stats[symbol] = {'vol': 0, 'pnl': 0, 'trades': 0}
-            symbol_stats[symbol]['vol'] += val
-            symbol_stats[symbol]['pnl'] += pnl
-            symbol_stats[symbol]['trades'] += 1
-            
-            time_str = dt.strftime('%H:%M:%S')
-            pnl_str = f"${pnl:+.2f}" if pnl != 0 else "-"
-            
-            print(f"{time_str:<10} | {symbol:<15} | {side:<6} | {price:<10.4f} | {qty:<8.3f} | {pnl_str:<10} | ${val:<10.2f}")
+    times = local_time(frame['ts'].to_numpy())
+    values = frame['price'].to_numpy() * frame['qty'].to_numpy()
+    rows = zip(times, frame['symbol'].to_numpy(), frame['side'].to_numpy(), frame['price'].to_numpy(), frame['qty'].to_numpy(), realized, values)
+    for dt, symbol, side, price, qty, pnl, val in rows:
+        side = "Bid" if side > 0 else "Ask"
+        time_str = dt.strftime('%H:%M:%S')
+        pnl_str = f"${pnl:+.2f}" if pnl != 0 else "-"
+        
+        print(f"{time_str:<10} | {symbol:<15} | {side:<6} | {price:<10.4f} | {qty:<8.3f} | {pnl_str:<10} | ${val:<10.2f}")
 
+    trades_count = len(frame)
+    total_volume = float(values.sum())
+    total_fees = float(frame['fee'].sum())
+    total_pnl = float(realized.sum())
+    
+    symbol_stats = analytics.by_symbol(today_start)
+    
     print("-" * 80)
     print(f" RESUMO DA SESSÃO:")
     print(f"   Trades Totais: {trades_count}")
@@ -112,8 +68,8 @@ async def analyze_performance():
     print(f"   PnL Líquido:   ${(total_pnl - total_fees):+.2f}")
     
     print("\n DESTAQUES POR ATIVO:")
-    for sym, stats in symbol_stats.items():
-        print(f"   {sym:<15}: {stats['trades']} Trades | Vol ${stats['vol']:,.0f} | PnL ${stats['pnl']:+.2f}")
+    for sym, stats in symbol_stats.iterrows():
+        print(f"   {sym:<15}: {int(stats['fills'])} Trades | Vol ${stats['volume']:,.0f} | PnL ${stats['gross_pnl']:+.2f}")
 
     print("\n ANÁLISE ESTRATÉGICA:")
     if total_pnl > 0:
@@ -14,6 +14,7 @@ sys.path.append(os.path.join(os.getcwd(), '_LEGACY_V1_ARCHIVE'))
 from backpack_auth import BackpackAuth
 from backpack_data import BackpackData
 from backpack_transport import BackpackTransport
+from fill_analytics import FillAnalytics, since_ns
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -62,22 +63,13 @@ class TradeAuditor:
         # 2. Buscar Histórico de Fills (Execuções)
         print("\n Buscando Execuções (Fills)...")
         fills = self.data.get_fill_history(limit=1000)
-        recent_fills = []
-        
-        for fill in fills:
-            # Timestamp vem em milissegundos ou ISO? Backpack costuma ser ISO ou ms.
-            # Verificando formato no código existente: investigate_drop.py trata ambos.
-            ts_val = fill.get('timestamp')
-            try:
-                if isinstance(ts_val, str):
-                    ts = datetime.fromisoformat(ts_val.replace('Z', '+00:00')).replace(tzinfo=None)
-                else:
-                    ts = datetime.fromtimestamp(int(ts_val) / 1000.0)
-            except:
-                continue
-                
-            if ts >= start_time:
-                recent_fills.append({**fill, 'parsed_time': ts})
+        analytics = FillAnalytics.from_fills(fills)
+        window_start = since_ns(hours=hours)
+        recent_fills = analytics.frame(window_start)
+        # orderId -> (maker, preço executado) do primeiro fill da ordem
+        fills_by_order = {}
+        for order_id, maker, price in zip(recent_fills['order_id'].to_numpy(), recent_fills['maker'].to_numpy(), recent_fills['price'].to_numpy()):
+            fills_by_order.setdefault(int(order_id), (bool(maker), float(price)))
         
         print(f"    {len(recent_fills)} execuções encontradas.")
         
@@ -126,7 +118,7 @@ class TradeAuditor:
         print(f"    {len(recent_orders)} ordens encontradas.")
         
         # 4. Processar e Gerar Relatório
-        if not recent_orders and not recent_fills:
+        if not recent_orders and recent_fills.empty:
             print("\n️ Nenhuma atividade registrada no período.")
             return
 
@@ -162,11 +154,14 @@ class TradeAuditor:
             status = order.get('status', '-')
             
             # Tentar encontrar fill correspondente para ver se foi Maker ou Taker
-            fill_info = next((f for f in recent_fills if f.get('orderId') == order.get('id')), None)
+            try:
+                fill_info = fills_by_order.get(int(order.get('id')))
+            except (TypeError, ValueError):
+                fill_info = None
             role = "NONE"
             if fill_info:
-                role = "MAKER" if fill_info.get('isMaker') else "TAKER"
-                exec_price = float(fill_info.get('price', 0))
+                is_maker, exec_price = fill_info
+                role = "MAKER" if is_maker else "TAKER"
                 # Slippage Check
                 if otype == "Limit" and price > 0:
                     slip = (exec_price - price) / price
@@ -184,24 +179,11 @@ class TradeAuditor:
         print("----------------------------------------------------------------")
         
         # 5. Análise de Custos e Resultado
-        total_fees = 0.0
-        total_volume = 0.0
-        maker_fills = 0
-        taker_fills = 0
-        
-        for fill in recent_fills:
-            fee = float(fill.get('fee', 0))
-            qty = float(fill.get('quantity', 0))
-            price = float(fill.get('price', 0))
-            vol = qty * price
-            
-            total_fees += fee
-            total_volume += vol
-            
-            if fill.get('isMaker'):
-                maker_fills += 1
-            else:
-                taker_fills += 1
+        costs = analytics.summary(window_start)
+        total_fees = costs['fees']
+        total_volume = costs['volume']
+        maker_fills = costs['maker_fills']
+        taker_fills = costs['taker_fills']
                 
         print(f"\n RESUMO FINANCEIRO (Estimado)")
         print(f"   Volume Total:    ${total_volume:.2f}")
@@ -12,6 +12,7 @@ sys.path.append(os.path.join(os.getcwd(), '_LEGACY_V1_ARCHIVE'))
 from backpack_auth import BackpackAuth
 from backpack_data import BackpackData
 from core.gatekeeper import Gatekeeper
+from core.trend_service import TrendService
 
 # Configurações de Exibição
 pd.set_option('display.max_columns', None)
@@ -28,6 +29,7 @@ class ChimeraRadar:
         self.auth = BackpackAuth(os.getenv('BACKPACK_API_KEY'), os.getenv('BACKPACK_API_SECRET'))
         self.data = BackpackData(self.auth)
         self.gatekeeper = Gatekeeper(self.data)
+        self.trend = TrendService(self.data) # EMA50 1H derivada do stream de 1m
         
         # Lista de Ativos Prioritários (Ou scan geral)
         self.priority_assets = [
@@ -62,13 +64,9 @@ class ChimeraRadar:
     def get_trend_bias(self, symbol):
         """Define viés (Buy/Sell) baseado na EMA50 de 1H."""
         try:
-            klines = self.data.get_klines(symbol, "1h", limit=60)
-            if not klines: return "Neutral", 0
-            
-            df = pd.DataFrame(klines)
-            df['close'] = df['close'].astype(float)
-            ema_50 = df['close'].ewm(span=50, adjust=False).mean().iloc[-1]
-            last_price = df.iloc[-1]['close']
+            ema_50 = self.trend.ema(symbol, "1h", 50)
+            last_price = self.trend.price(symbol)
+            if ema_50 is None or last_price is None: return "Neutral", 0
             
             if last_price > ema_50: return "Buy", last_price
             return "Sell", last_price
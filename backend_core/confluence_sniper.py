@@ -36,6 +36,7 @@ class ConfluenceSniper:
         # Inicializa Protocolo Chimera
         self.black_box = BlackBox()
         self.learning_engine = LearningEngine()
+        self.black_box.subscribe(self.learning_engine.observe) # Estatísticas atualizadas a cada trade fechado
         
         # Parâmetros de Gestão Rigorosa
         self.RISK_PCT = 0.001   # 0.1% Risco (SL) - HIPER SCALP
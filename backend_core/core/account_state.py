@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import copy
+import time
+import struct
+import asyncio
+import logging
+from multiprocessing import shared_memory
+
+SHM_NAME = "obi_account_state"
+SHM_SIZE = 1 << 20 # 1 MB (posições + ordens abertas + colateral em JSON)
+
+# Header: version (Q) | updated_at (d) | payload_len (I) | refresh_token (Q)
+SNAPSHOT_HEADER = struct.Struct("<QdI") # Escrito apenas pelo serviço
+REFRESH_TOKEN = struct.Struct("<Q")      # Sobrescrito pelos leitores com um valor novo a cada pedido
+REFRESH_OFFSET = SNAPSHOT_HEADER.size
+PAYLOAD_OFFSET = REFRESH_OFFSET + REFRESH_TOKEN.size
+
+WS_URL = os.getenv("BACKPACK_WS_URL", "wss://ws.backpack.exchange") # Simulador local: core/exchange_simulator.py
+PRIVATE_STREAMS = ["account.orderUpdate", "account.positionUpdate"]
+
+# Métodos de escrita que alteram o estado da conta (forçam reconciliação)
+WRITE_METHODS = ("execute_order", "cancel_order", "cancel_open_orders", "replace_order", "execute_batch", "transfer_spot_to_futures", "_send_request")
+
+
+def _open_shm(create=False):
+    """Abre o segmento compartilhado. Leitores não devem registrar no resource_tracker (senão ele apaga o segmento ao sair)."""
+    if create:
+        try:
+            return shared_memory.SharedMemory(name=SHM_NAME, create=True, size=SHM_SIZE)
+        except FileExistsError:
+            # Serviço anterior morreu sem unlink: reaproveita o segmento
+            return shared_memory.SharedMemory(name=SHM_NAME)
+    try:
+        return shared_memory.SharedMemory(name=SHM_NAME, track=False)
+    except TypeError:
+        # Python < 3.13
+        shm = shared_memory.SharedMemory(name=SHM_NAME)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class AccountStateService:
+    """
+     ACCOUNT STATE SERVICE (Single Writer)
+    Mantém a visão autoritativa de posições, ordens abertas e colateral.
+    - Streams privados (orderUpdate/positionUpdate) disparam reconciliação imediata.
+    - REST completo periódico (reconcile_interval) cobre eventos perdidos.
+    - Publica snapshot versionado em memória compartilhada (seqlock: versão ímpar = escrevendo).
+    """
+    def __init__(self, transport, reconcile_interval=15.0, min_refresh_gap=0.25):
+        self.transport = transport
+        self.reconcile_interval = reconcile_interval
+        self.min_refresh_gap = min_refresh_gap
+        self.logger = logging.getLogger("AccountState")
+        self.shm = _open_shm(create=True)
+        self.version = SNAPSHOT_HEADER.unpack_from(self.shm.buf, 0)[0] & ~1
+        self.last_refresh = 0.0
+        self.last_refresh_token = REFRESH_TOKEN.unpack_from(self.shm.buf, REFRESH_OFFSET)[0]
+        self.dirty = asyncio.Event()
+        self.is_running = True
+
+    def _publish(self, snapshot):
+        payload = json.dumps(snapshot, separators=(',', ':')).encode()
+        if PAYLOAD_OFFSET + len(payload) > SHM_SIZE:
+            self.logger.error(f" Snapshot excede {SHM_SIZE} bytes ({len(payload)}). Publicação ignorada.")
+            return
+
+        buf = self.shm.buf
+        SNAPSHOT_HEADER.pack_into(buf, 0, self.version + 1, time.time(), 0)
+        buf[PAYLOAD_OFFSET:PAYLOAD_OFFSET + len(payload)] = payload
+        self.version += 2
+        SNAPSHOT_HEADER.pack_into(buf, 0, self.version, snapshot['updated_at'], len(payload))
+
+    async def refresh(self):
+        """Reconciliação REST completa (3 chamadas privadas por ciclo, para todos os consumidores)."""
+        positions, orders, collateral = await asyncio.gather(
+            asyncio.to_thread(self.transport.get_positions),
+            asyncio.to_thread(self.transport.get_open_orders),
+            asyncio.to_thread(self.transport.get_account_collateral),
+        )
+        if positions is None or orders is None or collateral is None:
+            self.logger.warning("️ Reconciliação parcial falhou. Mantendo snapshot anterior.")
+            return False
+
+        self.last_refresh = time.time()
+        self._publish({
+            'updated_at': self.last_refresh,
+            'positions': positions,
+            'orders': orders,
+            'collateral': collateral,
+        })
+        return True
+
+    async def _stream_listener(self):
+        """Assina streams privados; cada evento apenas marca o estado como sujo."""
+        try:
+            import websockets
+        except ImportError:
+            self.logger.warning("️ websockets não instalado. Usando apenas reconciliação REST.")
+            return
+
+        while self.is_running:
+            try:
+                async with websockets.connect(WS_URL, ping_interval=20) as ws:
+                    headers = self.transport.auth.get_headers("subscribe")
+                    await ws.send(json.dumps({
+                        "method": "SUBSCRIBE",
+                        "params": PRIVATE_STREAMS,
+                        "signature": [headers["X-API-Key"], headers["X-Signature"], headers["X-Timestamp"], headers["X-Window"]],
+                    }))
+                    self.logger.info(f" Streams privados ativos: {PRIVATE_STREAMS}")
+                    async for _ in ws:
+                        self.dirty.set()
+            except Exception as e:
+                self.logger.warning(f"️ Stream privado caiu ({e}). Reconectando em 3s...")
+                await asyncio.sleep(3)
+
+    async def _refresh_loop(self):
+        while self.is_running:
+            gap = self.last_refresh + self.min_refresh_gap - time.time()
+            if self.dirty.is_set() and gap > 0:
+                await asyncio.sleep(gap) # Já sujo dentro do gap: dorme até ele abrir (wait() retornaria na hora)
+            else:
+                try:
+                    await asyncio.wait_for(self.dirty.wait(), timeout=0.1)
+                except asyncio.TimeoutError:
+                    pass
+
+            refresh_token = REFRESH_TOKEN.unpack_from(self.shm.buf, REFRESH_OFFSET)[0]
+            if refresh_token != self.last_refresh_token:
+                self.last_refresh_token = refresh_token
+                self.dirty.set()
+
+            now = time.time()
+            due = now - self.last_refresh >= self.reconcile_interval
+            if (self.dirty.is_set() and now - self.last_refresh >= self.min_refresh_gap) or due:
+                self.dirty.clear()
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    self.logger.error(f"Erro na reconciliação: {e}")
+                    await asyncio.sleep(1)
+
+    async def run(self):
+        self.logger.info(" Account State Service iniciado.")
+        if not self.last_refresh:
+            await self.refresh()
+        try:
+            await asyncio.gather(self._stream_listener(), self._refresh_loop())
+        finally:
+            self.close()
+
+    def close(self):
+        self.is_running = False
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except Exception:
+            pass
+
+
+class AccountStateView:
+    """
+     ACCOUNT STATE VIEW (Leitor)
+    Lê o snapshot compartilhado sem chamadas à API. Seguro entre processos (seqlock).
+    """
+    def __init__(self):
+        self.shm = _open_shm()
+        self._cache_version = -1
+        self._cache = None
+
+    @staticmethod
+    def available():
+        try:
+            AccountStateView().close()
+            return True
+        except FileNotFoundError:
+            return False
+
+    @property
+    def version(self):
+        return SNAPSHOT_HEADER.unpack_from(self.shm.buf, 0)[0]
+
+    def snapshot(self):
+        """Retorna uma cópia do snapshot mais recente (dict) ou None se ainda não publicado."""
+        snap = self._current()
+        return copy.deepcopy(snap) if snap is not None else None
+
+    def _current(self):
+        """Snapshot decodificado em cache (compartilhado entre chamadas: não alterar)."""
+        buf = self.shm.buf
+        for _ in range(100):
+            v1, updated_at, length = SNAPSHOT_HEADER.unpack_from(buf, 0)
+            if v1 == 0:
+                return None
+            if v1 & 1:
+                time.sleep(0.0005)
+                continue
+            if v1 == self._cache_version:
+                return self._cache
+            payload = bytes(buf[PAYLOAD_OFFSET:PAYLOAD_OFFSET + length])
+            if SNAPSHOT_HEADER.unpack_from(buf, 0)[0] != v1:
+                continue
+            self._cache = json.loads(payload)
+            self._cache['version'] = v1
+            self._cache_version = v1
+            return self._cache
+        return self._cache
+
+    def wait_for_change(self, last_version, timeout=None, poll=0.05):
+        """Bloqueia até a versão mudar (notificação de mudança). Retorna a nova versão ou None no timeout."""
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            v = self.version
+            if v != last_version and not v & 1:
+                return v
+            if deadline and time.time() >= deadline:
+                return None
+            time.sleep(poll)
+
+    async def changes(self, poll=0.05):
+        """Gerador assíncrono de snapshots a cada nova versão."""
+        last = -1
+        while True:
+            v = self.version
+            if v != last and not v & 1:
+                last = v
+                snap = self.snapshot()
+                if snap is not None:
+                    yield snap
+            await asyncio.sleep(poll)
+
+    def request_refresh(self):
+        """
+        Pede ao serviço uma reconciliação imediata (ex.: após enviar/cancelar ordem).
+        Escrita cega de um token novo (sem ler-incrementar-gravar entre processos): o serviço só compara
+        com o último token visto, então pedidos concorrentes coalescem num único refresh e nenhum se perde.
+        """
+        token = (time.time_ns() << 16 | os.getpid() & 0xFFFF) & 0xFFFFFFFFFFFFFFFF
+        REFRESH_TOKEN.pack_into(self.shm.buf, REFRESH_OFFSET, token)
+
+    def close(self):
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+
+class AccountStateProxy:
+    """
+     ACCOUNT STATE PROXY
+    Drop-in para BackpackTransport: get_positions / get_open_orders / get_account_collateral
+    são servidos do snapshot compartilhado; todo o resto é delegado ao transport real.
+    Se o snapshot estiver mais velho que max_age, cai para REST (fail-safe).
+    """
+    def __init__(self, transport, view, max_age=30.0):
+        self._transport = transport
+        self._view = view
+        self._max_age = max_age
+
+    def __getattr__(self, name):
+        attr = getattr(self._transport, name)
+        if name in WRITE_METHODS and callable(attr):
+            def write_through(*args, **kwargs):
+                result = attr(*args, **kwargs)
+                if name != "_send_request" or (args and args[0] != "GET"):
+                    self._view.request_refresh()
+                return result
+            return write_through
+        return attr
+
+    def _fresh_snapshot(self):
+        snap = self._view._current()
+        if snap and time.time() - snap['updated_at'] <= self._max_age:
+            return snap
+        return None
+
+    @property
+    def state_version(self):
+        return self._view.version
+
+    def get_positions(self):
+        snap = self._fresh_snapshot()
+        if snap is None:
+            return self._transport.get_positions()
+        return copy.deepcopy(snap['positions'])
+
+    def get_open_orders(self, symbol=None):
+        snap = self._fresh_snapshot()
+        if snap is None:
+            return self._transport.get_open_orders(symbol)
+        if symbol:
+            return [copy.deepcopy(o) for o in snap['orders'] if o.get('symbol') == symbol]
+        return copy.deepcopy(snap['orders'])
+
+    def get_account_collateral(self):
+        snap = self._fresh_snapshot()
+        if snap is None:
+            return self._transport.get_account_collateral()
+        return copy.deepcopy(snap['collateral'])
+
+    def get_capital(self):
+        return self.get_account_collateral()
+
+
+def attach_account_state(transport, max_age=30.0):
+    """Retorna um AccountStateProxy se o serviço estiver rodando; senão o próprio transport."""
+    try:
+        return AccountStateProxy(transport, AccountStateView(), max_age=max_age)
+    except FileNotFoundError:
+        return transport
+
+
+if __name__ == "__main__":
+    # Serviço standalone: python core/account_state.py
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.backpack_transport import BackpackTransport
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    service = AccountStateService(BackpackTransport())
+    try:
+        asyncio.run(service.run())
+    except KeyboardInterrupt:
+        print("\n Account State Service encerrado.")
@@ -1,15 +1,29 @@
 import time
 import base64
+import threading
 from cryptography.hazmat.primitives.asymmetric import ed25519
 from cryptography.hazmat.primitives import serialization
 
 class BackpackAuth:
+    # Chaves já derivadas/verificadas neste processo (e herdadas por fork): {(api_key, secret): private_key}
+    _derived = {}
+    _shared = {}
+    _lock = threading.Lock()
+
     def __init__(self, api_key_base64, private_key_base64):
         self.api_key = api_key_base64
         # Add padding if needed for base64 decoding
         padding = len(private_key_base64) % 4
         if padding > 0:
             private_key_base64 += "=" * (4 - padding)
+
+        # Derivação + verificação (e o log) acontecem uma vez por par de chaves por processo
+        key = (api_key_base64, private_key_base64)
+        with self._lock:
+            cached = self._derived.get(key)
+        if cached:
+            self.private_key_bytes, self.private_key = cached
+            return
             
         self.private_key_bytes = base64.b64decode(private_key_base64)
         self.private_key = ed25519.Ed25519PrivateKey.from_private_bytes(self.private_key_bytes)
@@ -32,6 +46,20 @@ class BackpackAuth:
         if self.api_key != public_b64:
             print("️ WARNING: API Key does NOT match derived Public Key! Keys are mismatched or format is wrong.")
 
+        with self._lock:
+            self._derived[key] = (self.private_key_bytes, self.private_key)
+
+    @classmethod
+    def shared(cls, api_key_base64, private_key_base64):
+        """Instância única por par de chaves no processo (transports do mesmo processo compartilham)."""
+        key = (api_key_base64, private_key_base64)
+        with cls._lock:
+            auth = cls._shared.get(key)
+        if auth is None:
+            auth = cls(api_key_base64, private_key_base64)
+            with cls._lock:
+                auth = cls._shared.setdefault(key, auth)
+        return auth
 
     def get_headers(self, instruction=None, params=None):
         if params is None:
@@ -97,3 +125,34 @@ class BackpackAuth:
         }
         
         return headers
+
+    def get_batch_headers(self, instruction, items):
+        """
+        Assinatura de endpoints em lote (ex.: POST /api/v1/orders).
+        Cada item vira um bloco 'instruction=<instr>&<params ordenados>'; os blocos são
+        unidos por '&' e timestamp/window entram uma única vez no final.
+        """
+        timestamp = int(time.time() * 1000)
+        window = 5000
+
+        blocks = []
+        for item in items:
+            parts = []
+            for key in sorted(item.keys()):
+                value = item[key]
+                if isinstance(value, bool):
+                    value = str(value).lower()
+                parts.append(f"{key}={value}")
+            blocks.append("&".join([f"instruction={instruction}"] + parts))
+
+        signature_payload = "&".join(blocks + [f"timestamp={timestamp}", f"window={window}"])
+        signature_bytes = self.private_key.sign(signature_payload.encode('utf-8'))
+        signature_base64 = base64.b64encode(signature_bytes).decode('utf-8')
+
+        return {
+            "X-API-Key": self.api_key,
+            "X-Signature": signature_base64,
+            "X-Timestamp": str(timestamp),
+            "X-Window": str(window),
+            "Content-Type": "application/json; charset=utf-8"
+        }
@@ -1,14 +1,19 @@
 
 import os
 import time
+import threading
 import requests
 import base64
 import json
-from dotenv import load_dotenv
 try:
     from .backpack_auth import BackpackAuth
+    from .runtime_env import credentials, http_session
 except ImportError:
     from backpack_auth import BackpackAuth
+    from runtime_env import credentials, http_session
+
+# Máximo de ordens por POST /api/v1/orders
+BATCH_LIMIT = 20
 
 class BackpackTransport:
     """
@@ -16,19 +21,22 @@ class BackpackTransport:
     Handles raw API communication with signing and error handling.
     """
     def __init__(self, api_key=None, api_secret=None):
-        self.base_url = "https://api.backpack.exchange"
-        # Force reload from env to ensure new keys are picked up
-        load_dotenv(override=True)
-        key = api_key if api_key else os.getenv('BACKPACK_API_KEY')
-        secret = api_secret if api_secret else os.getenv('BACKPACK_API_SECRET')
-        self.auth = BackpackAuth(key, secret)
-        self.session = requests.Session()
+        # .env carregado uma vez por processo (relido só se mudar: chaves novas ainda entram)
+        key, secret = credentials(api_key, api_secret)
+        # BACKPACK_API_URL aponta para o simulador local (core/exchange_simulator.py)
+        self.base_url = os.getenv("BACKPACK_API_URL", "https://api.backpack.exchange")
+        self.auth = BackpackAuth.shared(key, secret)
+        self.session = http_session() # Keep-alive compartilhado entre transports do processo
+        self.metrics = None # Opcional: MetricsFeed (core/metrics_feed.py) para latência/erros
         
     def _send_request(self, method, endpoint, instruction, payload=None):
         url = f"{self.base_url}{endpoint}"
         
         # Revert: Pass instruction to get_headers explicitly
-        headers = self.auth.get_headers(instruction, payload)
+        if isinstance(payload, list):
+            headers = self.auth.get_batch_headers(instruction, payload) # Endpoints em lote
+        else:
+            headers = self.auth.get_headers(instruction, payload)
         
         if payload is None:
             payload = {}
@@ -40,6 +48,8 @@ class BackpackTransport:
         #    payload['timestamp'] = headers['X-Timestamp']
         #    payload['window'] = headers['X-Window']
         
+        started = time.perf_counter()
+        ok = False
         try:
             if method == "GET":
                 # Important: Pass payload as params so they are actually sent!
@@ -55,6 +65,7 @@ class BackpackTransport:
                 return None
                 
             if response.status_code == 200:
+                ok = True
                 return response.json()
             else:
                 print(f"    API ERROR ({response.status_code}): {response.text}")
@@ -62,6 +73,9 @@ class BackpackTransport:
         except Exception as e:
             print(f"    TRANSPORT ERROR: {e}")
             return None
+        finally:
+            if self.metrics:
+                self.metrics.record_request(endpoint.split('?')[0], (time.perf_counter() - started) * 1000, ok)
 
     def get_klines(self, symbol, interval, limit=100):
         # Calculate startTime if needed (Backpack API requires it often)
@@ -134,14 +148,14 @@ class BackpackTransport:
         """Retorna lista de todos os mercados disponíveis"""
         try:
             url = f"{self.base_url}/api/v1/markets"
-            resp = requests.get(url)
+            resp = self.session.get(url)
             if resp.status_code == 200:
                 return resp.json()
             return []
         except:
             return []
         try:
-            resp = requests.get(url)
+            resp = self.session.get(url)
             if resp.status_code == 200:
                 return resp.json()
             return []
@@ -208,7 +222,7 @@ class BackpackTransport:
     def get_ticker(self, symbol):
         url = f"{self.base_url}/api/v1/ticker?symbol={symbol}"
         try:
-            resp = requests.get(url)
+            resp = self.session.get(url)
             if resp.status_code == 200:
                 return resp.json()
             return None
@@ -269,6 +283,57 @@ class BackpackTransport:
         }
         return self._send_request("DELETE", "/api/v1/order", "orderCancel", payload)
 
+    def execute_batch(self, orders):
+        """
+        Envia várias ordens em uma requisição (lotes de até BATCH_LIMIT).
+        Endpoint: POST /api/v1/orders
+        Instrução: orderExecute (uma por ordem na assinatura)
+        Retorna lista alinhada com `orders` (None onde o lote falhou).
+        """
+        results = []
+        for i in range(0, len(orders), BATCH_LIMIT):
+            chunk = orders[i:i + BATCH_LIMIT]
+            res = self._send_request("POST", "/api/v1/orders", "orderExecute", chunk)
+            if isinstance(res, list) and len(res) == len(chunk):
+                results.extend(res)
+            else:
+                results.extend([None] * len(chunk))
+        return results
+
+    def replace_order(self, symbol, order_id, payload, make_before_break=True):
+        """
+        Substitui uma ordem aberta por `payload` (a Backpack não expõe amend nativo).
+        make_before_break: posta a nova antes de cancelar a antiga. Seguro para ordens reduceOnly
+        (duas saídas nunca ultrapassam a posição) e a posição nunca fica descoberta.
+        Senão, cancelamento e nova ordem seguem em paralelo (uma janela de RTT em vez de três).
+        Retorna {'order', 'cancel', 'latency_ms', 'unprotected_ms'}.
+        """
+        started = time.perf_counter()
+        if make_before_break:
+            order = self._send_request("POST", "/api/v1/order", "orderExecute", payload)
+            # Se a nova falhar, a antiga continua no livro
+            cancel = self.cancel_order(symbol, order_id) if order else None
+            unprotected_ms = 0.0 if order else None
+        else:
+            done = {}
+            def cancel_old():
+                done['cancel'] = self.cancel_order(symbol, order_id)
+                done['cancel_at'] = time.perf_counter()
+            worker = threading.Thread(target=cancel_old)
+            worker.start()
+            order = self._send_request("POST", "/api/v1/order", "orderExecute", payload)
+            placed_at = time.perf_counter()
+            worker.join()
+            cancel = done.get('cancel')
+            unprotected_ms = max(0.0, placed_at - done['cancel_at']) * 1000 if order else None
+
+        return {
+            'order': order,
+            'cancel': cancel,
+            'latency_ms': (time.perf_counter() - started) * 1000,
+            'unprotected_ms': unprotected_ms,
+        }
+
     def get_order_history(self, limit=100, symbol=None):
         """
         Retorna histórico de ordens.
@@ -10,8 +10,13 @@ class BlackBox:
     """
     def __init__(self, filename="trade_memory.json"):
         self.filename = filename
+        self.subscribers = []
         self._ensure_file_exists()
 
+    def subscribe(self, callback):
+        """callback(trade) a cada trade fechado (ex.: LearningEngine.observe)."""
+        self.subscribers.append(callback)
+
     def _ensure_file_exists(self):
         if not os.path.exists(self.filename):
             with open(self.filename, 'w') as f:
@@ -44,7 +49,7 @@ class BlackBox:
             with open(self.filename, 'r') as f:
                 history = json.load(f)
             
-            updated = False
+            updated = None
             for trade in history:
                 if trade['id'] == trade_id:
                     trade['status'] = "CLOSED"
@@ -54,13 +59,18 @@ class BlackBox:
                         "exit_price": exit_price,
                         "exit_time": datetime.now().isoformat()
                     }
-                    updated = True
+                    updated = trade
                     break
             
             if updated:
                 with open(self.filename, 'w') as f:
                     json.dump(history, f, indent=4)
                 print(f"    [BLACK BOX] Resultado Atualizado para {trade_id}: {pnl_percent}% ({exit_reason})")
+                for callback in self.subscribers:
+                    try:
+                        callback(updated)
+                    except Exception as e:
+                        print(f"   ️ Erro no assinante da Black Box: {e}")
             else:
                 print(f"   ️ [BLACK BOX] Trade ID {trade_id} não encontrado para atualização.")
                 
@@ -0,0 +1,457 @@
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None # Fallback para zlib (arquivos continuam legíveis: codec gravado no header)
+
+# Relativo ao backend_core, não ao CWD: recorder, reader e simulador enxergam o mesmo arquivo
+ARCHIVE_ROOT = os.getenv("OBI_BOOK_ARCHIVE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "book_archive"))
+WS_URL = os.getenv("BACKPACK_WS_URL", "wss://ws.backpack.exchange") # Simulador local: core/exchange_simulator.py
+
+# Tipos de evento (coluna 'kind')
+SNAPSHOT = 0 # Nível de um snapshot completo (mesmo ts = mesmo snapshot)
+DIFF = 1     # Atualização absoluta de nível (qty 0 = remove)
+TRADE = 2    # Trade público (side = agressor)
+
+BID = 1
+ASK = -1
+
+PRICE_DECIMALS = 8
+QTY_DECIMALS = 8
+
+MAGIC = b"OBZ1"
+CODEC_ZLIB = 0
+CODEC_ZSTD = 1
+CHUNK_HEADER = struct.Struct("<4sBI") # magic | codec | meta_len
+
+
+def _day_of(ts_us):
+    return datetime.fromtimestamp(ts_us / 1_000_000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def encode_chunk(ts, kind, side, price, qty):
+    """
+    Serializa um bloco colunar:
+    ts (µs) e preço (int escalado) em delta-encoding, qty escalado, tudo comprimido (zstd ou zlib).
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    order = np.argsort(ts, kind="stable")
+    ts = ts[order]
+    price_i = np.round(np.asarray(price, dtype=np.float64)[order] * 10**PRICE_DECIMALS).astype(np.int64)
+    qty_i = np.round(np.asarray(qty, dtype=np.float64)[order] * 10**QTY_DECIMALS).astype(np.int64)
+
+    body = b"".join([
+        np.diff(ts, prepend=0).astype("<i8").tobytes(),
+        np.asarray(kind, dtype=np.uint8)[order].tobytes(),
+        np.asarray(side, dtype=np.int8)[order].tobytes(),
+        np.diff(price_i, prepend=0).astype("<i8").tobytes(),
+        qty_i.astype("<i8").tobytes(),
+    ])
+
+    if zstandard is not None:
+        codec, payload = CODEC_ZSTD, zstandard.ZstdCompressor(level=3).compress(body)
+    else:
+        codec, payload = CODEC_ZLIB, zlib.compress(body, 6)
+
+    meta = json.dumps({
+        "n": int(len(ts)),
+        "first_ts": int(ts[0]) if len(ts) else 0,
+        "last_ts": int(ts[-1]) if len(ts) else 0,
+        "price_decimals": PRICE_DECIMALS,
+        "qty_decimals": QTY_DECIMALS,
+    }).encode()
+    return CHUNK_HEADER.pack(MAGIC, codec, len(meta)) + meta + payload, meta
+
+
+def decode_chunk(blob):
+    """Retorna dict de colunas NumPy: ts, kind, side, price, qty."""
+    magic, codec, meta_len = CHUNK_HEADER.unpack_from(blob, 0)
+    if magic != MAGIC:
+        raise ValueError("Chunk inválido (magic)")
+    meta = json.loads(blob[CHUNK_HEADER.size:CHUNK_HEADER.size + meta_len])
+    payload = blob[CHUNK_HEADER.size + meta_len:]
+
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Chunk zstd requer o pacote 'zstandard'")
+        body = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        body = zlib.decompress(payload)
+
+    n = meta["n"]
+    offset = 0
+
+    def take(dtype, itemsize):
+        nonlocal offset
+        arr = np.frombuffer(body, dtype=dtype, count=n, offset=offset)
+        offset += n * itemsize
+        return arr
+
+    ts = np.cumsum(take("<i8", 8))
+    kind = take(np.uint8, 1)
+    side = take(np.int8, 1)
+    price = np.cumsum(take("<i8", 8)) / 10**meta["price_decimals"]
+    qty = take("<i8", 8) / 10**meta["qty_decimals"]
+    return {"ts": ts, "kind": kind, "side": side, "price": price, "qty": qty}
+
+
+class BookArchiveWriter:
+    """
+     BOOK ARCHIVE WRITER
+    Buffer em memória por símbolo; descarrega chunks colunares por tamanho ou idade.
+    Layout: {root}/{SYMBOL}/{YYYY-MM-DD}/chunk_00000.obz + index.vsc (CHUNK|FIRST_TS|LAST_TS|N)
+    """
+    def __init__(self, root=ARCHIVE_ROOT, chunk_rows=50_000, chunk_seconds=60):
+        self.root = root
+        self.chunk_rows = chunk_rows
+        self.chunk_seconds = chunk_seconds
+        self.buffers = {}
+        self.logger = logging.getLogger("BookArchive")
+
+    def _buffer(self, symbol):
+        if symbol not in self.buffers:
+            self.buffers[symbol] = {"rows": [], "opened": time.time(), "day": None}
+        return self.buffers[symbol]
+
+    def append(self, symbol, ts_us, kind, side, price, qty):
+        buf = self._buffer(symbol)
+        day = _day_of(ts_us)
+        if buf["day"] is not None and day != buf["day"]:
+            self.flush(symbol) # Partição diária: nunca mistura dias num chunk
+            buf = self._buffer(symbol)
+        buf["day"] = day
+        buf["rows"].append((ts_us, kind, side, price, qty))
+        if len(buf["rows"]) >= self.chunk_rows:
+            self.flush(symbol)
+
+    def append_snapshot(self, symbol, ts_us, depth):
+        for p, q in depth.get("bids", []):
+            self.append(symbol, ts_us, SNAPSHOT, BID, float(p), float(q))
+        for p, q in depth.get("asks", []):
+            self.append(symbol, ts_us, SNAPSHOT, ASK, float(p), float(q))
+
+    def flush_due(self):
+        now = time.time()
+        for symbol, buf in list(self.buffers.items()):
+            if buf["rows"] and now - buf["opened"] >= self.chunk_seconds:
+                self.flush(symbol)
+
+    def flush(self, symbol=None):
+        symbols = [symbol] if symbol else list(self.buffers.keys())
+        for sym in symbols:
+            buf = self.buffers.pop(sym, None)
+            if not buf or not buf["rows"]:
+                continue
+            cols = list(zip(*buf["rows"]))
+            blob, _ = encode_chunk(*cols)
+
+            day_dir = os.path.join(self.root, sym, buf["day"])
+            os.makedirs(day_dir, exist_ok=True)
+            index_path = os.path.join(day_dir, "index.vsc")
+            chunk_no = 0
+            if os.path.exists(index_path):
+                with open(index_path) as f:
+                    chunk_no = sum(1 for line in f if line.strip())
+            chunk_name = f"chunk_{chunk_no:05d}.obz"
+
+            with open(os.path.join(day_dir, chunk_name), "wb") as f:
+                f.write(blob)
+            with open(index_path, "a") as f:
+                f.write(f"{chunk_name}|{min(cols[0])}|{max(cols[0])}|{len(cols[0])}\n")
+
+
+class BookArchiveReader:
+    """
+     BOOK ARCHIVE READER
+    Usa o index.vsc para abrir apenas os chunks que intersectam [start_us, end_us].
+    """
+    def __init__(self, root=ARCHIVE_ROOT):
+        self.root = root
+
+    def days(self, symbol):
+        path = os.path.join(self.root, symbol)
+        return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+    def chunks(self, symbol, start_us=None, end_us=None):
+        for day in self.days(symbol):
+            if start_us and day < _day_of(start_us):
+                continue
+            if end_us and day > _day_of(end_us):
+                break
+            day_dir = os.path.join(self.root, symbol, day)
+            index_path = os.path.join(day_dir, "index.vsc")
+            if not os.path.exists(index_path):
+                continue
+            with open(index_path) as f:
+                for line in f:
+                    parts = line.strip().split("|")
+                    if len(parts) != 4:
+                        continue
+                    first_ts, last_ts = int(parts[1]), int(parts[2])
+                    if (start_us and last_ts < start_us) or (end_us and first_ts > end_us):
+                        continue
+                    with open(os.path.join(day_dir, parts[0]), "rb") as cf:
+                        yield decode_chunk(cf.read())
+
+    def load(self, symbol, start_us=None, end_us=None):
+        """Concatena todas as colunas do intervalo, ordenadas por ts."""
+        parts = list(self.chunks(symbol, start_us, end_us))
+        if not parts:
+            return None
+        cols = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+        order = np.argsort(cols["ts"], kind="stable")
+        cols = {k: v[order] for k, v in cols.items()}
+        if start_us or end_us:
+            mask = np.ones(len(cols["ts"]), dtype=bool)
+            if start_us:
+                mask &= cols["ts"] >= start_us
+            if end_us:
+                mask &= cols["ts"] <= end_us
+            cols = {k: v[mask] for k, v in cols.items()}
+        return cols
+
+
+class ReplayBook:
+    """Livro local reconstruído no replay. depth() devolve o mesmo formato de get_orderbook_depth."""
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = {}
+        self.asks = {}
+        self.ts = 0
+
+    def apply(self, kind, side, price, qty):
+        levels = self.bids if side == BID else self.asks
+        if qty <= 0:
+            levels.pop(price, None)
+        else:
+            levels[price] = qty
+
+    def depth(self, limit=100):
+        bids = sorted(self.bids.items(), reverse=True)[:limit]
+        asks = sorted(self.asks.items())[:limit]
+        return {
+            "bids": [[str(p), str(q)] for p, q in bids], # Melhor bid primeiro (igual ao BackpackTransport)
+            "asks": [[str(p), str(q)] for p, q in asks],
+            "timestamp": self.ts,
+        }
+
+
+class BookReplay:
+    """
+     BOOK REPLAY
+    Iterador de eventos: ("book", ts_us, ReplayBook) após cada update e ("trade", ts_us, trade_dict).
+    speed=None: o mais rápido possível | 1.0: tempo real | 10.0: 10x.
+    """
+    def __init__(self, symbol, start_us=None, end_us=None, speed=None, root=ARCHIVE_ROOT):
+        self.symbol = symbol
+        self.start_us = start_us
+        self.end_us = end_us
+        self.speed = speed
+        self.reader = BookArchiveReader(root)
+        self.book = ReplayBook(symbol)
+
+    def __iter__(self):
+        cols = self.reader.load(self.symbol, self.start_us, self.end_us)
+        if cols is None:
+            return
+        ts, kind, side = cols["ts"], cols["kind"], cols["side"]
+        price, qty = cols["price"], cols["qty"]
+        n = len(ts)
+
+        wall_start = time.time()
+        replay_start = int(ts[0]) if n else 0
+        i = 0
+        while i < n:
+            t = int(ts[i])
+            if self.speed:
+                delay = (t - replay_start) / 1_000_000 / self.speed - (time.time() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            if kind[i] == TRADE:
+                yield "trade", t, {
+                    "symbol": self.symbol,
+                    "price": float(price[i]),
+                    "quantity": float(qty[i]),
+                    "side": "Bid" if side[i] == BID else "Ask",
+                    "timestamp": t,
+                }
+                i += 1
+                continue
+
+            # Agrupa todas as linhas de book com o mesmo ts (um snapshot ou um lote de diffs)
+            j = i
+            while j < n and ts[j] == t and kind[j] != TRADE:
+                j += 1
+            if kind[i] == SNAPSHOT:
+                self.book.bids.clear()
+                self.book.asks.clear()
+            for k in range(i, j):
+                self.book.apply(kind[k], side[k], float(price[k]), float(qty[k]))
+            self.book.ts = t
+            yield "book", t, self.book
+            i = j
+
+    def to_frames(self, levels=20, sample_us=0):
+        """Converte o replay em (BookFrames, TradeTape) para o ExecutionSimulator."""
+        try:
+            from .execution_simulator import BookFrames, TradeTape
+        except ImportError:
+            from execution_simulator import BookFrames, TradeTape
+
+        book_ts, bid_px, bid_sz, ask_px, ask_sz = [], [], [], [], []
+        t_ts, t_px, t_qty, t_side = [], [], [], []
+        last_sample = None
+        for event, t, payload in self:
+            if event == "trade":
+                t_ts.append(t)
+                t_px.append(payload["price"])
+                t_qty.append(payload["quantity"])
+                t_side.append(BID if payload["side"] == "Bid" else ASK)
+                continue
+            if last_sample is not None and t - last_sample < sample_us:
+                continue
+            last_sample = t
+            bids = sorted(payload.bids.items(), reverse=True)[:levels]
+            asks = sorted(payload.asks.items())[:levels]
+            row_bp, row_bs = np.full(levels, np.nan), np.zeros(levels)
+            row_ap, row_as = np.full(levels, np.nan), np.zeros(levels)
+            if bids:
+                row_bp[:len(bids)], row_bs[:len(bids)] = zip(*bids)
+            if asks:
+                row_ap[:len(asks)], row_as[:len(asks)] = zip(*asks)
+            book_ts.append(t)
+            bid_px.append(row_bp)
+            bid_sz.append(row_bs)
+            ask_px.append(row_ap)
+            ask_sz.append(row_as)
+
+        frames = BookFrames(book_ts, np.array(bid_px).reshape(-1, levels), np.array(bid_sz).reshape(-1, levels),
+                            np.array(ask_px).reshape(-1, levels), np.array(ask_sz).reshape(-1, levels))
+        return frames, TradeTape(t_ts, t_px, t_qty, t_side)
+
+
+class ReplayTransport:
+    """
+    Stand-in mínimo do BackpackTransport para rodar lógica de OBI (calculate_obi, get_whale_obi,
+    VSCTransformer, BookScanner) sobre o replay: get_orderbook_depth lê o livro reconstruído.
+    """
+    def __init__(self, replays):
+        self.replays = {r.symbol: r for r in replays}
+
+    def get_orderbook_depth(self, symbol, limit=100):
+        replay = self.replays.get(symbol)
+        return replay.book.depth(limit) if replay else None
+
+
+class BookRecorder:
+    """
+     BOOK RECORDER (Serviço)
+    Grava diffs de profundidade (depth.SYMBOL) e trades (trade.SYMBOL) via WebSocket público,
+    com snapshot REST periódico como âncora para o replay.
+    Tudo no relógio da exchange (µs): snapshots usam o timestamp do /depth; sem ele (ou evento sem T/E),
+    relógio local + offset medido nos eventos do stream, para o skew local não reordenar o replay.
+    """
+    def __init__(self, symbols, transport, writer=None, snapshot_interval=60):
+        self.symbols = symbols
+        self.transport = transport
+        self.writer = writer or BookArchiveWriter()
+        self.snapshot_interval = snapshot_interval
+        self.logger = logging.getLogger("BookRecorder")
+        self.is_running = True
+        self.events = 0
+        self.clock_offset = 0 # µs: relógio da exchange - relógio local (último evento com T/E)
+
+    def _exchange_us(self, value):
+        """Timestamp da exchange em µs (aceita s/ms/µs/ns). Ausente: relógio local corrigido pelo offset."""
+        local = int(time.time() * 1_000_000)
+        try:
+            ts = int(value)
+        except (TypeError, ValueError):
+            return local + self.clock_offset
+        if ts <= 0:
+            return local + self.clock_offset
+        ts = ts // 1000 if ts > 1e17 else ts if ts > 1e14 else ts * 1000 if ts > 1e11 else ts * 1_000_000
+        self.clock_offset = ts - local
+        return ts
+
+    async def _snapshot_loop(self):
+        while self.is_running:
+            for symbol in self.symbols:
+                depth = await asyncio.to_thread(self.transport.get_orderbook_depth, symbol, 1000)
+                if depth:
+                    self.writer.append_snapshot(symbol, self._exchange_us(depth.get("timestamp")), depth)
+            self.writer.flush_due()
+            await asyncio.sleep(self.snapshot_interval)
+
+    def _on_message(self, msg):
+        data = msg.get("data") or {}
+        stream = msg.get("stream", "")
+        symbol = data.get("s")
+        if not symbol:
+            return
+        if stream.startswith("depth."):
+            ts = self._exchange_us(data.get("T") or data.get("E"))
+            for p, q in data.get("b", []):
+                self.writer.append(symbol, ts, DIFF, BID, float(p), float(q))
+            for p, q in data.get("a", []):
+                self.writer.append(symbol, ts, DIFF, ASK, float(p), float(q))
+        elif stream.startswith("trade."):
+            ts = self._exchange_us(data.get("T") or data.get("E"))
+            # m = buyer is maker -> agressor vendedor
+            side = ASK if data.get("m") else BID
+            self.writer.append(symbol, ts, TRADE, side, float(data["p"]), float(data["q"]))
+        self.events += 1
+
+    async def _stream_loop(self):
+        import websockets
+        params = [f"depth.{s}" for s in self.symbols] + [f"trade.{s}" for s in self.symbols]
+        while self.is_running:
+            try:
+                async with websockets.connect(WS_URL, ping_interval=20, max_size=None) as ws:
+                    await ws.send(json.dumps({"method": "SUBSCRIBE", "params": params}))
+                    self.logger.info(f" Gravando {len(self.symbols)} símbolos ({len(params)} streams)")
+                    async for raw in ws:
+                        self._on_message(json.loads(raw))
+                        if self.events % 1000 == 0:
+                            self.writer.flush_due()
+            except Exception as e:
+                self.logger.warning(f"️ Stream caiu ({e}). Reconectando em 3s...")
+                await asyncio.sleep(3)
+
+    async def run(self):
+        try:
+            await asyncio.gather(self._stream_loop(), self._snapshot_loop())
+        finally:
+            self.writer.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Book Recorder (depth + trades -> arquivo colunar comprimido)")
+    parser.add_argument("--symbols", nargs="+", default=["BTC_USDC_PERP", "SOL_USDC_PERP"])
+    parser.add_argument("--snapshot-interval", type=int, default=60)
+    parser.add_argument("--root", default=ARCHIVE_ROOT)
+    args = parser.parse_args()
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.backpack_transport import BackpackTransport
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    recorder = BookRecorder(args.symbols, BackpackTransport(), BookArchiveWriter(args.root), args.snapshot_interval)
+    try:
+        asyncio.run(recorder.run())
+    except KeyboardInterrupt:
+        recorder.writer.flush()
+        print("\n Recorder encerrado.")
@@ -0,0 +1,150 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+
+INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "8h": 28800,
+    "12h": 43200, "1d": 86400, "3d": 259200, "1w": 604800
+}
+
+# Relativo ao backend_core, não ao CWD: TrendService/PortfolioRisk/VolumeFarmer leem o mesmo histórico
+CANDLES_ROOT = os.getenv("OBI_CANDLES", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "candles"))
+
+FIELDS = ("ts", "open", "high", "low", "close", "volume", "quote_volume")
+
+
+class CandleStore:
+    """
+     CANDLE STORE
+    Histórico OHLCV por (símbolo, intervalo) em arrays NumPy, persistido em backend_core/data/candles/*.npz (OBI_CANDLES).
+    refresh() baixa apenas as velas que faltam desde a última gravada (sem re-download do histórico).
+    """
+    def __init__(self, root=CANDLES_ROOT, max_bars=5000):
+        self.root = root
+        self.max_bars = max_bars
+        self.series = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, symbol, interval):
+        return os.path.join(self.root, f"{symbol}_{interval}.npz")
+
+    def get(self, symbol, interval):
+        """Retorna dict de arrays (ts em epoch segundos, início da vela) ou None."""
+        key = (symbol, interval)
+        if key not in self.series:
+            path = self._path(symbol, interval)
+            if os.path.exists(path):
+                with np.load(path) as data:
+                    self.series[key] = {f: data[f] for f in FIELDS}
+            else:
+                return None
+        return self.series[key]
+
+    def last_ts(self, symbol, interval):
+        data = self.get(symbol, interval)
+        return int(data["ts"][-1]) if data is not None and len(data["ts"]) else None
+
+    def ingest(self, symbol, interval, klines, persist=True):
+        """
+        Mescla klines no formato da API (/api/v1/klines) no histórico.
+        Velas com o mesmo 'start' são substituídas (a vela em formação é atualizada).
+        Retorna quantas velas novas foram adicionadas.
+        """
+        if not klines:
+            return 0
+        df = pd.DataFrame(klines)
+        if "start" not in df:
+            return 0
+        incoming = {
+            "ts": pd.to_datetime(df["start"], utc=True).to_numpy("datetime64[s]").astype(np.int64),
+            "open": df["open"].astype(float).to_numpy(),
+            "high": df["high"].astype(float).to_numpy(),
+            "low": df["low"].astype(float).to_numpy(),
+            "close": df["close"].astype(float).to_numpy(),
+            "volume": df["volume"].astype(float).to_numpy() if "volume" in df else np.zeros(len(df)),
+            "quote_volume": df["quoteVolume"].astype(float).to_numpy() if "quoteVolume" in df else np.zeros(len(df)),
+        }
+        return self.ingest_arrays(symbol, interval, incoming, persist)
+
+    def ingest_arrays(self, symbol, interval, incoming, persist=True):
+        current = self.get(symbol, interval)
+        before = 0 if current is None else len(current["ts"])
+        if current is None:
+            merged = incoming
+        else:
+            merged = {f: np.concatenate([current[f], incoming[f]]) for f in FIELDS}
+
+        # Dedup por ts mantendo a última ocorrência (dados mais novos vencem)
+        ts = merged["ts"]
+        _, last_idx = np.unique(ts[::-1], return_index=True)
+        keep = np.sort(len(ts) - 1 - last_idx)
+        merged = {f: np.asarray(merged[f][keep]) for f in FIELDS}
+        if len(merged["ts"]) > self.max_bars:
+            merged = {f: v[-self.max_bars:] for f, v in merged.items()}
+
+        self.series[(symbol, interval)] = merged
+        added = len(merged["ts"]) - before
+        if persist and added:
+            np.savez(self._path(symbol, interval), **merged)
+        return max(0, added)
+
+    def refresh(self, transport, symbol, interval, limit=1000):
+        """Busca só o que falta desde a última vela gravada (mínimo 2: última fechada + em formação)."""
+        last = self.last_ts(symbol, interval)
+        seconds = INTERVAL_SECONDS.get(interval, 3600)
+        if last is not None:
+            missing = int((time.time() - last) // seconds) + 2
+            limit = max(2, min(limit, missing))
+        klines = transport.get_klines(symbol, interval, limit=limit)
+        return self.ingest(symbol, interval, klines)
+
+    def resample(self, symbol, interval, base="1m", start=None):
+        """
+        Agrega a série `base` em velas de `interval` (início = ts // segundos * segundos, UTC).
+        start: ignora velas base anteriores (reagrega só a cauda). Retorna dict de arrays ou None.
+        """
+        data = self.get(symbol, base)
+        if data is None or not len(data["ts"]):
+            return None
+        seconds = INTERVAL_SECONDS[interval]
+        first = 0 if start is None else int(np.searchsorted(data["ts"], start))
+        if first >= len(data["ts"]):
+            return None
+        src = {f: v[first:] for f, v in data.items()}
+        bucket = src["ts"] // seconds * seconds
+        ts, idx = np.unique(bucket, return_index=True)
+        last = np.r_[idx[1:], len(bucket)] - 1
+        return {
+            "ts": ts,
+            "open": src["open"][idx],
+            "high": np.maximum.reduceat(src["high"], idx),
+            "low": np.minimum.reduceat(src["low"], idx),
+            "close": src["close"][last],
+            "volume": np.add.reduceat(src["volume"], idx),
+            "quote_volume": np.add.reduceat(src["quote_volume"], idx),
+        }
+
+    def closes(self, symbols, interval, n=None):
+        """
+        Matriz de fechamentos alinhada por timestamp comum (T x K).
+        Retorna (ts, matrix) ou (None, None) se algum símbolo não tiver histórico.
+        """
+        series = [self.get(s, interval) for s in symbols]
+        if any(s is None or not len(s["ts"]) for s in series):
+            return None, None
+        common = series[0]["ts"]
+        for s in series[1:]:
+            common = np.intersect1d(common, s["ts"], assume_unique=True)
+        if n:
+            common = common[-n:]
+        matrix = np.column_stack([s["close"][np.searchsorted(s["ts"], common)] for s in series])
+        return common, matrix
+
+    def stale(self, symbol, interval, now=None):
+        """True se já existe vela fechada além da última gravada (vale a pena chamar refresh)."""
+        last = self.last_ts(symbol, interval)
+        if last is None:
+            return True
+        return (now or time.time()) >= last + INTERVAL_SECONDS.get(interval, 3600)
@@ -0,0 +1,239 @@
+import os
+import time
+import logging
+import requests
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+PUBLIC_URL = os.getenv("BACKPACK_API_URL", "https://api.backpack.exchange")
+FUNDING_PERIODS_PER_YEAR = 24 * 365 # Funding horário
+
+
+def book_imbalance(depth, levels=10):
+    """OBI simples: (BidVol - AskVol) / (BidVol + AskVol) nos `levels` melhores níveis."""
+    bids, asks = (depth or {}).get('bids') or [], (depth or {}).get('asks') or []
+    if not bids or not asks:
+        return 0.0
+    # Ordenação varia (REST ascendente, BackpackTransport devolve bids invertidos): seleciona pelo preço
+    bids, asks = np.asarray(bids, dtype=float), np.asarray(asks, dtype=float)
+    bid_vol = float(bids[np.argsort(-bids[:, 0], kind='stable')[:levels], 1].sum())
+    ask_vol = float(asks[np.argsort(asks[:, 0], kind='stable')[:levels], 1].sum())
+    total = bid_vol + ask_vol
+    return (bid_vol - ask_vol) / total if total else 0.0
+
+
+class CarryAnalytics:
+    """
+     CARRY ANALYTICS (Funding / Lend / Basis em Lote)
+    Uma varredura = 3 chamadas em paralelo (markPrices, tickers, borrowLend/markets),
+    não importa quantos ativos existam:
+    - Funding APR, Lend APY, carry total e basis spot/perp calculados de uma vez (vetorizado).
+    - Histórico de funding por período (deque por símbolo) -> persistência do sinal,
+      para ranquear por carry recorrente e não só pelo valor do momento.
+    - Book (OBI) e histórico de funding só para a shortlist, em paralelo.
+    data_client é opcional: métodos que ele não tiver caem nos endpoints públicos.
+    """
+    def __init__(self, data_client=None, history_len=168, max_workers=8, obi_fn=None,
+                 base_url=PUBLIC_URL, logger=None):
+        self.data = data_client
+        self.history_len = history_len
+        self.history = {}   # symbol -> deque[(período, fundingRate)]
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="CarryAnalytics")
+        self.obi_fn = obi_fn or book_imbalance
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.logger = logger or logging.getLogger("CarryAnalytics")
+
+    # --- DADOS ---
+
+    def _public(self, endpoint, params=None):
+        resp = self.session.get(f"{self.base_url}{endpoint}", params=params, timeout=10)
+        resp.raise_for_status()
+        return resp.json()
+
+    def _fetch(self, method, endpoint, *args, params=None):
+        fn = getattr(self.data, method, None) if self.data is not None else None
+        try:
+            return fn(*args) if fn else self._public(endpoint, params)
+        except Exception as e:
+            self.logger.warning(f"️ Falha em {endpoint}: {e}")
+            return None
+
+    def fetch_universe(self):
+        """(mark_prices, tickers, lending) buscados em paralelo."""
+        jobs = [
+            self.pool.submit(self._fetch, "get_mark_prices", "/api/v1/markPrices"),
+            self.pool.submit(self._fetch, "get_tickers", "/api/v1/tickers"),
+            self.pool.submit(self._fetch, "get_borrow_lend_markets", "/api/v1/borrowLend/markets"),
+        ]
+        return tuple(job.result() if isinstance(job.result(), list) else [] for job in jobs)
+
+    # --- HISTÓRICO DE FUNDING ---
+
+    def record(self, symbols, rates, periods):
+        """Um ponto por período de funding: dentro do mesmo período, a taxa é atualizada."""
+        for symbol, rate, period in zip(symbols, rates, periods):
+            hist = self.history.setdefault(symbol, deque(maxlen=self.history_len))
+            if hist and hist[-1][0] == period:
+                hist[-1] = (period, rate)
+            elif not hist or period > hist[-1][0]:
+                hist.append((period, rate))
+
+    def _submit_history(self, symbols, limit=None):
+        """Futures de /api/v1/fundingRates para quem ainda não tem histórico. {symbol: future}"""
+        limit = limit or self.history_len
+        return {
+            s: self.pool.submit(self._fetch, "get_funding_rates", "/api/v1/fundingRates", s,
+                                params={'symbol': s, 'limit': limit})
+            for s in symbols if len(self.history.get(s, ())) < 2
+        }
+
+    def _apply_history(self, futures):
+        for symbol, future in futures.items():
+            data = future.result()
+            if not isinstance(data, list) or not data:
+                continue
+            past = sorted(
+                (int(pd.Timestamp(r['intervalEndTimestamp']).timestamp()), float(r.get('fundingRate', 0)))
+                for r in data if r.get('intervalEndTimestamp')
+            )
+            current = list(self.history.get(symbol, ()))
+            hist = self.history[symbol] = deque(maxlen=self.history_len)
+            for period, rate in past + current:
+                if not hist or period > hist[-1][0]:
+                    hist.append((period, rate))
+
+    def seed_history(self, symbols, limit=None):
+        """Aquece o histórico via /api/v1/fundingRates (em paralelo) para quem ainda não tem."""
+        self._apply_history(self._submit_history(symbols, limit))
+
+    def persistence(self, symbols, rates):
+        """
+        (avg_funding, persistence) por símbolo, como arrays.
+        persistence = fração dos períodos com o mesmo sinal da taxa atual (0..1).
+        """
+        width = max([len(self.history.get(s, ())) for s in symbols] + [1])
+        matrix = np.full((len(symbols), width), np.nan)
+        for i, s in enumerate(symbols):
+            hist = self.history.get(s)
+            if hist:
+                matrix[i, -len(hist):] = [rate for _, rate in hist]
+        empty = np.isnan(matrix).all(axis=1)
+        matrix[empty, -1] = np.asarray(rates, dtype=float)[empty]
+        with np.errstate(invalid="ignore"):
+            avg = np.nanmean(matrix, axis=1)
+            same = np.sign(matrix) == np.sign(np.asarray(rates, dtype=float))[:, None]
+            persistence = np.where(np.isnan(matrix), np.nan, same).astype(float)
+            persistence = np.nanmean(persistence, axis=1)
+        return avg, persistence
+
+    # --- VARREDURA ---
+
+    def scan(self, quote="USDC"):
+        """
+        Tabela (DataFrame) de todos os perps: funding, funding_apr, lend_apy, carry_apr, strategy,
+        spot, perp, basis_pct, avg_funding, persistence, persistent_apr. Vazia se a API falhar.
+        """
+        marks, tickers, lending = self.fetch_universe()
+        if not marks:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(marks)
+        df = df[df['symbol'].str.endswith('_PERP') & df['symbol'].str.contains(f"_{quote}")].reset_index(drop=True)
+        if df.empty:
+            return df
+        num = lambda col: pd.to_numeric(df[col], errors='coerce') if col in df else pd.Series(np.nan, index=df.index)
+        df['funding'] = num('fundingRate').fillna(0.0)
+        df['mark'] = num('markPrice')
+        df['base'] = df['symbol'].str.split('_').str[0]
+
+        last = pd.Series({t['symbol']: t.get('lastPrice') for t in tickers if t.get('symbol')}, dtype=object)
+        last = pd.to_numeric(last, errors='coerce')
+        df['perp'] = df['symbol'].map(last).fillna(df['mark'])
+        df['spot'] = (df['base'] + f"_{quote}").map(last).fillna(num('indexPrice'))
+        df['basis_pct'] = np.where(df['spot'] > 0, (df['perp'] - df['spot']) / df['spot'] * 100, np.nan)
+
+        # Lend APY decimal (0.05 = 5%): 'estimatedApy' quando existir, senão a taxa de lend
+        lend = {
+            item.get('symbol'): float(item.get('estimatedApy', item.get('lendInterestRate', 0)) or 0)
+            for item in lending if item.get('symbol')
+        }
+        df['lend_apy'] = df['base'].map(lend).fillna(0.0) * 100
+
+        df['funding_apr'] = df['funding'] * FUNDING_PERIODS_PER_YEAR * 100
+        positive = df['funding'] > 0
+        # Funding > 0: Long Spot (rende Lend) + Short Perp (recebe Funding). Funding < 0: Long Perp.
+        df['carry_apr'] = np.where(positive, df['lend_apy'] + df['funding_apr'], df['funding_apr'].abs())
+        df['strategy'] = np.where(positive, "Delta Neutral (Long Spot + Short Perp)", "Long Perp (Funding Play)")
+
+        if 'nextFundingTimestamp' in df:
+            periods = (num('nextFundingTimestamp').fillna(0) // 1000).astype(np.int64)
+        else:
+            periods = pd.Series(int(time.time()) // 3600 * 3600 + 3600, index=df.index)
+        self.record(df['symbol'], df['funding'], periods)
+        self._rank(df)
+        return df
+
+    def _rank(self, df):
+        avg, persistence = self.persistence(list(df['symbol']), df['funding'].to_numpy())
+        df['avg_funding'] = avg
+        df['persistence'] = persistence
+        df['samples'] = [len(self.history.get(s, ())) for s in df['symbol']]
+        # Carry recorrente: APR da média do histórico, só conta o lado que paga
+        avg_apr = np.abs(avg) * FUNDING_PERIODS_PER_YEAR * 100
+        df['persistent_apr'] = np.where(avg > 0, df['lend_apy'] + avg_apr, avg_apr) * persistence
+
+    def _submit_depth(self, symbols):
+        return {s: self.pool.submit(self._fetch, "get_orderbook_depth", "/api/v1/depth", s,
+                                    params={'symbol': s}) for s in symbols}
+
+    def _apply_depth(self, futures):
+        result = {}
+        for symbol, future in futures.items():
+            book = future.result()
+            try:
+                result[symbol] = float(self.obi_fn(book)) if book else 0.0
+            except Exception:
+                result[symbol] = 0.0
+        return result
+
+    def depth(self, symbols):
+        """OBI da shortlist (books buscados em paralelo). {symbol: obi}"""
+        return self._apply_depth(self._submit_depth(symbols))
+
+    def analyze(self, top=30, by="abs_funding", min_carry_apr=None):
+        """
+        Varredura completa + estágio de profundidade: shortlist dos `top` por `by`
+        ('abs_funding' ou qualquer coluna da tabela), histórico aquecido e OBI em paralelo.
+        Retorna a shortlist (DataFrame) ordenada por persistent_apr.
+        """
+        df = self.scan()
+        if df.empty:
+            return df
+        if min_carry_apr is not None:
+            df = df[df['carry_apr'] > min_carry_apr]
+        key = df['funding'].abs() if by == "abs_funding" else df[by]
+        short = df.loc[key.sort_values(ascending=False).index[:top]].copy()
+        if short.empty:
+            return short
+
+        symbols = list(short['symbol'])
+        # Books e histórico de funding da shortlist disparados juntos
+        books, rates = self._submit_depth(symbols), self._submit_history(symbols)
+        self._apply_history(rates)
+        obi = self._apply_depth(books)
+        short['obi'] = short['symbol'].map(obi).fillna(0.0)
+        self._rank(short)
+        return short.sort_values('persistent_apr', ascending=False).reset_index(drop=True)
+
+    def basis(self, assets, quote="USDC"):
+        """Basis spot/perp só dos ativos pedidos (ex.: ['SOL', 'BTC']), numa única varredura."""
+        df = self.scan(quote)
+        if df.empty:
+            return df
+        return df[df['base'].isin(assets)].reset_index(drop=True)
+
+    def close(self):
+        self.pool.shutdown(wait=False)
@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import zlib
+import time
+import struct
+import threading
+from multiprocessing import shared_memory
+
+CHANNEL_SIZE = 1 << 16 # 64 KB: configs de risco são pequenas
+
+# Header: version (Q) | updated_at (d) | payload_len (I) — seqlock: versão ímpar = escrevendo
+CHANNEL_HEADER = struct.Struct("<QdI")
+PAYLOAD_OFFSET = CHANNEL_HEADER.size
+
+
+def _untrack(shm):
+    """Tira o segmento do resource_tracker: a config publicada sobrevive ao processo que publicou."""
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def _attach(name):
+    """Abre o segmento do canal, criando-o (zerado = versão 0) se ainda não existir."""
+    for create in (False, True, False):
+        try:
+            try:
+                return shared_memory.SharedMemory(name=name, create=create, size=CHANNEL_SIZE, track=False)
+            except TypeError:
+                # Python < 3.13
+                shm = shared_memory.SharedMemory(name=name, create=create, size=CHANNEL_SIZE)
+                _untrack(shm)
+                return shm
+        except (FileNotFoundError, FileExistsError):
+            continue # Corrida com outro processo criando o mesmo canal
+    raise FileNotFoundError(name)
+
+
+class ConfigChannel:
+    """
+     CONFIG CHANNEL (Parâmetros Versionados)
+    Config publicada em memória compartilhada com número de versão (seqlock, como o AccountState).
+    Leitores checam a versão (um struct.unpack) e só decodificam o JSON quando ela muda.
+    O publicador também grava o arquivo, que é o estado inicial após reboot e o que o dashboard lê.
+    Uma instância por (processo, arquivo): shared(path) devolve sempre a mesma.
+    """
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path, defaults=None):
+        self.path = path
+        self.defaults = dict(defaults or {})
+        self.name = f"obi_cfg_{zlib.crc32(os.path.abspath(path).encode()):08x}"
+        self.shm = _attach(self.name)
+        self.write_lock = threading.Lock()
+        self._cache_version = -1
+        self._cache = None
+
+    @classmethod
+    def shared(cls, path, defaults=None):
+        key = (os.getpid(), os.path.abspath(path))
+        with cls._shared_lock:
+            channel = cls._shared.get(key)
+            if channel is None:
+                channel = cls._shared[key] = cls(path, defaults)
+            return channel
+
+    @property
+    def version(self):
+        return CHANNEL_HEADER.unpack_from(self.shm.buf, 0)[0]
+
+    def snapshot(self):
+        """
+        (versão, config). Versão 0 = nada publicado desde o boot: a config vem do arquivo (ou dos defaults).
+        O dict devolvido é compartilhado entre chamadas: copie antes de alterar.
+        """
+        buf = self.shm.buf
+        for _ in range(100):
+            v1, _, length = CHANNEL_HEADER.unpack_from(buf, 0)
+            if v1 & 1:
+                time.sleep(0.0005)
+                continue
+            if v1 == self._cache_version:
+                return v1, self._cache
+            if v1 == 0:
+                config = self._read_file()
+            else:
+                payload = bytes(buf[PAYLOAD_OFFSET:PAYLOAD_OFFSET + length])
+                if CHANNEL_HEADER.unpack_from(buf, 0)[0] != v1:
+                    continue
+                config = json.loads(payload)
+            self._cache, self._cache_version = config, v1
+            return v1, config
+        return self._cache_version, self._cache if self._cache is not None else dict(self.defaults)
+
+    def publish(self, config):
+        """Publica uma nova versão (e persiste no arquivo). Retorna o número da versão."""
+        payload = json.dumps(config, separators=(',', ':')).encode()
+        if PAYLOAD_OFFSET + len(payload) > CHANNEL_SIZE:
+            raise ValueError(f"Config excede {CHANNEL_SIZE} bytes ({len(payload)})")
+        with self.write_lock:
+            buf = self.shm.buf
+            version = CHANNEL_HEADER.unpack_from(buf, 0)[0] & ~1
+            CHANNEL_HEADER.pack_into(buf, 0, version + 1, time.time(), 0)
+            buf[PAYLOAD_OFFSET:PAYLOAD_OFFSET + len(payload)] = payload
+            CHANNEL_HEADER.pack_into(buf, 0, version + 2, time.time(), len(payload))
+            self._write_file(config)
+        return version + 2
+
+    def _read_file(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict(self.defaults)
+
+    def _write_file(self, config):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(config, f, indent=4)
+        os.replace(tmp, self.path)
+
+    def close(self):
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    # python core/config_channel.py [risk_config.json] [--publish]
+    # --publish: empurra para o canal uma edição manual do arquivo
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    channel = ConfigChannel(args[0] if args else "risk_config.json")
+    if '--publish' in sys.argv:
+        print(f"Publicado: v{channel.publish(channel._read_file())}")
+    version, config = channel.snapshot()
+    print(f"{channel.name} v{version}")
+    print(json.dumps(config, indent=4))
@@ -0,0 +1,1283 @@
+import sys
+import json
+import time
+import base64
+import random
+import asyncio
+import logging
+import argparse
+import itertools
+import threading
+from bisect import bisect_left, insort
+from collections import deque, Counter
+from datetime import datetime, timezone
+from decimal import Decimal
+
+try:
+    from .execution_simulator import MAKER_FEE, TAKER_FEE
+    from .book_archive import BookArchiveReader, ARCHIVE_ROOT, SNAPSHOT, TRADE, BID
+    from .market_registry import MarketRegistry, MARKETS_CACHE
+    from .order_replace import fmt_number
+except ImportError:
+    from execution_simulator import MAKER_FEE, TAKER_FEE
+    from book_archive import BookArchiveReader, ARCHIVE_ROOT, SNAPSHOT, TRADE, BID
+    from market_registry import MarketRegistry, MARKETS_CACHE
+    from order_replace import fmt_number
+
+DEFAULT_PORT = 8787
+EPS = 1e-12
+KLINE_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "8h": 28800,
+    "12h": 43200, "1d": 86400, "3d": 259200, "1w": 604800
+}
+
+
+def _now_us():
+    return int(time.time() * 1_000_000)
+
+
+def _bool(value):
+    return value is True or str(value).lower() == "true"
+
+
+def _decimals(value):
+    """Casas decimais de um número vindo do payload (string ou float)."""
+    return max(0, -Decimal(str(value)).normalize().as_tuple().exponent)
+
+
+def _on_grid(value, unit):
+    """value é múltiplo exato de unit (tickSize/stepSize), em Decimal: 150.03 num tick 0.05 não passa."""
+    return Decimal(str(value)) % Decimal(fmt_number(unit)) == 0
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+
+
+def _kline_time(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SimError(Exception):
+    """Erro da API simulada: vira HTTP `status` com {"code", "message"} (formato da Backpack)."""
+    def __init__(self, code, message, status=400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+
+
+class SimOrder:
+    """Ordem no simulador. owner: 'user' (conta simulada), 'book' (liquidez gravada) ou 'tape' (trade gravado)."""
+    __slots__ = ("id", "client_id", "symbol", "side", "order_type", "price", "quantity", "quote_quantity",
+                 "filled", "quote_filled", "status", "tif", "post_only", "reduce_only", "trigger_price",
+                 "trigger_above", "created_at", "seq", "owner", "resting")
+
+    def __init__(self, oid, symbol, side, order_type, quantity, price=None, tif="GTC", post_only=False,
+                 reduce_only=False, trigger_price=None, quote_quantity=None, client_id=None, owner="user", seq=0):
+        self.id = oid
+        self.client_id = client_id
+        self.symbol = symbol
+        self.side = side
+        self.order_type = order_type
+        self.price = price
+        self.quantity = quantity
+        self.quote_quantity = quote_quantity
+        self.filled = 0.0
+        self.quote_filled = 0.0
+        self.status = "New"
+        self.tif = tif
+        self.post_only = post_only
+        self.reduce_only = reduce_only
+        self.trigger_price = trigger_price
+        self.trigger_above = False
+        self.created_at = int(time.time() * 1000)
+        self.seq = seq
+        self.owner = owner
+        self.resting = False
+
+    @property
+    def remaining(self):
+        if self.quote_quantity is not None and not self.quantity:
+            return float("inf") if self.quote_quantity - self.quote_filled > EPS else 0.0
+        return max(0.0, self.quantity - self.filled)
+
+    def to_api(self):
+        order = {
+            "id": self.id,
+            "clientId": self.client_id,
+            "symbol": self.symbol,
+            "side": self.side,
+            "orderType": self.order_type,
+            "quantity": fmt_number(self.quantity) if self.quantity else None,
+            "executedQuantity": fmt_number(self.filled),
+            "executedQuoteQuantity": fmt_number(self.quote_filled),
+            "status": self.status,
+            "timeInForce": self.tif,
+            "postOnly": self.post_only,
+            "reduceOnly": self.reduce_only,
+            "selfTradePrevention": "Allow",
+            "createdAt": self.created_at,
+        }
+        if self.price is not None:
+            order["price"] = fmt_number(self.price)
+        if self.quote_quantity is not None:
+            order["quoteQuantity"] = fmt_number(self.quote_quantity)
+        if self.trigger_price is not None:
+            order["triggerPrice"] = fmt_number(self.trigger_price)
+            order["triggerQuantity"] = order["quantity"]
+        return order
+
+    def to_ws(self, event):
+        return {
+            "e": event, "E": _now_us(), "s": self.symbol, "c": self.client_id, "S": self.side,
+            "o": self.order_type, "f": self.tif, "q": fmt_number(self.quantity or 0),
+            "p": fmt_number(self.price) if self.price is not None else None,
+            "P": fmt_number(self.trigger_price) if self.trigger_price is not None else None,
+            "X": self.status, "i": self.id, "z": fmt_number(self.filled), "Z": fmt_number(self.quote_filled),
+            "r": self.reduce_only, "T": _now_us(),
+        }
+
+
+class OrderBook:
+    """
+    Livro de um símbolo com prioridade preço-tempo.
+    Cada nível é uma fila (deque) de ordens; a liquidez gravada entra como uma ordem 'book' por nível,
+    então ordens da conta simulada disputam fila com ela.
+    """
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.levels = {"Bid": {}, "Ask": {}}   # price -> deque[SimOrder]
+        self.prices = {"Bid": [], "Ask": []}   # ascendentes
+        self.external = {"Bid": {}, "Ask": {}} # price -> SimOrder('book')
+        self.dirty = set()                     # (side, price) alterados desde o último depth publicado
+
+    def best(self, side):
+        prices = self.prices[side]
+        if not prices:
+            return None
+        return prices[-1] if side == "Bid" else prices[0]
+
+    def add(self, order):
+        levels = self.levels[order.side]
+        level = levels.get(order.price)
+        if level is None:
+            level = levels[order.price] = deque()
+            insort(self.prices[order.side], order.price)
+        level.append(order)
+        order.resting = True
+        self.dirty.add((order.side, order.price))
+
+    def remove(self, order):
+        level = self.levels[order.side].get(order.price)
+        if level is None:
+            return
+        try:
+            level.remove(order)
+        except ValueError:
+            return
+        order.resting = False
+        if not level:
+            del self.levels[order.side][order.price]
+            prices = self.prices[order.side]
+            del prices[bisect_left(prices, order.price)]
+        if order.owner == "book":
+            self.external[order.side].pop(order.price, None)
+        self.dirty.add((order.side, order.price))
+
+    def set_external(self, side, price, qty, seq):
+        current = self.external[side].get(price)
+        if qty <= 0:
+            if current is not None:
+                self.remove(current)
+            return
+        if current is not None:
+            # Alteração de tamanho mantém a posição na fila
+            current.quantity, current.filled = qty, 0.0
+            self.dirty.add((side, price))
+            return
+        order = SimOrder(None, self.symbol, side, "Limit", qty, price, owner="book", seq=seq)
+        self.external[side][price] = order
+        self.add(order)
+
+    def replace_external(self, side, levels, seq):
+        """Snapshot completo de um lado: níveis que sumiram saem, os que ficaram mantêm a fila."""
+        for price in [p for p in self.external[side] if p not in levels]:
+            self.remove(self.external[side][price])
+        for price, qty in levels.items():
+            self.set_external(side, price, qty, next(seq))
+
+    def level_qty(self, side, price):
+        return sum(o.remaining for o in self.levels[side].get(price, ()))
+
+    def available(self, side, limit_price):
+        """Quantidade disponível do lado `side` até limit_price (para FOK)."""
+        total = 0.0
+        prices = self.prices[side]
+        ordered = reversed(prices) if side == "Bid" else prices
+        for price in ordered:
+            if (side == "Ask" and price > limit_price) or (side == "Bid" and price < limit_price):
+                break
+            total += self.level_qty(side, price)
+        return total
+
+    def depth(self, limit=100):
+        """Mesmo formato de /api/v1/depth (bids e asks ascendentes)."""
+        bids = self.prices["Bid"][-limit:] if limit else self.prices["Bid"]
+        asks = self.prices["Ask"][:limit] if limit else self.prices["Ask"]
+        return {
+            "bids": [[fmt_number(p), fmt_number(self.level_qty("Bid", p))] for p in bids],
+            "asks": [[fmt_number(p), fmt_number(self.level_qty("Ask", p))] for p in asks],
+        }
+
+
+class SimAccount:
+    """Conta de margem única em USDC: saldo (com PnL realizado e taxas) e posições por símbolo."""
+    def __init__(self, balance=10_000.0, max_leverage=20):
+        self.initial_balance = balance
+        self.balance = balance
+        self.max_leverage = max_leverage
+        self.positions = {} # symbol -> {'qty', 'entry', 'realized', 'fees'}
+        self.position_ids = itertools.count(1)
+
+    def position_qty(self, symbol):
+        pos = self.positions.get(symbol)
+        return pos['qty'] if pos else 0.0
+
+    def reducible(self, symbol, side):
+        """Quanto uma ordem reduceOnly de `side` pode executar sem inverter a posição."""
+        qty = self.position_qty(symbol)
+        return max(0.0, qty if side == "Ask" else -qty)
+
+    def apply_fill(self, symbol, side, price, qty, fee):
+        pos = self.positions.setdefault(symbol, {'qty': 0.0, 'entry': 0.0, 'realized': 0.0, 'fees': 0.0,
+                                                 'id': str(next(self.position_ids))})
+        signed = qty if side == "Bid" else -qty
+        q0 = pos['qty']
+        realized = 0.0
+        if abs(q0) < EPS or (q0 > 0) == (signed > 0):
+            new = q0 + signed
+            pos['entry'] = (abs(q0) * pos['entry'] + qty * price) / abs(new)
+        else:
+            closing = min(abs(q0), qty)
+            realized = closing * (price - pos['entry']) * (1 if q0 > 0 else -1)
+            new = q0 + signed
+            if abs(new) < EPS:
+                new, pos['entry'] = 0.0, 0.0
+            elif (new > 0) != (q0 > 0):
+                pos['entry'] = price # Virou de lado: o excedente abre no preço do fill
+        pos['qty'] = new
+        pos['realized'] += realized
+        pos['fees'] += fee
+        self.balance += realized - fee
+        return pos
+
+    def unrealized(self, marks):
+        return sum(p['qty'] * (marks.get(s, p['entry']) - p['entry']) for s, p in self.positions.items())
+
+    def exposure(self, marks):
+        return sum(abs(p['qty']) * marks.get(s, p['entry']) for s, p in self.positions.items())
+
+    def equity(self, marks):
+        return self.balance + self.unrealized(marks)
+
+
+class ExchangeSimulator:
+    """
+     EXCHANGE SIMULATOR (Matching Engine Local)
+    Motor em memória com prioridade preço-tempo, alimentado por books gravados (BookArchive)
+    ou sintéticos, com uma conta de margem simulada:
+    - Limit (GTC/IOC/FOK, postOnly), Market (quantity ou quoteQuantity), gatilhos (triggerPrice)
+      e reduceOnly, com os mesmos campos/status da API da Backpack.
+    - Trades gravados executam ordens da conta que estiverem na frente da fila (fills Maker).
+    - Respostas REST e eventos WS (depth, bookTicker, trade, markPrice, account.*) no formato da API.
+    Thread-safe: feeds rodam em threads, o servidor chama da event loop.
+    """
+    def __init__(self, balance=10_000.0, maker_fee=MAKER_FEE, taker_fee=TAKER_FEE, max_leverage=20, logger=None):
+        self.account = SimAccount(balance, max_leverage)
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.logger = logger or logging.getLogger("ExchangeSimulator")
+        self.lock = threading.RLock()
+        self.books = {}
+        self.filters = {}   # symbol -> (tick, step, min_qty)
+        self.orders = {}    # id -> SimOrder (todas as ordens da conta)
+        self.triggers = {}  # symbol -> [SimOrder] aguardando gatilho
+        self.marks = {}
+        self.last_trade = {}
+        self.bars = {}      # symbol -> {minuto: [o, h, l, c, v, qv, n]}
+        self.fills = deque(maxlen=100_000)
+        self.public_trades = {}
+        self.history = deque(maxlen=100_000)
+        self.ids = itertools.count(int(time.time() * 1000) * 1000)
+        self.trade_ids = itertools.count(1)
+        self.seq = itertools.count(1)
+        self.subscribed = Counter() # Streams com assinantes (mantido pelo servidor)
+        self.listeners = []
+        self.stats = Counter()
+
+    # --- MERCADOS ---
+
+    def add_market(self, symbol, tick_size, step_size, min_qty=None):
+        with self.lock:
+            self.books.setdefault(symbol, OrderBook(symbol))
+            self.filters[symbol] = (float(tick_size), float(step_size), float(min_qty or step_size))
+            self.triggers.setdefault(symbol, [])
+            self.bars.setdefault(symbol, {})
+            self.public_trades.setdefault(symbol, deque(maxlen=1000))
+
+    def markets(self):
+        return [{
+            "symbol": s,
+            "baseSymbol": s.split("_")[0],
+            "quoteSymbol": s.split("_")[1] if "_" in s else "USDC",
+            "marketType": "PERP" if s.endswith("_PERP") else "SPOT",
+            "orderBookState": "Open",
+            "filters": {
+                "price": {"tickSize": fmt_number(tick)},
+                "quantity": {"stepSize": fmt_number(step), "minQuantity": fmt_number(min_qty)},
+            },
+        } for s, (tick, step, min_qty) in self.filters.items()]
+
+    def _book(self, symbol):
+        book = self.books.get(symbol)
+        if book is None:
+            raise SimError("INVALID_SYMBOL", f"Mercado não simulado: {symbol}", 404)
+        return book
+
+    # --- EVENTOS ---
+
+    def emit(self, stream, data):
+        if self.subscribed.get(stream):
+            for listener in self.listeners:
+                listener(stream, data)
+
+    def _emit_order(self, order, event, **extra):
+        if order.owner != "user":
+            return
+        data = order.to_ws(event)
+        data.update(extra)
+        self.emit("account.orderUpdate", data)
+        self.emit(f"account.orderUpdate.{order.symbol}", data)
+
+    def _emit_position(self, symbol, pos, event):
+        mark = self.marks.get(symbol, pos['entry'])
+        data = {
+            "e": event, "E": _now_us(), "s": symbol, "i": pos['id'],
+            "q": fmt_number(pos['qty']), "Q": fmt_number(abs(pos['qty'])), "n": fmt_number(abs(pos['qty']) * mark),
+            "B": fmt_number(pos['entry']), "M": fmt_number(mark),
+            "P": fmt_number(pos['qty'] * (mark - pos['entry'])), "p": fmt_number(pos['realized']), "T": _now_us(),
+        }
+        self.emit("account.positionUpdate", data)
+        self.emit(f"account.positionUpdate.{symbol}", data)
+
+    def _publish(self, book):
+        """Depois de cada operação: diffs de depth, bookTicker, mark price e gatilhos."""
+        symbol = book.symbol
+        if book.dirty:
+            if self.subscribed.get(f"depth.{symbol}"):
+                bids = [[fmt_number(p), fmt_number(book.level_qty(s, p))] for s, p in book.dirty if s == "Bid"]
+                asks = [[fmt_number(p), fmt_number(book.level_qty(s, p))] for s, p in book.dirty if s == "Ask"]
+                u = next(self.seq)
+                self.emit(f"depth.{symbol}", {"e": "depth", "E": _now_us(), "s": symbol, "b": bids, "a": asks,
+                                              "U": u, "u": u, "T": _now_us()})
+            book.dirty.clear()
+        bid, ask = book.best("Bid"), book.best("Ask")
+        if self.subscribed.get(f"bookTicker.{symbol}") and bid is not None and ask is not None:
+            self.emit(f"bookTicker.{symbol}", {
+                "e": "bookTicker", "E": _now_us(), "s": symbol,
+                "b": fmt_number(bid), "B": fmt_number(book.level_qty("Bid", bid)),
+                "a": fmt_number(ask), "A": fmt_number(book.level_qty("Ask", ask)), "T": _now_us(),
+            })
+        if bid is not None and ask is not None:
+            mark = (bid + ask) / 2
+        else:
+            mark = self.last_trade.get(symbol)
+        if mark is not None and mark != self.marks.get(symbol):
+            self.marks[symbol] = mark
+            self._bar(symbol, mark, 0.0)
+            self.emit(f"markPrice.{symbol}", {"e": "markPrice", "E": _now_us(), "s": symbol, "p": fmt_number(mark),
+                                              "f": "0", "i": fmt_number(mark), "n": self._next_funding(), "T": _now_us()})
+            self._check_triggers(symbol)
+
+    @staticmethod
+    def _next_funding():
+        return (int(time.time()) // 3600 + 1) * 3600 * 1000
+
+    def _bar(self, symbol, price, qty, trade=False):
+        minute = int(time.time()) // 60
+        bars = self.bars[symbol]
+        bar = bars.get(minute)
+        if bar is None:
+            bars[minute] = [price, price, price, price, qty, qty * price, 1 if trade else 0]
+            if len(bars) > 20_000:
+                del bars[next(iter(bars))]
+            return
+        bar[1] = max(bar[1], price)
+        bar[2] = min(bar[2], price)
+        bar[3] = price
+        bar[4] += qty
+        bar[5] += qty * price
+        bar[6] += 1 if trade else 0
+
+    # --- MATCHING ---
+
+    def _trade(self, book, maker, taker, price, qty):
+        for order, is_maker in ((maker, True), (taker, False)):
+            order.filled += qty
+            order.quote_filled += qty * price
+            if order.owner != "user":
+                continue
+            fee = qty * price * (self.maker_fee if is_maker else self.taker_fee)
+            pos = self.account.apply_fill(order.symbol, order.side, price, qty, fee)
+            trade_id = next(self.trade_ids)
+            order.status = "Filled" if order.remaining <= EPS else "PartiallyFilled"
+            self.fills.append({
+                "tradeId": trade_id, "orderId": order.id, "clientId": order.client_id, "symbol": order.symbol,
+                "side": order.side, "price": fmt_number(price), "quantity": fmt_number(qty),
+                "fee": fmt_number(fee), "feeSymbol": "USDC", "isMaker": is_maker,
+                "timestamp": _iso(time.time()),
+            })
+            self.stats["fills"] += 1
+            self._emit_order(order, "orderFill", l=fmt_number(qty), L=fmt_number(price), m=is_maker,
+                             n=fmt_number(fee), N="USDC", t=trade_id)
+            self._emit_position(order.symbol, pos, "positionClosed" if abs(pos['qty']) < EPS else "positionAdjusted")
+        if maker.remaining <= EPS and maker.resting:
+            book.remove(maker)
+        elif maker.resting:
+            book.dirty.add((maker.side, maker.price))
+        if taker.remaining <= EPS and taker.resting:
+            book.remove(taker)
+        # Aggressor = taker; m = buyer is maker
+        self.last_trade[book.symbol] = price
+        self._bar(book.symbol, price, qty, trade=True)
+        trade = {"e": "trade", "E": _now_us(), "s": book.symbol, "p": fmt_number(price), "q": fmt_number(qty),
+                 "t": next(self.trade_ids), "m": maker.side == "Bid", "T": _now_us()}
+        self.public_trades[book.symbol].append(trade)
+        self.emit(f"trade.{book.symbol}", trade)
+
+    def _clip_reduce_only(self, order):
+        """reduceOnly: limita ao tamanho da posição. Retorna False se não há o que reduzir."""
+        if not order.reduce_only or order.owner != "user":
+            return True
+        allowed = self.account.reducible(order.symbol, order.side)
+        if allowed <= EPS:
+            return False
+        if order.remaining > allowed:
+            order.quantity = order.filled + allowed
+        return True
+
+    def _match(self, book, taker, limit_price):
+        opposite = "Ask" if taker.side == "Bid" else "Bid"
+        while taker.remaining > EPS:
+            best = book.best(opposite)
+            if best is None:
+                break
+            if limit_price is not None and (best > limit_price if taker.side == "Bid" else best < limit_price):
+                break
+            maker = book.levels[opposite][best][0]
+            if not self._clip_reduce_only(maker):
+                self._cancel(book, maker, "orderCancelled")
+                continue
+            qty = min(taker.remaining, maker.remaining)
+            if taker.quote_quantity is not None and not taker.quantity:
+                qty = min(qty, (taker.quote_quantity - taker.quote_filled) / best)
+            if taker.reduce_only and taker.owner == "user":
+                qty = min(qty, self.account.reducible(taker.symbol, taker.side))
+                if qty <= EPS:
+                    break
+            self._trade(book, maker, taker, best, qty)
+
+    def _uncross(self, book):
+        """Feed gravado cruzou ordens da conta: a mais antiga é Maker e executa no próprio preço."""
+        while True:
+            bid, ask = book.best("Bid"), book.best("Ask")
+            if bid is None or ask is None or bid < ask:
+                return
+            b, a = book.levels["Bid"][bid][0], book.levels["Ask"][ask][0]
+            if b.owner == "book" and a.owner == "book":
+                book.remove(b if b.seq < a.seq else a) # Nível gravado velho (snapshot atrasado)
+                continue
+            maker, taker = (b, a) if b.seq < a.seq else (a, b)
+            if not self._clip_reduce_only(maker):
+                self._cancel(book, maker, "orderCancelled")
+                continue
+            if not self._clip_reduce_only(taker):
+                self._cancel(book, taker, "orderCancelled")
+                continue
+            self._trade(book, maker, taker, maker.price, min(b.remaining, a.remaining))
+
+    def _cancel(self, book, order, event, status="Cancelled"):
+        if order.resting:
+            book.remove(order)
+        if order in self.triggers.get(order.symbol, ()):
+            self.triggers[order.symbol].remove(order)
+        order.status = status
+        self._emit_order(order, event)
+
+    def _execute(self, order):
+        book = self.books[order.symbol]
+        if not self._clip_reduce_only(order):
+            self._cancel(book, order, "orderCancelled")
+            return order
+        opposite = "Ask" if order.side == "Bid" else "Bid"
+        limit_price = order.price if order.order_type == "Limit" else None
+        if limit_price is not None:
+            if order.tif == "FOK" and book.available(opposite, limit_price) < order.remaining - EPS:
+                self._cancel(book, order, "orderExpired", "Expired")
+                return order
+        self._match(book, order, limit_price)
+        if order.remaining > EPS and order.status not in ("Cancelled", "Expired"):
+            if order.order_type == "Market" or order.tif in ("IOC", "FOK"):
+                self._cancel(book, order, "orderExpired", "Expired") # Resto não executado expira
+            else:
+                order.seq = next(self.seq)
+                book.add(order)
+        self._publish(book)
+        return order
+
+    def _check_triggers(self, symbol):
+        pending = self.triggers.get(symbol)
+        mark = self.marks.get(symbol)
+        if not pending or mark is None:
+            return
+        fired = [o for o in pending if (mark >= o.trigger_price if o.trigger_above else mark <= o.trigger_price)]
+        for order in fired:
+            pending.remove(order)
+            order.status = "New"
+            self._emit_order(order, "triggered")
+            self._execute(order)
+
+    # --- API DE ORDENS ---
+
+    def _parse_order(self, payload):
+        symbol = payload.get("symbol")
+        self._book(symbol)
+        tick, step, min_qty = self.filters[symbol]
+        side = payload.get("side")
+        if side not in ("Bid", "Ask"):
+            raise SimError("INVALID_ORDER", "side deve ser Bid ou Ask")
+        order_type = payload.get("orderType")
+        if order_type not in ("Limit", "Market"):
+            raise SimError("INVALID_ORDER", f"orderType inválido: {order_type}")
+
+        quantity = payload.get("quantity")
+        quote_quantity = payload.get("quoteQuantity")
+        if quantity in (None, "") and quote_quantity in (None, ""):
+            raise SimError("INVALID_ORDER", "quantity ou quoteQuantity obrigatório")
+        if quantity not in (None, ""):
+            if _decimals(quantity) > _decimals(step):
+                raise SimError("INVALID_ORDER", "Quantity decimal too long")
+            if not _on_grid(quantity, step):
+                raise SimError("INVALID_ORDER", "Quantity must be a multiple of the step size")
+            quantity = float(quantity)
+            if quantity < min_qty - EPS:
+                raise SimError("INVALID_ORDER", "Quantity is below the minimum allowed value")
+        else:
+            quantity = None
+        price = payload.get("price")
+        if order_type == "Limit":
+            if price in (None, ""):
+                raise SimError("INVALID_ORDER", "price obrigatório para Limit")
+            if _decimals(price) > _decimals(tick):
+                raise SimError("INVALID_ORDER", "Price decimal too long")
+            if not _on_grid(price, tick):
+                raise SimError("INVALID_ORDER", "Price must be a multiple of the tick size")
+            price = float(price)
+        else:
+            price = None
+        trigger = payload.get("triggerPrice")
+        if trigger not in (None, ""):
+            if _decimals(trigger) > _decimals(tick):
+                raise SimError("INVALID_ORDER", "Trigger price decimal too long")
+            if not _on_grid(trigger, tick):
+                raise SimError("INVALID_ORDER", "Trigger price must be a multiple of the tick size")
+            trigger = float(trigger)
+        else:
+            trigger = None
+
+        client_id = payload.get("clientId")
+        return SimOrder(
+            str(next(self.ids)), symbol, side, order_type, quantity, price,
+            tif=payload.get("timeInForce") or "GTC",
+            post_only=_bool(payload.get("postOnly")),
+            reduce_only=_bool(payload.get("reduceOnly")),
+            trigger_price=trigger,
+            quote_quantity=float(quote_quantity) if quote_quantity not in (None, "") and quantity is None else None,
+            client_id=int(client_id) if client_id not in (None, "") else None,
+            seq=next(self.seq),
+        )
+
+    def _check_margin(self, order):
+        if order.reduce_only:
+            return
+        marks = self.marks
+        ref = order.price or marks.get(order.symbol) or self.last_trade.get(order.symbol)
+        if not ref:
+            raise SimError("INVALID_ORDER", "Sem preço de referência (book vazio)")
+        qty = order.quantity or (order.quote_quantity or 0) / ref
+        current = self.account.position_qty(order.symbol)
+        signed = qty if order.side == "Bid" else -qty
+        added = max(0.0, abs(current + signed) - abs(current)) * ref
+        if self.account.exposure(marks) + added > self.account.equity(marks) * self.account.max_leverage:
+            raise SimError("INSUFFICIENT_MARGIN", "Insufficient margin")
+
+    def place_order(self, payload):
+        with self.lock:
+            order = self._parse_order(payload)
+            book = self.books[order.symbol]
+            self._check_margin(order)
+            opposite = "Ask" if order.side == "Bid" else "Bid"
+            best = book.best(opposite)
+            if order.post_only and order.order_type == "Limit" and order.trigger_price is None and best is not None:
+                if (order.side == "Bid" and order.price >= best) or (order.side == "Ask" and order.price <= best):
+                    raise SimError("INVALID_ORDER", "Order would immediately match and take")
+            self.orders[order.id] = order
+            self.history.append(order)
+            self.stats["orders"] += 1
+            if order.trigger_price is not None:
+                mark = self.marks.get(order.symbol, order.trigger_price)
+                order.trigger_above = order.trigger_price > mark
+                order.status = "TriggerPending"
+                self.triggers[order.symbol].append(order)
+                self._emit_order(order, "triggerPlaced")
+                return order.to_api()
+            self._emit_order(order, "orderAccepted")
+            return self._execute(order).to_api()
+
+    def _find(self, symbol, order_id=None, client_id=None):
+        order = self.orders.get(str(order_id)) if order_id else None
+        if order is None and client_id not in (None, ""):
+            order = next((o for o in self.orders.values()
+                          if o.symbol == symbol and o.client_id == int(client_id)), None)
+        if order is None or (symbol and order.symbol != symbol):
+            raise SimError("RESOURCE_NOT_FOUND", "Order not found", 404)
+        return order
+
+    def cancel_order(self, symbol, order_id=None, client_id=None):
+        with self.lock:
+            order = self._find(symbol, order_id, client_id)
+            if order.status not in ("New", "PartiallyFilled", "TriggerPending"):
+                raise SimError("RESOURCE_NOT_FOUND", "Order not found", 404)
+            book = self.books[order.symbol]
+            self._cancel(book, order, "orderCancelled")
+            self.stats["cancels"] += 1
+            self._publish(book)
+            return order.to_api()
+
+    def cancel_all(self, symbol):
+        with self.lock:
+            cancelled = [o for o in self.orders.values()
+                         if o.symbol == symbol and o.status in ("New", "PartiallyFilled", "TriggerPending")]
+            for order in cancelled:
+                self._cancel(self.books[symbol], order, "orderCancelled")
+            self.stats["cancels"] += len(cancelled)
+            self._publish(self._book(symbol))
+            return [o.to_api() for o in cancelled]
+
+    def get_order(self, symbol, order_id=None, client_id=None):
+        with self.lock:
+            return self._find(symbol, order_id, client_id).to_api()
+
+    def open_orders(self, symbol=None):
+        with self.lock:
+            self._prune()
+            return [o.to_api() for o in self.orders.values()
+                    if o.status in ("New", "PartiallyFilled", "TriggerPending") and (not symbol or o.symbol == symbol)]
+
+    def _prune(self, keep=10_000):
+        """Ordens finalizadas saem do índice por id (continuam no histórico)."""
+        if len(self.orders) > keep:
+            for oid in [oid for oid, o in self.orders.items() if o.status in ("Filled", "Cancelled", "Expired")]:
+                del self.orders[oid]
+
+    def order_history(self, symbol=None, limit=100, offset=0):
+        with self.lock:
+            rows = [o.to_api() for o in reversed(self.history) if not symbol or o.symbol == symbol]
+            return rows[offset:offset + limit]
+
+    def fill_history(self, symbol=None, limit=100, offset=0):
+        with self.lock:
+            rows = [f for f in reversed(self.fills) if not symbol or f['symbol'] == symbol]
+            return rows[offset:offset + limit]
+
+    # --- CONTA ---
+
+    def positions(self):
+        with self.lock:
+            result = []
+            for symbol, pos in self.account.positions.items():
+                if abs(pos['qty']) < EPS:
+                    continue
+                mark = self.marks.get(symbol, pos['entry'])
+                result.append({
+                    "symbol": symbol, "positionId": pos['id'],
+                    "netQuantity": fmt_number(pos['qty']),
+                    "netExposureQuantity": fmt_number(abs(pos['qty'])),
+                    "netExposureNotional": fmt_number(abs(pos['qty']) * mark),
+                    "entryPrice": fmt_number(pos['entry']),
+                    "breakEvenPrice": fmt_number(pos['entry']),
+                    "markPrice": fmt_number(mark),
+                    "pnlUnrealized": fmt_number(pos['qty'] * (mark - pos['entry'])),
+                    "pnlRealized": fmt_number(pos['realized']),
+                    "cumulativeFundingPayment": "0",
+                })
+            return result
+
+    def capital(self):
+        with self.lock:
+            return {"USDC": {"available": fmt_number(self.account.balance), "locked": "0", "staked": "0"}}
+
+    def collateral(self):
+        with self.lock:
+            marks = self.marks
+            equity = self.account.equity(marks)
+            exposure = self.account.exposure(marks)
+            locked = exposure / self.account.max_leverage
+            return {
+                "assetsValue": fmt_number(self.account.balance),
+                "liabilitiesValue": "0",
+                "pnlUnrealized": fmt_number(self.account.unrealized(marks)),
+                "netEquity": fmt_number(equity),
+                "netEquityAvailable": fmt_number(max(0.0, equity - locked)),
+                "netEquityLocked": fmt_number(locked),
+                "netExposureFutures": fmt_number(exposure),
+                "marginFraction": fmt_number(equity / exposure) if exposure else None,
+                "collateral": [{"symbol": "USDC", "totalQuantity": fmt_number(self.account.balance),
+                                "availableQuantity": fmt_number(self.account.balance)}],
+            }
+
+    # --- DADOS DE MERCADO ---
+
+    def depth(self, symbol, limit=100):
+        with self.lock:
+            data = self._book(symbol).depth(limit)
+            data["lastUpdateId"] = str(next(self.seq))
+            data["timestamp"] = _now_us()
+            return data
+
+    def klines(self, symbol, interval="1m", start=None, end=None, limit=None):
+        seconds = KLINE_SECONDS.get(interval)
+        if seconds is None:
+            raise SimError("INVALID_CLIENT_REQUEST", f"interval inválido: {interval}")
+        with self.lock:
+            self._book(symbol)
+            minutes = list(self.bars[symbol].items())
+        grouped = {}
+        for minute, (o, h, l, c, v, qv, n) in minutes:
+            ts = minute * 60
+            if (start and ts < int(start) // seconds * seconds) or (end and ts >= int(end)):
+                continue
+            key = ts // seconds * seconds
+            bar = grouped.get(key)
+            if bar is None:
+                grouped[key] = [o, h, l, c, v, qv, n]
+            else:
+                bar[1], bar[2], bar[3] = max(bar[1], h), min(bar[2], l), c
+                bar[4] += v
+                bar[5] += qv
+                bar[6] += n
+        rows = [{
+            "start": _kline_time(ts), "end": _kline_time(ts + seconds),
+            "open": fmt_number(o), "high": fmt_number(h), "low": fmt_number(l), "close": fmt_number(c),
+            "volume": fmt_number(v), "quoteVolume": fmt_number(qv), "trades": str(n),
+        } for ts, (o, h, l, c, v, qv, n) in grouped.items()]
+        return rows[-int(limit):] if limit else rows
+
+    def ticker(self, symbol):
+        with self.lock:
+            self._book(symbol)
+            since = int(time.time()) // 60 - 24 * 60
+            bars = [b for m, b in self.bars[symbol].items() if m >= since]
+            last = self.last_trade.get(symbol, self.marks.get(symbol))
+        if not bars or last is None:
+            return {"symbol": symbol, "lastPrice": fmt_number(last) if last else None}
+        first = bars[0][0]
+        return {
+            "symbol": symbol,
+            "firstPrice": fmt_number(first), "lastPrice": fmt_number(last),
+            "high": fmt_number(max(b[1] for b in bars)), "low": fmt_number(min(b[2] for b in bars)),
+            "priceChange": fmt_number(last - first),
+            "priceChangePercent": fmt_number((last - first) / first if first else 0),
+            "volume": fmt_number(sum(b[4] for b in bars)), "quoteVolume": fmt_number(sum(b[5] for b in bars)),
+            "trades": str(sum(b[6] for b in bars)),
+        }
+
+    def tickers(self):
+        return [self.ticker(s) for s in list(self.books)]
+
+    def mark_prices(self):
+        with self.lock:
+            return [{"symbol": s, "markPrice": fmt_number(m), "indexPrice": fmt_number(m), "fundingRate": "0",
+                     "nextFundingTimestamp": self._next_funding()} for s, m in self.marks.items()]
+
+    def recent_trades(self, symbol, limit=100):
+        with self.lock:
+            self._book(symbol)
+            trades = list(self.public_trades[symbol])[-int(limit):]
+        return [{"id": t["t"], "price": t["p"], "quantity": t["q"], "quoteQuantity": fmt_number(float(t["p"]) * float(t["q"])),
+                 "timestamp": t["T"] // 1000, "isBuyerMaker": t["m"]} for t in trades]
+
+    # --- FEED (books gravados / sintéticos) ---
+
+    def apply_snapshot(self, symbol, bids, asks):
+        """Substitui toda a liquidez gravada do símbolo. bids/asks: {price: qty}."""
+        with self.lock:
+            book = self.books[symbol]
+            book.replace_external("Bid", bids, self.seq)
+            book.replace_external("Ask", asks, self.seq)
+            self._uncross(book)
+            self._publish(book)
+
+    def apply_levels(self, symbol, levels):
+        """Diffs absolutos: [(side 'Bid'|'Ask', price, qty)], qty 0 remove o nível."""
+        with self.lock:
+            book = self.books[symbol]
+            for side, price, qty in levels:
+                book.set_external(side, price, qty, next(self.seq))
+            self._uncross(book)
+            self._publish(book)
+
+    def apply_trade(self, symbol, price, qty, aggressor):
+        """Trade gravado: consome a fila do lado passivo até `price` (ordens da conta na frente executam)."""
+        with self.lock:
+            book = self.books[symbol]
+            tape = SimOrder(None, symbol, aggressor, "Limit", qty, price, owner="tape")
+            self._match(book, tape, price)
+            self._publish(book)
+
+    def seed_history(self, symbol, minutes=6000, vol=0.001, seed=7):
+        """
+        Velas de 1m sintéticas terminando no preço atual (random walk), para ferramentas que
+        precisam de histórico (EMA50 1h etc.) logo na partida. Não substitui dados reais.
+        """
+        with self.lock:
+            price = self.marks.get(symbol) or self.last_trade.get(symbol)
+            if not price:
+                return 0
+            rng = random.Random(seed)
+            now_minute = int(time.time()) // 60
+            closes = [price]
+            for _ in range(minutes - 1):
+                closes.append(closes[-1] / (1 + rng.gauss(0, vol)))
+            closes.reverse()
+            bars = self.bars[symbol]
+            seeded = {}
+            prev = closes[0]
+            for i, close in enumerate(closes):
+                minute = now_minute - minutes + i
+                high, low = max(prev, close) * (1 + abs(rng.gauss(0, vol / 2))), min(prev, close) * (1 - abs(rng.gauss(0, vol / 2)))
+                volume = abs(rng.gauss(0, 1)) * 100
+                seeded[minute] = [prev, high, low, close, volume, volume * close, 10]
+                prev = close
+            seeded.update(bars)
+            self.bars[symbol] = seeded
+            return minutes
+
+
+class RecordedFeed:
+    """
+    Alimenta o simulador com o BookArchive gravado (snapshots, diffs e trades), no ritmo `speed`
+    (None = o mais rápido possível). loop=True recomeça do início ao terminar.
+    """
+    def __init__(self, engine, symbol, root=ARCHIVE_ROOT, speed=1.0, loop=False, start_us=None, end_us=None):
+        self.engine = engine
+        self.symbol = symbol
+        self.reader = BookArchiveReader(root)
+        self.speed = speed
+        self.loop = loop
+        self.start_us = start_us
+        self.end_us = end_us
+        self.is_running = True
+        self.cols = self.reader.load(symbol, start_us, end_us)
+
+    def first_book(self):
+        """(bids, asks) do primeiro snapshot gravado, para registrar o mercado antes do replay."""
+        cols = self.cols
+        if cols is None or not len(cols["ts"]):
+            return None
+        bids, asks = {}, {}
+        t0 = None
+        for i in range(len(cols["ts"])):
+            if cols["kind"][i] != SNAPSHOT:
+                continue
+            if t0 is None:
+                t0 = cols["ts"][i]
+            elif cols["ts"][i] != t0:
+                break
+            (bids if cols["side"][i] == BID else asks)[float(cols["price"][i])] = float(cols["qty"][i])
+        return bids, asks
+
+    def run(self):
+        cols = self.cols
+        if cols is None or not len(cols["ts"]):
+            return
+        ts, kind, side, price, qty = cols["ts"], cols["kind"], cols["side"], cols["price"], cols["qty"]
+        n = len(ts)
+        while self.is_running:
+            wall_start, replay_start = time.time(), int(ts[0])
+            i = 0
+            while i < n and self.is_running:
+                t = int(ts[i])
+                if self.speed:
+                    delay = (t - replay_start) / 1_000_000 / self.speed - (time.time() - wall_start)
+                    if delay > 0:
+                        time.sleep(delay)
+                if kind[i] == TRADE:
+                    self.engine.apply_trade(self.symbol, float(price[i]), float(qty[i]), "Bid" if side[i] == BID else "Ask")
+                    i += 1
+                    continue
+                j = i
+                while j < n and ts[j] == t and kind[j] != TRADE:
+                    j += 1
+                rows = [("Bid" if side[k] == BID else "Ask", float(price[k]), float(qty[k])) for k in range(i, j)]
+                if kind[i] == SNAPSHOT:
+                    levels = ({p: q for s, p, q in rows if s == "Bid"}, {p: q for s, p, q in rows if s == "Ask"})
+                    self.engine.apply_snapshot(self.symbol, *levels)
+                else:
+                    self.engine.apply_levels(self.symbol, rows)
+                i = j
+            if not self.loop:
+                return
+
+    def start(self):
+        threading.Thread(target=self.run, name=f"SimFeed-{self.symbol}", daemon=True).start()
+        return self
+
+
+class SyntheticFeed:
+    """Book sintético (random walk no mid, `levels` níveis por lado) e trades aleatórios, para benchmark sem gravação."""
+    def __init__(self, engine, symbol, price, levels=50, interval=0.1, vol=0.0005, trade_prob=0.3, seed=None):
+        self.engine = engine
+        self.symbol = symbol
+        self.mid = float(price)
+        self.levels = levels
+        self.interval = interval
+        self.vol = vol
+        self.trade_prob = trade_prob
+        self.rng = random.Random(seed)
+        self.is_running = True
+
+    def book(self):
+        tick, step, _ = self.engine.filters[self.symbol]
+        half = max(tick, self.mid * 0.0002)
+        best_bid = round((self.mid - half) / tick) * tick
+        best_ask = max(best_bid + tick, round((self.mid + half) / tick) * tick)
+        size = lambda: max(step, round(self.rng.expovariate(1.0) * 1000 / self.mid / step) * step)
+        bids = {round(best_bid - i * tick, 10): size() for i in range(self.levels)}
+        asks = {round(best_ask + i * tick, 10): size() for i in range(self.levels)}
+        return bids, asks
+
+    def step(self):
+        self.mid *= 1 + self.rng.gauss(0, self.vol)
+        self.engine.apply_snapshot(self.symbol, *self.book())
+        if self.rng.random() < self.trade_prob:
+            tick, step, _ = self.engine.filters[self.symbol]
+            aggressor = "Bid" if self.rng.random() < 0.5 else "Ask"
+            depth = 1 + int(self.rng.expovariate(1.0))
+            price = self.mid * (1 + depth * 0.0002 if aggressor == "Bid" else 1 - depth * 0.0002)
+            qty = max(step, round(self.rng.expovariate(1.0) * 2000 / self.mid / step) * step)
+            self.engine.apply_trade(self.symbol, price, qty, aggressor)
+
+    def run(self):
+        while self.is_running:
+            self.step()
+            time.sleep(self.interval)
+
+    def start(self):
+        threading.Thread(target=self.run, name=f"SimFeed-{self.symbol}", daemon=True).start()
+        return self
+
+
+class SimulatorServer:
+    """
+     SIMULATOR SERVER (REST + WS locais)
+    Mesmos endpoints que o BackpackTransport usa (/api/v1/order(s), /position, /capital, /depth,
+    /klines, /wapi/v1/history/*), mais o WS (SUBSCRIBE com streams públicos e account.*).
+    Assinaturas são aceitas sem verificação. latency_ms simula o RTT da corretora, com variação
+    uniforme de ±jitter_ms por requisição.
+    Cada resposta REST leva X-Sim-Delay-Ms (atraso injetado) e X-Sim-Server-Ms (tempo total no servidor),
+    para o cliente separar o ack da corretora do custo da própria rede (core/latency_bench.py).
+    /sim/stats: contadores do motor e latência por endpoint (lado servidor).
+    """
+    def __init__(self, engine, host="127.0.0.1", port=DEFAULT_PORT, latency_ms=0.0, logger=None, jitter_ms=0.0, seed=None):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rng = random.Random(seed)
+        self.logger = logger or logging.getLogger("SimulatorServer")
+        self.clients = {} # ws -> (set(streams), asyncio.Queue)
+        self.timings = {}  # endpoint -> [count, total_ms, max_ms]
+        self.dropped = 0
+        self.loop = None
+        self.runner = None
+        engine.listeners.append(self._on_event)
+
+    # --- WS ---
+
+    def _on_event(self, stream, data):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._broadcast, stream, data)
+
+    def _broadcast(self, stream, data):
+        message = None
+        for streams, queue in self.clients.values():
+            if stream in streams:
+                message = message or json.dumps({"stream": stream, "data": data})
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    self.dropped += 1 # Cliente lento: descarta (como a corretora faria ao desconectar)
+
+    async def _ws(self, request):
+        from aiohttp import web, WSMsgType
+        ws = web.WebSocketResponse(heartbeat=20)
+        await ws.prepare(request)
+        streams, queue = set(), asyncio.Queue(maxsize=10_000)
+        self.clients[ws] = (streams, queue)
+
+        async def writer():
+            while True:
+                await ws.send_str(await queue.get())
+
+        task = asyncio.create_task(writer())
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    body = json.loads(msg.data)
+                except ValueError:
+                    continue
+                params = body.get("params") or []
+                method = (body.get("method") or "").upper()
+                with self.engine.lock:
+                    for stream in params:
+                        if method == "SUBSCRIBE" and stream not in streams:
+                            streams.add(stream)
+                            self.engine.subscribed[stream] += 1
+                        elif method == "UNSUBSCRIBE" and stream in streams:
+                            streams.discard(stream)
+                            self.engine.subscribed[stream] -= 1
+        finally:
+            task.cancel()
+            self.clients.pop(ws, None)
+            with self.engine.lock:
+                for stream in streams:
+                    self.engine.subscribed[stream] -= 1
+        return ws
+
+    # --- REST ---
+
+    async def _params(self, request):
+        params = dict(request.query)
+        if request.method in ("POST", "DELETE") and request.can_read_body:
+            try:
+                body = await request.json()
+            except ValueError:
+                body = None
+            if isinstance(body, dict):
+                params.update(body)
+            elif isinstance(body, list):
+                return body
+        return params
+
+    def _route(self, path, method, p):
+        e = self.engine
+        limit = int(p.get("limit", 100)) if isinstance(p, dict) else 100
+        offset = int(p.get("offset", 0)) if isinstance(p, dict) else 0
+        if path == "/api/v1/order":
+            if method == "POST":
+                return e.place_order(p)
+            if method == "DELETE":
+                return e.cancel_order(p.get("symbol"), p.get("orderId"), p.get("clientId"))
+            return e.get_order(p.get("symbol"), p.get("orderId"), p.get("clientId"))
+        if path == "/api/v1/orders":
+            if method == "POST":
+                results = []
+                for payload in p:
+                    try:
+                        results.append(e.place_order(payload))
+                    except SimError as err:
+                        results.append({"code": err.code, "message": err.message})
+                return results
+            if method == "DELETE":
+                return e.cancel_all(p.get("symbol"))
+            return e.open_orders(p.get("symbol"))
+        routes = {
+            "/api/v1/position": lambda: e.positions(),
+            "/api/v1/capital": lambda: e.capital(),
+            "/api/v1/capital/collateral": lambda: e.collateral(),
+            "/wapi/v1/history/fills": lambda: e.fill_history(p.get("symbol"), limit, offset),
+            "/wapi/v1/history/orders": lambda: e.order_history(p.get("symbol"), limit, offset),
+            "/api/v1/depth": lambda: e.depth(p.get("symbol"), int(p.get("limit", 0)) or None),
+            "/api/v1/klines": lambda: e.klines(p.get("symbol"), p.get("interval", "1m"), p.get("startTime"),
+                                               p.get("endTime"), p.get("limit")),
+            "/api/v1/ticker": lambda: e.ticker(p.get("symbol")),
+            "/api/v1/tickers": lambda: e.tickers(),
+            "/api/v1/markPrices": lambda: e.mark_prices(),
+            "/api/v1/markets": lambda: e.markets(),
+            "/api/v1/trades": lambda: e.recent_trades(p.get("symbol"), limit),
+            "/api/v1/fundingRates": lambda: [],
+            "/api/v1/borrowLend/markets": lambda: [],
+            "/sim/stats": lambda: self.stats(),
+        }
+        handler = routes.get(path)
+        if handler is None:
+            raise SimError("RESOURCE_NOT_FOUND", f"Endpoint não simulado: {path}", 404)
+        return handler()
+
+    async def _rest(self, request):
+        from aiohttp import web
+        started = time.perf_counter()
+        delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)) if self.jitter else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            params = await self._params(request)
+            body, status = self._route(request.path, request.method, params), 200
+        except SimError as err:
+            body, status = {"code": err.code, "message": err.message}, err.status
+        except Exception as err:
+            self.logger.exception(f"Erro em {request.method} {request.path}")
+            body, status = {"code": "INTERNAL_ERROR", "message": str(err)}, 500
+        response = web.json_response(body, status=status)
+        elapsed = (time.perf_counter() - started) * 1000
+        response.headers["X-Sim-Delay-Ms"] = f"{delay * 1000:.3f}"
+        response.headers["X-Sim-Server-Ms"] = f"{elapsed:.3f}"
+        timing = self.timings.setdefault(f"{request.method} {request.path}", [0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += elapsed
+        timing[2] = max(timing[2], elapsed)
+        return response
+
+    def stats(self):
+        return {
+            "engine": dict(self.engine.stats),
+            "ws_clients": len(self.clients),
+            "ws_dropped": self.dropped,
+            "endpoints": {k: {"count": c, "avg_ms": round(t / c, 3), "max_ms": round(m, 3)}
+                          for k, (c, t, m) in self.timings.items()},
+        }
+
+    async def start(self):
+        from aiohttp import web
+        self.loop = asyncio.get_running_loop()
+        app = web.Application()
+        app.router.add_get("/ws", self._ws)
+        app.router.add_route("*", "/{tail:.*}", self._rest)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        if not self.port:
+            self.port = self.runner.addresses[0][1] # port=0: porta livre escolhida pelo SO
+        self.logger.info(f" Simulador em http://{self.host}:{self.port} (WS ws://{self.host}:{self.port}/ws)")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+def infer_filters(bids, asks):
+    """(tickSize, stepSize) pelas casas decimais do book gravado."""
+    prices = list(bids) + list(asks)
+    sizes = list(bids.values()) + list(asks.values())
+    tick = 10 ** -max([_decimals(round(p, 8)) for p in prices] + [0])
+    step = 10 ** -max([_decimals(round(q, 8)) for q in sizes] + [0])
+    return tick, step
+
+
+def paper_keys():
+    """Par ed25519 descartável: BackpackAuth exige uma chave válida, o simulador não verifica a assinatura."""
+    from cryptography.hazmat.primitives.asymmetric import ed25519
+    from cryptography.hazmat.primitives import serialization
+    private = ed25519.Ed25519PrivateKey.generate()
+    secret = private.private_bytes(serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption())
+    public = private.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return base64.b64encode(public).decode(), base64.b64encode(secret).decode()
+
+
+def build(symbols, root=ARCHIVE_ROOT, synthetic=None, balance=10_000.0, speed=1.0, loop=True, history_minutes=6000):
+    """
+    Monta motor + feeds. synthetic: {symbol: preço} para símbolos sem gravação.
+    Filtros vêm do cache do MarketRegistry (data/markets.json) quando existir; senão, do book gravado.
+    """
+    engine = ExchangeSimulator(balance=balance)
+    cached = {}
+    try:
+        with open(MARKETS_CACHE) as f:
+            cached = MarketRegistry.parse(json.load(f).get('markets'))
+    except (OSError, ValueError):
+        pass
+
+    feeds = []
+    for symbol in symbols:
+        feed = RecordedFeed(engine, symbol, root, speed=speed, loop=loop)
+        first = feed.first_book()
+        q = cached.get(symbol)
+        if first:
+            tick, step = (q.tick_size, q.step_size) if q else infer_filters(*first)
+            engine.add_market(symbol, tick, step, q.min_qty if q else None)
+            engine.apply_snapshot(symbol, *first)
+            feeds.append(feed)
+        elif synthetic and symbol in synthetic:
+            tick, step = (q.tick_size, q.step_size) if q else (10 ** (len(str(int(synthetic[symbol]))) - 6), 0.01)
+            engine.add_market(symbol, tick, step, q.min_qty if q else None)
+            feed = SyntheticFeed(engine, symbol, synthetic[symbol])
+            feed.step()
+            feeds.append(feed)
+        else:
+            engine.logger.warning(f"️ {symbol}: sem gravação em {root} nem preço sintético. Ignorado.")
+            continue
+        if history_minutes:
+            engine.seed_history(symbol, history_minutes)
+    return engine, feeds
+
+
+async def serve(engine, feeds, host="127.0.0.1", port=DEFAULT_PORT, latency_ms=0.0, jitter_ms=0.0):
+    server = SimulatorServer(engine, host, port, latency_ms, jitter_ms=jitter_ms)
+    await server.start()
+    for feed in feeds:
+        feed.start()
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        for feed in feeds:
+            feed.is_running = False
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exchange Simulator (Backpack REST/WS local para paper trading e benchmark)")
+    parser.add_argument("--symbols", nargs="+", default=["SOL_USDC_PERP", "BTC_USDC_PERP"])
+    parser.add_argument("--root", default=ARCHIVE_ROOT, help="BookArchive gravado pelo BookRecorder")
+    parser.add_argument("--synthetic", nargs="*", default=[], help="SYMBOL=PREÇO para símbolos sem gravação")
+    parser.add_argument("--speed", type=float, default=1.0, help="Ritmo do replay (0 = o mais rápido possível)")
+    parser.add_argument("--balance", type=float, default=10_000.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="RTT simulado por requisição REST")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Variação uniforme (±) sobre --latency-ms")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    synthetic = {s: float(p) for s, p in (item.split("=", 1) for item in args.synthetic)}
+    engine, feeds = build(args.symbols + [s for s in synthetic if s not in args.symbols], args.root, synthetic,
+                          args.balance, args.speed or None)
+    if not engine.books:
+        sys.exit(" Nenhum mercado simulado (grave com core/book_archive.py ou use --synthetic SYMBOL=PREÇO).")
+
+    key, secret = paper_keys()
+    print("\n Aponte qualquer ferramenta para o simulador:")
+    print(f"   export BACKPACK_API_URL=http://{args.host}:{args.port}")
+    print(f"   export BACKPACK_WS_URL=ws://{args.host}:{args.port}/ws")
+    print(f"   export BACKPACK_API_KEY={key}")
+    print(f"   export BACKPACK_API_SECRET={secret}\n")
+    try:
+        asyncio.run(serve(engine, feeds, args.host, args.port, args.latency_ms, args.jitter_ms))
+    except KeyboardInterrupt:
+        print("\n Simulador encerrado.")
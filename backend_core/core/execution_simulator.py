@@ -0,0 +1,374 @@
+import time
+import numpy as np
+
+# Taxas padrão Backpack Perps (Tier 0). Sobrescreva no construtor conforme o tier da conta.
+MAKER_FEE = 0.0002
+TAKER_FEE = 0.0005
+
+BID = 1
+ASK = -1
+
+
+class BookFrames:
+    """
+     BOOK FRAMES (L2 em arrays)
+    Snapshots de profundidade alinhados em matrizes (N x L), níveis ordenados do melhor para o pior.
+    Níveis ausentes: preço NaN, tamanho 0.
+    """
+    def __init__(self, ts, bid_px, bid_sz, ask_px, ask_sz):
+        self.ts = np.asarray(ts, dtype=np.int64)
+        self.bid_px = np.asarray(bid_px, dtype=np.float64)
+        self.bid_sz = np.asarray(bid_sz, dtype=np.float64)
+        self.ask_px = np.asarray(ask_px, dtype=np.float64)
+        self.ask_sz = np.asarray(ask_sz, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.ts)
+
+    @classmethod
+    def from_depth_snapshots(cls, snapshots, levels=20):
+        """
+        Converte snapshots no formato de /api/v1/depth ({'timestamp', 'bids', 'asks'}).
+        Aceita bids ascendentes (formato cru da API) ou descendentes.
+        """
+        n = len(snapshots)
+        ts = np.zeros(n, dtype=np.int64)
+        bid_px = np.full((n, levels), np.nan)
+        ask_px = np.full((n, levels), np.nan)
+        bid_sz = np.zeros((n, levels))
+        ask_sz = np.zeros((n, levels))
+
+        for i, snap in enumerate(snapshots):
+            ts[i] = int(snap.get('timestamp', 0))
+            bids = np.asarray(snap.get('bids') or [], dtype=np.float64).reshape(-1, 2)
+            asks = np.asarray(snap.get('asks') or [], dtype=np.float64).reshape(-1, 2)
+            if len(bids):
+                bids = bids[np.argsort(-bids[:, 0])][:levels]
+                bid_px[i, :len(bids)] = bids[:, 0]
+                bid_sz[i, :len(bids)] = bids[:, 1]
+            if len(asks):
+                asks = asks[np.argsort(asks[:, 0])][:levels]
+                ask_px[i, :len(asks)] = asks[:, 0]
+                ask_sz[i, :len(asks)] = asks[:, 1]
+
+        return cls(ts, bid_px, bid_sz, ask_px, ask_sz)
+
+
+class TradeTape:
+    """
+     TRADE TAPE
+    Trades públicos em arrays. side: +1 = agressor comprador (consome asks), -1 = agressor vendedor (consome bids).
+    """
+    def __init__(self, ts, price, qty, side):
+        self.ts = np.asarray(ts, dtype=np.int64)
+        self.price = np.asarray(price, dtype=np.float64)
+        self.qty = np.asarray(qty, dtype=np.float64)
+        self.side = np.asarray(side, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.ts)
+
+
+class SimOrder:
+    __slots__ = ("id", "side", "price", "qty", "remaining", "queue_ahead", "placed_ts", "status")
+
+    def __init__(self, order_id, side, price, qty, queue_ahead, placed_ts):
+        self.id = order_id
+        self.side = side
+        self.price = price
+        self.qty = qty
+        self.remaining = qty
+        self.queue_ahead = queue_ahead
+        self.placed_ts = placed_ts
+        self.status = "New"
+
+
+class ExecutionSimulator:
+    """
+     EXECUTION SIMULATOR (Depth-Aware / Queue Position)
+    Replay de L2 + trades para estratégias maker (VolumeFarmer, WeaverGrid, maker_sniper).
+
+    Regras de preenchimento:
+    1. Ordem Limit entra no FIM da fila: queue_ahead = tamanho exibido no nível ao postar.
+    2. Só preenche quando volume agressor no nosso preço consome a fila à frente.
+    3. Trade ATRAVÉS do nosso preço (preço pior) = nível varrido, preenche o restante.
+    4. Se o nível encolhe sem trades (cancelamentos), a fila à frente nunca excede o tamanho exibido.
+    5. Market walk-the-book no snapshot corrente (slippage real) + taxa taker.
+    """
+    def __init__(self, book, trades, maker_fee=MAKER_FEE, taker_fee=TAKER_FEE):
+        self.book = book
+        self.trades = trades
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+
+        # Para cada snapshot i, trades no intervalo (ts[i], ts[i+1]] ficam em [trade_bounds[i], trade_bounds[i+1])
+        self.trade_bounds = np.searchsorted(trades.ts, book.ts, side='right')
+
+        self.i = 0
+        self.now = int(book.ts[0]) if len(book) else 0
+        self.orders = {}
+        self._next_id = 1
+
+        self.position = 0.0
+        self.avg_price = 0.0
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.fills = [] # (ts, order_id, side, price, qty, fee, liquidity)
+        self.posted_qty = 0.0
+        self.maker_qty = 0.0
+        self.taker_qty = 0.0
+        self.slippage_cost = 0.0
+
+    # --- Estado do Book ---
+    def best_bid(self):
+        return self.book.bid_px[self.i, 0]
+
+    def best_ask(self):
+        return self.book.ask_px[self.i, 0]
+
+    def mid(self):
+        return (self.best_bid() + self.best_ask()) / 2
+
+    def _level_size(self, side, price):
+        px = self.book.bid_px[self.i] if side == BID else self.book.ask_px[self.i]
+        sz = self.book.bid_sz[self.i] if side == BID else self.book.ask_sz[self.i]
+        hit = np.abs(px - price) <= price * 1e-9
+        return float(sz[hit].sum())
+
+    # --- Ordens ---
+    def place_limit(self, side, price, qty, post_only=True):
+        """
+        Posta ordem Limit. Retorna order_id, ou None se PostOnly cruzaria o book.
+        Limit agressiva (post_only=False cruzando): executa como taker até o preço limite (fills com o
+        mesmo order_id) e o restante fica em repouso no preço, como GTC na exchange. Executada por
+        inteiro, a ordem já nasce Filled e não entra em sim.orders.
+        """
+        side = BID if side in (BID, "Bid", "Buy") else ASK
+        crosses = price >= self.best_ask() if side == BID else price <= self.best_bid()
+        if crosses and post_only:
+            return None
+
+        order_id = self._next_id
+        self._next_id += 1
+        queue_ahead = 0.0 # Cruzou: o restante é o melhor nível do lado dele
+        if crosses:
+            # Limit agressiva: executa como taker até o preço limite
+            qty -= self.market(side, qty, limit_price=price, order_id=order_id)
+            if qty <= 1e-12:
+                return order_id
+        else:
+            queue_ahead = self._level_size(side, price)
+
+        order = SimOrder(order_id, side, float(price), float(qty), queue_ahead, self.now)
+        self.orders[order.id] = order
+        self.posted_qty += qty
+        return order.id
+
+    def cancel(self, order_id):
+        order = self.orders.pop(order_id, None)
+        if order:
+            order.status = "Cancelled"
+        return order is not None
+
+    def replace(self, order_id, price, qty=None, post_only=True):
+        """Cancel/replace: perde a prioridade na fila (como na exchange)."""
+        order = self.orders.get(order_id)
+        if not order:
+            return None
+        self.cancel(order_id)
+        return self.place_limit(order.side, price, order.remaining if qty is None else qty, post_only)
+
+    def market(self, side, qty, limit_price=None, order_id=None):
+        """Market walk-the-book no snapshot atual. Retorna quantidade executada."""
+        side = BID if side in (BID, "Bid", "Buy") else ASK
+        px = self.book.ask_px[self.i] if side == BID else self.book.bid_px[self.i]
+        sz = self.book.ask_sz[self.i] if side == BID else self.book.bid_sz[self.i]
+        valid = ~np.isnan(px)
+        if limit_price is not None:
+            valid &= (px <= limit_price) if side == BID else (px >= limit_price)
+        px, sz = px[valid], sz[valid]
+        if not len(px):
+            return 0.0
+
+        cum = np.cumsum(sz)
+        take = np.minimum(sz, np.maximum(0.0, qty - (cum - sz)))
+        filled = float(take.sum())
+        if filled < qty and limit_price is None:
+            # Book exibido insuficiente: restante no último nível visível (otimista; logado como slippage)
+            take[-1] += qty - filled
+            filled = qty
+        if filled <= 0:
+            return 0.0
+
+        vwap = float((take * px).sum() / filled)
+        self.slippage_cost += abs(vwap - px[0]) * filled
+        self._apply_fill(order_id, side, vwap, filled, self.taker_fee, "Taker", self.now)
+        self.taker_qty += filled
+        return filled
+
+    def _apply_fill(self, order_id, side, price, qty, fee_rate, liquidity, ts):
+        fee = price * qty * fee_rate
+        self.fees += fee
+        signed = qty if side == BID else -qty
+
+        if self.position == 0 or np.sign(self.position) == np.sign(signed):
+            new_pos = self.position + signed
+            self.avg_price = (self.avg_price * abs(self.position) + price * qty) / abs(new_pos)
+            self.position = new_pos
+        else:
+            closing = min(abs(signed), abs(self.position))
+            self.realized_pnl += closing * (price - self.avg_price) * np.sign(self.position)
+            self.position += signed
+            if abs(self.position) < 1e-12:
+                self.position = 0.0
+                self.avg_price = 0.0
+            elif np.sign(self.position) == np.sign(signed):
+                self.avg_price = price # Virou a mão
+
+        self.fills.append((ts, order_id, side, price, qty, fee, liquidity))
+
+    # --- Motor de Eventos ---
+    def _match_trades(self, lo, hi):
+        """Aplica os trades [lo, hi) às ordens em repouso (vetorizado por ordem)."""
+        t_px = self.trades.price[lo:hi]
+        t_qty = self.trades.qty[lo:hi]
+        t_side = self.trades.side[lo:hi]
+        t_ts = self.trades.ts[lo:hi]
+
+        for order in list(self.orders.values()):
+            if order.side == BID:
+                aggressor = t_side == -1
+                through = aggressor & (t_px < order.price - order.price * 1e-9)
+            else:
+                aggressor = t_side == 1
+                through = aggressor & (t_px > order.price + order.price * 1e-9)
+            at_level = aggressor & (np.abs(t_px - order.price) <= order.price * 1e-9)
+
+            if not at_level.any() and not through.any():
+                continue
+
+            depletion = np.cumsum(np.where(at_level, t_qty, 0.0)) - order.queue_ahead
+            first_through = int(np.argmax(through)) if through.any() else None
+
+            if first_through is not None:
+                filled = order.remaining
+                fill_ts = int(t_ts[first_through])
+            else:
+                filled = min(order.remaining, max(0.0, float(depletion[-1])))
+                fill_ts = int(t_ts[int(np.argmax(depletion > 0))]) if filled > 0 else None
+
+            order.queue_ahead = max(0.0, -float(depletion[-1]))
+            if filled > 0:
+                order.remaining -= filled
+                self.maker_qty += filled
+                self._apply_fill(order.id, order.side, order.price, filled, self.maker_fee, "Maker", fill_ts)
+                if order.remaining <= 1e-12:
+                    order.status = "Filled"
+                    del self.orders[order.id]
+                else:
+                    order.status = "PartiallyFilled"
+
+    def _shrink_queues(self):
+        """Cancelamentos à frente: fila nunca maior que o nível exibido no snapshot atual."""
+        for order in self.orders.values():
+            level = self._level_size(order.side, order.price)
+            if level < order.queue_ahead:
+                order.queue_ahead = level
+
+    def run(self, strategy=None, on_book=None):
+        """
+        Replay completo. 'strategy' precisa de on_book(sim); alternativamente passe on_book(sim).
+        Trades só são avaliados quando há ordens em repouso (loop barato fora de posição).
+        """
+        callback = on_book or (strategy.on_book if strategy is not None else None)
+        n = len(self.book)
+        bounds = self.trade_bounds
+
+        for i in range(n):
+            self.i = i
+            self.now = int(self.book.ts[i])
+            if self.orders:
+                self._shrink_queues()
+            if callback:
+                callback(self)
+            if self.orders and i + 1 < n and bounds[i + 1] > bounds[i]:
+                self._match_trades(bounds[i], bounds[i + 1])
+
+        return self.report()
+
+    def report(self):
+        mark = self.mid() if len(self.book) else 0.0
+        unrealized = self.position * (mark - self.avg_price) if self.position else 0.0
+        return {
+            'fills': len(self.fills),
+            'posted_qty': self.posted_qty,
+            'maker_qty': self.maker_qty,
+            'taker_qty': self.taker_qty,
+            'maker_fill_rate': self.maker_qty / self.posted_qty if self.posted_qty else 0.0,
+            'fees': self.fees,
+            'slippage_cost': self.slippage_cost,
+            'realized_pnl': self.realized_pnl,
+            'unrealized_pnl': unrealized,
+            'net_pnl': self.realized_pnl + unrealized - self.fees,
+            'position': self.position,
+        }
+
+
+class JoinBestMaker:
+    """Estratégia de referência: mantém um Bid e um Ask no topo do book, reprecificando quando o topo anda."""
+    def __init__(self, qty, max_position):
+        self.qty = qty
+        self.max_position = max_position
+        self.bid_id = None
+        self.ask_id = None
+
+    def on_book(self, sim):
+        if self.bid_id not in sim.orders:
+            self.bid_id = None
+        if self.ask_id not in sim.orders:
+            self.ask_id = None
+
+        bid, ask = sim.best_bid(), sim.best_ask()
+        if np.isnan(bid) or np.isnan(ask):
+            return
+        if self.bid_id is not None and sim.orders[self.bid_id].price != bid:
+            self.bid_id = sim.replace(self.bid_id, bid)
+        if self.ask_id is not None and sim.orders[self.ask_id].price != ask:
+            self.ask_id = sim.replace(self.ask_id, ask)
+        if self.bid_id is None and sim.position < self.max_position:
+            self.bid_id = sim.place_limit(BID, bid, self.qty)
+        if self.ask_id is None and sim.position > -self.max_position:
+            self.ask_id = sim.place_limit(ASK, ask, self.qty)
+
+
+if __name__ == "__main__":
+    # Benchmark sintético: 1 dia de snapshots a cada 250ms + ~4M trades
+    rng = np.random.default_rng(7)
+    n_books, n_trades, levels, tick = 345_600, 4_000_000, 20, 0.1
+
+    book_ts = np.arange(n_books, dtype=np.int64) * 250_000_000
+    mid = 60_000 + np.cumsum(rng.normal(0, 0.5, n_books))
+    best_bid = np.floor(mid / tick) * tick
+    offsets = np.arange(levels) * tick
+    book = BookFrames(
+        book_ts,
+        best_bid[:, None] - offsets,
+        rng.exponential(0.5, (n_books, levels)),
+        best_bid[:, None] + tick + offsets,
+        rng.exponential(0.5, (n_books, levels)),
+    )
+
+    trade_ts = np.sort(rng.integers(0, book_ts[-1], n_trades))
+    idx = np.searchsorted(book_ts, trade_ts, side='right') - 1
+    side = np.where(rng.random(n_trades) < 0.5, 1, -1).astype(np.int8)
+    price = np.where(side == 1, book.ask_px[idx, 0], book.bid_px[idx, 0])
+    trades = TradeTape(trade_ts, price, rng.exponential(0.05, n_trades), side)
+
+    started = time.perf_counter()
+    sim = ExecutionSimulator(book, trades)
+    result = sim.run(JoinBestMaker(qty=0.01, max_position=0.05))
+    elapsed = time.perf_counter() - started
+
+    print(f" Replay: {n_books:,} snapshots + {n_trades:,} trades em {elapsed:.1f}s")
+    for k, v in result.items():
+        print(f"   {k:<16} {v:,.6f}" if isinstance(v, float) else f"   {k:<16} {v}")
@@ -0,0 +1,475 @@
+import os
+import time
+import zlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86_400 * 10**9
+REFRESH_OVERLAP = 10 # Fills re-baixados na emenda do backfill (fills que chegam durante a paginação deslocam o offset)
+NO_STRATEGY = "-"
+# Relativo ao backend_core, não ao CWD: relatório, dashboard e agente compartilham o mesmo store
+FILLS_ROOT = os.getenv("OBI_FILLS", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fills"))
+CATEGORIES = ("symbol", "strategy")
+NUMERIC = {
+    "ts": np.int64,        # epoch ns (UTC)
+    "side": np.int8,       # +1 compra (Bid), -1 venda (Ask)
+    "price": np.float64,
+    "qty": np.float64,
+    "fee": np.float64,
+    "maker": np.bool_,
+    "trade_id": np.int64,  # -1 = ausente
+    "order_id": np.int64,
+    "client_id": np.int64,
+}
+COLUMNS = ("ts", "symbol", "side", "price", "qty", "fee", "maker", "trade_id", "order_id", "client_id", "strategy")
+
+
+def epoch_ns(values):
+    """
+    Timestamps da API em epoch ns, vetorizado. Aceita ISO 8601 (UTC, com ou sem 'Z') e números
+    em s/ms/us/ns (escala pela magnitude). Inválidos viram -1.
+    """
+    s = pd.Series(values, dtype=object)
+    out = np.full(len(s), -1, dtype=np.int64)
+    iso = s.map(lambda v: isinstance(v, str) and '-' in v, na_action='ignore').fillna(False).to_numpy(dtype=bool)
+    if iso.any():
+        parsed = pd.to_datetime(s[iso], format='ISO8601', utc=True, errors='coerce')
+        ns = parsed.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        out[iso] = np.where(parsed.isna().to_numpy(), -1, ns)
+    if not iso.all():
+        n = _floats(s[~iso])
+        scale = np.select([n > 1e17, n > 1e14, n > 1e11], [1, 1e3, 1e6], 1e9)
+        out[~iso] = np.where(np.isnan(n), -1, n * scale).astype(np.int64)
+    return out
+
+
+def _floats(values):
+    """Strings numéricas da API -> float64 (caminho rápido; to_numeric só se houver lixo)."""
+    try:
+        return values.astype(np.float64).to_numpy()
+    except (TypeError, ValueError):
+        return pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _ids(values):
+    """Ids numéricos (tradeId/orderId/clientId) em int64 sem passar por float; -1 = ausente."""
+    try:
+        return values.fillna(-1).astype(np.int64).to_numpy()
+    except (TypeError, ValueError, OverflowError):
+        return pd.to_numeric(values, errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+
+
+def to_frame(fills, strategies=None):
+    """
+    Fills no formato da API (/wapi/v1/history/fills) -> frame colunar tipado, ordenado por (ts, trade_id).
+    strategies: {clientId: estratégia}; um campo 'strategy' no próprio fill tem precedência.
+    """
+    raw = pd.DataFrame.from_records(list(fills or []))
+    col = lambda name, default=None: raw[name] if name in raw else pd.Series([default] * len(raw), dtype=object)
+    side = col('side').astype(str).to_numpy()
+    frame = pd.DataFrame({
+        "ts": epoch_ns(col('timestamp')),
+        "symbol": col('symbol', '').astype(str),
+        "side": np.where(np.isin(side, ("Bid", "Buy")), 1, -1).astype(np.int8),
+        "price": _floats(col('price')),
+        "qty": _floats(col('quantity')),
+        "fee": np.nan_to_num(_floats(col('fee', 0))),
+        "maker": col('isMaker', False).fillna(False).astype(bool).to_numpy(),
+        "trade_id": _ids(col('tradeId')),
+        "order_id": _ids(col('orderId')),
+        "client_id": _ids(col('clientId')),
+        "strategy": col('strategy').astype(object),
+    })
+    if strategies:
+        mapped = pd.Series(frame['client_id']).map(strategies)
+        frame['strategy'] = frame['strategy'].where(frame['strategy'].notna(), mapped)
+    frame['strategy'] = frame['strategy'].fillna(NO_STRATEGY).astype(str)
+    valid = (frame['ts'] >= 0) & (frame['qty'] > 0) & (frame['price'] > 0)
+    return _normalize(frame[valid])
+
+
+def _normalize(frame):
+    frame = frame.sort_values(['ts', 'trade_id'], kind='stable').reset_index(drop=True)
+    for name in CATEGORIES:
+        frame[name] = frame[name].astype(str).astype('category')
+    return frame.astype(NUMERIC)
+
+
+def empty_frame():
+    return _normalize(pd.DataFrame({name: pd.Series(dtype=object if name in CATEGORIES else NUMERIC[name])
+                                    for name in COLUMNS}))
+
+
+class FillStore:
+    """
+     FILL STORE (Histórico de Execuções Colunar)
+    Fills da conta em um frame tipado (ts epoch ns, símbolo/estratégia categóricos, float64 para
+    preço/qty/fee), carregado uma vez e persistido em backend_core/data/fills/fills_<conta>.npz (OBI_FILLS).
+    refresh() pagina /wapi/v1/history/fills (mais novos primeiro) só até alcançar o que já está gravado,
+    ou além dele quando a janela pedida é mais antiga que covered_ns (histórico completo de covered_ns até o
+    fill mais novo, persistido junto no npz).
+    root=None: só em memória (análises de uma amostra avulsa).
+    version muda a cada ingest com fills novos: o FillAnalytics usa isso para invalidar o cache.
+    """
+    def __init__(self, root=FILLS_ROOT, account=None, max_fills=1_000_000):
+        self.root = root
+        self.max_fills = max_fills
+        account = account if account is not None else os.getenv('BACKPACK_API_KEY', '')
+        self.path = os.path.join(root, f"fills_{zlib.crc32(account.encode()):08x}.npz") if root else None
+        self.covered_ns = None # None = cobertura desconhecida: o próximo refresh pagina a janela inteira
+        self.df = self._load()
+        self.version = 0
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return empty_frame()
+        try:
+            with np.load(self.path) as data:
+                columns = {name: data[name] for name in NUMERIC}
+                for name in CATEGORIES:
+                    columns[name] = pd.Categorical.from_codes(data[name], data[f"{name}_categories"].astype(str))
+                if 'covered_ns' in data:
+                    self.covered_ns = int(data['covered_ns'])
+            return pd.DataFrame(columns)[list(COLUMNS)].astype(NUMERIC)
+        except (OSError, KeyError, ValueError):
+            return empty_frame() # Cache corrompido/formato antigo: refaz pelo refresh
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        arrays = {name: self.df[name].to_numpy() for name in NUMERIC}
+        for name in CATEGORIES:
+            arrays[name] = self.df[name].cat.codes.to_numpy()
+            arrays[f"{name}_categories"] = np.asarray(self.df[name].cat.categories, dtype=str)
+        if self.covered_ns is not None:
+            arrays['covered_ns'] = np.int64(self.covered_ns)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def newest_ns(self):
+        return int(self.df['ts'].iloc[-1]) if len(self.df) else None
+
+    def ingest(self, fills, strategies=None, persist=True):
+        """Mescla fills da API (duplicados pelo tradeId/ordem/ts são ignorados). Retorna quantos eram novos."""
+        incoming = to_frame(fills, strategies)
+        if incoming.empty:
+            return 0
+        before = len(self.df)
+        merged = pd.concat([self.df.astype({n: str for n in CATEGORIES}),
+                            incoming.astype({n: str for n in CATEGORIES})], ignore_index=True)
+        merged = merged.drop_duplicates(['trade_id', 'order_id', 'symbol', 'ts', 'side', 'qty'], keep='first')
+        added = len(merged) - before # Contado antes do corte: no teto, o merge volta ao mesmo tamanho
+        if not added:
+            return 0
+        merged = _normalize(merged)
+        if len(merged) > self.max_fills:
+            merged = _normalize(merged.iloc[-self.max_fills:])
+            if self.covered_ns is not None:
+                self.covered_ns = max(self.covered_ns, int(merged['ts'].iloc[0]))
+        self.df = merged
+        self.version += 1
+        if persist:
+            self._save()
+        return added
+
+    def tag(self, strategies):
+        """Atribui estratégia por clientId aos fills já gravados (fills sem estratégia)."""
+        current = self.df['strategy'].astype(str)
+        mapped = self.df['client_id'].map(strategies)
+        update = (current == NO_STRATEGY) & mapped.notna()
+        if update.any():
+            self.df['strategy'] = current.where(~update, mapped).astype('category')
+            self.version += 1
+            self._save()
+        return int(update.sum())
+
+    def refresh(self, client, days=30, page=1000, max_pages=200, strategies=None):
+        """
+        Baixa fills novos. client: qualquer objeto com get_fill_history(limit=, offset=)
+        (BackpackTransport, BackpackData). Para ao alcançar o fill mais novo já gravado, se o gravado já
+        cobre `days`; senão continua (backfill) até `days` atrás ou o fim do histórico.
+        """
+        newest = self.newest_ns
+        since = int((time.time() - days * 86_400) * 1e9)
+        covered = newest is not None and self.covered_ns is not None and self.covered_ns <= since
+        rows = []
+        offset, oldest, overlap, exhausted = 0, None, False, False
+        for _ in range(max_pages):
+            batch = client.get_fill_history(limit=page, offset=offset)
+            if not isinstance(batch, list):
+                break # Erro da API: cobre só o que chegou
+            if not batch:
+                exhausted = True
+                break
+            rows.extend(batch)
+            ts = epoch_ns([f.get('timestamp') for f in batch])
+            oldest = int(ts[-1])
+            offset += len(batch)
+            if len(batch) < page:
+                exhausted = True
+                break
+            if not overlap and newest is not None and oldest <= newest:
+                overlap = True
+                if not covered and self.covered_ns is not None:
+                    # Backfill: pula o trecho já gravado (completo de covered_ns até newest), com folga
+                    fresh = offset - len(batch) + int((ts > newest).sum())
+                    known = int((self.df['ts'].to_numpy() >= self.covered_ns).sum())
+                    offset = max(offset, fresh + known - REFRESH_OVERLAP)
+                    oldest = self.covered_ns
+            if (overlap and covered) or oldest < since:
+                break
+
+        # Cobertura contígua a partir de agora: emenda na anterior só se a paginação alcançou o gravado
+        if exhausted:
+            reach = 0
+        elif oldest is None:
+            reach = self.covered_ns
+        elif overlap and self.covered_ns is not None:
+            reach = min(self.covered_ns, oldest)
+        else:
+            reach = oldest
+        added = self.ingest(rows, strategies, persist=False)
+        if reach is not None and len(self.df) >= self.max_fills:
+            reach = max(reach, int(self.df['ts'].iloc[0])) # Cortado pelo max_fills
+        if added or reach != self.covered_ns:
+            self.covered_ns = reach
+            self._save()
+        return added
+
+
+class FillAnalytics:
+    """
+     FILL ANALYTICS (PnL por Round-Trip, Vetorizado)
+    Pareamento FIFO de aberturas/fechamentos sobre o FillStore, por símbolo, sem laço por fill:
+    com filas FIFO, a k-ésima unidade comprada sempre fecha contra a k-ésima unidade vendida
+    (long ou short), então os round-trips são as interseções das quantidades acumuladas de
+    compras e vendas (np.union1d + searchsorted).
+    Relatórios por símbolo/dia/estratégia trazem PnL líquido, maker ratio (fração do volume como maker)
+    e fee drag (taxas / PnL bruto). Pareamento e relatórios ficam em cache até o store mudar de versão.
+    """
+    def __init__(self, store):
+        self.store = store
+        self._cache = {}
+        self._version = None
+
+    @classmethod
+    def from_fills(cls, fills, strategies=None):
+        """Análise avulsa de uma lista de fills da API (sem disco)."""
+        store = FillStore(root=None)
+        store.ingest(fills, strategies, persist=False)
+        return cls(store)
+
+    def _cached(self, key, compute):
+        if self._version != self.store.version:
+            self._cache.clear()
+            self._version = self.store.version
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _bounds(self, start_ns, end_ns, ts):
+        lo = 0 if start_ns is None else int(np.searchsorted(ts, start_ns, side='left'))
+        hi = len(ts) if end_ns is None else int(np.searchsorted(ts, end_ns, side='left'))
+        return lo, hi
+
+    def frame(self, start_ns=None, end_ns=None):
+        """Fills em [start_ns, end_ns) (fatia do frame ordenado, sem cópia)."""
+        df = self.store.df
+        lo, hi = self._bounds(start_ns, end_ns, df['ts'].to_numpy())
+        return df.iloc[lo:hi]
+
+    # --- PAREAMENTO ---
+
+    def _pair_symbol(self, idx, side, price, qty, fee):
+        buys, sells = idx[side[idx] > 0], idx[side[idx] < 0]
+        cb, cs = np.cumsum(qty[buys]), np.cumsum(qty[sells])
+        bought, sold = (cb[-1] if len(cb) else 0.0), (cs[-1] if len(cs) else 0.0)
+        matched = min(bought, sold)
+        if matched <= 0:
+            return None, bought - sold
+        edges = np.union1d(np.r_[0.0, cb, cs], [matched])
+        edges = edges[edges <= matched]
+        q = np.diff(edges)
+        keep = q > 1e-12 * max(1.0, matched) # Resíduo de ponto flutuante entre acumulados quase iguais
+        mid = ((edges[:-1] + edges[1:]) / 2)[keep]
+        b = buys[np.minimum(np.searchsorted(cb, mid, side='right'), len(buys) - 1)]
+        s = sells[np.minimum(np.searchsorted(cs, mid, side='right'), len(sells) - 1)]
+        q = q[keep]
+        rt_fee = fee[b] * q / qty[b] + fee[s] * q / qty[s] # Taxa proporcional das duas pontas
+        return (b, s, q, rt_fee), bought - sold
+
+    def round_trips(self):
+        """
+        Um registro por pedaço pareado (como o FIFO do analyze_history): entrada = fill mais antigo
+        do par, saída = o mais novo. Fee = parcela proporcional da entrada + da saída.
+        """
+        return self._cached('round_trips', self._round_trips)
+
+    def _round_trips(self):
+        df = self.store.df
+        codes = df['symbol'].cat.codes.to_numpy()
+        side, price, qty, fee = (df[c].to_numpy() for c in ('side', 'price', 'qty', 'fee'))
+        order = np.argsort(codes, kind='stable') # Mantém a ordem temporal dentro de cada símbolo
+        splits = np.flatnonzero(np.diff(codes[order])) + 1
+        parts, open_qty = [], {}
+        for idx in np.split(order, splits) if len(order) else []:
+            pairs, net = self._pair_symbol(idx, side, price, qty, fee)
+            open_qty[df['symbol'].iat[idx[0]]] = net
+            if pairs is not None:
+                parts.append(pairs)
+        self._cache['open_qty'] = open_qty
+        if not parts:
+            return pd.DataFrame(columns=['symbol', 'strategy', 'type', 'entry_ts', 'exit_ts', 'entry_price',
+                                         'exit_price', 'quantity', 'gross_pnl', 'fee', 'net_pnl', 'maker_entry',
+                                         'maker_exit', 'exit_idx'])
+        b, s, q, rt_fee = (np.concatenate(x) for x in zip(*parts))
+        entry, exit_ = np.minimum(b, s), np.maximum(b, s) # Frame ordenado: índice menor = mais antigo
+        gross = (price[s] - price[b]) * q # Long ou short: venda - compra
+        ts, maker = df['ts'].to_numpy(), df['maker'].to_numpy()
+        trips = pd.DataFrame({
+            "symbol": df['symbol'].to_numpy()[entry],
+            "strategy": df['strategy'].to_numpy()[entry],
+            "type": np.where(b < s, "Long", "Short"),
+            "entry_ts": ts[entry],
+            "exit_ts": ts[exit_],
+            "entry_price": price[entry],
+            "exit_price": price[exit_],
+            "quantity": q,
+            "gross_pnl": gross,
+            "fee": rt_fee,
+            "net_pnl": gross - rt_fee,
+            "maker_entry": maker[entry],
+            "maker_exit": maker[exit_],
+            "exit_idx": exit_,
+        })
+        return trips.sort_values(['exit_ts', 'entry_ts'], kind='stable').reset_index(drop=True)
+
+    def open_positions(self):
+        """{símbolo: quantidade líquida sem par} (>0 long, <0 short) dentro do histórico carregado."""
+        self.round_trips()
+        return {s: float(q) for s, q in self._cached('open_qty', dict).items() if abs(q) > 1e-12}
+
+    def realized_by_fill(self, start_ns=None, end_ns=None, column='net_pnl'):
+        """PnL realizado por fill (round-trips que o fill fechou), alinhado a frame(start_ns, end_ns). column: net_pnl|gross_pnl."""
+        def compute():
+            trips = self.round_trips()
+            return np.bincount(trips['exit_idx'].to_numpy(dtype=np.int64), weights=trips[column].to_numpy(dtype=np.float64),
+                               minlength=len(self.store.df))
+        lo, hi = self._bounds(start_ns, end_ns, self.store.df['ts'].to_numpy())
+        return self._cached(('realized_by_fill', column), compute)[lo:hi]
+
+    def closed(self, start_ns=None, end_ns=None):
+        """Round-trips fechados em [start_ns, end_ns)."""
+        trips = self.round_trips()
+        lo, hi = self._bounds(start_ns, end_ns, trips['exit_ts'].to_numpy())
+        return trips.iloc[lo:hi]
+
+    # --- RELATÓRIOS ---
+
+    def _breakdown(self, key, start_ns, end_ns):
+        fills, trips = self.frame(start_ns, end_ns), self.closed(start_ns, end_ns)
+        notional = fills['price'].to_numpy() * fills['qty'].to_numpy()
+        if key == 'day':
+            fill_key, trip_key = fills['ts'].to_numpy() // NS_PER_DAY, trips['exit_ts'].to_numpy() // NS_PER_DAY
+        else:
+            fill_key, trip_key = fills[key].astype(str).to_numpy(), trips[key].astype(str).to_numpy()
+        per_fill = pd.DataFrame({key: fill_key, 'volume': notional, 'fees': fills['fee'].to_numpy(),
+                                 'maker_volume': notional * fills['maker'].to_numpy()})
+        per_trip = pd.DataFrame({key: trip_key, 'gross_pnl': trips['gross_pnl'].to_numpy(),
+                                 'rt_fees': trips['fee'].to_numpy(), 'net_pnl': trips['net_pnl'].to_numpy(),
+                                 'wins': trips['net_pnl'].to_numpy() > 0})
+        out = per_fill.groupby(key).agg(fills=('fees', 'size'), volume=('volume', 'sum'), fees=('fees', 'sum'),
+                                        maker_volume=('maker_volume', 'sum'))
+        out = out.join(per_trip.groupby(key).agg(trades=('net_pnl', 'size'), wins=('wins', 'sum'),
+                                                 gross_pnl=('gross_pnl', 'sum'), rt_fees=('rt_fees', 'sum'),
+                                                 net_pnl=('net_pnl', 'sum')), how='outer').fillna(0)
+        out = out.astype({'fills': np.int64, 'trades': np.int64, 'wins': np.int64})
+        self._ratios(out)
+        if key == 'day':
+            out.index = pd.to_datetime(out.index.to_numpy(dtype=np.int64) * NS_PER_DAY).date
+            out.index.name = 'date'
+            return out.sort_index(ascending=False)
+        return out.sort_values('volume', ascending=False)
+
+    @staticmethod
+    def _ratios(out):
+        volume, gross, trades = out['volume'], out['gross_pnl'], out['trades']
+        out['maker_ratio'] = (out['maker_volume'] / volume).where(volume > 0)
+        out['fee_bps'] = (out['fees'] / volume * 1e4).where(volume > 0)
+        out['win_rate'] = (out['wins'] / trades).where(trades > 0)
+        out['fee_drag'] = (out['rt_fees'] / gross).where(gross > 0) # Fração do lucro bruto que virou taxa
+
+    def by_symbol(self, start_ns=None, end_ns=None):
+        return self._cached(('symbol', start_ns, end_ns), lambda: self._breakdown('symbol', start_ns, end_ns))
+
+    def by_day(self, start_ns=None, end_ns=None):
+        """Por dia UTC: volume/taxas pelo dia do fill, PnL pelo dia em que o round-trip fechou."""
+        return self._cached(('day', start_ns, end_ns), lambda: self._breakdown('day', start_ns, end_ns))
+
+    def by_strategy(self, start_ns=None, end_ns=None):
+        """Por estratégia (round-trip herda a estratégia do fill de entrada)."""
+        return self._cached(('strategy', start_ns, end_ns), lambda: self._breakdown('strategy', start_ns, end_ns))
+
+    def summary(self, start_ns=None, end_ns=None):
+        def compute():
+            fills, trips = self.frame(start_ns, end_ns), self.closed(start_ns, end_ns)
+            notional = fills['price'].to_numpy() * fills['qty'].to_numpy()
+            net = trips['net_pnl'].to_numpy()
+            wins, losses = net[net > 0], net[net <= 0]
+            row = pd.DataFrame({
+                'fills': [len(fills)], 'volume': [notional.sum()], 'fees': [fills['fee'].sum()],
+                'maker_volume': [(notional * fills['maker'].to_numpy()).sum()],
+                'trades': [len(trips)], 'wins': [len(wins)], 'gross_pnl': [trips['gross_pnl'].sum()],
+                'rt_fees': [trips['fee'].sum()], 'net_pnl': [net.sum()],
+            })
+            self._ratios(row)
+            summary = {k: (None if pd.isna(v) else v.item()) for k, v in ((c, row[c].iat[0]) for c in row)}
+            summary['losses'] = len(losses)
+            summary['maker_fills'] = int(fills['maker'].sum())
+            summary['taker_fills'] = len(fills) - summary['maker_fills']
+            summary['avg_win'] = float(wins.mean()) if len(wins) else None
+            summary['avg_loss'] = float(losses.mean()) if len(losses) else None
+            return summary
+        return self._cached(('summary', start_ns, end_ns), compute)
+
+
+def local_time(ts_ns):
+    """epoch ns -> datetimes locais sem fuso (exibição, como o datetime.fromtimestamp dos relatórios)."""
+    tz = datetime.now().astimezone().tzinfo
+    return pd.to_datetime(np.asarray(ts_ns, dtype=np.int64), unit='ns', utc=True).tz_convert(tz).tz_localize(None)
+
+
+def since_ns(days=None, hours=None, now=None):
+    """Início de janela em epoch ns, arredondado ao minuto (relatórios repetidos caem no mesmo cache)."""
+    seconds = (days or 0) * 86_400 + (hours or 0) * 3_600
+    return int(((now or time.time()) - seconds) // 60 * 60) * 10**9
+
+
+def load(client, days=30, root=FILLS_ROOT, strategies=None):
+    """FillStore da conta atualizado + FillAnalytics sobre ele."""
+    store = FillStore(root)
+    store.refresh(client, days=days, strategies=strategies)
+    return FillAnalytics(store)
+
+
+if __name__ == "__main__":
+    import sys
+    from backpack_transport import BackpackTransport
+
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    started = time.perf_counter()
+    analytics = load(BackpackTransport(), days=days)
+    start = since_ns(days=days)
+    summary = analytics.summary(start)
+    print(f" {summary['fills']} fills / {summary['trades']} round-trips em {days} dias "
+          f"({(time.perf_counter() - started) * 1000:.0f} ms, cache: {analytics.store.path})")
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        print(analytics.by_symbol(start)[['fills', 'volume', 'fees', 'net_pnl', 'win_rate', 'maker_ratio', 'fee_drag']])
@@ -3,6 +3,10 @@ import json
 import os
 import stat
 from backpack_data import BackpackData
+try:
+    from .config_channel import ConfigChannel
+except ImportError:
+    from config_channel import ConfigChannel
 
 class Gatekeeper:
     """
@@ -14,6 +18,8 @@ class Gatekeeper:
         self._check_env_security()
         self.data = data_client
         self.config_file = config_file
+        self.channel = None
+        self.config_version = None
         self._load_dynamic_config()
 
     def _check_env_security(self):
@@ -37,7 +43,7 @@ class Gatekeeper:
             print("️ WARNING: .env file not found. System running on environment variables or defaults.")
 
     def _load_dynamic_config(self):
-        """Carrega parâmetros ajustados pelo Learning Engine."""
+        """Carrega parâmetros ajustados pelo Learning Engine (só quando a versão publicada muda)."""
         default_config = {
             "min_volume_usd": 10_000_000,
             "max_spread_pct": 0.0015,
@@ -46,12 +52,12 @@ class Gatekeeper:
         }
         
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    self.config = json.load(f)
-            else:
-                self.config = default_config
-        except:
+            if self.channel is None:
+                self.channel = ConfigChannel.shared(self.config_file, defaults=default_config)
+            if self.channel.version == self.config_version:
+                return
+            self.config_version, self.config = self.channel.snapshot()
+        except Exception:
             self.config = default_config
             
         # Mapear para variáveis locais para compatibilidade
@@ -65,7 +71,7 @@ class Gatekeeper:
         Valida se o trade atende as Camadas de Segurança (Dynamic Risk).
         Retorna: (bool, reason, context_data)
         """
-        # Recarregar config a cada check para pegar ajustes em tempo real
+        # Ajustes do Learning Engine em tempo real: recarrega só se a versão do canal mudou
         self._load_dynamic_config()
         
         print(f"   ️ GATEKEEPER (Dynamic): Validando {symbol} ({side})...")
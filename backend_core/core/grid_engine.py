@@ -0,0 +1,226 @@
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .order_replace import fmt_number, is_stop_order
+except ImportError:
+    from order_replace import fmt_number, is_stop_order
+
+
+GRID_CLIENT_ID = 0x6F626967 # "obig": tag das ordens do grid (clientId u32) para reconhecê-las após recentralizar/reiniciar
+
+
+def _price_key(side, price):
+    return side, round(float(price), 10)
+
+
+class GridLadder:
+    """
+     GRID LADDER
+    Escada desejada de um símbolo: níveis anchor * (1 + spread * i), i em [-lines, lines].
+    Cada nível guarda o lado que deve estar no livro (Bid/Ask) ou None (slot vazio).
+    Começa com Bids abaixo, Asks acima e o nível 0 vazio.
+    Ping-pong: fill de Bid no nível i libera i e arma Ask em i+1; fill de Ask arma Bid em i-1.
+    """
+    def __init__(self, symbol, anchor, lines, spread, quantity, round_price=None):
+        self.symbol = symbol
+        self.anchor = float(anchor)
+        self.lines = lines
+        self.spread = spread
+        self.quantity = quantity
+        self.round_price = round_price or (lambda p: p)
+        self.levels = {i: ("Bid" if i < 0 else "Ask") if i else None for i in range(-lines, lines + 1)}
+        self.prices = {i: self.round_price(self.anchor * (1 + spread * i)) for i in self.levels}
+
+    def desired(self):
+        """{(lado, preço): nível} das ordens que devem estar no livro."""
+        return {_price_key(side, self.prices[i]): i for i, side in self.levels.items() if side}
+
+    def on_fill(self, index):
+        """Aplica o ping-pong do nível executado. Retorna o nível rearmado (ou None)."""
+        side = self.levels.get(index)
+        if not side:
+            return None
+        self.levels[index] = None
+        target = index + 1 if side == "Bid" else index - 1
+        if target in self.levels and self.levels[target] is None:
+            self.levels[target] = "Ask" if side == "Bid" else "Bid"
+            return target
+        return None
+
+    def exhausted(self):
+        """True quando um dos lados acabou (preço saiu do range): hora de recentralizar."""
+        return len(set(filter(None, self.levels.values()))) < 2
+
+    def payload(self, index):
+        return {
+            "symbol": self.symbol,
+            "side": self.levels[index],
+            "orderType": "Limit",
+            "quantity": fmt_number(self.quantity),
+            "price": fmt_number(self.prices[index]),
+            "timeInForce": "GTC",
+            "postOnly": True
+        }
+
+
+class GridEngine:
+    """
+     GRID ENGINE (Reconciliação por Diff)
+    Mantém a escada desejada de cada símbolo (GridLadder) e reconcilia contra o livro:
+    - Uma consulta de ordens abertas por ciclo cobre todos os símbolos.
+    - Só reconcilia ordens do grid (ids rastreados ou clientId == client_id). TPs/SLs reduceOnly,
+      ordens de gatilho, de outras estratégias e manuais nunca são tocadas.
+    - Ordem rastreada que sumiu só vira fill com status Filled no histórico de ordens -> ping-pong só
+      naquele nível. Cancelada por fora: o nível é reposto. Sem confirmação: o nível fica em espera.
+    - Diff mínimo: cancela só níveis obsoletos e posta só os faltantes
+      (novas ordens em um POST em lote, cancelamentos em paralelo).
+    Um fill custa 2 GETs + 1 POST, independente de quantos níveis/símbolos o grid tem.
+    """
+    def __init__(self, transport, max_workers=8, logger=None, client_id=GRID_CLIENT_ID):
+        self.transport = transport
+        self.client_id = client_id
+        self.ladders = {}
+        self.tracked = {}   # symbol -> {order_id: nível}
+        self.reports = deque(maxlen=500)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="GridEngine")
+        self.logger = logger or logging.getLogger("GridEngine")
+
+    def set_ladder(self, ladder):
+        """Instala (ou recentraliza) a escada do símbolo. Ordens vivas no mesmo preço são reaproveitadas."""
+        self.ladders[ladder.symbol] = ladder
+        self.tracked[ladder.symbol] = {}
+
+    def remove(self, symbol):
+        """Tira o símbolo do grid cancelando só as ordens rastreadas por ele."""
+        self.ladders.pop(symbol, None)
+        tracked = self.tracked.pop(symbol, {})
+        list(self.pool.map(lambda oid: self.transport.cancel_order(symbol, oid), tracked))
+
+    # --- RECONCILIAÇÃO ---
+
+    def _fetch_open_orders(self):
+        symbols = list(self.ladders)
+        if len(symbols) == 1:
+            return self.transport.get_open_orders(symbols[0])
+        return self.transport.get_open_orders()
+
+    def _owned(self, order, tracked):
+        if order.get('reduceOnly') or is_stop_order(order):
+            return False
+        if order.get('id') in tracked:
+            return True
+        try:
+            return int(order.get('clientId')) == self.client_id
+        except (TypeError, ValueError):
+            return False
+
+    def _confirm_fills(self, symbol, missing):
+        """
+        Separa as ordens rastreadas que sumiram do livro pelo histórico de ordens.
+        Retorna (filled [nível], pending {order_id: nível}): pending = sem status final ainda (ou consulta
+        falhou), checado de novo no próximo ciclo sem repor o nível.
+        """
+        if not missing:
+            return [], {}
+        history = self.transport.get_order_history(limit=max(100, 2 * len(missing)), symbol=symbol)
+        status = {o.get('id'): o.get('status') for o in history} if isinstance(history, list) else {}
+        filled, pending = [], {}
+        for oid, index in missing.items():
+            state = status.get(oid)
+            if state == 'Filled':
+                filled.append(index)
+            elif state is None or state in ('New', 'PartiallyFilled'):
+                pending[oid] = index
+            # Cancelled/Expired/rejeitada: cancelada por fora, o diff repõe o nível
+        return filled, pending
+
+    def diff(self, ladder, live):
+        """
+        Compara a escada com as ordens vivas do símbolo.
+        Retorna (kept {order_id: nível}, cancel [order_id], place [nível]).
+        """
+        desired = ladder.desired()
+        kept, cancel = {}, []
+        for order in live:
+            index = desired.pop(_price_key(order.get('side'), order.get('price')), None)
+            if index is None:
+                cancel.append(order['id']) # Nível obsoleto ou duplicado
+            else:
+                kept[order['id']] = index
+        return kept, cancel, sorted(desired.values())
+
+    def reconcile(self, open_orders=None):
+        """
+        Um ciclo completo: detecta fills, aplica ping-pong e submete o diff.
+        Retorna relatório {symbol: {fills, kept, cancelled, placed, rejected}, latency_ms}
+        ou None se a consulta de ordens falhar.
+        """
+        if not self.ladders:
+            return None
+        started = time.perf_counter()
+        if open_orders is None:
+            open_orders = self._fetch_open_orders()
+        if open_orders is None:
+            self.logger.warning("️ Falha ao consultar ordens abertas. Grid mantido como está.")
+            return None
+
+        live = {symbol: [] for symbol in self.ladders}
+        for order in open_orders:
+            symbol = order.get('symbol')
+            if symbol in live and order.get('orderType') == 'Limit' and self._owned(order, self.tracked.get(symbol, {})):
+                live[symbol].append(order)
+
+        report = {}
+        cancels, placements = [], []
+        for symbol, ladder in self.ladders.items():
+            live_ids = {o['id'] for o in live[symbol]}
+            tracked = self.tracked.get(symbol, {})
+            missing = {oid: idx for oid, idx in tracked.items() if oid not in live_ids}
+            filled, pending = self._confirm_fills(symbol, missing)
+            # Fills mais próximos do centro primeiro (Bids de cima para baixo, Asks de baixo para cima)
+            for index in sorted(filled, key=abs):
+                ladder.on_fill(index)
+
+            kept, cancel, place = self.diff(ladder, live[symbol])
+            waiting = set(pending.values())
+            place = [idx for idx in place if idx not in waiting]
+            self.tracked[symbol] = {**kept, **pending}
+            cancels += [(symbol, oid) for oid in cancel]
+            placements += [(symbol, idx) for idx in place]
+            report[symbol] = {'fills': len(filled), 'kept': len(kept), 'cancelled': len(cancel),
+                              'placed': 0, 'rejected': 0}
+
+        # Cancelamentos primeiro (liberam margem para os novos níveis), em paralelo
+        list(self.pool.map(lambda item: self.transport.cancel_order(*item), cancels))
+        if placements:
+            results = self._submit([{**self.ladders[s].payload(i), "clientId": self.client_id} for s, i in placements])
+            for (symbol, index), res in zip(placements, results):
+                if isinstance(res, dict) and res.get('id'):
+                    self.tracked[symbol][res['id']] = index
+                    report[symbol]['placed'] += 1
+                else:
+                    report[symbol]['rejected'] += 1 # PostOnly cruzou ou erro: nova tentativa no próximo ciclo
+
+        report['latency_ms'] = (time.perf_counter() - started) * 1000
+        self.reports.append(report)
+        for symbol in self.ladders:
+            r = report[symbol]
+            if r['fills'] or r['cancelled'] or r['placed'] or r['rejected']:
+                self.logger.info(
+                    f"️ {symbol}: {r['fills']} fills | mantidas {r['kept']} | canceladas {r['cancelled']} | "
+                    f"postadas {r['placed']} | rejeitadas {r['rejected']} ({report['latency_ms']:.0f}ms)"
+                )
+        return report
+
+    def _submit(self, payloads):
+        """Envia as novas ordens em lote; sem suporte a lote, em paralelo."""
+        if hasattr(self.transport, 'execute_batch'):
+            return self.transport.execute_batch(payloads)
+        return list(self.pool.map(
+            lambda p: self.transport._send_request("POST", "/api/v1/order", "orderExecute", p), payloads))
+
+    def close(self):
+        self.pool.shutdown(wait=False)
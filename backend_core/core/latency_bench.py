@@ -0,0 +1,387 @@
+"""
+ LATENCY BENCH (Caminhos de Ordem contra o Simulador)
+A métrica de latência de entrada do ScalpLab, generalizada para todos os caminhos de envio de ordem:
+cada caminho roda N vezes contra o exchange_simulator local (latência e jitter injetáveis) e o tempo
+de cada chamada é separado em fases, com percentis por fase. Regressões no hot path aparecem aqui,
+antes do deploy.
+
+    python core/latency_bench.py                                   # todos os caminhos, 200 execuções
+    python core/latency_bench.py transport weaver_grid --runs 500 --latency-ms 20 --jitter-ms 5
+    python core/latency_bench.py --save bench.json                 # grava a referência
+    python core/latency_bench.py --baseline bench.json             # exit 1 se o custo do cliente piorou
+
+Fases (ms por chamada do caminho, somando todas as requisições dela):
+    sign       cabeçalhos assinados (ed25519): BackpackAuth / BackpackClient._get_headers
+    serialize  JSON do corpo e da resposta dentro do requests
+    network    ida e volta HTTP menos o tempo no servidor (pilha HTTP, conexão, loopback)
+    ack        tempo no simulador, atraso injetado incluso (X-Sim-Server-Ms)
+    other      o resto: montagem do payload e da requisição (requests), arredondamento, logs, estratégia
+    client     total - ack: o que o nosso código custa (base da checagem de regressão)
+
+Cada caminho roda em um processo próprio, com cwd temporário: as duas árvores (core/ e
+obiwork_core/core/) têm módulos homônimos, e logs/caches das ferramentas não sujam o repositório.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import functools
+import importlib
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OBIWORK = os.path.join(ROOT, 'obiwork_core')
+
+# nome do caminho -> o que é medido
+CASES = {
+    'transport': "core BackpackTransport.execute_order",
+    'client': "obi_work_core BackpackClient.execute_order",
+    'assembly_line': "obiwork assembly_line VolumeStriker.execute_order",
+    'volume_farmer_maker': "obiwork VolumeFarmer._send_maker_order (depth em cache + PostOnly)",
+    'weaver_grid': "WeaverGrid.execute_modular_attack (depth + lote de 3 ordens)",
+}
+MEASURED = ('sign', 'serialize', 'network', 'ack')
+PHASES = MEASURED + ('other', 'client', 'total')
+PERCENTILES = (50, 90, 99)
+
+# Classes que assinam requisições e os métodos de assinatura
+SIGNERS = (
+    ('BackpackAuth', ('get_headers', 'get_batch_headers')),
+    ('BackpackClient', ('_get_headers',)),
+)
+
+
+def percentile(values, pct):
+    """Mesmo critério do MetricsFeed.latency_percentile (rank mais próximo sobre a lista ordenada)."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round((pct / 100.0) * (len(values) - 1))))]
+
+
+def summarize(samples):
+    """{fase: {p50, p90, p99, max, mean}} de uma lista de amostras do worker."""
+    phases = {}
+    for phase in PHASES:
+        values = [s[phase] for s in samples]
+        stats = {f"p{p}": round(percentile(values, p), 3) for p in PERCENTILES}
+        stats['max'] = round(max(values), 3)
+        stats['mean'] = round(sum(values) / len(values), 3)
+        phases[phase] = stats
+    return phases
+
+
+# --- WORKER (um caminho por processo) ---
+
+_acc = {}
+
+
+def _reset():
+    _acc.update(dict.fromkeys(MEASURED, 0.0), requests=0, errors=0)
+
+
+def _timed(fn, phase):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _acc[phase] += (time.perf_counter() - started) * 1000
+    return wrapper
+
+
+class _TimedJson:
+    """Substitui o `complexjson` de requests.models: só o JSON do requests entra em serialize."""
+
+    def __init__(self, module):
+        self._module = module
+        self.dumps = _timed(module.dumps, 'serialize')
+        self.loads = _timed(module.loads, 'serialize')
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+def _instrument():
+    import requests
+    import requests.models
+
+    send = requests.Session.send
+
+    @functools.wraps(send)
+    def timed_send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = send(self, request, **kwargs) # stream=False: corpo já lido aqui dentro
+        elapsed = (time.perf_counter() - started) * 1000
+        ack = float(response.headers.get('X-Sim-Server-Ms') or 0.0)
+        _acc['ack'] += ack
+        _acc['network'] += max(0.0, elapsed - ack)
+        _acc['requests'] += 1
+        if response.status_code != 200:
+            _acc['errors'] += 1
+        return response
+
+    requests.Session.send = timed_send
+    requests.models.complexjson = _TimedJson(requests.models.complexjson)
+
+    patched = set()
+    for module in list(sys.modules.values()):
+        for class_name, methods in SIGNERS:
+            cls = getattr(module, class_name, None)
+            if not isinstance(cls, type) or cls in patched:
+                continue
+            patched.add(cls)
+            for method in methods:
+                if method in cls.__dict__:
+                    setattr(cls, method, _timed(cls.__dict__[method], 'sign'))
+
+
+def _use_tree(directory):
+    """sys.path[0] como `python <directory>/script.py` teria (este arquivo roda a partir de core/)."""
+    sys.path[0] = directory
+    os.environ.setdefault('OBI_ENV_FILE', '') # Nunca as chaves reais do .env contra o simulador
+
+
+def _case_transport(args):
+    _use_tree(ROOT)
+    from core.backpack_transport import BackpackTransport
+    transport = BackpackTransport()
+    return lambda: transport.execute_order(args.symbol, "Limit", "Buy", args.qty, args.order_price)
+
+
+def _case_client(args):
+    _use_tree(os.path.join(ROOT, 'obi_work_core'))
+    from backpack_client import BackpackClient
+    client = BackpackClient()
+    client.BASE_URL = args.url # URL fixa na classe
+    return lambda: client.execute_order(args.symbol, "Bid", "Limit", args.qty, args.order_price)
+
+
+def _case_assembly_line(args):
+    _use_tree(os.path.join(OBIWORK, 'tools'))
+    striker = importlib.import_module('assembly_line').VolumeStriker()
+    striker.transport.base_url = args.url # Transport do obiwork não lê BACKPACK_API_URL
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(
+        striker.execute_order(args.symbol, "Buy", "Limit", args.qty, args.order_price, post_only=True))
+
+
+def _case_volume_farmer_maker(args):
+    _use_tree(os.path.join(OBIWORK, 'tools'))
+    farmer = importlib.import_module('volume_farmer').VolumeFarmer(symbols=[args.symbol])
+    farmer.transport.base_url = args.url
+    farmer.data_client.base_url = args.url
+    return lambda: farmer._send_maker_order(args.symbol, "Buy", args.qty, args.order_price)
+
+
+def _case_weaver_grid(args):
+    _use_tree(ROOT)
+    from core.backpack_transport import BackpackTransport
+    from strategies.weaver_grid import WeaverGrid
+    transport = BackpackTransport()
+    grid = WeaverGrid(transport, transport, None)
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(grid.execute_modular_attack(args.symbol, args.capital, "Buy"))
+
+
+def run_worker(args):
+    fire = globals()[f"_case_{args.worker}"](args)
+    _instrument()
+    samples = []
+    for i in range(args.warmup + args.runs):
+        _reset()
+        started = time.perf_counter()
+        fire()
+        total = (time.perf_counter() - started) * 1000
+        if i < args.warmup:
+            continue
+        sample = {phase: _acc[phase] for phase in MEASURED}
+        sample['total'] = total
+        sample['client'] = total - _acc['ack']
+        sample['other'] = max(0.0, total - sum(sample[phase] for phase in MEASURED))
+        sample['requests'] = _acc['requests']
+        sample['errors'] = _acc['errors']
+        samples.append(sample)
+    with open(args.out, 'w') as f:
+        json.dump({'case': args.worker, 'samples': samples}, f)
+    return 0
+
+
+# --- HARNESS ---
+
+class SimulatorThread:
+    """Simulador (motor + REST) num event loop próprio, com um mercado sintético estático."""
+
+    def __init__(self, symbol, price, latency_ms=0.0, jitter_ms=0.0, tick=0.01, step=0.01, seed=7):
+        try:
+            from .exchange_simulator import ExchangeSimulator, SimulatorServer, SyntheticFeed
+        except ImportError:
+            from exchange_simulator import ExchangeSimulator, SimulatorServer, SyntheticFeed
+        self.engine = ExchangeSimulator(balance=1e9) # Ordens repousam sem esbarrar em margem
+        self.engine.add_market(symbol, tick, step)
+        SyntheticFeed(self.engine, symbol, price, seed=seed).step() # Book fixo: mesma entrada a cada execução
+        self.server = SimulatorServer(self.engine, port=0, latency_ms=latency_ms, jitter_ms=jitter_ms, seed=seed)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="LatencyBenchSim", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result(timeout=30)
+        self.url = f"http://{self.server.host}:{self.server.port}"
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result(timeout=30)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+def _tail(path, lines=15):
+    try:
+        with open(path, errors='replace') as f:
+            return ''.join(f.readlines()[-lines:])
+    except OSError:
+        return ''
+
+
+def bench(cases, runs=200, warmup=10, latency_ms=0.0, jitter_ms=0.0, symbol="SOL_USDC_PERP", price=150.0,
+          capital=100.0):
+    """Roda cada caminho em um worker contra o simulador. {caso: {runs, requests_per_call, errors, phases}}."""
+    import subprocess
+    import tempfile
+    try:
+        from .exchange_simulator import paper_keys
+    except ImportError:
+        from exchange_simulator import paper_keys
+
+    sim = SimulatorThread(symbol, price, latency_ms, jitter_ms).start()
+    key, secret = paper_keys()
+    env = dict(os.environ, BACKPACK_API_URL=sim.url, BACKPACK_WS_URL=sim.url.replace('http', 'ws', 1) + '/ws',
+               BACKPACK_API_KEY=key, BACKPACK_API_SECRET=secret, OBI_ENV_FILE='', PYTHONUNBUFFERED='1')
+    order_price = f"{price * 0.9:.2f}" # Bem abaixo do book: repousa, não executa
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="obi-latency-") as workdir:
+            for case in cases:
+                out = os.path.join(workdir, f"{case}.json")
+                log = os.path.join(workdir, f"{case}.log")
+                argv = [sys.executable, os.path.abspath(__file__), '--worker', case, '--url', sim.url,
+                        '--symbol', symbol, '--order-price', order_price, '--qty', '0.1', '--capital', str(capital),
+                        '--runs', str(runs), '--warmup', str(warmup), '--out', out]
+                with open(log, 'w') as log_file:
+                    code = subprocess.call(argv, cwd=workdir, env=env, stdin=subprocess.DEVNULL,
+                                           stdout=log_file, stderr=subprocess.STDOUT)
+                if code != 0 or not os.path.exists(out):
+                    results[case] = {'error': f"worker saiu com {code}", 'log': _tail(log)}
+                    continue
+                with open(out) as f:
+                    samples = json.load(f)['samples']
+                results[case] = {
+                    'runs': len(samples),
+                    'requests_per_call': round(sum(s['requests'] for s in samples) / len(samples), 2),
+                    'errors': sum(s['errors'] for s in samples),
+                    'phases': summarize(samples),
+                }
+    finally:
+        sim.stop()
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, slack_ms=0.5):
+    """Regressões do custo do cliente (p50/p99 de `client`) contra um resultado salvo."""
+    regressions = []
+    for case, row in results.items():
+        base = baseline.get('cases', {}).get(case)
+        if 'phases' not in row or not base or 'phases' not in base:
+            continue
+        for stat in ('p50', 'p99'):
+            now, before = row['phases']['client'][stat], base['phases']['client'][stat]
+            if now > before * (1 + tolerance) + slack_ms:
+                regressions.append((case, stat, before, now))
+    return regressions
+
+
+def print_report(report):
+    config = report['config']
+    print(f"\n LATENCY BENCH ({config['runs']} execuções por caminho, latência injetada "
+          f"{config['latency_ms']:.1f} ± {config['jitter_ms']:.1f} ms)")
+    print("-" * 86)
+    print(f"{'CAMINHO':<22} | {'FASE':<9} | {'p50':>8} | {'p90':>8} | {'p99':>8} | {'max':>8} | {'média':>8}")
+    print("-" * 86)
+    for case, row in report['cases'].items():
+        if 'phases' not in row:
+            print(f"{case:<22} |  FALHOU: {row['error']}")
+            for line in row['log'].splitlines():
+                print(f"{'':<22} |   {line}")
+            continue
+        for i, phase in enumerate(PHASES):
+            stats = row['phases'][phase]
+            label = case if i == 0 else (f"  {row['requests_per_call']:g} req/chamada" if i == 1 else "")
+            print(f"{label:<22} | {phase:<9} | " + " | ".join(f"{stats[k]:>8.3f}" for k in
+                                                            ('p50', 'p90', 'p99', 'max', 'mean')))
+        if row['errors']:
+            print(f"{'':<22} | ️ {row['errors']} respostas com erro (veja o simulador)")
+        print("-" * 86)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latência dos caminhos de ordem contra o simulador local")
+    parser.add_argument('cases', nargs='*', help=f"Caminhos a medir (padrão: todos): {', '.join(CASES)}")
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10, help="Execuções descartadas (conexão, imports, caches)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="RTT injetado no simulador")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Variação uniforme (±) sobre --latency-ms")
+    parser.add_argument('--symbol', default="SOL_USDC_PERP")
+    parser.add_argument('--price', type=float, default=150.0, help="Mid do mercado sintético")
+    parser.add_argument('--capital', type=float, default=100.0, help="Capital do ataque do WeaverGrid")
+    parser.add_argument('--json', action='store_true', help="Resultado em JSON no stdout")
+    parser.add_argument('--save', help="Grava o resultado (referência para --baseline)")
+    parser.add_argument('--baseline', help="Resultado salvo: exit 1 se o p50/p99 do cliente piorou")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Piora relativa aceita (0.25 = 25%%)")
+    parser.add_argument('--slack-ms', type=float, default=0.5, help="Piora absoluta aceita além da relativa")
+    # Uso interno: um caminho por processo
+    parser.add_argument('--worker', choices=list(CASES), help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    parser.add_argument('--order-price', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--qty', type=float, default=0.1, help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return run_worker(args)
+
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        parser.error(f"caminho desconhecido: {', '.join(unknown)} (disponíveis: {', '.join(CASES)})")
+    cases = args.cases or list(CASES)
+    report = {
+        'config': {'runs': args.runs, 'warmup': args.warmup, 'latency_ms': args.latency_ms,
+                   'jitter_ms': args.jitter_ms, 'symbol': args.symbol, 'ts': time.time()},
+        'cases': bench(cases, args.runs, args.warmup, args.latency_ms, args.jitter_ms, args.symbol, args.price,
+                       args.capital),
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    failed = [case for case, row in report['cases'].items() if 'phases' not in row]
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report['cases'], json.load(f), args.tolerance, args.slack_ms)
+        for case, stat, before, now in regressions:
+            print(f" REGRESSÃO {case}: client {stat} {before:.3f} -> {now:.3f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
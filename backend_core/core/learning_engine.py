@@ -1,17 +1,89 @@
 import json
 import os
-import pandas as pd
+import math
 import time
+import threading
+from bisect import bisect_right
+try:
+    from .config_channel import ConfigChannel
+except ImportError:
+    from config_channel import ConfigChannel
+
+# (nome, campo do contexto da Black Box, usa |valor|, limites dos bins do histograma)
+FEATURES = (
+    ("spread", "spread", False, (0.0002, 0.0005, 0.001, 0.0015, 0.002, 0.005)),
+    ("obi", "obi", True, (0.05, 0.10, 0.15, 0.20, 0.30, 0.50)),
+    ("funding_rate", "funding_rate", True, (0.0001, 0.0002, 0.0004, 0.0008, 0.002)),
+)
+
+
+class RunningStats:
+    """Média/variância (Welford) e EWMA de uma feature, atualizadas um valor por vez."""
+    __slots__ = ('alpha', 'count', 'mean', 'm2', 'ewma')
+
+    def __init__(self, alpha=0.1, count=0, mean=0.0, m2=0.0, ewma=None):
+        self.alpha = alpha
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.ewma = ewma
+
+    def push(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.ewma = value if self.ewma is None else self.ewma + self.alpha * (value - self.ewma)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'ewma': self.ewma}
+
+
+class LossHistogram:
+    """Trades e perdas por faixa de valor da feature (bin i = valores até edges[i])."""
+    __slots__ = ('edges', 'trades', 'losses')
+
+    def __init__(self, edges, trades=None, losses=None):
+        self.edges = tuple(edges)
+        self.trades = list(trades or [0] * (len(self.edges) + 1))
+        self.losses = list(losses or [0] * (len(self.edges) + 1))
+
+    def push(self, value, is_loss):
+        i = bisect_right(self.edges, value)
+        self.trades[i] += 1
+        if is_loss:
+            self.losses[i] += 1
+
+    def loss_rate(self):
+        return [l / t if t else None for l, t in zip(self.losses, self.trades)]
+
+    def to_dict(self):
+        return {'trades': self.trades, 'losses': self.losses}
+
 
 class LearningEngine:
     """
      LEARNING ENGINE (Protocolo Chimera)
     Analisa erros passados e ajusta os pesos de risco dinamicamente.
+    Aprendizado incremental: cada trade fechado atualiza as estatísticas (Welford/EWMA das features
+    nas perdas e histogramas de perda por faixa), persistidas em state_file; o histórico não é
+    reprocessado. Novos parâmetros saem pelo ConfigChannel com número de versão.
     """
-    def __init__(self, memory_file="trade_memory.json", config_file="risk_config.json"):
+    def __init__(self, memory_file="trade_memory.json", config_file="risk_config.json",
+                 state_file="learning_state.json", alpha=0.1):
         self.memory_file = memory_file
         self.config_file = config_file
-        
+        self.state_file = state_file
+        self.alpha = alpha
+
         # Configuração Padrão (Base)
         self.default_config = {
             "min_volume_usd": 10_000_000,
@@ -20,96 +92,234 @@ class LearningEngine:
             "max_funding_rate": 0.0004,  # 0.04%
             "ema_tolerance_pct": 0.001   # 0.1% tolerância contra tendência (se aplicável)
         }
-        
+
         self._ensure_config_exists()
+        self.channel = ConfigChannel.shared(config_file, defaults=self.default_config)
+        self.lock = threading.RLock()
+        self._load_state()
+        self.catch_up()
 
     def _ensure_config_exists(self):
         if not os.path.exists(self.config_file):
             with open(self.config_file, 'w') as f:
                 json.dump(self.default_config, f, indent=4)
 
+    # --- ESTATÍSTICAS INCREMENTAIS ---
+
+    def _reset_stats(self):
+        self.trades = 0
+        self.losses = 0
+        self.new_losses = 0 # Perdas absorvidas desde a última calibração
+        self.seen = set()
+        self.memory_mtime = None
+        self.loss_stats = {name: RunningStats(self.alpha) for name, *_ in FEATURES}
+        self.histograms = {name: LossHistogram(edges) for name, _, _, edges in FEATURES}
+
+    def _load_state(self):
+        self._reset_stats()
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.trades = state.get('trades', 0)
+        self.losses = state.get('losses', 0)
+        self.new_losses = state.get('new_losses', 0)
+        self.seen = set(state.get('seen', []))
+        self.memory_mtime = state.get('memory_mtime')
+        for name, _, _, edges in FEATURES:
+            if name in state.get('loss_stats', {}):
+                self.loss_stats[name] = RunningStats(self.alpha, **state['loss_stats'][name])
+            hist = state.get('histograms', {}).get(name)
+            if hist and len(hist['trades']) == len(edges) + 1:
+                self.histograms[name] = LossHistogram(edges, hist['trades'], hist['losses'])
+
+    def _save_state(self):
+        state = {
+            'trades': self.trades,
+            'losses': self.losses,
+            'new_losses': self.new_losses,
+            'seen': sorted(self.seen, key=str),
+            'memory_mtime': self.memory_mtime,
+            'loss_stats': {name: stats.to_dict() for name, stats in self.loss_stats.items()},
+            'histograms': {name: hist.to_dict() for name, hist in self.histograms.items()},
+        }
+        try:
+            tmp = f"{self.state_file}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            print(f"   ️ Erro ao salvar estado do Learning Engine: {e}")
+
+    def _absorb(self, trade):
+        """Um trade fechado nas estatísticas. False se já visto ou ainda sem resultado."""
+        result = trade.get('result') or {}
+        try:
+            pnl = float(result.get('pnl_percent'))
+        except (TypeError, ValueError):
+            return False
+        trade_id = trade.get('id')
+        if math.isnan(pnl) or trade_id in self.seen:
+            return False
+        self.seen.add(trade_id)
+
+        is_loss = pnl < 0
+        context = trade.get('context') or {}
+        for name, field, absolute, _ in FEATURES:
+            try:
+                value = float(context[field])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if math.isnan(value):
+                continue
+            if absolute:
+                value = abs(value)
+            self.histograms[name].push(value, is_loss)
+            if is_loss:
+                self.loss_stats[name].push(value)
+        self.trades += 1
+        if is_loss:
+            self.losses += 1
+            self.new_losses += 1
+        return True
+
+    def observe(self, trade):
+        """
+        Callback de trade fechado (BlackBox.subscribe). Atualiza as estatísticas em O(features).
+        Retorna True se o trade era novo.
+        """
+        with self.lock:
+            absorbed = self._absorb(trade)
+            if absorbed:
+                self._save_state()
+            return absorbed
+
+    def catch_up(self):
+        """
+        Absorve trades fechados gravados por outros processos. Só relê a memória quando o arquivo
+        mudou; ids que saíram da memória (janela de 1000 trades) deixam de ser rastreados.
+        """
+        try:
+            mtime = os.path.getmtime(self.memory_file)
+        except OSError:
+            return 0
+        with self.lock:
+            if mtime == self.memory_mtime:
+                return 0
+            try:
+                with open(self.memory_file, 'r') as f:
+                    history = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"   ️ Erro ao ler memória do Learning Engine: {e}")
+                return 0
+            absorbed = sum(self._absorb(trade) for trade in history or [])
+            self.seen &= {trade.get('id') for trade in history or []}
+            self.memory_mtime = mtime
+            self._save_state()
+            return absorbed
+
+    def report(self):
+        """Estatísticas correntes por feature (dashboard / diagnóstico)."""
+        with self.lock:
+            return {
+                'trades': self.trades,
+                'losses': self.losses,
+                'config_version': self.channel.version,
+                'features': {
+                    name: {
+                        'loss_mean': self.loss_stats[name].mean if self.loss_stats[name].count else None,
+                        'loss_std': self.loss_stats[name].std,
+                        'loss_ewma': self.loss_stats[name].ewma,
+                        'loss_count': self.loss_stats[name].count,
+                        'bins': list(edges),
+                        'loss_rate': self.histograms[name].loss_rate(),
+                    }
+                    for name, _, _, edges in FEATURES
+                },
+            }
+
+    # --- CALIBRAÇÃO ---
+
     def evolve(self):
         """
         Executa o ciclo de aprendizado (Reinforcement Learning Simplificado).
+        Decide sobre as estatísticas acumuladas; só recalibra quando chegaram perdas novas.
         """
-        if not os.path.exists(self.memory_file):
-            return
-
         try:
-            with open(self.memory_file, 'r') as f:
-                history = json.load(f)
-            
-            if not history: return
-            
-            df = pd.json_normalize(history)
-            
-            # Verificar se temos trades fechados com resultado
-            if 'result.pnl_percent' not in df.columns:
-                return
-
-            # Filtrar PERDAS (PnL < 0)
-            losses = df[df['result.pnl_percent'] < 0]
-            
-            if losses.empty:
-                print("    [LEARNING] Sem perdas recentes para analisar. Mantendo parâmetros.")
-                return
-            
-            print(f"    [LEARNING] Analisando {len(losses)} perdas para calibração...")
-            
-            current_config = self._load_config()
-            new_config = current_config.copy()
-            
-            # --- ANÁLISE DE CAUSALIDADE (CORRELAÇÃO DE FALHAS) ---
-            
-            # 1. Hipótese: Spread Alto causou a perda?
-            # Se média do spread nas perdas > spread atual configurado * 0.8 (perto do limite)
-            if 'context.spread' in losses.columns:
-                avg_loss_spread = losses['context.spread'].mean()
-                if avg_loss_spread > current_config['max_spread_pct'] * 0.8:
-                    print(f"    Padrão Detectado: Spread médio nas perdas ({avg_loss_spread*100:.3f}%) está alto.")
-                    # Ação: Apertar o cinto (Reduzir spread máximo permitido)
-                    new_config['max_spread_pct'] = max(0.0005, current_config['max_spread_pct'] * 0.9)
-                    print(f"    Ajuste: Max Spread reduzido para {new_config['max_spread_pct']*100:.3f}%")
-
-            # 2. Hipótese: OBI Fraco?
-            if 'context.obi' in losses.columns:
-                # OBI nas perdas (absoluto)
-                avg_loss_obi = losses['context.obi'].abs().mean()
-                if avg_loss_obi < current_config['min_obi'] * 1.2: # Se perdemos mesmo com OBI "bom", talvez precise ser MELHOR
-                    print(f"    Padrão Detectado: OBI nas perdas ({avg_loss_obi:.2f}) pode ser insuficiente.")
-                    new_config['min_obi'] = min(0.3, current_config['min_obi'] * 1.1)
-                    print(f"    Ajuste: Min OBI aumentado para {new_config['min_obi']:.2f}")
-
-            # 3. Hipótese: Funding Rate (Taxas comeram o lucro ou contra-fluxo)
-            if 'context.funding_rate' in losses.columns:
-                # Se Long e Funding Positivo -> Pagou taxa
-                # Se Short e Funding Negativo -> Pagou taxa
-                # Simplificação: Verificar magnitude do funding nas perdas
-                avg_loss_funding = losses['context.funding_rate'].abs().mean()
-                if avg_loss_funding > current_config['max_funding_rate'] * 0.8:
-                    print(f"    Padrão Detectado: Funding Rate alto nas perdas.")
-                    new_config['max_funding_rate'] = max(0.0001, current_config['max_funding_rate'] * 0.9)
-                    print(f"    Ajuste: Max Funding reduzido para {new_config['max_funding_rate']*100:.4f}%")
-
-            # Salvar nova configuração se houve mudança
-            if new_config != current_config:
-                with open(self.config_file, 'w') as f:
-                    json.dump(new_config, f, indent=4)
-                print("    [EVOLUTION] Parâmetros de Risco Recalibrados com Sucesso.")
-            else:
-                print("    [LEARNING] Nenhuma correlação óbvia encontrada. Parâmetros mantidos.")
+            self.catch_up()
+            with self.lock:
+                if not self.trades:
+                    return
+
+                if not self.losses:
+                    print("    [LEARNING] Sem perdas recentes para analisar. Mantendo parâmetros.")
+                    return
+
+                if not self.new_losses:
+                    print("    [LEARNING] Nenhuma perda nova desde a última calibração. Mantendo parâmetros.")
+                    return
+
+                print(f"    [LEARNING] Analisando {self.losses} perdas para calibração ({self.new_losses} novas)...")
+
+                current_config = self._load_config()
+                new_config = current_config.copy()
+                get = lambda key: current_config.get(key, self.default_config[key])
+
+                # --- ANÁLISE DE CAUSALIDADE (CORRELAÇÃO DE FALHAS) ---
+
+                # 1. Hipótese: Spread Alto causou a perda?
+                # Se média do spread nas perdas > spread atual configurado * 0.8 (perto do limite)
+                spread = self.loss_stats['spread']
+                if spread.count:
+                    avg_loss_spread = spread.mean
+                    if avg_loss_spread > get('max_spread_pct') * 0.8:
+                        print(f"    Padrão Detectado: Spread médio nas perdas ({avg_loss_spread*100:.3f}%) está alto.")
+                        # Ação: Apertar o cinto (Reduzir spread máximo permitido)
+                        new_config['max_spread_pct'] = max(0.0005, get('max_spread_pct') * 0.9)
+                        print(f"    Ajuste: Max Spread reduzido para {new_config['max_spread_pct']*100:.3f}%")
+
+                # 2. Hipótese: OBI Fraco?
+                obi = self.loss_stats['obi']
+                if obi.count:
+                    # OBI nas perdas (absoluto)
+                    avg_loss_obi = obi.mean
+                    if avg_loss_obi < get('min_obi') * 1.2: # Se perdemos mesmo com OBI "bom", talvez precise ser MELHOR
+                        print(f"    Padrão Detectado: OBI nas perdas ({avg_loss_obi:.2f}) pode ser insuficiente.")
+                        new_config['min_obi'] = min(0.3, get('min_obi') * 1.1)
+                        print(f"    Ajuste: Min OBI aumentado para {new_config['min_obi']:.2f}")
+
+                # 3. Hipótese: Funding Rate (Taxas comeram o lucro ou contra-fluxo)
+                funding = self.loss_stats['funding_rate']
+                if funding.count:
+                    # Simplificação: Verificar magnitude do funding nas perdas
+                    avg_loss_funding = funding.mean
+                    if avg_loss_funding > get('max_funding_rate') * 0.8:
+                        print(f"    Padrão Detectado: Funding Rate alto nas perdas.")
+                        new_config['max_funding_rate'] = max(0.0001, get('max_funding_rate') * 0.9)
+                        print(f"    Ajuste: Max Funding reduzido para {new_config['max_funding_rate']*100:.4f}%")
+
+                self.new_losses = 0
+                self._save_state()
+
+                # Publicar nova configuração se houve mudança (gatekeepers recarregam pela versão)
+                if new_config != current_config:
+                    version = self.channel.publish(new_config)
+                    print(f"    [EVOLUTION] Parâmetros de Risco Recalibrados com Sucesso (config v{version}).")
+                else:
+                    print("    [LEARNING] Nenhuma correlação óbvia encontrada. Parâmetros mantidos.")
 
         except Exception as e:
             print(f"   ️ Erro no Learning Engine: {e}")
 
     def _load_config(self):
         try:
-            with open(self.config_file, 'r') as f:
-                return json.load(f)
-        except:
+            return dict(self.channel.snapshot()[1])
+        except Exception:
             return self.default_config
 
 if __name__ == "__main__":
     # Teste Manual
     engine = LearningEngine()
     engine.evolve()
+    print(json.dumps(engine.report(), indent=4))
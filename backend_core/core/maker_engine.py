@@ -0,0 +1,318 @@
+import os
+import math
+import time
+import json
+import asyncio
+import logging
+from functools import partial
+
+try:
+    from .precision_guardian import PrecisionGuardian
+except ImportError:
+    from precision_guardian import PrecisionGuardian
+
+WS_URL = os.getenv("BACKPACK_WS_URL", "wss://ws.backpack.exchange") # Simulador local: core/exchange_simulator.py
+
+
+def maker_price(side, best_bid, best_ask, tick, aggression=0.0):
+    """
+    Preço passivo alinhado ao tick: BestBid + Spread * aggression (Buy) / BestAsk - Spread * aggression (Sell),
+    nunca cruzando o spread (teto BestAsk - tick / piso BestBid + tick).
+    """
+    spread = best_ask - best_bid
+    if side in ("Buy", "Bid"):
+        price = math.floor((best_bid + spread * aggression) / tick + 1e-9) * tick
+        return min(price, best_ask - tick)
+    price = math.ceil((best_ask - spread * aggression) / tick - 1e-9) * tick
+    return max(price, best_bid + tick)
+
+
+def top_of_book(depth):
+    """Melhor bid/ask de um snapshot REST independente da ordenação devolvida pela API."""
+    if not depth or not depth.get('bids') or not depth.get('asks'):
+        return None, None
+    return max(float(b[0]) for b in depth['bids']), min(float(a[0]) for a in depth['asks'])
+
+
+class _Chase:
+    def __init__(self, symbol, side, quantity, tick, aggression):
+        self.symbol = symbol
+        self.side = "Bid" if side in ("Buy", "Bid") else "Ask"
+        self.quantity = float(quantity)
+        self.tick = tick
+        self.aggression = aggression
+        self.bid = None
+        self.ask = None
+        self.book_changed = asyncio.Event()
+        self.done = asyncio.Event()
+        self.order_id = None
+        self.order_price = None
+        self.order_quantity = 0.0
+        self.order_executed = 0.0   # Executado na ordem viva
+        self.filled = 0.0           # Executado nas ordens já encerradas
+        self.notional = 0.0
+        self.orders = []
+        self.replaces = 0
+        self.rejects = 0
+        self.api_calls = 0
+        self.private_stream = False
+        self.last_replace = 0.0
+
+    @property
+    def total_filled(self):
+        return self.filled + self.order_executed
+
+    @property
+    def remaining(self):
+        return max(0.0, self.quantity - self.total_filled)
+
+
+class MakerChaseEngine:
+    """
+     MAKER CHASE ENGINE (Event-Driven)
+    Executa uma ordem Limit PostOnly perseguindo o topo do book:
+    - Reage ao stream bookTicker (fallback: polling REST do depth).
+    - Só reprecifica quando a ordem viva não está mais no preço desejado (alinhado ao tickSize do PrecisionGuardian).
+    - Cancel/replace limitado a max_replaces_per_sec.
+    - Resolve no evento de fill (stream privado account.orderUpdate; fallback: consulta da ordem).
+      Cancel que perde a corrida para o fill (cancel falha, consulta 404) é resolvido pelo histórico de fills.
+    """
+    def __init__(self, transport, guardian=None, max_replaces_per_sec=2.0, poll_interval=0.25,
+                 fill_poll_interval=1.0, use_ws=True, logger=None):
+        self.transport = transport
+        self.guardian = guardian or PrecisionGuardian(transport)
+        self.min_replace_interval = 1.0 / max_replaces_per_sec
+        self.poll_interval = poll_interval
+        self.fill_poll_interval = fill_poll_interval
+        self.use_ws = use_ws
+        self.logger = logger or logging.getLogger("MakerChase")
+
+    async def chase(self, symbol, side, quantity, aggression=0.0, timeout=30.0, reduce_only=False):
+        """
+        Persegue o fill de `quantity` como Maker. Retorna relatório:
+        {status: filled|partial|timeout, filled_qty, avg_price, orders, replaces, api_calls, time_to_fill_ms}
+        """
+        tick = self.guardian.tick_size(symbol)
+        chase = _Chase(symbol, side, quantity, tick, aggression)
+        started = time.perf_counter()
+
+        bid, ask = top_of_book(await self._call(chase, self.transport.get_orderbook_depth, symbol))
+        if bid is not None:
+            chase.bid, chase.ask = bid, ask
+            chase.book_changed.set()
+
+        feeds = [asyncio.create_task(self._book_feed(chase)), asyncio.create_task(self._fill_poller(chase))]
+        deadline = time.monotonic() + timeout
+        try:
+            while not chase.done.is_set():
+                remaining_time = deadline - time.monotonic()
+                if remaining_time <= 0:
+                    break
+                wait = remaining_time
+                if chase.order_id and chase.last_replace:
+                    # Acorda quando a janela de rate limit abrir para aplicar o último topo
+                    wait = min(wait, max(0.0, chase.last_replace + self.min_replace_interval - time.monotonic()) or wait)
+                try:
+                    await asyncio.wait_for(chase.book_changed.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                chase.book_changed.clear()
+                if chase.done.is_set() or chase.bid is None:
+                    continue
+                await self._reprice(chase, reduce_only)
+        finally:
+            for task in feeds:
+                task.cancel()
+            if chase.order_id and not chase.done.is_set():
+                await self._cancel_live(chase)
+
+        filled = chase.total_filled
+        status = "filled" if chase.remaining <= chase.quantity * 1e-9 else ("partial" if filled > 0 else "timeout")
+        report = {
+            'symbol': symbol,
+            'side': chase.side,
+            'status': status,
+            'filled_qty': filled,
+            'avg_price': chase.notional / filled if filled else None,
+            'orders': len(chase.orders),
+            'replaces': chase.replaces,
+            'rejects': chase.rejects,
+            'api_calls': chase.api_calls,
+            'time_to_fill_ms': (time.perf_counter() - started) * 1000,
+        }
+        self.logger.info(
+            f" {symbol} {chase.side} {status.upper()}: {filled}/{chase.quantity} @ {report['avg_price']} "
+            f"({report['time_to_fill_ms']:.0f}ms, {chase.replaces} replaces, {chase.api_calls} chamadas)"
+        )
+        return report
+
+    # --- EXECUÇÃO ---
+
+    async def _call(self, chase, fn, *args):
+        chase.api_calls += 1
+        return await asyncio.to_thread(fn, *args)
+
+    async def _reprice(self, chase, reduce_only):
+        desired = maker_price(chase.side, chase.bid, chase.ask, chase.tick, chase.aggression)
+        if chase.order_id:
+            if abs(desired - chase.order_price) < chase.tick / 2:
+                return # Ainda no nível desejado: não mexe (preserva fila)
+            if time.monotonic() - chase.last_replace < self.min_replace_interval:
+                return # Rate limit: o próximo wake aplica o topo mais recente
+            if not await self._cancel_live(chase):
+                return
+            chase.replaces += 1
+            if chase.done.is_set():
+                return
+        await self._place(chase, desired, reduce_only)
+
+    async def _place(self, chase, price, reduce_only):
+        payload = {
+            "symbol": chase.symbol,
+            "side": chase.side,
+            "orderType": "Limit",
+            "quantity": self.guardian.format_quantity(chase.symbol, chase.remaining),
+            "price": self.guardian.format_price(chase.symbol, price),
+            "timeInForce": "GTC",
+            "postOnly": True
+        }
+        if float(payload["quantity"]) <= 0:
+            chase.done.set() # Resto abaixo do stepSize
+            return
+        if reduce_only:
+            payload["reduceOnly"] = True
+
+        res = await self._call(chase, self.transport._send_request, "POST", "/api/v1/order", "orderExecute", payload)
+        chase.last_replace = time.monotonic()
+        if res and 'id' in res:
+            chase.order_id = res['id']
+            chase.order_price = float(payload["price"])
+            chase.order_quantity = float(payload["quantity"])
+            chase.order_executed = 0.0
+            chase.orders.append(res['id'])
+            self._apply_status(chase, res)
+        else:
+            # PostOnly rejeitado (book andou entre o evento e o envio): espera o próximo topo
+            chase.rejects += 1
+
+    async def _cancel_live(self, chase):
+        """Cancela a ordem viva e contabiliza o executado informado pelo cancelamento."""
+        order_id = chase.order_id
+        res = await self._call(chase, self.transport.cancel_order, chase.symbol, order_id)
+        if res is None:
+            # Falha no cancel: a ordem pode ter sido executada. Confirma pelo status.
+            res = await self._query_order(chase, order_id)
+            if res is None:
+                # Fora do livro (a consulta dá 404): credita pelos fills da ordem.
+                # Parcial também fecha a ordem: o restante é recotado no próximo ciclo.
+                res = await self._fills_for_order(chase, order_id)
+                if res is None:
+                    return False
+        if chase.order_id == order_id:
+            self._apply_status(chase, res)
+            self._close_order(chase)
+        return True
+
+    def _close_order(self, chase):
+        chase.filled += chase.order_executed
+        chase.order_executed = 0.0
+        chase.order_id = None
+        chase.order_price = None
+        if chase.remaining <= chase.quantity * 1e-9:
+            chase.done.set()
+
+    def _apply_status(self, chase, order):
+        """Atualiza o executado da ordem viva (fills Maker saem no preço da ordem)."""
+        executed = float(order.get('executedQuantity', order.get('z', 0)) or 0)
+        delta = executed - chase.order_executed
+        if delta > 0:
+            chase.notional += delta * chase.order_price
+            chase.order_executed = executed
+        status = order.get('status', order.get('X'))
+        if status == 'Filled' or chase.remaining <= chase.quantity * 1e-9:
+            self._close_order(chase)
+        elif status in ('Cancelled', 'Expired') and chase.order_id == order.get('id', order.get('i')):
+            self._close_order(chase)
+            chase.book_changed.set() # Recoloca no próximo ciclo
+
+    async def _fills_for_order(self, chase, order_id):
+        """Executado de uma ordem pelo histórico de fills (orderId). None sem fills ou sem histórico."""
+        get_fills = getattr(self.transport, 'get_fill_history', None)
+        if get_fills is None:
+            return None
+        fills = await self._call(chase, partial(get_fills, limit=100, symbol=chase.symbol))
+        if not isinstance(fills, list):
+            return None
+        executed = sum(float(f.get('quantity', 0) or 0) for f in fills if str(f.get('orderId')) == str(order_id))
+        if executed <= 0:
+            return None
+        filled = executed >= chase.order_quantity * (1 - 1e-9)
+        return {'id': order_id, 'executedQuantity': executed, 'status': 'Filled' if filled else 'PartiallyFilled'}
+
+    async def _query_order(self, chase, order_id):
+        params = {"symbol": chase.symbol, "orderId": order_id}
+        endpoint = f"/api/v1/order?symbol={chase.symbol}&orderId={order_id}"
+        return await self._call(chase, self.transport._send_request, "GET", endpoint, "orderQuery", params)
+
+    # --- FEEDS ---
+
+    def _on_message(self, chase, msg):
+        stream = msg.get("stream", "")
+        data = msg.get("data") or {}
+        if stream.startswith("bookTicker."):
+            bid, ask = float(data.get('b', 0) or 0), float(data.get('a', 0) or 0)
+            if bid and ask and (bid != chase.bid or ask != chase.ask):
+                chase.bid, chase.ask = bid, ask
+                chase.book_changed.set()
+        elif stream.startswith("account.orderUpdate") and data.get('i') == chase.order_id:
+            self._apply_status(chase, data)
+
+    async def _book_feed(self, chase):
+        websockets = None
+        if self.use_ws:
+            try:
+                import websockets
+            except ImportError:
+                self.logger.warning("️ websockets não instalado. Usando polling REST do book.")
+
+        if websockets is None:
+            while not chase.done.is_set():
+                await asyncio.sleep(self.poll_interval)
+                bid, ask = top_of_book(await self._call(chase, self.transport.get_orderbook_depth, chase.symbol))
+                if bid is not None and (bid != chase.bid or ask != chase.ask):
+                    chase.bid, chase.ask = bid, ask
+                    chase.book_changed.set()
+            return
+
+        while not chase.done.is_set():
+            try:
+                async with websockets.connect(WS_URL, ping_interval=20) as ws:
+                    await ws.send(json.dumps({"method": "SUBSCRIBE", "params": [f"bookTicker.{chase.symbol}"]}))
+                    auth = getattr(self.transport, 'auth', None)
+                    if auth:
+                        headers = auth.get_headers("subscribe")
+                        await ws.send(json.dumps({
+                            "method": "SUBSCRIBE",
+                            "params": [f"account.orderUpdate.{chase.symbol}"],
+                            "signature": [headers["X-API-Key"], headers["X-Signature"], headers["X-Timestamp"], headers["X-Window"]],
+                        }))
+                        chase.private_stream = True
+                    async for raw in ws:
+                        self._on_message(chase, json.loads(raw))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                chase.private_stream = False
+                self.logger.warning(f"️ Stream {chase.symbol} caiu ({e}). Reconectando...")
+                await asyncio.sleep(1)
+
+    async def _fill_poller(self, chase):
+        """Sem stream privado, confirma fills consultando a ordem viva (no máximo 1x por fill_poll_interval)."""
+        while not chase.done.is_set():
+            await asyncio.sleep(self.fill_poll_interval)
+            if chase.private_stream or not chase.order_id:
+                continue
+            order_id = chase.order_id
+            res = await self._query_order(chase, order_id)
+            if res and chase.order_id == order_id:
+                self._apply_status(chase, res)
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import logging
+import threading
+import requests
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+
+MARKETS_URL = os.getenv("BACKPACK_API_URL", "https://api.backpack.exchange") + "/api/v1/markets"
+# Relativo ao backend_core, não ao CWD: um cache (e uma thread de refresh) por máquina, não por diretório
+MARKETS_CACHE = os.getenv("OBI_MARKETS_CACHE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "markets.json"))
+
+
+def _decimal(value):
+    # round(…, 12) descarta ruído de float (0.8999999999999999 -> 0.9) antes de alinhar ao passo
+    return Decimal(repr(round(float(value), 12)))
+
+
+class Quantizer:
+    """
+    Arredondamento pré-compilado de um mercado (Decimal, sem log10/format a cada chamada).
+    price(): tick mais próximo. qty(): floor no stepSize (nunca excede o saldo).
+    """
+    __slots__ = ("symbol", "tick", "step", "min_qty", "min_notional", "_tick_exp", "_step_exp")
+
+    def __init__(self, symbol, tick_size, step_size, min_qty=0.0, min_notional=0.0):
+        self.symbol = symbol
+        self.tick = Decimal(str(tick_size)).normalize()
+        self.step = Decimal(str(step_size)).normalize()
+        self.min_qty = float(min_qty or 0)
+        self.min_notional = float(min_notional or 0)
+        # Casas decimais do passo (tick 0.05 -> 0.01; tick 10 -> 1)
+        self._tick_exp = Decimal(1).scaleb(min(0, self.tick.as_tuple().exponent))
+        self._step_exp = Decimal(1).scaleb(min(0, self.step.as_tuple().exponent))
+
+    def _align(self, value, unit, exp, rounding):
+        return ((_decimal(value) / unit).to_integral_value(rounding) * unit).quantize(exp)
+
+    def price(self, price, rounding=ROUND_HALF_UP):
+        """Preço alinhado ao tickSize, como string para o payload."""
+        return str(self._align(price, self.tick, self._tick_exp, rounding))
+
+    def qty(self, quantity):
+        """Quantidade com floor no stepSize, como string para o payload."""
+        return str(self._align(quantity, self.step, self._step_exp, ROUND_DOWN))
+
+    def round_price(self, price, rounding=ROUND_HALF_UP):
+        return float(self._align(price, self.tick, self._tick_exp, rounding))
+
+    def floor_qty(self, quantity):
+        return float(self._align(quantity, self.step, self._step_exp, ROUND_DOWN))
+
+    @property
+    def tick_size(self):
+        return float(self.tick)
+
+    @property
+    def step_size(self):
+        return float(self.step)
+
+    def filters(self):
+        return {'tickSize': float(self.tick), 'stepSize': float(self.step),
+                'minQuantity': self.min_qty, 'minNotional': self.min_notional}
+
+
+def heuristic_filters(symbol):
+    """(tickSize, stepSize) quando o mercado não está no registro (mesmas heurísticas de antes)."""
+    if "BTC" in symbol:
+        return 0.1, 0.001
+    if "ETH" in symbol:
+        return 0.01, 0.01
+    if "SOL" in symbol:
+        return 0.01, 0.1 # SOL geralmente aceita 0.1 ou 0.01, ser conservador.
+    if "HYPE" in symbol:
+        return 0.001, 1.0
+    if "SHIB" in symbol or "BONK" in symbol:
+        return 0.000001, 1000.0
+    return 0.0001, 1.0 # Genérico para Alts
+
+
+class MarketRegistry:
+    """
+     MARKET REGISTRY (Filtros de Todos os Mercados)
+    Uma instância por processo (shared()): /api/v1/markets é baixado uma vez,
+    persistido em backend_core/data/markets.json (OBI_MARKETS_CACHE) e recarregado do disco enquanto estiver dentro do TTL.
+    - quantizer(symbol) responde da memória: nenhuma chamada de rede no caminho da ordem.
+    - TTL vencido ou símbolo desconhecido -> refresh em background (o chamador não espera);
+      enquanto isso, o símbolo desconhecido usa os filtros heurísticos.
+    """
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path=MARKETS_CACHE, ttl=6 * 3600, url=MARKETS_URL, logger=None):
+        self.path = path
+        self.ttl = ttl
+        self.url = url
+        self.logger = logger or logging.getLogger("MarketRegistry")
+        self.quantizers = {}
+        self.fallbacks = {}
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+        self.refreshing = False
+        self.last_attempt = 0.0
+        if not self._load_disk():
+            self.refresh() # Primeira execução: única carga síncrona (startup, fora do caminho da ordem)
+
+    @classmethod
+    def shared(cls, path=MARKETS_CACHE, **kwargs):
+        key = (os.getpid(), os.path.abspath(path))
+        with cls._shared_lock:
+            registry = cls._shared.get(key)
+            if registry is None:
+                registry = cls._shared[key] = cls(path, **kwargs)
+            return registry
+
+    # --- CARGA ---
+
+    @staticmethod
+    def parse(markets):
+        """Lista de /api/v1/markets -> {symbol: Quantizer}. Aceita os formatos novo e antigo de filtros."""
+        result = {}
+        for m in markets or []:
+            symbol = m.get('symbol')
+            if not symbol:
+                continue
+            filters = m.get('filters') or {}
+            price = filters.get('price') or filters.get('priceFilter') or {}
+            quantity = filters.get('quantity') or filters.get('quantityFilter') or {}
+            try:
+                result[symbol] = Quantizer(
+                    symbol,
+                    filters.get('tickSize') or price.get('tickSize') or 0.01,
+                    filters.get('stepSize') or quantity.get('stepSize') or 1.0,
+                    filters.get('minQuantity') or quantity.get('minQuantity') or 0,
+                    filters.get('minNotional') or m.get('minNotional') or 0,
+                )
+            except Exception:
+                continue
+        return result
+
+    def _install(self, markets, loaded_at):
+        quantizers = self.parse(markets)
+        if not quantizers:
+            return False
+        with self.lock:
+            self.quantizers = quantizers
+            self.fallbacks = {s: q for s, q in self.fallbacks.items() if s not in quantizers}
+            self.loaded_at = loaded_at
+        return True
+
+    def _load_disk(self):
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        # Mesmo vencido, o cache serve: quantizer() dispara o refresh em background
+        return self._install(cached.get('markets'), cached.get('fetched_at', 0))
+
+    def refresh(self):
+        """Baixa /api/v1/markets, troca o registro em memória e grava o cache em disco."""
+        self.last_attempt = time.time()
+        try:
+            resp = requests.get(self.url, timeout=10)
+            resp.raise_for_status()
+            markets = resp.json()
+        except Exception as e:
+            self.logger.warning(f"️ Falha ao buscar Markets API: {e}. Usando cache/heurísticas.")
+            return False
+        now = time.time()
+        if not self._install(markets, now):
+            return False
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({'fetched_at': now, 'markets': markets}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self.logger.warning(f"️ Cache de mercados não gravado: {e}")
+        self.logger.info(f"️ Filtros carregados para {len(self.quantizers)} mercados.")
+        return True
+
+    def _refresh_async(self):
+        # No máximo uma tentativa por minuto, sempre fora do caminho da ordem
+        if self.refreshing or time.time() - self.last_attempt < 60:
+            return
+        self.refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self.refreshing = False
+        threading.Thread(target=run, name="MarketRegistry-refresh", daemon=True).start()
+
+    # --- CONSULTA ---
+
+    def quantizer(self, symbol):
+        q = self.quantizers.get(symbol)
+        if time.time() - self.loaded_at > self.ttl:
+            self._refresh_async()
+        if q is not None:
+            return q
+        self._refresh_async()
+        q = self.fallbacks.get(symbol)
+        if q is None:
+            q = self.fallbacks[symbol] = Quantizer(symbol, *heuristic_filters(symbol))
+        return q
+
+    def filters(self, symbol):
+        return self.quantizer(symbol).filters()
+
+    def symbols(self):
+        return list(self.quantizers)
@@ -0,0 +1,210 @@
+import os
+import time
+import threading
+from collections import deque
+
+# Um único arquivo para todos os produtores e o dashboard, independente do CWD de quem sobe o processo
+FEED_PATH = os.getenv("OBI_METRICS_FEED", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "metrics_feed.vsc"))
+
+# Vocabulário padrão de métricas (compartilhado entre agentes e dashboard)
+METRIC_EQUITY = "equity_usd"
+METRIC_PNL = "pnl_usd"
+METRIC_POSITION = "position_notional"
+METRIC_POSITIONS_OPEN = "positions_open"
+METRIC_ORDER_LATENCY = "order_latency_ms"
+METRIC_API_LATENCY = "api_latency_ms"
+METRIC_API_ERROR = "api_error"
+METRIC_SIGNAL = "signal_score"
+METRIC_UNPROTECTED = "unprotected_ms" # Janela sem SL/TP durante substituição de ordem
+
+
+class MetricsFeed:
+    """
+     METRICS FEED (Append-Only VSC)
+    Canal local de métricas publicado pelos agentes (Orchestrator, Volume Farmer, Radar).
+    Formato por linha: TS|SOURCE|METRIC|KEY|VALUE
+
+    publish() apenas enfileira em memória; uma thread daemon grava em lote,
+    então a estratégia nunca bloqueia em I/O de disco.
+    """
+    def __init__(self, source, path=FEED_PATH, flush_interval=0.5, max_buffer=5000):
+        self.source = source
+        self.path = path
+        self.flush_interval = flush_interval
+        self.buffer = deque(maxlen=max_buffer)  # Se o disco travar, descarta as métricas mais antigas
+        self.lock = threading.Lock()
+        self.is_running = True
+        self._open_symbols = set()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._writer = threading.Thread(target=self._flush_loop, name=f"MetricsFeed-{source}", daemon=True)
+        self._writer.start()
+
+    def publish(self, metric, value, key="-"):
+        """Enfileira uma métrica. Nunca lança exceção para o chamador."""
+        try:
+            self.buffer.append(f"{time.time():.3f}|{self.source}|{metric}|{key or '-'}|{float(value):.6g}\n")
+        except (TypeError, ValueError):
+            pass
+
+    def record_request(self, endpoint, latency_ms, ok):
+        """Hook usado pelo BackpackTransport a cada chamada REST."""
+        metric = METRIC_ORDER_LATENCY if endpoint.startswith("/api/v1/order") else METRIC_API_LATENCY
+        self.publish(metric, latency_ms, endpoint)
+        self.publish(METRIC_API_ERROR, 0 if ok else 1, endpoint)
+
+    def publish_positions(self, positions):
+        """Publica notional por símbolo e contagem de posições a partir do payload de /api/v1/position."""
+        open_symbols = set()
+        for pos in positions or []:
+            symbol = pos.get('symbol')
+            if not symbol:
+                continue
+            qty = float(pos.get('netQuantity', pos.get('quantity', 0)) or 0)
+            if qty == 0:
+                continue
+            mark = float(pos.get('markPrice', 0) or 0)
+            self.publish(METRIC_POSITION, qty * mark, symbol)
+            self.publish(METRIC_PNL, float(pos.get('pnlUnrealized', pos.get('unrealizedPnl', 0)) or 0), symbol)
+            open_symbols.add(symbol)
+
+        # Zera posições que fecharam desde o último snapshot (o dashboard guarda o último valor)
+        for symbol in self._open_symbols - open_symbols:
+            self.publish(METRIC_POSITION, 0, symbol)
+            self.publish(METRIC_PNL, 0, symbol)
+        self._open_symbols = open_symbols
+        self.publish(METRIC_POSITIONS_OPEN, len(open_symbols))
+
+    def flush(self):
+        lines = []
+        with self.lock:
+            while self.buffer:
+                lines.append(self.buffer.popleft())
+            if not lines:
+                return
+            try:
+                with open(self.path, "a") as f:
+                    f.write("".join(lines))
+            except OSError:
+                pass
+
+    def close(self):
+        self.is_running = False
+        self._writer.join(timeout=self.flush_interval * 2)
+        self.flush()
+
+    def _flush_loop(self):
+        while self.is_running:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+class MetricsTail:
+    """
+     METRICS TAIL
+    Leitor incremental do feed: guarda o offset em bytes e só lê o que foi anexado
+    desde a última chamada. Linhas incompletas ficam para o próximo poll.
+    """
+    def __init__(self, path=FEED_PATH, from_start=False):
+        self.path = path
+        self.offset = 0
+        if not from_start and os.path.exists(self.path):
+            self.offset = os.path.getsize(self.path)
+
+    def poll(self):
+        """Retorna lista de (ts, source, metric, key, value) novos desde o último poll."""
+        if not os.path.exists(self.path):
+            return []
+
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            # Arquivo truncado/rotacionado: recomeça do início
+            self.offset = 0
+        if size == self.offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return []
+        self.offset += end + 1
+
+        records = []
+        for line in chunk[:end].decode("utf-8", errors="ignore").split("\n"):
+            parts = line.split("|")
+            if len(parts) != 5:
+                continue
+            try:
+                records.append((float(parts[0]), parts[1], parts[2], parts[3], float(parts[4])))
+            except ValueError:
+                continue
+        return records
+
+
+class MetricsBoard:
+    """
+     METRICS BOARD
+    Agregado em memória consumido pelo dashboard: último valor por (source, metric, key),
+    séries recentes para gráficos e janelas de latência/erro.
+    """
+    def __init__(self, window_seconds=60, series_len=600):
+        self.window_seconds = window_seconds
+        self.latest = {}
+        self.series = {}
+        self.series_len = series_len
+        self.latency = deque()
+        self.errors = deque()
+
+    def ingest(self, records):
+        for ts, source, metric, key, value in records:
+            self.latest[(source, metric, key)] = (ts, value)
+            if metric in (METRIC_ORDER_LATENCY, METRIC_API_LATENCY):
+                self.latency.append((ts, value))
+            elif metric == METRIC_API_ERROR:
+                self.errors.append((ts, value))
+            elif metric in (METRIC_EQUITY, METRIC_SIGNAL):
+                series = self.series.setdefault((source, metric, key), deque(maxlen=self.series_len))
+                series.append((ts, value))
+        self._expire(time.time())
+
+    def _expire(self, now):
+        cutoff = now - self.window_seconds
+        for window in (self.latency, self.errors):
+            while window and window[0][0] < cutoff:
+                window.popleft()
+
+    def latency_percentile(self, pct):
+        if not self.latency:
+            return None
+        values = sorted(v for _, v in self.latency)
+        idx = min(len(values) - 1, int(round((pct / 100.0) * (len(values) - 1))))
+        return values[idx]
+
+    def error_rate(self):
+        if not self.errors:
+            return 0.0
+        return sum(v for _, v in self.errors) / len(self.errors)
+
+    def values(self, metric):
+        """Último valor de uma métrica para cada (source, key)."""
+        return {(s, k): v for (s, m, k), (_, v) in self.latest.items() if m == metric}
+
+    def by_key(self, metric):
+        """Valor mais recente por key, independente da fonte (vários agentes publicam a mesma conta)."""
+        merged = {}
+        for (s, m, k), (ts, v) in self.latest.items():
+            if m == metric and (k not in merged or ts > merged[k][0]):
+                merged[k] = (ts, v)
+        return {k: v for k, (_, v) in merged.items()}
+
+    def last_update(self):
+        if not self.latest:
+            return None
+        return max(ts for ts, _ in self.latest.values())
@@ -0,0 +1,712 @@
+"""
+ OBI CLI (Entrada Única das Ferramentas)
+Roda qualquer script de tools/ ou obiwork_core/tools/ pelo nome, com um bootstrap só
+(sys.path, .env e credenciais resolvidos uma vez). Este arquivo só importa stdlib:
+pandas/requests/ccxt entram quando a ferramenta pede.
+
+    python obi.py list [filtro]
+    python obi.py check_positions [args...]        # usa o daemon se estiver de pé
+    python obi.py run --local cancel_all           # força execução neste processo
+    python obi.py obiwork.check_balance
+    python obi.py daemon start|stop|restart|status
+    python obi.py bench [comando ...] [--runs N] [--json]
+
+O daemon mantém um processo aquecido (bibliotecas importadas, chave ed25519 derivada).
+Cada comando roda em um fork dele, com o stdin/stdout/stderr, cwd e ambiente do cliente:
+o script enxerga o próprio terminal e não deixa estado para trás no daemon.
+"""
+import os
+import sys
+import json
+import time
+import runpy
+import socket
+import signal
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY = os.path.join(ROOT, 'obi.py')
+OBIWORK = os.path.join(ROOT, 'obiwork_core')
+
+# prefixo do comando -> diretório dos scripts
+TOOL_DIRS = (
+    ('', os.path.join(ROOT, 'tools')),
+    ('obiwork.', os.path.join(OBIWORK, 'tools')),
+)
+
+# Bibliotecas que as ferramentas importam no topo: o daemon paga esse custo uma vez
+PRELOAD = (
+    'requests', 'dotenv', 'numpy', 'pandas', 'tabulate', 'colorama', 'aiohttp', 'ccxt',
+    'cryptography.hazmat.primitives.asymmetric.ed25519',
+)
+
+_tag = f"{zlib.crc32(ROOT.encode()):08x}"
+SOCKET_PATH = os.environ.get('OBI_DAEMON_SOCKET') or os.path.join(
+    os.environ.get('TMPDIR', '/tmp'), f"obi-{os.getuid()}-{_tag}.sock")
+LOG_PATH = os.path.splitext(SOCKET_PATH)[0] + '.log'
+
+
+# --- COMANDOS ---
+
+def commands():
+    """{nome: caminho} de todos os scripts de ferramentas."""
+    found = {}
+    for prefix, directory in TOOL_DIRS:
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.py') and not entry.name.startswith('__'):
+                    found[prefix + entry.name[:-3]] = entry.path
+    return found
+
+
+def resolve(name):
+    """Nome do comando (check_positions, obiwork.check_balance, obiwork/check_balance) ou caminho de script."""
+    if name.endswith('.py') and os.path.isfile(name):
+        return os.path.abspath(name)
+    name = name.replace('/', '.')
+    if name.endswith('.py'):
+        name = name[:-3]
+    path = commands().get(name)
+    if path is None:
+        raise SystemExit(f"obi: comando desconhecido '{name}' (veja: obi list)")
+    return path
+
+
+def _tree(path):
+    """Árvore dona do arquivo: 'obiwork', 'backend' ou None (stdlib/site-packages)."""
+    path = os.path.abspath(path)
+    if path.startswith(OBIWORK + os.sep):
+        return 'obiwork'
+    if path == ROOT or path.startswith(ROOT + os.sep):
+        return 'backend'
+    return None
+
+
+def _module_trees(module):
+    spec_file = getattr(module, '__file__', None)
+    if spec_file:
+        return {_tree(spec_file)}
+    return {_tree(p) for p in getattr(module, '__path__', ())} # Pacotes de namespace (core/, tools/)
+
+
+def _reset_env():
+    for name in ('core.runtime_env', 'runtime_env'):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.reset()
+
+
+def bootstrap(path):
+    """
+    Prepara o processo como `python <path>` faria: diretório do script em sys.path[0] e .env
+    carregado uma vez. As duas árvores têm módulos homônimos (core/backpack_transport.py):
+    o que veio da outra árvore sai de sys.modules e de sys.path.
+    """
+    tree = _tree(path)
+    try:
+        from core.runtime_env import load_env
+        load_env()
+    except ImportError:
+        pass # python-dotenv ausente: cada script ainda chama o próprio load_dotenv()
+    if tree is not None:
+        other = 'backend' if tree == 'obiwork' else 'obiwork'
+        for name, module in list(sys.modules.items()):
+            if name != '__main__' and module is not None and other in _module_trees(module):
+                del sys.modules[name]
+        sys.path[1:] = [p for p in sys.path[1:] if _tree(p or '.') != other]
+    sys.path[0] = os.path.dirname(path)
+
+
+def execute(path, argv, cwd=None, env=None):
+    """Roda o script como __main__ neste processo. Retorna o exit code."""
+    if cwd:
+        os.chdir(cwd)
+    if env is not None:
+        os.environ.clear()
+        os.environ.update(env)
+        _reset_env()
+    bootstrap(path)
+    sys.argv = [path] + list(argv)
+    try:
+        runpy.run_path(path, run_name='__main__')
+        return 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        import traceback
+        traceback.print_exc()
+        return 130
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+# --- DAEMON ---
+
+def _send(conn, payload):
+    conn.sendall(json.dumps(payload).encode() + b'\n')
+
+
+def _readline(conn, buffer=b''):
+    while b'\n' not in buffer:
+        chunk = conn.recv(65536)
+        if not chunk:
+            raise ConnectionError("conexão fechada")
+        buffer += chunk
+    line, _, rest = buffer.partition(b'\n')
+    return json.loads(line), rest
+
+
+def connect(path=None, timeout=None):
+    """Socket conectado ao daemon, ou None se não houver daemon rodando."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path or SOCKET_PATH)
+        return sock
+    except OSError:
+        sock.close()
+        return None
+
+
+class ObiDaemon:
+    """
+     OBI DAEMON (Processo Aquecido)
+    Loop único (selectors, sem threads: fork seguro) que aceita comandos no socket Unix,
+    faz fork por comando e devolve o exit code. Ctrl+C no cliente vira SIGINT no filho.
+    """
+
+    def __init__(self, socket_path=None, preload=PRELOAD):
+        import selectors
+        self.socket_path = socket_path or SOCKET_PATH
+        self.preload = preload
+        self.selector = selectors.DefaultSelector()
+        self.children = {} # pid -> conn
+        self.buffers = {} # conn -> bytes pendentes
+        self.started_at = time.time()
+        self.served = 0
+        self.running = True
+        self.warm_report = {}
+
+    def warm(self):
+        """Importa as bibliotecas e monta os transports (os dois nomes de módulo usados pelas ferramentas)."""
+        import importlib
+        for name in self.preload:
+            t0 = time.perf_counter()
+            try:
+                importlib.import_module(name)
+                self.warm_report[name] = round((time.perf_counter() - t0) * 1000, 1)
+            except Exception:
+                self.warm_report[name] = None
+        for path in (ROOT, os.path.join(ROOT, 'core')):
+            if path not in sys.path:
+                sys.path.append(path)
+        try:
+            from core.runtime_env import load_env
+            load_env()
+        except ImportError:
+            pass
+        for name in ('core.backpack_transport', 'backpack_transport'):
+            try:
+                importlib.import_module(name).BackpackTransport() # Deriva e valida a chave uma vez
+            except Exception as e:
+                print(f"️ Warm-up {name}: {e}")
+        sys.stdout.flush()
+
+    def serve(self):
+        import selectors
+        if connect(self.socket_path):
+            raise SystemExit(f"obi: daemon já rodando em {self.socket_path}")
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path) # Socket órfão de um daemon morto
+        self.warm()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        listener.listen(16)
+        self.listener = listener
+        self.selector.register(listener, selectors.EVENT_READ)
+        # SIGCHLD acorda o select: o exit code chega ao cliente assim que o filho termina
+        self.wakeup, wakeup_w = socket.socketpair()
+        for end in (self.wakeup, wakeup_w):
+            end.setblocking(False)
+        signal.set_wakeup_fd(wakeup_w.fileno())
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+        self.selector.register(self.wakeup, selectors.EVENT_READ)
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        print(f" OBI daemon pid {os.getpid()} em {self.socket_path}", flush=True)
+        try:
+            while self.running:
+                for key, _ in self.selector.select(timeout=1.0):
+                    if key.fileobj is listener:
+                        self._accept()
+                    elif key.fileobj is self.wakeup:
+                        self._drain()
+                    else:
+                        self._on_client(key.fileobj)
+                self._reap()
+        finally:
+            for pid in self.children:
+                self._kill(pid, signal.SIGTERM)
+            listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def stop(self):
+        self.running = False
+
+    def _drain(self):
+        try:
+            while self.wakeup.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def status(self):
+        return {
+            'pid': os.getpid(),
+            'socket': self.socket_path,
+            'uptime': round(time.time() - self.started_at, 1),
+            'served': self.served,
+            'running': len(self.children),
+            'python': sys.version.split()[0],
+            'preloaded_ms': self.warm_report,
+        }
+
+    def _accept(self):
+        import selectors
+        conn, _ = self.listener.accept()
+        conn.settimeout(5)
+        try:
+            data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+            if not data:
+                conn.close() # Sonda de connect() (start/status): nada a fazer
+                return
+            request, rest = _readline(conn, data)
+        except (OSError, ValueError) as e:
+            print(f" Pedido inválido: {e}", flush=True)
+            conn.close()
+            return
+        op = request.get('op')
+        if op == 'run' and len(fds) == 3:
+            pid = self._fork(request, fds, conn)
+            for fd in fds:
+                os.close(fd)
+            self.children[pid] = conn
+            self.buffers[conn] = rest
+            conn.setblocking(False)
+            self.selector.register(conn, selectors.EVENT_READ, pid)
+            self.served += 1
+            return
+        for fd in fds:
+            os.close(fd)
+        if op == 'status':
+            _send(conn, self.status())
+        elif op == 'stop':
+            _send(conn, {'stopping': os.getpid()})
+            self.stop()
+        else:
+            _send(conn, {'error': f"op desconhecida: {op}"})
+        conn.close()
+
+    def _fork(self, request, fds, conn):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            return pid
+        code = 1
+        try:
+            import atexit
+            atexit._clear() # Handlers do daemon não são do comando
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            self.selector.close()
+            self.wakeup.close()
+            self.listener.close()
+            for other in self.children.values():
+                other.close()
+            conn.close()
+            os.setpgid(0, 0) # Grupo próprio: SIGINT alcança subprocessos da ferramenta
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+            for fd in fds:
+                if fd > 2:
+                    os.close(fd)
+            # Reabre o stdio sobre os fds do cliente (bufferização de linha se for terminal)
+            sys.stdin = sys.__stdin__ = open(0, 'r', closefd=False)
+            sys.stdout = sys.__stdout__ = open(1, 'w', buffering=1 if os.isatty(1) else -1, closefd=False)
+            sys.stderr = sys.__stderr__ = open(2, 'w', buffering=1, errors='backslashreplace', closefd=False)
+            code = execute(request['path'], request.get('argv', ()), request.get('cwd'), request.get('env'))
+            _join_threads()
+            atexit._run_exitfuncs()
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+        finally:
+            for stream in (sys.stdout, sys.stderr):
+                try:
+                    stream.flush()
+                except Exception:
+                    pass
+            os._exit(code if isinstance(code, int) and 0 <= code < 256 else 1)
+
+    def _on_client(self, conn):
+        """Mensagens do cliente durante a execução: sinal (Ctrl+C) ou desconexão."""
+        pid = self.selector.get_key(conn).data
+        try:
+            chunk = conn.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b''
+        if not chunk:
+            self._kill(pid, signal.SIGTERM) # Cliente morreu: o comando não tem mais terminal
+            self.selector.unregister(conn)
+            return
+        buffer = self.buffers.get(conn, b'') + chunk
+        while b'\n' in buffer:
+            line, _, buffer = buffer.partition(b'\n')
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get('op') == 'signal':
+                self._kill(pid, int(message.get('signal', signal.SIGINT)))
+        self.buffers[conn] = buffer
+
+    def _kill(self, pid, signum):
+        try:
+            os.killpg(pid, signum)
+        except OSError:
+            pass
+
+    def _reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            conn = self.children.pop(pid, None)
+            if conn is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            self.buffers.pop(conn, None)
+            try:
+                self.selector.unregister(conn)
+            except (KeyError, ValueError):
+                pass
+            try:
+                conn.setblocking(True)
+                _send(conn, {'exit': code if code >= 0 else 128 - code})
+            except OSError:
+                pass
+            conn.close()
+
+
+def _join_threads():
+    """Como no shutdown normal do interpretador: espera threads não-daemon da ferramenta."""
+    import threading
+    for thread in threading.enumerate():
+        if thread is not threading.main_thread() and not thread.daemon:
+            thread.join()
+
+
+def run_remote(path, argv, sock):
+    """Executa no daemon repassando o stdio deste processo. Retorna o exit code."""
+    fds, opened = [], []
+    for fd in (0, 1, 2):
+        try:
+            os.fstat(fd)
+            fds.append(fd)
+        except OSError:
+            opened.append(os.open(os.devnull, os.O_RDWR))
+            fds.append(opened[-1])
+    request = {'op': 'run', 'path': path, 'argv': argv, 'cwd': os.getcwd(), 'env': dict(os.environ)}
+    sys.stdout.flush()
+    socket.send_fds(sock, [json.dumps(request).encode() + b'\n'], fds)
+    for fd in opened:
+        os.close(fd)
+    while True:
+        try:
+            reply, _ = _readline(sock)
+            return reply.get('exit', 1)
+        except KeyboardInterrupt:
+            _send(sock, {'op': 'signal', 'signal': int(signal.SIGINT)})
+        except ConnectionError:
+            print("obi: daemon encerrou durante o comando", file=sys.stderr)
+            return 1
+
+
+def _request(op, socket_path=None):
+    sock = connect(socket_path, timeout=5)
+    if sock is None:
+        return None
+    with sock:
+        _send(sock, {'op': op})
+        reply, _ = _readline(sock)
+        return reply
+
+
+def daemon_start(socket_path=None, env=None, wait=60.0):
+    import subprocess
+    socket_path = socket_path or SOCKET_PATH
+    if connect(socket_path):
+        print(f"Daemon já rodando em {socket_path}")
+        return 0
+    env = dict(env if env is not None else os.environ, OBI_DAEMON_SOCKET=socket_path)
+    log_path = os.path.splitext(socket_path)[0] + '.log'
+    with open(log_path, 'ab') as log:
+        process = subprocess.Popen([sys.executable, ENTRY, 'daemon', 'serve'],
+                                   cwd=ROOT, env=env, stdin=subprocess.DEVNULL, stdout=log,
+                                   stderr=subprocess.STDOUT, start_new_session=True)
+    deadline = time.time() + wait
+    while time.time() < deadline:
+        sock = connect(socket_path)
+        if sock:
+            sock.close()
+            print(f" Daemon pid {process.pid} pronto em {socket_path}")
+            return 0
+        if process.poll() is not None:
+            break
+        time.sleep(0.05)
+    print(f" Daemon não subiu (log: {log_path})", file=sys.stderr)
+    return 1
+
+
+def daemon_stop(socket_path=None):
+    reply = _request('stop', socket_path)
+    if reply is None:
+        print("Nenhum daemon rodando.")
+        return 0
+    deadline = time.time() + 10
+    while time.time() < deadline and os.path.exists(socket_path or SOCKET_PATH):
+        time.sleep(0.05)
+    print(f" Daemon pid {reply.get('stopping')} encerrado.")
+    return 0
+
+
+def daemon_command(args):
+    action = args[0] if args else 'status'
+    if action == 'serve':
+        ObiDaemon().serve()
+        return 0
+    if action == 'start':
+        return daemon_start()
+    if action == 'stop':
+        return daemon_stop()
+    if action == 'restart':
+        daemon_stop()
+        return daemon_start()
+    if action == 'status':
+        reply = _request('status')
+        if reply is None:
+            print("Nenhum daemon rodando.")
+            return 1
+        print(json.dumps(reply, indent=2))
+        return 0
+    raise SystemExit(f"obi daemon: ação desconhecida '{action}' (start|stop|restart|status|serve)")
+
+
+# --- BENCHMARK ---
+
+class _StubApi:
+    """API falsa local: registra quando chega a primeira requisição e responde []."""
+
+    def __init__(self):
+        import threading
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        stub = self
+        self.first = None
+        self.lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self):
+                with stub.lock:
+                    if stub.first is None:
+                        stub.first = time.perf_counter()
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                body = b'[]'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_DELETE = do_PATCH = _reply
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, name="ObiStubApi", daemon=True).start()
+
+    def reset(self):
+        with self.lock:
+            self.first = None
+
+    def close(self):
+        self.server.shutdown()
+
+
+def _importtime(argv, env):
+    """{módulo de primeiro nível: ms cumulativos} de `python -X importtime <argv>`."""
+    import subprocess
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + argv, cwd=ROOT, env=env,
+                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            text=True, timeout=120)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '): # Sem indentação extra = import de primeiro nível
+            modules[name.strip()] = int(cumulative) / 1000
+    return modules
+
+
+def import_profile(argv, env, top=5):
+    """(ms de import do script, [(ms, módulo)] mais pesados), sem o que o interpretador já carrega (site, encodings)."""
+    baseline = _importtime(['-c', 'pass'], env)
+    heavy = sorted(((ms, name) for name, ms in _importtime(argv, env).items() if name not in baseline), reverse=True)
+    return sum(ms for ms, _ in heavy), heavy[:top]
+
+
+def bench(names, runs=3, as_json=False):
+    """
+    Compara, por comando: `python tools/X.py` (frio), `obi run --local X` e `obi X` via daemon.
+    Mede tempo até a primeira requisição HTTP (API falsa local) e tempo total, com chaves de papel.
+    """
+    import subprocess
+    import statistics
+    try:
+        from core.exchange_simulator import paper_keys
+    except ImportError:
+        sys.path.append(os.path.join(ROOT, 'core'))
+        from exchange_simulator import paper_keys
+    stub = _StubApi()
+    key, secret = paper_keys()
+    socket_path = os.path.join(os.environ.get('TMPDIR', '/tmp'), f"obi-bench-{os.getpid()}.sock")
+    env = dict(os.environ, BACKPACK_API_URL=stub.url, BACKPACK_API_KEY=key, BACKPACK_API_SECRET=secret,
+               OBI_ENV_FILE='', OBI_DAEMON_SOCKET=socket_path, PYTHONUNBUFFERED='1')
+    me = ENTRY
+    modes = (
+        ('cold', lambda path, name: [sys.executable, path]),
+        ('obi', lambda path, name: [sys.executable, me, 'run', '--local', name]),
+        ('daemon', lambda path, name: [sys.executable, me, 'run', name]),
+    )
+    results = []
+    try:
+        if daemon_start(socket_path, env=env) != 0:
+            modes = modes[:2]
+        for name in names:
+            path = resolve(name)
+            row = {'command': name}
+            total_ms, heavy = import_profile([path], env)
+            row['imports_ms'] = round(total_ms, 1)
+            row['heaviest'] = [[round(ms, 1), module] for ms, module in heavy]
+            for mode, build in modes:
+                firsts, walls = [], []
+                for _ in range(runs):
+                    stub.reset()
+                    t0 = time.perf_counter()
+                    try:
+                        subprocess.run(build(path, name), cwd=ROOT, env=env, stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=120)
+                    except subprocess.TimeoutExpired:
+                        pass
+                    walls.append((time.perf_counter() - t0) * 1000)
+                    if stub.first is not None:
+                        firsts.append((stub.first - t0) * 1000)
+                row[mode] = {
+                    'first_request_ms': round(statistics.median(firsts), 1) if firsts else None,
+                    'wall_ms': round(statistics.median(walls), 1),
+                }
+            results.append(row)
+        cli_ms, _ = import_profile([me, 'list', '-q'], env)
+    finally:
+        if os.path.exists(socket_path):
+            daemon_stop(socket_path)
+        stub.close()
+
+    if as_json:
+        print(json.dumps({'runs': runs, 'cli_imports_ms': round(cli_ms, 1), 'commands': results}, indent=2))
+        return 0
+    print(f"\n OBI BENCH ({runs} execuções, mediana) | imports do próprio obi: {cli_ms:.1f} ms")
+    print("-" * 96)
+    print(f"{'COMANDO':<28} | {'IMPORTS':>8} | {'1ª REQ FRIO':>11} | {'1ª REQ OBI':>10} | {'1ª REQ DAEMON':>13} | {'TOTAL FRIO/DAEMON':>17}")
+    print("-" * 96)
+    fmt = lambda v: f"{v:.0f} ms" if v is not None else "-"
+    for row in results:
+        daemon = row.get('daemon', {})
+        print(f"{row['command']:<28} | {fmt(row['imports_ms']):>8} | {fmt(row['cold']['first_request_ms']):>11} | "
+              f"{fmt(row['obi']['first_request_ms']):>10} | {fmt(daemon.get('first_request_ms')):>13} | "
+              f"{fmt(row['cold']['wall_ms']) + ' / ' + fmt(daemon.get('wall_ms')):>17}")
+        print(f"{'':<28}   mais pesados: " + ", ".join(f"{m} {ms:.0f}ms" for ms, m in row['heaviest']))
+    return 0
+
+
+# --- ENTRADA ---
+
+def usage():
+    print(__doc__.strip())
+    return 0
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ('-h', '--help', 'help'):
+        return usage()
+    command, args = argv[0], argv[1:]
+    if command == 'list':
+        quiet = '-q' in args
+        pattern = next((a for a in args if a != '-q'), '')
+        names = sorted(n for n in commands() if pattern in n)
+        if not quiet:
+            print("\n".join(names))
+        return 0
+    if command == 'daemon':
+        return daemon_command(args)
+    if command == 'bench':
+        runs = 3
+        if '--runs' in args:
+            i = args.index('--runs')
+            runs = int(args[i + 1])
+            del args[i:i + 2]
+        as_json = '--json' in args
+        names = [a for a in args if a != '--json'] or ['check_positions', 'cancel_all', 'check_sl_status']
+        return bench(names, runs, as_json)
+    if command == 'run':
+        if not args:
+            raise SystemExit("obi run: informe o comando")
+        command, args = args[0], args[1:]
+    local = command == '--local'
+    if local:
+        if not args:
+            raise SystemExit("obi: informe o comando")
+        command, args = args[0], args[1:]
+    path = resolve(command)
+    sock = None if local or os.environ.get('OBI_NO_DAEMON') else connect()
+    if sock is not None:
+        with sock:
+            return run_remote(path, args, sock)
+    return execute(path, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
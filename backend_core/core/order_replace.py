@@ -0,0 +1,287 @@
+import time
+import logging
+import threading
+from collections import deque
+
+try:
+    from .metrics_feed import METRIC_UNPROTECTED
+except ImportError:
+    try:
+        from metrics_feed import METRIC_UNPROTECTED
+    except ImportError:
+        METRIC_UNPROTECTED = "unprotected_ms"
+
+
+def api_side(side):
+    """Normaliza Buy/Sell/Bid/Ask para o enum da API."""
+    return "Bid" if side in ("Buy", "Bid") else "Ask"
+
+
+def fmt_number(value):
+    if isinstance(value, str):
+        return value
+    return f"{float(value):.8f}".rstrip('0').rstrip('.')
+
+
+def is_stop_order(order):
+    """A API pode devolver Stop Market como 'Market' com triggerPrice."""
+    o_type = order.get('orderType') or ''
+    trigger = float(order.get('triggerPrice') or 0)
+    return 'Stop' in o_type or trigger > 0
+
+
+class OpenOrderCache:
+    """
+     OPEN ORDER CACHE
+    Espelho local das ordens abertas por símbolo. Sincroniza via REST no primeiro acesso
+    e a cada resync_interval; entre sincronizações é atualizado pelas próprias
+    colocações/cancelamentos, então localizar o SL/TP atual não custa chamada à API.
+    """
+    def __init__(self, transport, resync_interval=30.0):
+        self.transport = transport
+        self.resync_interval = resync_interval
+        self.orders = {}
+        self.synced_at = {}
+        self.lock = threading.Lock()
+
+    def get(self, symbol):
+        now = time.time()
+        if now - self.synced_at.get(symbol, 0) >= self.resync_interval:
+            fetched = self.transport.get_open_orders(symbol)
+            if fetched is not None:
+                with self.lock:
+                    self.orders[symbol] = {o['id']: o for o in fetched if o.get('id')}
+                    self.synced_at[symbol] = now
+        with self.lock:
+            return list(self.orders.get(symbol, {}).values())
+
+    def load(self, orders, symbols=()):
+        """
+        Sincroniza vários símbolos de uma vez a partir de um único GET /orders (sem filtro).
+        `symbols` sem ordens no retorno ficam sincronizados como vazios.
+        """
+        now = time.time()
+        grouped = {s: {} for s in symbols}
+        for o in orders or []:
+            if o.get('id') and o.get('symbol'):
+                grouped.setdefault(o['symbol'], {})[o['id']] = o
+        with self.lock:
+            for symbol, by_id in grouped.items():
+                self.orders[symbol] = by_id
+                self.synced_at[symbol] = now
+
+    def find_stop(self, symbol, exit_side):
+        side = api_side(exit_side)
+        return next((o for o in self.get(symbol) if o.get('side') == side and is_stop_order(o)), None)
+
+    def find_limit(self, symbol, exit_side):
+        side = api_side(exit_side)
+        return next((o for o in self.get(symbol)
+                     if o.get('side') == side and o.get('orderType') == 'Limit' and not is_stop_order(o)), None)
+
+    def on_placed(self, symbol, order):
+        if order and order.get('id'):
+            with self.lock:
+                self.orders.setdefault(symbol, {})[order['id']] = order
+
+    def on_cancelled(self, symbol, order_id):
+        with self.lock:
+            self.orders.get(symbol, {}).pop(order_id, None)
+
+    def invalidate(self, symbol=None):
+        """Força resync no próximo acesso (ex.: posição fechada, stop disparado)."""
+        with self.lock:
+            if symbol:
+                self.synced_at.pop(symbol, None)
+            else:
+                self.synced_at.clear()
+
+
+class OrderReplacer:
+    """
+     ORDER REPLACER (Amend com Debounce)
+    Ajusta SL/TP sem o ciclo consulta -> cancela -> posta a cada tick:
+    - O SL/TP atual vem do OpenOrderCache (sem GET /orders).
+    - Atualizações rápidas para o mesmo (símbolo, tipo, lado) são coalescidas:
+      só o último preço desejado dentro da janela de debounce é enviado.
+    - A troca usa transport.replace_order (nova ordem reduceOnly antes de cancelar a antiga).
+    Cada ajuste gera um relatório com o tempo sem proteção (unprotected_ms).
+    """
+    def __init__(self, transport, cache=None, debounce=0.25, logger=None):
+        self.transport = transport
+        self.cache = cache or OpenOrderCache(transport)
+        self.debounce = debounce
+        self.logger = logger or logging.getLogger("OrderReplacer")
+        self.pending = {}
+        self.reports = deque(maxlen=500)
+        self.cond = threading.Condition()
+        self.apply_lock = threading.Lock()
+        self.is_running = True
+        self.worker = threading.Thread(target=self._loop, name="OrderReplacer", daemon=True)
+        self.worker.start()
+
+    # --- API PÚBLICA ---
+
+    def submit_stop(self, symbol, exit_side, trigger_price, quantity=None):
+        """Agenda o SL (Stop Market reduceOnly) para trigger_price. Não bloqueia."""
+        self._submit(symbol, "stop", exit_side, trigger_price, quantity)
+
+    def submit_limit(self, symbol, exit_side, price, quantity=None):
+        """Agenda o TP (Limit Maker reduceOnly) para price. Não bloqueia."""
+        self._submit(symbol, "limit", exit_side, price, quantity)
+
+    def current_stop(self, symbol, exit_side):
+        """Trigger efetivo do SL: o pendente (ainda em debounce) ou o que está no livro."""
+        return self._current(symbol, "stop", exit_side)
+
+    def current_limit(self, symbol, exit_side):
+        return self._current(symbol, "limit", exit_side)
+
+    def flush(self):
+        """Aplica imediatamente tudo que está pendente (ex.: antes de encerrar)."""
+        with self.cond:
+            ready = list(self.pending.items())
+            self.pending.clear()
+        for key, desired in ready:
+            self._apply(key, desired)
+
+    def close(self):
+        self.flush()
+        with self.cond:
+            self.is_running = False
+            self.cond.notify_all()
+        self.worker.join(timeout=1)
+
+    # --- INTERNO ---
+
+    def _current(self, symbol, kind, exit_side):
+        key = (symbol, kind, api_side(exit_side))
+        with self.cond:
+            if key in self.pending:
+                return float(self.pending[key]['price'])
+        order = self.cache.find_stop(symbol, exit_side) if kind == "stop" else self.cache.find_limit(symbol, exit_side)
+        if not order:
+            return None
+        return float(order.get('triggerPrice') if kind == "stop" else order.get('price'))
+
+    def _submit(self, symbol, kind, exit_side, price, quantity):
+        key = (symbol, kind, api_side(exit_side))
+        with self.cond:
+            desired = self.pending.get(key)
+            if desired:
+                desired['price'] = price
+                desired['quantity'] = quantity or desired['quantity']
+                desired['coalesced'] += 1
+            else:
+                self.pending[key] = {
+                    'price': price,
+                    'quantity': quantity,
+                    'coalesced': 0,
+                    'submitted_at': time.time(),
+                    'due': time.time() + self.debounce,
+                }
+            self.cond.notify()
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while self.is_running:
+                    now = time.time()
+                    ready = [k for k, d in self.pending.items() if d['due'] <= now]
+                    if ready:
+                        break
+                    timeout = min(d['due'] for d in self.pending.values()) - now if self.pending else None
+                    self.cond.wait(timeout)
+                if not self.is_running:
+                    return
+                batch = [(k, self.pending.pop(k)) for k in ready]
+            for key, desired in batch:
+                try:
+                    self._apply(key, desired)
+                except Exception as e:
+                    self.logger.error(f" Falha ao ajustar {key[1]} de {key[0]}: {e}")
+
+    def _build_payload(self, symbol, kind, side, price, quantity):
+        qty = fmt_number(quantity)
+        if kind == "stop":
+            return {
+                "symbol": symbol,
+                "side": side,
+                "orderType": "Market", # TriggerPrice ativa o comportamento Stop Market
+                "quantity": qty,
+                "triggerPrice": fmt_number(price),
+                "triggerQuantity": qty,
+                "reduceOnly": True
+            }
+        return {
+            "symbol": symbol,
+            "side": side,
+            "orderType": "Limit",
+            "quantity": qty,
+            "price": fmt_number(price),
+            "timeInForce": "GTC",
+            "postOnly": True,
+            "reduceOnly": True
+        }
+
+    def _apply(self, key, desired):
+        symbol, kind, side = key
+        with self.apply_lock:
+            current = self.cache.find_stop(symbol, side) if kind == "stop" else self.cache.find_limit(symbol, side)
+            quantity = desired['quantity']
+            if not quantity and current:
+                quantity = current.get('triggerQuantity') or current.get('quantity')
+            if not quantity:
+                self.logger.warning(f"️ {symbol}: sem quantidade para {kind} @ {desired['price']}. Ignorado.")
+                return None
+
+            payload = self._build_payload(symbol, kind, side, desired['price'], quantity)
+            price_field = "triggerPrice" if kind == "stop" else "price"
+            if current and current.get(price_field) is not None and float(current[price_field]) == float(payload[price_field]):
+                return None # Já está no preço desejado
+
+            if current:
+                result = self.transport.replace_order(symbol, current['id'], payload)
+                order = result['order']
+                if order:
+                    self.cache.on_placed(symbol, order)
+                    self.cache.on_cancelled(symbol, current['id'])
+                    if result['cancel'] is None:
+                        self.cache.invalidate(symbol) # Cancelamento falhou: a antiga pode ter disparado
+            else:
+                started = time.perf_counter()
+                order = self.transport._send_request("POST", "/api/v1/order", "orderExecute", payload)
+                self.cache.on_placed(symbol, order)
+                result = {'order': order, 'cancel': None, 'unprotected_ms': None,
+                          'latency_ms': (time.perf_counter() - started) * 1000}
+
+            report = {
+                'symbol': symbol,
+                'kind': kind,
+                'side': side,
+                'old_id': current.get('id') if current else None,
+                'new_id': order.get('id') if order else None,
+                'old_price': float(current[price_field]) if current and current.get(price_field) else None,
+                'new_price': float(payload[price_field]),
+                'coalesced': desired['coalesced'],
+                'queued_ms': (time.time() - desired['submitted_at']) * 1000,
+                'latency_ms': result['latency_ms'],
+                'unprotected_ms': result['unprotected_ms'],
+                'ok': bool(order),
+            }
+            self.reports.append(report)
+
+            if order:
+                unprotected = "n/a (sem ordem anterior)" if report['unprotected_ms'] is None else f"{report['unprotected_ms']:.0f}ms"
+                self.logger.info(
+                    f"️ {symbol} {kind.upper()} {report['old_price']} -> {report['new_price']} "
+                    f"({report['latency_ms']:.0f}ms, desprotegido {unprotected}, coalescidos {report['coalesced']})"
+                )
+            else:
+                self.logger.error(f" {symbol}: falha ao substituir {kind} @ {report['new_price']} (ordem anterior mantida)")
+                self.cache.invalidate(symbol)
+
+            metrics = getattr(self.transport, 'metrics', None)
+            if metrics and report['unprotected_ms'] is not None:
+                metrics.publish(METRIC_UNPROTECTED, report['unprotected_ms'], symbol)
+            return report
@@ -0,0 +1,217 @@
+import time
+import logging
+import numpy as np
+
+try:
+    from .candle_store import CandleStore, INTERVAL_SECONDS
+except ImportError:
+    from candle_store import CandleStore, INTERVAL_SECONDS
+
+# Fração do volume diário (em USD) que uma posição pode representar sem impacto relevante
+LIQUIDITY_PARTICIPATION = 0.001
+
+
+class PortfolioRiskEngine:
+    """
+     PORTFOLIO RISK ENGINE (Monte Carlo Vetorizado)
+    Covariância dos log-retornos calculada do histórico de velas (CandleStore).
+    Cenários correlacionados gerados de uma vez (Cholesky ou bootstrap histórico) e
+    reaproveitados enquanto nenhuma vela nova fechar: avaliar o portfólio a cada tick
+    custa um produto matriz x vetor (N cenários x K ativos).
+    """
+    def __init__(self, store=None, interval="1h", lookback=500, horizon_bars=24,
+                 n_scenarios=10000, method="cholesky", seed=None):
+        self.store = store or CandleStore()
+        self.interval = interval
+        self.lookback = lookback
+        self.horizon_bars = horizon_bars
+        self.n_scenarios = n_scenarios
+        self.method = method
+        self.rng = np.random.default_rng(seed)
+        self.bar_seconds = INTERVAL_SECONDS.get(interval, 3600)
+        self.logger = logging.getLogger("PortfolioRisk")
+        self._model = None
+
+    # --- DADOS ---
+
+    def refresh(self, transport, symbols):
+        """Atualiza o histórico apenas dos símbolos com vela nova fechada. Retorna velas adicionadas."""
+        added = 0
+        for symbol in symbols:
+            if self.store.stale(symbol, self.interval):
+                try:
+                    added += self.store.refresh(transport, symbol, self.interval, limit=self.lookback + 1)
+                except Exception as e:
+                    self.logger.warning(f"️ Falha ao atualizar velas de {symbol}: {e}")
+        return added
+
+    def _returns(self, symbols):
+        """Log-retornos (T x K) das velas fechadas alinhadas. Retorna (last_ts, R) ou (None, None)."""
+        ts, closes = self.store.closes(symbols, self.interval)
+        if ts is None:
+            return None, None
+        closed = ts + self.bar_seconds <= time.time()
+        ts, closes = ts[closed][-(self.lookback + 1):], closes[closed][-(self.lookback + 1):]
+        if len(ts) < 3:
+            return None, None
+        return int(ts[-1]), np.diff(np.log(closes), axis=0)
+
+    # --- MODELO DE CENÁRIOS ---
+
+    def _cholesky(self, cov):
+        jitter = 0.0
+        scale = np.mean(np.diag(cov)) or 1e-12
+        for _ in range(6):
+            try:
+                return np.linalg.cholesky(cov + np.eye(len(cov)) * jitter)
+            except np.linalg.LinAlgError:
+                # Matriz não positiva-definida (ativos colineares/histórico curto)
+                jitter = scale * 1e-6 if not jitter else jitter * 10
+        return np.diag(np.sqrt(np.clip(np.diag(cov), 0, None)))
+
+    def _simulate(self, R):
+        """Retornos simples no horizonte (N x K) em uma única passada."""
+        n, h = self.n_scenarios, self.horizon_bars
+        if self.method == "bootstrap":
+            # Bootstrap histórico: soma de h barras sorteadas (preserva caudas e correlação contemporânea)
+            log_paths = np.zeros((n, R.shape[1]))
+            for _ in range(h):
+                log_paths += R[self.rng.integers(0, len(R), n)]
+        else:
+            mu = R.mean(axis=0)
+            L = self._cholesky(np.atleast_2d(np.cov(R, rowvar=False)))
+            z = self.rng.standard_normal((n, R.shape[1]))
+            log_paths = mu * h + (z @ L.T) * np.sqrt(h)
+        return np.expm1(log_paths)
+
+    def _cache_key(self, symbols):
+        # Muda só quando entra vela nova no store ou quando a vela corrente fecha
+        return tuple(self.store.last_ts(s, self.interval) for s in symbols), int(time.time() // self.bar_seconds)
+
+    def model(self, symbols):
+        """
+        Retorna o modelo (símbolos, cenários, covariância) cobrindo `symbols`.
+        Reaproveita o cache se já cobre os símbolos e nenhuma vela nova fechou.
+        """
+        wanted = sorted(set(symbols))
+        cached = self._model
+        if cached and set(wanted) <= set(cached['symbols']):
+            if self._cache_key(cached['symbols']) == cached['key']:
+                return cached
+            wanted = sorted(set(wanted) | set(cached['symbols']))
+
+        last_ts, R = self._returns(wanted)
+        if R is None:
+            return None
+        self._model = {
+            'key': self._cache_key(wanted),
+            'symbols': wanted,
+            'index': {s: i for i, s in enumerate(wanted)},
+            'last_ts': last_ts,
+            'returns': R,
+            'cov': np.atleast_2d(np.cov(R, rowvar=False)),
+            'scenarios': self._simulate(R),
+        }
+        return self._model
+
+    # --- AVALIAÇÃO ---
+
+    @staticmethod
+    def exposures(positions):
+        """Notional assinado por símbolo a partir de dicts {symbol, size, current_price, side}."""
+        book = {}
+        for pos in positions:
+            notional = float(pos['size']) * float(pos['current_price'])
+            if str(pos.get('side', 'long')).lower() in ('short', 'ask', 'sell'):
+                notional = -abs(notional)
+            book[pos['symbol']] = book.get(pos['symbol'], 0.0) + notional
+        return book
+
+    def evaluate(self, positions, confidence=(0.95, 0.99)):
+        """
+        VaR/CVaR (em USD, perdas positivas) do portfólio e de cada posição.
+        component_cvar decompõe o CVaR do portfólio por posição (soma = CVaR total).
+        Retorna None se não houver histórico suficiente.
+        """
+        book = self.exposures(positions) if isinstance(positions, list) else dict(positions)
+        if not book:
+            return None
+        model = self.model(book.keys())
+        if model is None:
+            return None
+
+        symbols = list(book)
+        cols = [model['index'][s] for s in symbols]
+        exposure = np.array([book[s] for s in symbols])
+        pnl = model['scenarios'][:, cols] * exposure   # N x K
+        total = pnl.sum(axis=1)
+
+        result = {'symbols': symbols, 'scenarios': len(total), 'as_of': model['last_ts']}
+        for c in confidence:
+            tag = int(round(c * 100))
+            q = 1 - c
+            var = np.quantile(total, q)
+            tail = total <= var
+            result[f'var_{tag}'] = float(max(0.0, -var))
+            result[f'cvar_{tag}'] = float(max(0.0, -total[tail].mean()))
+
+            pos_var = np.quantile(pnl, q, axis=0)
+            pos_tail = pnl <= pos_var
+            pos_cvar = -(pnl * pos_tail).sum(axis=0) / np.maximum(pos_tail.sum(axis=0), 1)
+            component = -pnl[tail].mean(axis=0)
+            result[f'positions_{tag}'] = {
+                s: {'var': float(max(0.0, -pos_var[i])), 'cvar': float(max(0.0, pos_cvar[i])),
+                    'component_cvar': float(component[i])}
+                for i, s in enumerate(symbols)
+            }
+        return result
+
+    # --- MÉTRICAS AUXILIARES ---
+
+    def correlation(self, symbol, others):
+        """Maior correlação (em módulo) dos retornos de `symbol` contra `others`."""
+        others = [o for o in others if o != symbol]
+        if not others:
+            return 0.0
+        _, R = self._returns([symbol] + others)
+        if R is None:
+            return None
+        corr = np.corrcoef(R, rowvar=False)[0, 1:]
+        return float(np.nanmax(np.abs(corr)))
+
+    def beta(self, target, hedge):
+        """Correlação, beta e razão de volatilidade de `target` contra `hedge`."""
+        _, R = self._returns([target, hedge])
+        if R is None:
+            return None
+        cov = np.cov(R, rowvar=False)
+        return {
+            'correlation': float(cov[0, 1] / np.sqrt(cov[0, 0] * cov[1, 1])),
+            'beta': float(cov[0, 1] / cov[1, 1]),
+            'vol_ratio': float(np.sqrt(cov[0, 0] / cov[1, 1])),
+        }
+
+    def volatility(self, symbol, window_seconds=86400):
+        """Volatilidade realizada na janela, escalada para o horizonte da janela (ex.: 24h)."""
+        _, R = self._returns([symbol])
+        if R is None:
+            return None
+        bars = max(2, window_seconds // self.bar_seconds)
+        return float(R[-bars:, 0].std(ddof=1) * np.sqrt(bars))
+
+    def long_run_volatility(self, symbol, window_seconds=86400):
+        """Mesma escala de volatility(), mas usando todo o lookback (referência de regime)."""
+        _, R = self._returns([symbol])
+        if R is None:
+            return None
+        bars = max(2, window_seconds // self.bar_seconds)
+        return float(R[:, 0].std(ddof=1) * np.sqrt(bars))
+
+    def liquidity_ratio(self, symbol, notional):
+        """1.0 = posição irrelevante frente ao volume das últimas 24h; cai linearmente com o tamanho."""
+        data = self.store.get(symbol, self.interval)
+        if data is None or not len(data['ts']) or notional <= 0:
+            return None
+        bars = max(1, 86400 // self.bar_seconds)
+        daily_quote = float(data['quote_volume'][-bars:].sum())
+        return float(min(1.0, daily_quote * LIQUIDITY_PARTICIPATION / notional))
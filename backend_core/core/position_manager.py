@@ -1,7 +1,14 @@
 
 import time
+import threading
+import requests
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from core.backpack_transport import BackpackTransport
+from core.order_replace import OrderReplacer
+from core.market_registry import MarketRegistry
+from core.trailing_engine import TrailingEngine, TrailingRule
 
 class PositionManager:
     """
@@ -9,45 +16,164 @@ class PositionManager:
     Monitora posições abertas e aplica regras de gestão dinâmica:
     1. Breakeven: Se lucro > 2%, move SL para Entrada + Taxas.
     2. Trend Guard: Se tendência inverter (Preço cruzar EMA50), fecha posição (Market).
+    Uma passada por ciclo (cadência `interval`, separada do scan de entrada):
+    posições, ordens, tickers e klines vêm de uma única foto (snapshot) e as regras
+    são avaliadas para todas as posições juntas.
     """
-    def __init__(self, transport: BackpackTransport):
+    TREND_INTERVAL = "1h"
+    TREND_BAR_SECONDS = 3600
+    TREND_PERIOD = 50
+
+    def __init__(self, transport: BackpackTransport, interval=5.0):
         self.transport = transport
         self.BREAKEVEN_TRIGGER_PCT = 0.02 # 2% de Lucro aciona Breakeven
         self.BREAKEVEN_BUFFER_PCT = 0.003 # 0.3% acima da entrada para cobrir taxas (Maker + Taker + Spread)
+        # SL/TP via cache local + replace (sem GET/DELETE/POST a cada tick do trailing)
+        self.replacer = OrderReplacer(transport)
+        self.markets = MarketRegistry.shared()
+        # Infinite Profit: +1.5% -> SL em Entrada + 0.2% (taxas); +3.0% -> trailing a 0.5% do pico.
+        # Stream de mark price, fora do ciclo de manage_positions.
+        self.trailing = TrailingEngine(transport, TrailingRule(
+            activation=0.03, callback=0.005, hard_stop=None, ladder=[(0.015, 0.002)],
+            place_stops=True, close_on_trigger=False
+        ), replacer=self.replacer)
+        # Cadência da passada de gestão
+        self.interval = interval
+        self.last_pass = 0.0
+        self.pass_lock = threading.Lock()
+        self.cached_positions = (0.0, [])
+        # Klines do Trend Guard: refeitas só quando abre uma nova barra de 1h. symbol -> (barra, closes)
+        self.klines = {}
+        self.pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="PositionManager")
+
+    # --- CADÊNCIA ---
+
+    def claim(self):
+        """Reserva a passada do ciclo: True se a cadência venceu (e marca o início da passada)."""
+        with self.pass_lock:
+            now = time.time()
+            if now - self.last_pass < self.interval:
+                return False
+            self.last_pass = now
+            return True
+
+    def positions(self, max_age=None):
+        """Posições da última foto se tiverem menos de `max_age` segundos; senão GET /position."""
+        max_age = self.interval if max_age is None else max_age
+        taken_at, cached = self.cached_positions
+        if time.time() - taken_at < max_age:
+            return cached
+        fetched = self.transport.get_positions()
+        if isinstance(fetched, list):
+            self.cached_positions = (time.time(), fetched)
+        return fetched
+
+    def invalidate(self):
+        """Descarta a foto de posições (ex.: logo após uma entrada) -> próximo positions() busca na API."""
+        self.cached_positions = (0.0, [])
+
+    # --- SNAPSHOT ---
+
+    def _tickers(self):
+        """{symbol: lastPrice} de todos os mercados numa chamada (GET /api/v1/tickers)."""
+        base_url = getattr(self.transport, 'base_url', "https://api.backpack.exchange")
+        try:
+            resp = requests.get(f"{base_url}/api/v1/tickers", timeout=10)
+            if resp.status_code == 200:
+                return {t['symbol']: float(t['lastPrice']) for t in resp.json() if t.get('symbol') and t.get('lastPrice')}
+        except Exception:
+            pass
+        return {}
 
-    def manage_positions(self, wall_intel=None, obi_data=None):
+    def _closes(self, symbol):
+        try:
+            klines = self.transport.get_klines(symbol, self.TREND_INTERVAL, limit=60)
+            return np.array([float(k['close']) for k in klines or []], dtype=float)
+        except Exception:
+            return np.array([], dtype=float)
+
+    def _refresh_klines(self, symbols):
+        """Busca em paralelo as klines só de quem ainda não tem a barra atual."""
+        bar = int(time.time() // self.TREND_BAR_SECONDS)
+        stale = [s for s in symbols if self.klines.get(s, (None,))[0] != bar]
+        for symbol, closes in zip(stale, self.pool.map(self._closes, stale)):
+            if len(closes):
+                self.klines[symbol] = (bar, closes)
+
+    def take_snapshot(self):
+        """
+        Foto do ciclo: posições, todas as ordens abertas e todos os tickers em paralelo,
+        depois as klines dos símbolos com posição. As ordens alimentam o cache do replacer.
+        """
+        jobs = [self.pool.submit(fn) for fn in (self.transport.get_positions, self.transport.get_open_orders, self._tickers)]
+        positions, orders, tickers = (job.result() for job in jobs)
+        positions = positions if isinstance(positions, list) else []
+        self.cached_positions = (time.time(), positions)
+
+        symbols = [p['symbol'] for p in positions if p.get('symbol')]
+        if isinstance(orders, list):
+            self.replacer.cache.load(orders, symbols)
+        self._refresh_klines(symbols)
+        return {'positions': positions, 'tickers': tickers, 'taken_at': time.time()}
+
+    def trend_emas(self, symbols, prices):
+        """
+        EMA50 (1h) de todos os símbolos numa passada: matriz de closes (uma coluna por símbolo),
+        com o último close trocado pelo preço atual. {symbol: ema}
         """
-        Escaneia e protege posições ativas.
+        series = {s: self.klines[s][1] for s in symbols if s in self.klines}
+        if not series:
+            return {}
+        width = max(len(c) for c in series.values())
+        matrix = np.full((width, len(series)), np.nan)
+        for i, (s, closes) in enumerate(series.items()):
+            matrix[-len(closes):, i] = closes
+            if prices.get(s):
+                matrix[-1, i] = prices[s]
+        ema = pd.DataFrame(matrix, columns=list(series)).ewm(span=self.TREND_PERIOD, adjust=False).mean().iloc[-1]
+        return ema.dropna().to_dict()
+
+    # --- PASSADA ---
+
+    def manage_positions(self, wall_intel=None, obi_data=None, force=False, snapshot=None):
+        """
+        Escaneia e protege posições ativas (uma passada para todas).
         Aceita 'wall_intel' (Dict) do Book Scanner.
         Aceita 'obi_data' (Dict) do Technical Oracle.
+        Sem `force`, respeita a cadência: retorna False se a última passada foi há menos de `interval`.
+        `snapshot` reaproveita uma foto já tirada (take_snapshot) pelo chamador.
         """
+        if not force and not self.claim():
+            return False
         try:
-            positions = self.transport.get_positions()
-            if not positions: return
+            self.trailing.start() # Idempotente
+            snapshot = snapshot or self.take_snapshot()
+            positions = snapshot['positions']
+            if not positions: return True
             
             # --- HEDGE MONITOR (BTC vs ETH) ---
             # Verifica se o lucro do ETH cobre o prejuízo do BTC para saída estratégica
             self._check_hedge_exit(positions, obi_data)
             # ----------------------------------
 
+            # Tabela de todas as posições: lado, qtd, entrada, preço atual (ticker ou mark), ROI
+            rows = []
             for pos in positions:
-                symbol = pos.get('symbol')
-                side = pos.get('side')
-                
                 # Fix: API returns 'netQuantity', not 'quantity'
                 qty = float(pos.get('netQuantity', pos.get('quantity', 0)))
-                
-                if not side: 
-                    if qty > 0: side = "Long"
-                    elif qty < 0: side = "Short"
-                    else: continue
-                
-                print(f"DEBUG: {symbol} | Side: {side} | Qty: {qty}")
+                side = pos.get('side') or ("Long" if qty > 0 else "Short" if qty < 0 else None)
+                price = snapshot['tickers'].get(pos.get('symbol')) or float(pos.get('markPrice') or 0)
+                if side and price and pos.get('entryPrice'):
+                    rows.append((pos['symbol'], side, qty, float(pos['entryPrice']), price))
+            if not rows: return True
+            df = pd.DataFrame(rows, columns=['symbol', 'side', 'qty', 'entry', 'price'])
+            sign = np.where(df['side'] == "Long", 1.0, -1.0)
+            df['roi'] = sign * (df['price'] - df['entry']) / df['entry']
+            prices = dict(zip(df['symbol'], df['price']))
+            df['ema'] = df['symbol'].map(self.trend_emas(list(df['symbol']), prices))
 
-                entry_price = float(pos.get('entryPrice'))
-                ticker = self.transport.get_ticker(symbol)
-                if not ticker: continue
-                current_price = float(ticker.get('lastPrice')) 
+            for symbol, side, qty, entry_price, current_price, roi, ema_50 in df.itertuples(index=False):
+                print(f"DEBUG: {symbol} | Side: {side} | Qty: {qty}")
                 
                 # 0. OBI RESCUE (Novo: Sair com perdas mínimas se fluxo virar)
                 if obi_data and symbol in obi_data:
@@ -56,7 +182,7 @@ class PositionManager:
                         continue
 
                 # 1. CHECK TREND ALIGNMENT (Trend Guard)
-                if self._check_trend_invalidation(symbol, side, current_price):
+                if self._check_trend_invalidation(symbol, side, current_price, ema_50):
                     print(f"   ️ TREND REVERSAL DETECTED em {symbol}! Mudando Estratégia...")
                     self._emergency_close(symbol, side, qty)
                     continue 
@@ -78,38 +204,23 @@ class PositionManager:
                              self._emergency_close(symbol, side, qty * 0.5) # Reduzir mão pela metade
                              # TODO: Mover SL para entrada
 
-                # 2. CHECK PROFITABILITY & TRAILING STOP
-                # OVERRIDE MESTRE: Manual Exit / Infinite Profit
-                # Lógica relaxada para permitir que o Mestre saia manualmente no alvo de 3% ou mais.
-                # Só ativa proteção se o lucro for muito bom.
+                # 2. PROFITABILITY & TRAILING STOP
+                # Breakeven (+1.5%) e trailing (+3.0%) ficam no TrailingEngine (self.trailing), por tick de mark price.
 
-                if side == "Long":
-                    roi = (current_price - entry_price) / entry_price
-                else:
-                    roi = (entry_price - current_price) / entry_price
-                
-                # Regra Infinite Profit:
-                # Se ROI > 3.0% -> Ativa Trailing Stop (1.0% de distância) - Garante lucro gordo
-                # Se ROI > 1.5% -> Ativa Breakeven (Protege o trade)
-                # Antes disso -> Deixa oscilar.
-                
-                if roi >= 0.03: # 3.0% Lucro (Alvo do Mestre)
-                    self._apply_trailing_stop(symbol, side, current_price, roi)
-                elif roi >= 0.015: # 1.5% Lucro
-                    self._move_to_breakeven(symbol, side, entry_price)
-                
                 # Log de Status para o Mestre acompanhar no App
                 if roi > 0:
                     print(f"    {symbol} LUCRO: {roi*100:.2f}% (Deixando Correr...)")
+            return True
 
         except Exception as e:
             print(f"️ Erro no Position Manager: {e}")
+            return False
 
     def _ensure_exit_orders(self, symbol, side, entry_price, quantity, current_price):
         """
         Garante que existam TP (Limit Maker) e SL (Stop Market) para a posição.
         """
-        open_orders = self.transport.get_open_orders(symbol)
+        open_orders = self.replacer.cache.get(symbol)
         
         has_tp = False
         has_sl = False
@@ -168,6 +279,7 @@ class PositionManager:
             # Envia imediatamente
             res = self.transport._send_request("POST", "/api/v1/order", "orderExecute", payload)
             if res:
+                self.replacer.cache.on_placed(symbol, res)
                 print(f"       SL de Emergência Criado: {sl_price}")
             else:
                 print(f"       FALHA AO CRIAR SL DE EMERGÊNCIA EM {symbol}!")
@@ -182,39 +294,6 @@ class PositionManager:
 
         # Removed redundant SL block (Moved to top priority)
 
-    def _apply_trailing_stop(self, symbol, side, current_price, roi):
-        """
-        Ajusta o Stop Loss dinamicamente para acompanhar o lucro.
-        Distância do Trailing Scalp: 0.5% do Preço Atual.
-        """
-        trailing_dist = 0.005 # 0.5% de distância (Scalp Apertado)
-        
-        if side == "Long":
-            new_sl = current_price * (1 - trailing_dist)
-        else:
-            new_sl = current_price * (1 + trailing_dist)
-            
-        self._update_stop_if_better(symbol, side, new_sl, "TRAILING SCALP")
-
-    def _move_to_breakeven(self, symbol, side, entry_price):
-        """
-        Move o SL para o preço de entrada (Breakeven) + Taxas (0.2%).
-        Garante que saímos no verde (ou pagando o café).
-        """
-        fee_buffer = 0.002 # 0.2% de buffer para taxas
-        
-        if side == "Long":
-            new_sl = entry_price * (1 + fee_buffer)
-        else:
-            new_sl = entry_price * (1 - fee_buffer)
-            
-        # Ajuste de precisão
-        if "BTC" in symbol: new_sl = round(new_sl, 1)
-        elif "ETH" in symbol: new_sl = round(new_sl, 2)
-        else: new_sl = round(new_sl, 4)
-            
-        self._update_stop_if_better(symbol, side, new_sl, "BREAKEVEN PLUS")
-
     def _apply_wall_protection(self, symbol, side, current_price, wall_data):
         """
         Ajusta TP ou SL baseado na presença de Paredões.
@@ -247,78 +326,21 @@ class PositionManager:
         """
         Atualiza TP Limit se o novo for mais seguro (mais perto do preço atual) que o antigo.
         """
-        open_orders = self.transport.get_open_orders(symbol)
-        tp_order = None
-        for o in open_orders:
-            if o.get('orderType') == 'Limit':
-                o_side = o.get('side')
-                if (side == "Long" and o_side == "Ask") or (side == "Short" and o_side == "Bid"):
-                    tp_order = o
-                    break
+        tp_side = "Bid" if side == "Short" else "Ask"
+        current_tp = self.replacer.current_limit(symbol, tp_side)
         
-        should_update = False
-        if tp_order:
-            current_tp = float(tp_order.get('price'))
-            # Se Short, TP é Buy. Se novo TP > TP atual (mais perto do preço de entrada/atual), é "pior" pro lucro máximo,
-            # MAS é "melhor" pra segurança (garante saída antes do wall).
-            # Na verdade, queremos garantir que a saída aconteça.
-            # Se o Wall está em 100 e nosso TP está em 90, o preço bate no wall e volta. Nunca pega 90.
-            # Então temos que SUBIR o TP do Short para 100.1.
-            
-            if side == "Short" and new_tp > current_tp:
-                should_update = True
-            elif side == "Long" and new_tp < current_tp:
-                should_update = True
-        else:
-            should_update = True
-
-        if should_update:
+        # Se o Wall está em 100 e nosso TP Short está em 90, o preço bate no wall e volta. Nunca pega 90.
+        # Então temos que SUBIR o TP do Short para 100.1 (e descer o do Long).
+        if current_tp is None:
+            # Sem TP no livro não sabemos a qtd a proteger (Infinite Profit Mode): apenas sugere
+            print(f"   ️ WALL GUARD: Sugestão de TP para {symbol} em {new_tp:.4f} (Sem TP ativo)")
+            return
+        
+        if (side == "Short" and new_tp > current_tp) or (side == "Long" and new_tp < current_tp):
             print(f"   ️ WALL GUARD: Movendo TP de {symbol} para {new_tp:.4f} (Antes do Paredão)")
-            if tp_order:
-                self.transport._send_request("DELETE", "/api/v1/order", "orderCancel", {'symbol': symbol, 'orderId': tp_order['id']})
-            
-            # Re-post Limit Maker
-            tp_side = "Bid" if side == "Short" else "Ask"
-            qty = "0" # Need logic to get position size... 
-            # Simplificação: O Position Manager já sabe a qtd da posição no loop principal, 
-            # mas aqui é helper. Vamos pegar a posição de novo ou passar como arg.
-            # Para não complicar, vamos pular a execução se não tivermos a qtd.
-            # Melhor: Apenas logar a sugestão por enquanto, pois cancelar ordem sem saber qtd exata é risco.
-            # Vou implementar a execução real no loop principal se necessário.
-            pass
+            # Reaproveita a qtd do TP atual; replace coloca o novo antes de cancelar o antigo
+            self.replacer.submit_limit(symbol, tp_side, self._round_price(symbol, new_tp))
 
-    def _update_stop_if_better(self, symbol, side, new_sl, mode):
-        """
-        Helper para atualizar SL apenas se melhorar a posição.
-        """
-        open_orders = self.transport.get_open_orders(symbol)
-        sl_order = None
-        for o in open_orders:
-            o_type = o.get('orderType')
-            trigger = float(o.get('triggerPrice', 0)) if o.get('triggerPrice') else 0
-            is_stop = 'Stop' in o_type or (o_type == 'Market' and trigger > 0)
-            
-            if is_stop:
-                o_side = o.get('side')
-                if (side == "Long" and o_side == "Ask") or (side == "Short" and o_side == "Bid"):
-                    sl_order = o
-                    break
-        
-        should_update = False
-        if sl_order:
-            current_trigger = float(sl_order.get('triggerPrice'))
-            if side == "Long" and new_sl > current_trigger: # Subir SL
-                should_update = True
-            elif side == "Short" and new_sl < current_trigger: # Descer SL
-                should_update = True
-        else:
-            should_update = True # Sem SL, cria um
-
-        if should_update:
-            print(f"   ️ {mode}: Atualizando SL de {symbol} para ${new_sl:.4f}")
-            if sl_order:
-                self.transport._send_request("DELETE", "/api/v1/order", "orderCancel", {'symbol': symbol, 'orderId': sl_order['id']})
-            self._place_stop(symbol, side, new_sl)
     def _check_obi_rescue(self, symbol, side, obi, entry_price, current_price):
         """
         Verifica se o fluxo (OBI) virou drasticamente contra a posição.
@@ -354,20 +376,17 @@ class PositionManager:
             
         return action_taken
 
-    def _check_trend_invalidation(self, symbol, side, current_price):
+    def _check_trend_invalidation(self, symbol, side, current_price, ema_50=None):
         """
         Verifica se a tendência mudou contra a posição (Cruzamento EMA 50).
+        ema_50 vem da passada (trend_emas); sem ela, calcula a partir das klines em cache.
         Retorna True se DEVE FECHAR.
         """
         try:
-            # Reutiliza lógica de EMA do Gatekeeper
-            klines = self.transport.get_klines(symbol, "1h", limit=60)
-            if not klines: return False
-            
-            df = pd.DataFrame(klines)
-            df['close'] = df['close'].astype(float)
-            ema_series = df['close'].ewm(span=50, adjust=False).mean()
-            ema_50 = ema_series.iloc[-1]
+            if ema_50 is None or pd.isna(ema_50):
+                self._refresh_klines([symbol])
+                ema_50 = self.trend_emas([symbol], {symbol: current_price}).get(symbol)
+            if ema_50 is None: return False
             
             # Regra: Se Long e Preço < EMA50 -> Invalidou
             if side == "Long" and current_price < ema_50:
@@ -444,37 +463,7 @@ class PositionManager:
             "quantity": str(abs(float(qty)))
         }
         self.transport._send_request("POST", "/api/v1/order", "orderExecute", payload)
+        self.replacer.cache.invalidate(symbol)
         
-    def _place_stop(self, symbol, side, price):
-        """
-        Envia ordem de Stop Market.
-        """
-        # Side do Stop é oposto à posição
-        stop_side = "Ask" if side == "Long" else "Bid"
-        
-        # Rounding logic
-        if "BTC" in symbol: price = round(price, 1)
-        elif "ETH" in symbol: price = round(price, 2)
-        else: price = round(price, 4)
-
-        # Precisamos da quantidade para ser seguro?
-        # A API da Backpack exige quantidade.
-        # Vamos buscar a posição novamente para ter certeza.
-        positions = self.transport.get_positions()
-        pos = next((p for p in positions if p['symbol'] == symbol), None)
-        
-        if pos:
-            # Fix: API returns 'netQuantity', not 'quantity'
-            qty_val = float(pos.get('netQuantity', pos.get('quantity', 0)))
-            quantity = str(abs(qty_val))
-            
-            payload = {
-                "symbol": symbol,
-                "side": stop_side,
-                "orderType": "Market",
-                "quantity": quantity,
-                "triggerPrice": str(price),
-                "triggerQuantity": quantity
-            }
-            
-            self.transport._send_request("POST", "/api/v1/order", "orderExecute", payload)
+    def _round_price(self, symbol, price):
+        return self.markets.quantizer(symbol).round_price(price)
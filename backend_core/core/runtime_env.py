@@ -0,0 +1,69 @@
+"""
+ RUNTIME ENV (Bootstrap do Processo)
+Config/credenciais carregadas uma única vez por processo e sessão HTTP compartilhada.
+Sem imports pesados no topo: dotenv/requests só entram quando usados.
+"""
+import os
+import threading
+
+_lock = threading.Lock()
+_env = {'path': None, 'mtime': None}
+_sessions = {}
+
+
+def env_path():
+    """
+    Mesmo .env que o load_dotenv() dos transports encontrava: busca a partir de core/ para cima.
+    OBI_ENV_FILE força outro arquivo ('' desliga o .env, ex.: benchmarks com chaves de papel).
+    """
+    forced = os.environ.get('OBI_ENV_FILE')
+    if forced is not None:
+        return forced
+    from dotenv import find_dotenv
+    return find_dotenv()
+
+
+def load_env(override=True):
+    """
+    Carrega o .env uma vez por processo. Chamadas seguintes só relêem se o arquivo mudou
+    (mesma garantia do antigo load_dotenv(override=True) em cada transport: chave nova entra).
+    """
+    with _lock:
+        if _env['path'] is None:
+            _env['path'] = env_path()
+        path = _env['path']
+        if not path:
+            return False
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        if mtime == _env['mtime']:
+            return False
+        from dotenv import load_dotenv
+        load_dotenv(path, override=override)
+        _env['mtime'] = mtime
+        return True
+
+
+def reset():
+    """Esquece o .env já aplicado (filho do daemon recebe o ambiente do cliente e recarrega)."""
+    with _lock:
+        _env['path'] = None
+        _env['mtime'] = None
+
+
+def credentials(api_key=None, api_secret=None):
+    load_env()
+    return api_key or os.getenv('BACKPACK_API_KEY'), api_secret or os.getenv('BACKPACK_API_SECRET')
+
+
+def http_session():
+    """requests.Session do processo: conexões keep-alive reaproveitadas entre transports."""
+    key = os.getpid()
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            import requests
+            session = _sessions[key] = requests.Session()
+        return session
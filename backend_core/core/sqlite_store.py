@@ -0,0 +1,200 @@
+import os
+import queue
+import atexit
+import asyncio
+import logging
+import sqlite3
+import threading
+from itertools import groupby
+from contextlib import contextmanager
+
+
+class SQLiteStore:
+    """
+     SQLITE STORE (Pool + WAL + Escrita em Lote)
+    Uma instância por (processo, arquivo): shared(path) devolve sempre a mesma.
+    - Pool de conexões em WAL (leitores não bloqueiam o escritor), synchronous=NORMAL.
+    - Statements preparados ficam no cache de cada conexão (mesmo SQL = sem novo parse).
+    - enqueue() acumula escritas e grava tudo em uma transação (executemany por SQL)
+      a cada flush_interval ou quando o buffer chega a batch_size.
+    - Leituras e escritas imediatas fazem flush antes, então enxergam o que foi enfileirado.
+    """
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path, pool_size=4, batch_size=200, flush_interval=1.0, logger=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.logger = logger or logging.getLogger("SQLiteStore")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self.pool.put(self._connect())
+        self.write_lock = threading.RLock()
+        self.pending = []
+        self.cond = threading.Condition()
+        self.is_running = True
+        self._aio = None
+        self.flusher = threading.Thread(target=self._flush_loop, name=f"SQLiteStore-{os.path.basename(path)}", daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def shared(cls, path, **kwargs):
+        """Store compartilhado do processo para `path` (após fork, o filho abre o seu)."""
+        key = (os.getpid(), os.path.abspath(path))
+        with cls._shared_lock:
+            store = cls._shared.get(key)
+            if store is None:
+                store = cls._shared[key] = cls(path, **kwargs)
+            return store
+
+    @property
+    def aio(self):
+        """Fachada assíncrona sobre este store."""
+        if self._aio is None:
+            self._aio = AsyncSQLiteStore(self)
+        return self._aio
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self.pool.get()
+        try:
+            yield conn
+        finally:
+            self.pool.put(conn)
+
+    # --- ESCRITA ---
+
+    def executescript(self, script):
+        """DDL (CREATE TABLE/INDEX...). Idempotente se o script usar IF NOT EXISTS."""
+        with self.write_lock, self.connection() as conn:
+            conn.executescript(script)
+
+    def execute(self, sql, params=()):
+        """Escrita imediata (commit antes de retornar). Retorna rowcount."""
+        with self.write_lock:
+            self._flush_locked()
+            with self.connection() as conn, conn:
+                return conn.execute(sql, params).rowcount
+
+    def executemany(self, sql, rows):
+        with self.write_lock:
+            self._flush_locked()
+            with self.connection() as conn, conn:
+                return conn.executemany(sql, rows).rowcount
+
+    def enqueue(self, sql, params=()):
+        """Agenda uma escrita para o próximo lote. Não bloqueia."""
+        with self.cond:
+            self.pending.append((sql, tuple(params)))
+            if len(self.pending) >= self.batch_size:
+                self.cond.notify()
+
+    def flush(self):
+        """Grava o buffer agora. Retorna quantas escritas foram aplicadas."""
+        with self.write_lock:
+            return self._flush_locked()
+
+    def _flush_locked(self):
+        with self.cond:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return 0
+        try:
+            with self.connection() as conn, conn:
+                # SQL consecutivos iguais viram um único executemany (ordem preservada)
+                for sql, group in groupby(batch, key=lambda item: item[0]):
+                    conn.executemany(sql, [params for _, params in group])
+        except sqlite3.Error as e:
+            # Lote revertido: regrava uma a uma para descartar só as escritas inválidas
+            self.logger.warning(f" {self.path}: lote de {len(batch)} escritas falhou ({e}), regravando individualmente")
+            return self._replay_locked(batch)
+        return len(batch)
+
+    def _replay_locked(self, batch):
+        applied = 0
+        with self.connection() as conn:
+            for sql, params in batch:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                    applied += 1
+                except sqlite3.Error as e:
+                    self.logger.error(f" {self.path}: escrita descartada ({e}): {sql} {params}")
+        return applied
+
+    def _flush_loop(self):
+        while True:
+            with self.cond:
+                if self.is_running and len(self.pending) < self.batch_size:
+                    self.cond.wait(self.flush_interval)
+                if not self.is_running:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f" {self.path}: falha no flush ({e})")
+
+    # --- LEITURA ---
+
+    def query(self, sql, params=()):
+        """Lista de dicts."""
+        self.flush()
+        with self.connection() as conn:
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    def query_one(self, sql, params=()):
+        rows = self.query(sql, params)
+        return rows[0] if rows else None
+
+    def close(self):
+        if not self.is_running:
+            return
+        with self.cond:
+            self.is_running = False
+            self.cond.notify_all()
+        self.flush()
+        while not self.pool.empty():
+            self.pool.get().close()
+
+
+class AsyncSQLiteStore:
+    """
+     ASYNC SQLITE STORE
+    Fachada para código asyncio: leituras e escritas imediatas rodam em thread
+    (o event loop não bloqueia em I/O de disco); enqueue() só bufferiza.
+    """
+    def __init__(self, store):
+        self.store = store
+
+    def enqueue(self, sql, params=()):
+        self.store.enqueue(sql, params)
+
+    async def execute(self, sql, params=()):
+        return await asyncio.to_thread(self.store.execute, sql, params)
+
+    async def executemany(self, sql, rows):
+        return await asyncio.to_thread(self.store.executemany, sql, rows)
+
+    async def executescript(self, script):
+        return await asyncio.to_thread(self.store.executescript, script)
+
+    async def query(self, sql, params=()):
+        return await asyncio.to_thread(self.store.query, sql, params)
+
+    async def query_one(self, sql, params=()):
+        return await asyncio.to_thread(self.store.query_one, sql, params)
+
+    async def flush(self):
+        return await asyncio.to_thread(self.store.flush)
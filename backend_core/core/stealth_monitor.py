@@ -15,6 +15,7 @@ from backpack_auth import BackpackAuth
 from technical_oracle import TechnicalOracle
 from position_manager import PositionManager
 from book_scanner import BookScanner
+from account_state import attach_account_state
 
 # Configurar Logging
 logging.basicConfig(
@@ -33,7 +34,8 @@ async def stealth_monitor():
     logger.info("   -> Monitorando posições, ajustando TP (Maker) e SL (Safety).")
     logger.info("   -> Wall Guardian & OBI Rescue Ativos.")
 
-    transport = BackpackTransport()
+    # Lê posições/ordens do Account State Service se estiver rodando (sem polling privado duplicado)
+    transport = attach_account_state(BackpackTransport())
     auth = BackpackAuth(os.getenv('BACKPACK_API_KEY'), os.getenv('BACKPACK_API_SECRET'))
     data_client = BackpackData(auth)
     oracle = TechnicalOracle(data_client)
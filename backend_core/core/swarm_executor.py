@@ -0,0 +1,195 @@
+import time
+import asyncio
+import logging
+import numpy as np
+
+try:
+    from .precision_guardian import PrecisionGuardian
+    from .maker_engine import top_of_book
+    from .order_replace import api_side
+except ImportError:
+    from precision_guardian import PrecisionGuardian
+    from maker_engine import top_of_book
+    from order_replace import api_side
+
+
+class RateBudget:
+    """Token bucket assíncrono: no máximo `rate` requisições/s, com rajada de até `burst`."""
+    def __init__(self, rate=10.0, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SwarmExecutor:
+    """
+     SWARM EXECUTOR (Entrada Simultânea)
+    Abre N posições de uma vez, sem o ativo N entrar segundos depois do primeiro:
+    - Pré-carrega filtros, posições e books uma única vez.
+    - Calcula todas as fatias de uma vez (NumPy), descartando as abaixo do mínimo da corretora.
+    - Dispara entrada + bracket (TP/SL reduceOnly) de todos os alvos em paralelo,
+      dentro do orçamento de requisições (RateBudget).
+    - Rollback: fill parcial abaixo de min_fill_ratio ou SL rejeitado -> zera o que entrou.
+    Retorna relatório com skew de entrada por ativo e falhas.
+    """
+    def __init__(self, transport, guardian=None, rate_limit=10.0, burst=None, min_fill_ratio=0.5, logger=None):
+        self.transport = transport
+        self.guardian = guardian or PrecisionGuardian(transport)
+        self.budget = RateBudget(rate_limit, burst)
+        self.min_fill_ratio = min_fill_ratio
+        self.logger = logger or logging.getLogger("SwarmExecutor")
+
+    async def call(self, fn, *args, **kwargs):
+        """Chamada síncrona (transport/data client) em thread, dentro do orçamento de requisições."""
+        await self.budget.acquire()
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def _post(self, payload):
+        return await self.call(self.transport._send_request, "POST", "/api/v1/order", "orderExecute", payload)
+
+    # --- PREPARAÇÃO ---
+
+    async def prefetch(self, symbols):
+        """Filtros (uma chamada a /markets cobre todos), posições e books de todos os alvos."""
+        filters = await asyncio.to_thread(self.guardian.prefetch, symbols)
+        positions, *depths = await asyncio.gather(
+            self.call(self.transport.get_positions),
+            *[self.call(self.transport.get_orderbook_depth, s) for s in symbols]
+        )
+        open_symbols = {p['symbol'] for p in (positions or []) if float(p.get('netQuantity', 1) or 0) != 0}
+        return {
+            'filters': filters,
+            'open': open_symbols,
+            'books': {s: top_of_book(d) for s, d in zip(symbols, depths)},
+        }
+
+    @staticmethod
+    def size(targets, books, filters, slice_capital, leverage):
+        """
+        Quantidade de cada fatia em uma passada: notional / preço de referência (ask na compra,
+        bid na venda), floor no stepSize. Retorna (qty, ref_price, ok) como arrays.
+        """
+        prices = np.array([(books[s][1] if side == "Buy" else books[s][0]) or np.nan for s, side in targets], dtype=float)
+        steps = np.array([filters[s]['stepSize'] for s, _ in targets], dtype=float)
+        min_qty = np.array([filters[s].get('minQuantity', 0) for s, _ in targets], dtype=float)
+        min_notional = np.array([filters[s].get('minNotional', 0) for s, _ in targets], dtype=float)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            qty = np.floor(slice_capital * leverage / prices / steps + 1e-9) * steps
+        ok = np.isfinite(qty) & (qty >= np.maximum(min_qty, steps)) & (qty * prices >= min_notional)
+        return np.nan_to_num(qty), prices, ok
+
+    # --- EXECUÇÃO ---
+
+    async def deploy(self, targets, slice_capital, leverage=5, tp_pct=0.015, sl_pct=0.15):
+        """
+        targets: [(symbol, 'Buy'|'Sell')]. Retorna relatório
+        {legs: {symbol: {...}}, opened, failed, rolled_back, max_skew_ms, prefetch_ms, total_ms}.
+        """
+        started = time.perf_counter()
+        snapshot = await self.prefetch([s for s, _ in targets])
+        prefetch_ms = (time.perf_counter() - started) * 1000
+
+        legs, plan = {}, []
+        live = [(s, side) for s, side in targets if s not in snapshot['open'] and snapshot['books'].get(s, (None,))[0]]
+        for s, _ in targets:
+            if s in snapshot['open']:
+                legs[s] = {'status': 'skipped', 'error': 'posição já aberta'}
+            elif not snapshot['books'].get(s, (None,))[0]:
+                legs[s] = {'status': 'skipped', 'error': 'sem book'}
+        if live:
+            qty, prices, ok = self.size(live, snapshot['books'], snapshot['filters'], slice_capital, leverage)
+            for (s, side), q, p, valid in zip(live, qty, prices, ok):
+                if not valid:
+                    legs[s] = {'status': 'skipped', 'error': 'abaixo do mínimo da corretora'}
+                    continue
+                plan.append({'symbol': s, 'side': side, 'qty': float(q),
+                             'qty_fmt': self.guardian.format_quantity(s, q), 'ref_price': float(p)})
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*[self._launch(leg, t0, tp_pct, sl_pct) for leg in plan], return_exceptions=True)
+        for leg, res in zip(plan, results):
+            if isinstance(res, Exception):
+                leg.update({'status': 'failed', 'error': str(res)})
+            legs[leg['symbol']] = leg
+
+        acked = [l['entry_ack_ms'] for l in legs.values() if l.get('entry_ack_ms') is not None]
+        report = {
+            'legs': legs,
+            'opened': sum(1 for l in legs.values() if l['status'] in ('filled', 'partial')),
+            'failed': sum(1 for l in legs.values() if l['status'] == 'failed'),
+            'rolled_back': sum(1 for l in legs.values() if l['status'] == 'rolled_back'),
+            'max_skew_ms': (max(acked) - min(acked)) if acked else 0.0,
+            'prefetch_ms': prefetch_ms,
+            'total_ms': (time.perf_counter() - started) * 1000,
+        }
+        self.logger.info(
+            f" SWARM: {report['opened']} abertas | {report['failed']} falhas | {report['rolled_back']} rollback | "
+            f"skew {report['max_skew_ms']:.0f}ms | prefetch {prefetch_ms:.0f}ms | total {report['total_ms']:.0f}ms"
+        )
+        return report
+
+    async def _launch(self, leg, t0, tp_pct, sl_pct):
+        symbol, side = leg['symbol'], leg['side']
+        leg['entry_sent_ms'] = (time.perf_counter() - t0) * 1000
+        res = await self._post({"symbol": symbol, "side": api_side(side), "orderType": "Market", "quantity": leg['qty_fmt']})
+        leg['entry_ack_ms'] = (time.perf_counter() - t0) * 1000
+        if not res or 'id' not in res:
+            leg.update({'status': 'failed', 'error': 'entrada rejeitada'})
+            return leg
+
+        filled = float(res.get('executedQuantity') or leg['qty'])
+        quote = float(res.get('executedQuoteQuantity') or 0)
+        leg['filled_qty'] = filled
+        leg['entry_price'] = quote / filled if quote and filled else leg['ref_price']
+
+        if filled < leg['qty'] * self.min_fill_ratio:
+            await self._rollback(leg, f"fill parcial {filled}/{leg['qty']}")
+            return leg
+
+        exit_side = api_side("Sell" if side == "Buy" else "Buy")
+        qty_fmt = self.guardian.format_quantity(symbol, filled)
+        sign = 1 if side == "Buy" else -1
+        tp_price = self.guardian.format_price(symbol, leg['entry_price'] * (1 + sign * tp_pct))
+        sl_price = self.guardian.format_price(symbol, leg['entry_price'] * (1 - sign * sl_pct))
+        tp, sl = await asyncio.gather(
+            self._post({"symbol": symbol, "side": exit_side, "orderType": "Limit", "quantity": qty_fmt,
+                        "price": tp_price, "timeInForce": "GTC", "reduceOnly": True}),
+            self._post({"symbol": symbol, "side": exit_side, "orderType": "Market", "quantity": qty_fmt,
+                        "triggerPrice": sl_price, "triggerQuantity": qty_fmt, "reduceOnly": True}),
+        )
+        leg.update({'tp': tp_price, 'sl': sl_price,
+                    'tp_id': tp.get('id') if tp else None, 'sl_id': sl.get('id') if sl else None})
+        if not leg['sl_id']:
+            await self._rollback(leg, "SL rejeitado")
+            return leg
+        leg['status'] = 'filled' if filled >= leg['qty'] * (1 - 1e-9) else 'partial'
+        leg['bracket_ms'] = (time.perf_counter() - t0) * 1000 - leg['entry_ack_ms']
+        return leg
+
+    async def _rollback(self, leg, reason):
+        """Zera o que entrou (reduceOnly a mercado) e cancela o TP órfão."""
+        symbol, filled = leg['symbol'], leg.get('filled_qty', 0)
+        self.logger.warning(f"↩️ {symbol}: rollback ({reason})")
+        if leg.get('tp_id'):
+            await self.call(self.transport.cancel_order, symbol, leg['tp_id'])
+        closed = None
+        if filled > 0:
+            close_side = api_side("Sell" if leg['side'] == "Buy" else "Buy")
+            closed = await self._post({"symbol": symbol, "side": close_side, "orderType": "Market",
+                                       "quantity": self.guardian.format_quantity(symbol, filled), "reduceOnly": True})
+        leg.update({'status': 'rolled_back', 'error': reason,
+                    'rollback_ok': filled <= 0 or bool(closed and closed.get('id'))})
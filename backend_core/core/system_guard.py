@@ -1,9 +1,10 @@
 import os
 import sys
 import json
-import glob
+import time
+import hashlib
 import re
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add core path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -17,16 +18,24 @@ except ImportError:
     sys.path.append(os.path.join(parent_dir, 'core'))
     from backpack_transport import BackpackTransport
 
+# Diretórios que não guardam .env do projeto e custam caro para varrer (ocultos também são pulados)
+IGNORE_DIRS = frozenset({'node_modules', '__pycache__', 'venv', 'site-packages', 'dist', 'build', 'target', 'logs'})
+
+
 class IdentityGuard:
     """
     ️ SYSTEM GUARD: PROTOCOLO ZERO TRUST IDENTITY
     Verifica se as chaves ativas correspondem à conta com fundos.
     Se falhar, busca automaticamente a 'Solução Atômica' (keys corretas em outros arquivos).
+    A varredura poda diretórios ignorados e guarda mtime/hash de cada arquivo e o resultado
+    de cada chave (data/identity_guard.json, sem segredos): rodadas seguintes só testam o que mudou.
     """
     
-    def __init__(self):
+    def __init__(self, ignore=IGNORE_DIRS, cache_path=None):
         self.project_root = parent_dir
         self.active_env_file = os.path.join(self.project_root, '.env')
+        self.ignore = frozenset(ignore)
+        self.cache_path = cache_path or os.path.join(self.project_root, 'data', 'identity_guard.json')
         
     def _extract_keys_from_file(self, filepath):
         """Extrai chaves API e Secret de um arquivo .env ou similar."""
@@ -51,14 +60,19 @@ class IdentityGuard:
         return None
 
     def _check_balance(self, api_key, api_secret):
-        """Retorna o saldo total (Equity + Assets) para um par de chaves."""
+        """
+        Retorna o saldo total (Equity + Assets) para um par de chaves.
+        (None, None) se nenhuma consulta respondeu (rede/API fora): saldo desconhecido, não zero.
+        """
         transport = BackpackTransport(api_key=api_key, api_secret=api_secret)
         total_balance = 0.0
+        answered = False
         details = {'futures': 0.0, 'spot_usdc': 0.0, 'points': 0}
         
         # 1. Futures Check
         try:
             collateral = transport.get_capital()
+            answered = isinstance(collateral, dict)
             if collateral and isinstance(collateral, dict) and 'totalEquity' in collateral:
                 equity = float(collateral.get('totalEquity', 0))
                 details['futures'] = equity
@@ -71,6 +85,7 @@ class IdentityGuard:
         # 2. Spot Check (Assets)
         try:
             assets = transport.get_assets()
+            answered = answered or isinstance(assets, dict)
             if assets and isinstance(assets, dict):
                 # Check USDC
                 if 'USDC' in assets:
@@ -83,60 +98,189 @@ class IdentityGuard:
         except:
             pass
             
+        if not answered:
+            return None, None
         return total_balance, details
 
-    def find_atomic_solution(self):
+    def _discover(self):
+        """
+        Mesmos candidatos do antigo glob ('.env' e '*.env' em qualquer nível, sem diretórios ocultos),
+        mas numa varredura que não desce em IGNORE_DIRS (node_modules do obi_solana_core etc.).
+        """
+        found = []
+        stack = [self.project_root]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    name = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if not name.startswith('.') and name not in self.ignore:
+                            stack.append(entry.path)
+                    elif name == '.env' or (name.endswith('.env') and not name.startswith('.')):
+                        found.append(entry.path)
+        # .env ativo primeiro: é a chave que mais interessa testar
+        return sorted(found, key=lambda path: (path != self.active_env_file, path))
+
+    @staticmethod
+    def _key_id(creds):
+        """Identidade da chave no cache: hash do par, nunca o par em si."""
+        return hashlib.sha256(f"{creds['key']}\n{creds['secret']}".encode()).hexdigest()[:16]
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+            return {'files': cache.get('files', {}), 'probes': cache.get('probes', {})}
+        except (OSError, ValueError):
+            return {'files': {}, 'probes': {}}
+
+    def _save_cache(self, cache):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = f"{self.cache_path}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(cache, f, indent=2)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"   ️ Cache não salvo: {e}")
+
+    def _scan(self, files, cache):
+        """
+        Atualiza o cache de arquivos. mtime+tamanho iguais = arquivo não é nem lido;
+        conteúdo com o mesmo hash = mesma chave. Retorna {key_id: creds} das chaves em arquivos alterados.
+        """
+        changed = {}
+        entries = {}
+        for filepath in files:
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                continue
+            entry = cache['files'].get(filepath)
+            if entry and entry['mtime'] == st.st_mtime and entry['size'] == st.st_size:
+                entries[filepath] = entry
+                continue
+            try:
+                with open(filepath, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            except OSError:
+                continue
+            if entry and entry['sha256'] == digest:
+                entries[filepath] = dict(entry, mtime=st.st_mtime, size=st.st_size)
+                continue
+            creds = self._extract_keys_from_file(filepath)
+            key_id = self._key_id(creds) if creds else None
+            entries[filepath] = {'mtime': st.st_mtime, 'size': st.st_size, 'sha256': digest, 'key_id': key_id,
+                                 'key_hint': creds['key'][-5:] if creds else None}
+            if creds:
+                changed.setdefault(key_id, creds)
+        cache['files'] = entries
+        return changed
+
+    def _probe(self, creds):
+        """_check_balance que não derruba a varredura: chave malformada conta como inválida."""
+        try:
+            return self._check_balance(creds['key'], creds['secret'])
+        except Exception:
+            return -1, None
+
+    def _probe_all(self, pending, workers, first_funded):
+        """Testa as chaves em paralelo (no máximo `workers` requisições simultâneas). {key_id: probe}."""
+        results = {}
+        if not pending:
+            return results
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending))), thread_name_prefix="IdentityGuard")
+        try:
+            futures = {pool.submit(self._probe, creds): (key_id, creds) for key_id, creds in pending.items()}
+            for future in as_completed(futures):
+                key_id, creds = futures[future]
+                balance, details = future.result()
+                results[key_id] = {'balance': balance, 'details': details, 'checked_at': time.time()}
+                self._report(creds['source'], creds['key'][-5:], results[key_id])
+                if first_funded and balance is not None and balance > 0:
+                    print("    Chave com saldo encontrada: demais testes cancelados.", flush=True)
+                    break
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    @staticmethod
+    def _report(source, key_hash, probe, cached=False):
+        tag = " (cache)" if cached else ""
+        print(f"    Testando chaves de: {os.path.basename(source)} (Key ...{key_hash}){tag}", flush=True)
+        if probe['balance'] is None:
+            print(f"      ️ Sem resposta da API: saldo desconhecido (testada de novo na próxima rodada).")
+        elif probe['balance'] == -1:
+            print(f"       Chave Inválida/Assinatura Errada.")
+        else:
+            print(f"       Válida! Saldo: ${probe['balance']:.2f} (Points: {probe['details']['points']})")
+
+    def find_atomic_solution(self, first_funded=False, workers=8, refresh=False):
         """
          SOLUÇÃO ATÓMICA
         Varre todos os arquivos .env, testa todas as chaves e encontra a que tem dinheiro.
+        first_funded: para na primeira chave com saldo (em vez de comparar todas).
+        workers: chaves testadas em paralelo. refresh: ignora resultados em cache e testa tudo de novo.
         """
         print("\n [AUTO-HEAL] Iniciando Protocolo de Solução Atômica...", flush=True)
         
-        # 1. Encontrar todos os arquivos .env candidatos
-        candidates = []
-        search_patterns = [
-            os.path.join(self.project_root, '.env'),
-            os.path.join(self.project_root, '**', '.env'),
-            os.path.join(self.project_root, '**', '*.env') # Backups
-        ]
+        # 1. Encontrar todos os arquivos .env candidatos (varredura podada + cache de mtime/hash)
+        found_files = self._discover()
+        cache = self._load_cache()
+        changed = self._scan(found_files, cache)
+        sources = {} # key_id -> primeiro arquivo que tem a chave
+        for filepath in found_files:
+            key_id = cache['files'].get(filepath, {}).get('key_id')
+            if key_id:
+                sources.setdefault(key_id, filepath)
         
-        found_files = []
-        for pattern in search_patterns:
-            found_files.extend(glob.glob(pattern, recursive=True))
-            
-        found_files = list(set(found_files)) # Remove duplicatas
+        # Chaves só de arquivos inalterados reaproveitam o teste anterior
+        cached = {} if refresh else {k: cache['probes'][k] for k in sources if k not in changed and k in cache['probes']}
+        pending = dict(changed)
+        for key_id, filepath in sources.items():
+            if key_id not in pending and key_id not in cached:
+                creds = self._extract_keys_from_file(filepath)
+                if creds:
+                    pending[key_id] = creds
+        print(f"    Arquivos de configuração encontrados: {len(found_files)} "
+              f"({len(sources)} chaves: {len(pending)} a testar, {len(cached)} em cache)")
         
-        print(f"    Arquivos de configuração encontrados: {len(found_files)}")
+        # 2. Testar as chaves (cache primeiro: se já há chave com saldo e basta uma, nem testa)
+        for key_id, probe in cached.items():
+            self._report(sources[key_id], cache['files'][sources[key_id]]['key_hint'], probe, cached=True)
+        funded_cached = first_funded and any(p['balance'] > 0 for p in cached.values())
+        probes = dict(cached)
+        probes.update(self._probe_all({} if funded_cached else pending, workers, first_funded))
         
-        valid_keys = []
+        # Saldo desconhecido (falha de rede) não entra no cache: senão viraria "saldo zero" para sempre
+        cache['probes'] = {k: v for k, v in {**cache['probes'], **probes}.items()
+                           if k in sources and v['balance'] is not None}
+        self._save_cache(cache)
         
-        # 2. Testar cada arquivo
-        for filepath in found_files:
-            creds = self._extract_keys_from_file(filepath)
-            if creds:
-                # Evitar testar a mesma chave duplicada (hash simples)
-                key_hash = creds['key'][-5:] 
-                print(f"    Testando chaves de: {os.path.basename(filepath)} (Key ...{key_hash})", flush=True)
-                
-                balance, details = self._check_balance(creds['key'], creds['secret'])
-                
-                if balance == -1:
-                    print(f"       Chave Inválida/Assinatura Errada.")
-                else:
-                    print(f"       Válida! Saldo: ${balance:.2f} (Points: {details['points']})")
-                    creds['balance'] = balance
-                    creds['details'] = details
-                    valid_keys.append(creds)
+        unknown = sum(1 for probe in probes.values() if probe['balance'] is None)
+        valid_keys = [(probe['balance'], key_id) for key_id, probe in probes.items() if probe['balance'] not in (-1, None)]
         
         # 3. Decisão Atômica
         if not valid_keys:
             print("   ️ Nenhuma chave válida encontrada no sistema.")
+            if unknown:
+                print(f"   -> {unknown} chave(s) sem resposta da API: rode novamente quando a conexão voltar.")
             return False
             
-        # Ordenar por saldo decrescente
-        best_key = sorted(valid_keys, key=lambda x: x['balance'], reverse=True)[0]
+        # Maior saldo vence
+        balance, key_id = max(valid_keys)
         
-        if best_key['balance'] > 0:
+        if balance > 0:
+            best_key = self._extract_keys_from_file(sources[key_id])
+            if not best_key or self._key_id(best_key) != key_id:
+                print("   ️ Arquivo da chave mudou durante a varredura. Rode novamente.")
+                return False
+            best_key['balance'] = balance
+            best_key['details'] = probes[key_id]['details']
             print(f"\n SOLUÇÃO ENCONTRADA: Usar chaves de '{best_key['source']}'")
             print(f"    Saldo Real: ${best_key['balance']:.2f}")
             print(f"    Fingerprint: {best_key['details']}")
@@ -151,6 +295,8 @@ class IdentityGuard:
             print("\n️ ALERTA: Todas as chaves válidas encontradas possuem SALDO ZERO.")
             print("   -> Isso indica que a chave correta (Subconta com fundos) NÃO está em nenhum arquivo .env deste projeto.")
             print("   -> Ação Necessária: Criar nova chave na Subconta correta via UI da Backpack.")
+            if unknown:
+                print(f"   -> {unknown} chave(s) sem resposta da API: rode novamente antes de concluir.")
             return False
 
     def _apply_fix(self, key_data):
@@ -187,5 +333,11 @@ RISK_PER_TRADE=0.02
         print("    Reinicie seus scripts agora para usar a conta correta.")
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Solução Atômica: encontra a chave com saldo nos .env do projeto")
+    parser.add_argument("--first-funded", action="store_true", help="Para na primeira chave com saldo")
+    parser.add_argument("--workers", type=int, default=8, help="Chaves testadas em paralelo")
+    parser.add_argument("--refresh", action="store_true", help="Ignora o cache e testa todas as chaves")
+    args = parser.parse_args()
     guard = IdentityGuard()
-    guard.find_atomic_solution()
+    guard.find_atomic_solution(first_funded=args.first_funded, workers=args.workers, refresh=args.refresh)
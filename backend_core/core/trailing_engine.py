@@ -0,0 +1,358 @@
+import os
+import time
+import json
+import asyncio
+import logging
+import threading
+import requests
+import numpy as np
+
+try:
+    from .sqlite_store import SQLiteStore
+    from .market_registry import MarketRegistry
+    from .order_replace import OrderReplacer, fmt_number
+except ImportError:
+    from sqlite_store import SQLiteStore
+    from market_registry import MarketRegistry
+    from order_replace import OrderReplacer, fmt_number
+
+WS_URL = os.getenv("BACKPACK_WS_URL", "wss://ws.backpack.exchange") # Simulador local: core/exchange_simulator.py
+MARK_PRICES_URL = os.getenv("BACKPACK_API_URL", "https://api.backpack.exchange") + "/api/v1/markPrices"
+# Relativo ao backend_core, não ao CWD: radar, guardian e PositionManager compartilham o mesmo estado
+STATE_PATH = os.getenv("OBI_TRAILING_STATE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "trailing_state.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trailing_state (
+    position_key TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    entry_price REAL NOT NULL,
+    peak_pnl REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class TrailingRule:
+    """
+    Regras em PnL de preço (fração da entrada, sem alavancagem: 0.003 = 0.3%).
+    - activation/callback: trailing contínuo, stop = pico - callback quando o pico passa de activation.
+    - ladder: degraus [(gatilho, trava)], pico >= gatilho -> stop em entrada + trava.
+    - hard_stop: perda máxima, fecha a mercado (None desliga).
+    - place_stops: mantém o Stop Market da corretora no nível do trailing.
+    - close_on_trigger: fecha a mercado quando o PnL cruza o stop (soft stop local).
+    """
+    def __init__(self, activation=0.003, callback=0.001, hard_stop=0.02, ladder=(),
+                 place_stops=False, close_on_trigger=True):
+        self.activation = activation
+        self.callback = callback
+        self.hard_stop = hard_stop
+        ladder = sorted(ladder)
+        self.ladder_triggers = np.array([t for t, _ in ladder], dtype=float)
+        self.ladder_locks = np.array([lock for _, lock in ladder], dtype=float)
+        self.place_stops = place_stops
+        self.close_on_trigger = close_on_trigger
+
+
+class OrderGateway:
+    """
+     ORDER GATEWAY (Saída Única do Trailing)
+    - close(): Market reduceOnly, no máximo um fechamento em voo por símbolo. Retorna a ordem aceita
+      ou None (em voo, erro da API ou resposta sem id).
+    - move_stop(): só melhora o SL; envio coalescido/debounced pelo OrderReplacer.
+    """
+    def __init__(self, transport, replacer=None, logger=None):
+        self.transport = transport
+        self.replacer = replacer or OrderReplacer(transport)
+        self.logger = logger or logging.getLogger("OrderGateway")
+        self.inflight = set()
+        self.lock = threading.Lock()
+
+    def close(self, symbol, side, qty, reason):
+        with self.lock:
+            if symbol in self.inflight:
+                return None
+            self.inflight.add(symbol)
+        try:
+            payload = {
+                "symbol": symbol,
+                "side": "Ask" if side == "Long" else "Bid",
+                "orderType": "Market",
+                "quantity": fmt_number(abs(qty)),
+                "reduceOnly": True
+            }
+            self.logger.warning(f" STOP ({reason}) -> {symbol}")
+            res = self.transport._send_request("POST", "/api/v1/order", "orderExecute", payload)
+            if not isinstance(res, dict) or not res.get("id") or "error" in res or "code" in res:
+                self.logger.error(f" Fechamento rejeitado em {symbol}: {res}")
+                return None
+            self.replacer.cache.invalidate(symbol) # SL antigo some junto com a posição
+            return res
+        finally:
+            with self.lock:
+                self.inflight.discard(symbol)
+
+    def move_stop(self, symbol, side, price, qty):
+        exit_side = "Ask" if side == "Long" else "Bid"
+        current = self.replacer.current_stop(symbol, exit_side)
+        if current is not None and (price <= current if side == "Long" else price >= current):
+            return False
+        self.replacer.submit_stop(symbol, exit_side, price, abs(qty))
+        return True
+
+
+class TrailingEngine:
+    """
+     TRAILING ENGINE (Streaming)
+    Um motor de trailing para todas as posições, alimentado por mark price:
+    - Stream markPrice.<symbol> (WebSocket); sem websockets, /api/v1/markPrices em lote por polling.
+    - Cada tick avalia todas as posições de uma vez (NumPy): pico, nível do stop, gatilhos.
+    - Pico de PnL por posição persistido em SQLite (sobrevive a restart).
+    - Fechamentos e movimentos de SL saem só pelo OrderGateway.
+    Posições: transport.get_positions() a cada positions_interval (com o Account State Service, sem REST).
+    """
+    def __init__(self, transport, rule=None, replacer=None, store_path=STATE_PATH, positions_interval=2.0,
+                 poll_interval=0.5, use_ws=True, on_event=None, logger=None):
+        self.transport = transport
+        self.rule = rule or TrailingRule()
+        self.logger = logger or logging.getLogger("TrailingEngine")
+        self.gateway = OrderGateway(transport, replacer, self.logger)
+        self.markets = MarketRegistry.shared()
+        self.store = SQLiteStore.shared(store_path)
+        self.store.executescript(SCHEMA)
+        self.positions_interval = positions_interval
+        self.poll_interval = poll_interval
+        self.use_ws = use_ws
+        self.on_event = on_event
+        self.is_running = False
+        self.thread = None
+        self.loop = None
+        self.dirty = None
+        self._reset([])
+
+    # --- LIVRO DE POSIÇÕES ---
+
+    def _reset(self, rows):
+        self.keys = [r['key'] for r in rows]
+        self.symbols = [r['symbol'] for r in rows]
+        self.sides = [r['side'] for r in rows]
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.sign = np.array([1.0 if r['side'] == "Long" else -1.0 for r in rows])
+        self.entry = np.array([r['entry'] for r in rows], dtype=float)
+        self.qty = np.array([r['qty'] for r in rows], dtype=float)
+        self.mark = np.array([r['mark'] for r in rows], dtype=float)
+        self.peak = np.array([r['peak'] for r in rows], dtype=float)
+        self.stop_price = np.array([r['stop_price'] for r in rows], dtype=float)
+        self.closing = np.zeros(len(rows), dtype=bool)
+
+    def load_positions(self, positions):
+        """Sincroniza o livro com a lista de posições da API (picos vêm da memória ou do SQLite)."""
+        current = {k: i for i, k in enumerate(self.keys)}
+        rows = []
+        for p in positions or []:
+            qty = float(p.get('netQuantity', p.get('quantity', 0)) or 0)
+            entry = float(p.get('entryPrice', 0) or 0)
+            if qty == 0 or entry <= 0:
+                continue
+            side = p.get('side') or ("Long" if qty > 0 else "Short")
+            key = f"{p['symbol']}:{side}:{entry}"
+            i = current.get(key)
+            rows.append({
+                'key': key, 'symbol': p['symbol'], 'side': side, 'entry': entry, 'qty': abs(qty),
+                'mark': self.mark[i] if i is not None and self.mark[i] > 0 else float(p.get('markPrice', 0) or 0),
+                'peak': self.peak[i] if i is not None else np.nan,
+                'stop_price': self.stop_price[i] if i is not None else np.nan,
+                'closing': bool(self.closing[i]) if i is not None else False,
+            })
+
+        new_keys = [r['key'] for r in rows if r['key'] not in current]
+        if new_keys:
+            marks = ",".join("?" * len(new_keys))
+            saved = {r['position_key']: r['peak_pnl'] for r in self.store.query(
+                f"SELECT position_key, peak_pnl FROM trailing_state WHERE position_key IN ({marks})", new_keys)}
+            for r in rows:
+                if r['key'] in saved:
+                    r['peak'] = saved[r['key']]
+        gone = set(current) - {r['key'] for r in rows}
+        for key in gone:
+            self.store.enqueue("DELETE FROM trailing_state WHERE position_key = ?", (key,))
+
+        closing = [r['closing'] for r in rows]
+        self._reset(rows)
+        self.closing[:] = closing
+        return len(rows)
+
+    def on_mark(self, symbol, price):
+        i = self.index.get(symbol)
+        if i is None or not price:
+            return
+        self.mark[i] = price
+        if self.dirty is not None:
+            self.dirty.set()
+
+    # --- AVALIAÇÃO VETORIZADA ---
+
+    def evaluate(self):
+        """Uma passada sobre todas as posições. Retorna ações [(tipo, símbolo, lado, qtd, info)]."""
+        if not len(self.keys):
+            return []
+        rule = self.rule
+        valid = self.mark > 0
+        pnl = np.where(valid, self.sign * (self.mark - self.entry) / self.entry, np.nan)
+        peak = np.fmax(self.peak, pnl)
+        changed = valid & ~(peak == self.peak)
+        self.peak = peak
+
+        best = np.nan_to_num(peak, nan=-np.inf)
+        stop = np.full(len(best), -np.inf)
+        if rule.activation is not None:
+            stop = np.where(best >= rule.activation, best - rule.callback, stop)
+        if len(rule.ladder_triggers):
+            idx = np.searchsorted(rule.ladder_triggers, best, side='right') - 1
+            stop = np.maximum(stop, np.where(idx >= 0, rule.ladder_locks[np.clip(idx, 0, None)], -np.inf))
+        armed = np.isfinite(stop)
+
+        hard = valid & (pnl <= -rule.hard_stop) if rule.hard_stop else np.zeros(len(best), dtype=bool)
+        trail = valid & armed & (pnl <= stop) if rule.close_on_trigger else np.zeros(len(best), dtype=bool)
+        close = (hard | trail) & ~self.closing
+
+        actions = []
+        for i in np.flatnonzero(close):
+            self.closing[i] = True
+            reason = (f"Hard Stop {pnl[i]*100:.2f}%" if hard[i] else
+                      f"Trailing Stop Hit! Peak: {best[i]*100:.2f}%, Now: {pnl[i]*100:.2f}%")
+            actions.append(("close", self.symbols[i], self.sides[i], float(self.qty[i]), reason))
+
+        if rule.place_stops:
+            for i in np.flatnonzero(armed & ~self.closing):
+                price = self.markets.quantizer(self.symbols[i]).round_price(self.entry[i] * (1 + self.sign[i] * stop[i]))
+                sent = self.stop_price[i]
+                if np.isnan(sent) or (price > sent if self.sign[i] > 0 else price < sent):
+                    self.stop_price[i] = price
+                    actions.append(("stop", self.symbols[i], self.sides[i], float(self.qty[i]), price))
+
+        now = time.time()
+        for i in np.flatnonzero(changed):
+            self.store.enqueue(
+                "INSERT OR REPLACE INTO trailing_state (position_key, symbol, side, entry_price, peak_pnl, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.keys[i], self.symbols[i], self.sides[i], float(self.entry[i]), float(peak[i]), now))
+        return actions
+
+    async def _dispatch(self, kind, symbol, side, qty, info):
+        try:
+            if kind == "close":
+                ok = await asyncio.to_thread(self.gateway.close, symbol, side, qty, info)
+            else:
+                ok = await asyncio.to_thread(self.gateway.move_stop, symbol, side, info, qty)
+        except Exception as e:
+            self.logger.error(f"Erro ao executar {kind} em {symbol}: {e}")
+            ok = None
+        if kind == "close" and not ok:
+            i = self.index.get(symbol)
+            if i is not None:
+                self.closing[i] = False # Falhou: o próximo tick tenta de novo
+        if ok and self.on_event:
+            try:
+                self.on_event(kind, symbol, info)
+            except Exception as e:
+                self.logger.error(f"Erro no on_event de {kind} em {symbol}: {e}")
+
+    # --- LOOPS ---
+
+    async def refresh_positions(self):
+        positions = await asyncio.to_thread(self.transport.get_positions)
+        if positions is not None:
+            self.load_positions(positions)
+            self.dirty.set()
+
+    async def _positions_loop(self):
+        while self.is_running:
+            await asyncio.sleep(self.positions_interval)
+            try:
+                await self.refresh_positions()
+            except Exception as e:
+                self.logger.warning(f"️ Falha ao atualizar posições: {e}")
+
+    async def _evaluate_loop(self):
+        while self.is_running:
+            await self.dirty.wait()
+            self.dirty.clear()
+            try:
+                for action in self.evaluate():
+                    asyncio.create_task(self._dispatch(*action))
+            except Exception as e:
+                self.logger.error(f"Erro na avaliação do trailing: {e}")
+
+    def _poll_marks(self):
+        resp = requests.get(MARK_PRICES_URL, timeout=5)
+        resp.raise_for_status()
+        return {m['symbol']: float(m.get('markPrice', 0) or 0) for m in resp.json() if m.get('symbol')}
+
+    async def _feed(self):
+        websockets = None
+        if self.use_ws:
+            try:
+                import websockets
+            except ImportError:
+                self.logger.warning("️ websockets não instalado. Usando polling de /markPrices.")
+
+        if websockets is None:
+            while self.is_running:
+                if self.symbols:
+                    try:
+                        marks = await asyncio.to_thread(self._poll_marks)
+                        for symbol in list(self.symbols):
+                            self.on_mark(symbol, marks.get(symbol))
+                    except Exception as e:
+                        self.logger.warning(f"️ Falha no polling de mark price: {e}")
+                await asyncio.sleep(self.poll_interval)
+            return
+
+        while self.is_running:
+            try:
+                async with websockets.connect(WS_URL, ping_interval=20) as ws:
+                    subscribed = set()
+                    while self.is_running:
+                        wanted = set(self.symbols)
+                        if wanted - subscribed:
+                            await ws.send(json.dumps({"method": "SUBSCRIBE", "params": [f"markPrice.{s}" for s in wanted - subscribed]}))
+                        if subscribed - wanted:
+                            await ws.send(json.dumps({"method": "UNSUBSCRIBE", "params": [f"markPrice.{s}" for s in subscribed - wanted]}))
+                        subscribed = wanted
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        data = json.loads(raw).get("data") or {}
+                        if data.get("e") == "markPrice":
+                            self.on_mark(data.get("s"), float(data.get("p", 0) or 0))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"️ Stream markPrice caiu ({e}). Reconectando em 1s...")
+                await asyncio.sleep(1)
+
+    async def run(self):
+        self.is_running = True
+        self.loop = asyncio.get_running_loop()
+        self.dirty = asyncio.Event()
+        await self.refresh_positions()
+        self.logger.info(f" Trailing Engine ativo ({len(self.keys)} posições).")
+        try:
+            await asyncio.gather(self._positions_loop(), self._feed(), self._evaluate_loop())
+        finally:
+            self.is_running = False
+            self.store.flush()
+
+    def start(self):
+        """Roda o engine em uma thread própria (para bots síncronos). Idempotente."""
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.run()), name="TrailingEngine", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.is_running = False
+        if self.loop and self.dirty is not None:
+            self.loop.call_soon_threadsafe(self.dirty.set)
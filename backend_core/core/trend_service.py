@@ -0,0 +1,174 @@
+import time
+import logging
+import threading
+import numpy as np
+
+try:
+    from .candle_store import CandleStore, INTERVAL_SECONDS
+except ImportError:
+    from candle_store import CandleStore, INTERVAL_SECONDS
+
+BASE_INTERVAL = "1m"
+
+
+class TrendService:
+    """
+     TREND SERVICE (Multi-Timeframe em Memória)
+    Um único stream de 1m por símbolo (CandleStore) alimenta todos os timeframes:
+    - 5m/15m/1h/4h/6h... são derivados por reamostragem das velas de 1m.
+      O download nativo do intervalo acontece uma vez, só para aquecer o histórico
+      (ou quando o stream de 1m não cobre mais a vela em formação).
+    - EMAs são atualizadas de forma incremental, uma vela fechada por vez.
+    - trend()/ema()/bars() respondem da memória; a API só é chamada quando fecha uma vela de 1m.
+    """
+    def __init__(self, transport, store=None, history_bars=1000, seed_bars=300, logger=None):
+        self.transport = transport
+        self.store = store or CandleStore()
+        self.history_bars = history_bars
+        self.seed_bars = seed_bars
+        self.emas = {}   # (symbol, interval, period) -> {'value', 'ts', 'count'}
+        self.lock = threading.RLock()
+        self.logger = logger or logging.getLogger("TrendService")
+
+    # --- DADOS ---
+
+    def _sync(self, symbol):
+        """Baixa só as velas de 1m que fecharam desde a última gravada."""
+        if self.store.stale(symbol, BASE_INTERVAL):
+            try:
+                self.store.refresh(self.transport, symbol, BASE_INTERVAL, limit=self.history_bars)
+            except Exception as e:
+                self.logger.warning(f"️ Falha ao atualizar 1m de {symbol}: {e}")
+
+    def _seed(self, symbol, interval):
+        try:
+            self.store.ingest(symbol, interval, self.transport.get_klines(symbol, interval, limit=self.seed_bars))
+        except Exception as e:
+            self.logger.warning(f"️ Falha ao aquecer {interval} de {symbol}: {e}")
+
+    def _derive(self, symbol, interval):
+        """Mantém a série do intervalo: aquece uma vez e depois só reagrega a cauda do 1m."""
+        seconds = INTERVAL_SECONDS.get(interval)
+        if interval == BASE_INTERVAL:
+            return
+        if not seconds or 86400 % seconds:
+            # 3d/1w não alinham com o epoch do 1m: segue com refresh incremental nativo
+            if self.store.stale(symbol, interval):
+                self.store.refresh(self.transport, symbol, interval, limit=self.seed_bars)
+            return
+
+        base = self.store.get(symbol, BASE_INTERVAL)
+        if base is None or not len(base["ts"]):
+            return
+        first_base = int(base["ts"][0])
+        last = self.store.last_ts(symbol, interval)
+        # Primeira vela do intervalo totalmente coberta pelo 1m
+        covered = -(-first_base // seconds) * seconds
+        start = last if last is not None and first_base <= last else covered
+        if last is None or start > last + seconds:
+            self._seed(symbol, interval) # Sem histórico ou buraco entre a série e o 1m
+            last = self.store.last_ts(symbol, interval)
+            if last is None:
+                return
+            start = last if first_base <= last else covered
+            if start > last + seconds:
+                return # 1m não cobre este intervalo (history_bars curto): fica no nativo
+        resampled = self.store.resample(symbol, interval, BASE_INTERVAL, start=start)
+        if resampled is not None:
+            self.store.ingest_arrays(symbol, interval, resampled)
+
+    def update(self, symbols, intervals=()):
+        """Pré-aquece/atualiza símbolos e timeframes (ex.: uma vez por ciclo do bot)."""
+        with self.lock:
+            for symbol in symbols:
+                self._sync(symbol)
+                for interval in intervals:
+                    self._derive(symbol, interval)
+
+    def bars(self, symbol, interval, n=None):
+        """OHLCV do intervalo (inclui a vela em formação). Dict de arrays ou None."""
+        with self.lock:
+            self._sync(symbol)
+            self._derive(symbol, interval)
+            data = self.store.get(symbol, interval)
+        if data is None or not len(data["ts"]):
+            return None
+        return {f: v[-n:] for f, v in data.items()} if n else data
+
+    def price(self, symbol):
+        data = self.store.get(symbol, BASE_INTERVAL)
+        if data is None or not len(data["ts"]):
+            return None
+        return float(data["close"][-1])
+
+    # --- EMA INCREMENTAL ---
+
+    def _ema_state(self, symbol, interval, period):
+        data = self.bars(symbol, interval)
+        if data is None:
+            return None
+        ts, close = data["ts"], data["close"]
+        n_closed = int(np.searchsorted(ts, time.time() - INTERVAL_SECONDS.get(interval, 60), side="right"))
+        if not n_closed:
+            return None
+        alpha = 2.0 / (period + 1)
+        key = (symbol, interval, period)
+        with self.lock:
+            state = self.emas.get(key)
+            if state is not None:
+                pos = int(np.searchsorted(ts, state["ts"]))
+                if pos >= len(ts) or ts[pos] != state["ts"]:
+                    state = None # Série reaquecida: recalcula
+            if state is None:
+                # Mesma convenção de pandas ewm(span=period, adjust=False)
+                value = float(close[0])
+                for c in close[1:n_closed]:
+                    value += alpha * (c - value)
+                state = {"value": value, "ts": int(ts[n_closed - 1]), "count": n_closed}
+            else:
+                for c in close[pos + 1:n_closed]:
+                    state["value"] += alpha * (c - state["value"])
+                state["count"] += max(0, n_closed - pos - 1)
+                state["ts"] = int(ts[n_closed - 1])
+            self.emas[key] = state
+            return state
+
+    def ema(self, symbol, interval, period, price=None):
+        """EMA incluindo a vela em formação (preço atual), como ewm().iloc[-1] sobre as klines."""
+        state = self._ema_state(symbol, interval, period)
+        if state is None:
+            return None
+        price = price if price is not None else self.price(symbol)
+        if price is None:
+            return state["value"]
+        return state["value"] + 2.0 / (period + 1) * (price - state["value"])
+
+    # --- VEREDITOS ---
+
+    def trend(self, symbol, interval="1m", period=50, price=None):
+        """'BULLISH' / 'BEARISH' / 'NEUTRAL' (preço vs EMA do timeframe)."""
+        state = self._ema_state(symbol, interval, period)
+        price = price if price is not None else self.price(symbol)
+        if state is None or price is None or state["count"] < period:
+            return "NEUTRAL"
+        ema = state["value"] + 2.0 / (period + 1) * (price - state["value"])
+        if price > ema:
+            return "BULLISH"
+        if price < ema:
+            return "BEARISH"
+        return "NEUTRAL"
+
+    def alignment(self, symbol, intervals, period=20):
+        """(alinhado, 'Long'/'Short'/'Neutral', {intervalo: veredito})."""
+        verdicts = {tf: self.trend(symbol, tf, period) for tf in intervals}
+        values = set(verdicts.values())
+        if values == {"BULLISH"}:
+            return True, "Long", verdicts
+        if values == {"BEARISH"}:
+            return True, "Short", verdicts
+        return False, "Neutral", verdicts
+
+    def snapshot(self, symbols, intervals, period=50):
+        """Vereditos de todos os símbolos x timeframes (uma atualização de 1m por símbolo)."""
+        self.update(symbols, intervals)
+        return {s: {tf: self.trend(s, tf, period) for tf in intervals} for s in symbols}
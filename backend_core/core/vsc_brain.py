@@ -1,136 +1,236 @@
+import os
+import time
+import atexit
 import logging
+import threading
+import numpy as np
 from core.vsc_neuro_translator import VSCNeuroTranslator
 
+
+class BrainStateWriter:
+    """
+     BRAIN STATE WRITER (Debounced)
+    Persiste o estado do cérebro fora do caminho de decisão: cada validação só entrega
+    o texto mais recente; uma thread grava no máximo uma vez por `debounce` segundos
+    (troca atômica do arquivo). O último estado é gravado ao encerrar o processo.
+    """
+    def __init__(self, path="tools/brain_state.vsc", debounce=1.0, logger=None):
+        self.path = path
+        self.debounce = debounce
+        self.logger = logger or logging.getLogger("VSCBrain")
+        self.pending = None
+        self.writes = 0
+        self.cond = threading.Condition()
+        self.is_running = True
+        self.worker = threading.Thread(target=self._loop, name="BrainStateWriter", daemon=True)
+        self.worker.start()
+        atexit.register(self.close)
+
+    def submit(self, text):
+        with self.cond:
+            self.pending = text
+            self.cond.notify()
+
+    def flush(self):
+        with self.cond:
+            text, self.pending = self.pending, None
+        if text is not None:
+            self._write(text)
+
+    def close(self):
+        with self.cond:
+            self.is_running = False
+            self.cond.notify_all()
+        self.worker.join(timeout=1)
+        self.flush()
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while self.is_running and self.pending is None:
+                    self.cond.wait()
+                if not self.is_running:
+                    return
+            self.flush()
+            time.sleep(self.debounce) # Coalesce: tudo que chegar nessa janela vira uma única escrita
+
+    def _write(self, text):
+        try:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                f.write(text)
+            os.replace(tmp, self.path)
+            self.writes += 1
+        except Exception as e:
+            self.logger.error(f"Failed to save state: {e}")
+
+
 class VSCBrain:
     """
     CÉREBRO VSC (Cognitive Validation Engine).
     Arquitetura de 4 Camadas: Percepção -> Contexto -> Memória -> Validação.
     Responsável por aprovar ou vetar entradas com base em Score Determinístico.
+    Vetos e penalidades são tabelas sobre os códigos do tradutor: validate_batch avalia
+    o universo inteiro em uma passada vetorizada; validate_entry é o caso de um símbolo.
     """
-    
-    def __init__(self):
+
+    # --- REGRAS DE VETO ABSOLUTAS (HARD BLOCK) ---
+    # "Se acontecer isso, NÃO ENTRA, independente do score." (ordem = prioridade)
+    # (ação, dimensão, labels, campo cru para a mensagem, mensagem)
+    VETOES = (
+        # Veto 1: Late Entry (Comprar topo)
+        ("LONG", "momentum", ("overbought_extreme",), "rsi", " VETO: Late Entry (RSI {} > 75)"),
+        ("SHORT", "momentum", ("oversold_extreme",), "rsi", " VETO: Late Entry (RSI {} < 25)"),
+        # Veto 2: Fighting the Flow (OBI Contra)
+        ("LONG", "orderbook", ("sell_wall_dominant",), "obi", " VETO: Fighting Orderbook (OBI {:.2f} < -0.3)"),
+        ("SHORT", "orderbook", ("buy_wall_dominant",), "obi", " VETO: Fighting Orderbook (OBI {:.2f} > 0.3)"),
+        # Veto 3: Crowded Trade (Funding muito alto/baixo)
+        ("LONG", "funding_rate", ("high",), "funding", " VETO: Crowded Long (Funding {} High)"),
+        ("SHORT", "funding_rate", ("negative",), "funding", " VETO: Crowded Short (Funding {} Negative)"),
+    )
+
+    # --- SCORE ANTI-FAKE-MOVE (PENALIDADES) ---
+    # Começa em 100. Perde pontos por sinais ruins. (ação ou None = qualquer, dimensão, labels, pontos, motivo)
+    PENALTIES = (
+        # Funding adverso (mas não suficiente para veto)
+        ("LONG", "funding_rate", ("high",), 20, "funding_high"),
+        ("SHORT", "funding_rate", ("negative",), 20, "funding_negative"),
+        # Netflow Positivo (Entrada de tokens na exchange = Pressão de Venda)
+        ("LONG", "exchange_netflow", ("positive_inflow",), 35, "netflow_inflow_danger"),
+        # OI Colapsando (Perda de interesse/Liquidez)
+        (None, "open_interest", ("collapsing",), 15, "oi_collapsing"),
+        # Smart Money Distribuindo (se detectado)
+        ("LONG", "smart_money", ("active_distribution",), 25, "whale_distribution"),
+        # Fighting Trend: LONG com RSI < 40 (faca caindo sem sobrevenda extrema)
+        ("LONG", "momentum", ("bearish_strong", "oversold_extreme"), 10, "weak_momentum"),
+    )
+
+    # 3. VALIDAÇÃO FINAL (Gate)
+    THRESHOLD_OPTIMAL = 70
+    THRESHOLD_CAUTIOUS = 50
+    SIZE_OPTIMAL = 1.0
+    SIZE_CAUTIOUS = 0.1 # 10% do tamanho normal
+
+    def __init__(self, state_path="tools/brain_state.vsc", save_debounce=1.0):
         self.logger = logging.getLogger("VSCBrain")
         self.translator = VSCNeuroTranslator()
-        # Estado cognitivo atual (pode ser persistido)
+        # Estado cognitivo atual (persistido pelo writer em background)
         self.current_state = {
             "perception": [],
             "score": 100,
             "decision": "WAIT"
         }
+        self.symbol_states = {}
+        self.writer = BrainStateWriter(state_path, debounce=save_debounce, logger=self.logger)
+        self._vetoes = self._compile(self.VETOES)
+        self._penalties = self._compile(self.PENALTIES)
+        self._penalty_points = np.array([p[3] for p in self.PENALTIES])
+
+    def _compile(self, table):
+        """(ação, dimensão, labels, ...) -> (ação, dimensão, máscara booleana indexada pelo código do label)."""
+        compiled = []
+        for action, dimension, labels, *_ in table:
+            rule = self.translator.BY_DIMENSION[dimension]
+            mask = np.zeros(len(rule.labels), dtype=bool)
+            mask[[rule.code_of(label) for label in labels]] = True
+            compiled.append((action, dimension, mask))
+        return compiled
+
+    def _match(self, compiled, codes, actions):
+        """Matriz (n, regras): a regra casa na linha (ação + label)."""
+        columns = []
+        for action, dimension, mask in compiled:
+            hit = mask[codes[dimension]]
+            if action is not None:
+                hit &= actions == action
+            columns.append(hit)
+        return np.column_stack(columns)
+
+    def validate_batch(self, symbols, actions, market_rows):
+        """
+        Valida intenções de entrada de vários símbolos em uma passada.
+        actions: 'LONG'/'SHORT' para todos ou uma lista por símbolo.
+        market_rows: lista de dicts de mercado (ou DataFrame), alinhada com symbols.
+        Retorna dict de arrays: score, veto (índice em VETOES ou -1), approved, size_factor, decision,
+        penalties (matriz booleana n x PENALTIES) e codes (percepção por dimensão).
+        """
+        n = len(symbols)
+        actions = np.full(n, actions, dtype=object) if isinstance(actions, str) else np.asarray(actions, dtype=object)
+
+        # 1. PERCEPÇÃO (Tradução)
+        codes = self.translator.translate_batch(market_rows)
+
+        # 2. CONTEXTO & SCORE
+        vetoes = self._match(self._vetoes, codes, actions)
+        veto = np.where(vetoes.any(axis=1), vetoes.argmax(axis=1), -1)
+        penalties = self._match(self._penalties, codes, actions)
+        score = 100 - penalties @ self._penalty_points
+
+        # 3. VALIDAÇÃO FINAL (Gate)
+        vetoed = veto >= 0
+        optimal = ~vetoed & (score >= self.THRESHOLD_OPTIMAL)
+        cautious = ~vetoed & ~optimal & (score >= self.THRESHOLD_CAUTIOUS)
+        result = {
+            "symbols": list(symbols),
+            "actions": actions,
+            "score": score,
+            "veto": veto,
+            "approved": optimal | cautious,
+            "size_factor": np.select([optimal, cautious], [self.SIZE_OPTIMAL, self.SIZE_CAUTIOUS], 0.0),
+            "decision": np.select([vetoed, optimal, cautious], ["VETO", "APPROVED", "CAUTIOUS"], "REJECTED"),
+            "penalties": penalties,
+            "codes": codes,
+        }
+        self._remember(result)
+        return result
 
     def validate_entry(self, symbol, proposed_action, market_data):
         """
         Valida uma intenção de entrada (LONG/SHORT).
         Retorna: (Bool, String Reason, Float SizeFactor)
         """
-        # 1. PERCEPÇÃO (Tradução)
-        vsc_states = self.translator.translate(market_data)
-        self.current_state["perception"] = vsc_states
-        
-        # 2. CONTEXTO & SCORE (Cálculo Determinístico)
-        score = 100
-        reasons = []
-        
-        # Extrair dados crus para vetos absolutos (às vezes precisamos do número exato para o veto)
-        funding = market_data.get('funding', 0)
-        rsi = market_data.get('rsi', 50)
-        obi = market_data.get('obi', 0)
-
-        # --- REGRAS DE VETO ABSOLUTAS (HARD BLOCK) ---
-        # "Se acontecer isso, NÃO ENTRA, independente do score."
-        
-        # Veto 1: Late Entry (Comprar topo)
-        if proposed_action == "LONG" and rsi > 75:
-            return False, f" VETO: Late Entry (RSI {rsi} > 75)", 0.0
-        if proposed_action == "SHORT" and rsi < 25:
-            return False, f" VETO: Late Entry (RSI {rsi} < 25)", 0.0
+        result = self.validate_batch([symbol], proposed_action, [market_data])
+        return self.explain(result, 0, market_data)
 
-        # Veto 2: Fighting the Flow (OBI Contra)
-        if proposed_action == "LONG" and obi < -0.3:
-            return False, f" VETO: Fighting Orderbook (OBI {obi:.2f} < -0.3)", 0.0
-        if proposed_action == "SHORT" and obi > 0.3:
-            return False, f" VETO: Fighting Orderbook (OBI {obi:.2f} > 0.3)", 0.0
+    def explain(self, result, index, market_data):
+        """(aprovado, motivo, size_factor) da linha `index` de validate_batch, no formato de validate_entry."""
+        veto = int(result["veto"][index])
+        if veto >= 0:
+            _, _, _, field, message = self.VETOES[veto]
+            return False, message.format(market_data.get(field, 0)), 0.0
 
-        # Veto 3: Crowded Trade (Funding muito alto/baixo)
-        if proposed_action == "LONG" and funding > 0.0005:
-             return False, f" VETO: Crowded Long (Funding {funding} High)", 0.0
-        if proposed_action == "SHORT" and funding < -0.0005:
-             return False, f" VETO: Crowded Short (Funding {funding} Negative)", 0.0
-
-
-        # --- SCORE ANTI-FAKE-MOVE (PENALIDADES) ---
-        # Começa em 100. Perde pontos por sinais ruins.
-        
-        # Penalidade: Funding adverso (mas não suficiente para veto)
-        if 'funding_rate,high' in vsc_states and proposed_action == "LONG":
-            score -= 20
-            reasons.append("funding_high")
-        elif 'funding_rate,negative' in vsc_states and proposed_action == "SHORT":
-            score -= 20
-            reasons.append("funding_negative")
-        
-        # Penalidade: Netflow Positivo (Entrada de tokens na exchange = Pressão de Venda)
-        if 'exchange_netflow,positive_inflow' in vsc_states and proposed_action == "LONG":
-            score -= 35
-            reasons.append("netflow_inflow_danger")
-            
-        # Penalidade: OI Colapsando (Perda de interesse/Liquidez)
-        if 'open_interest,collapsing' in vsc_states:
-            score -= 15
-            reasons.append("oi_collapsing")
-
-        # Penalidade: Smart Money Distribuindo (se detectado)
-        if 'smart_money,active_distribution' in vsc_states and proposed_action == "LONG":
-            score -= 25
-            reasons.append("whale_distribution")
-
-        # Penalidade: Fighting Trend (RSI divergence mild)
-        if proposed_action == "LONG" and rsi < 40: # Trying to catch a falling knife without extreme oversold
-             score -= 10
-             reasons.append("weak_momentum")
-        
-        # Atualiza estado
-        self.current_state["score"] = score
-        
-        # 3. VALIDAÇÃO FINAL (Gate)
-        THRESHOLD_OPTIMAL = 70
-        THRESHOLD_CAUTIOUS = 50
-        
-        decision_str = ""
-        size_factor = 0.0
-        result = False
-
-        if score >= THRESHOLD_OPTIMAL:
-            self.current_state["decision"] = "APPROVED"
-            decision_str = f" APPROVED (Score: {score})"
-            size_factor = 1.0
-            result = True
-        elif score >= THRESHOLD_CAUTIOUS:
-            self.current_state["decision"] = "CAUTIOUS"
-            decision_str = f"️ CAUTIOUS_APPROVED (Score: {score}) - MICROSIZE MODE"
-            size_factor = 0.1 # 10% do tamanho normal
-            result = True
-        else:
-            self.current_state["decision"] = "REJECTED"
-            decision_str = f" REJECTED (Score: {score}, Reasons: {reasons})"
-            size_factor = 0.0
-            result = False
-            
+        score = int(result["score"][index])
+        decision = result["decision"][index]
+        if decision == "APPROVED":
+            return True, f" APPROVED (Score: {score})", self.SIZE_OPTIMAL
+        if decision == "CAUTIOUS":
+            return True, f"️ CAUTIOUS_APPROVED (Score: {score}) - MICROSIZE MODE", self.SIZE_CAUTIOUS
+        reasons = [p[4] for p, hit in zip(self.PENALTIES, result["penalties"][index]) if hit]
+        return False, f" REJECTED (Score: {score}, Reasons: {reasons})", 0.0
+
+    def _remember(self, result):
+        """Atualiza o estado (último símbolo avaliado + estado por símbolo) e agenda a persistência."""
+        for i, symbol in enumerate(result["symbols"]):
+            self.symbol_states[symbol] = (int(result["score"][i]), str(result["decision"][i]))
+        last = len(result["symbols"]) - 1
+        if last < 0:
+            return
+        # Veto sai antes do score: o estado mantém o score anterior, como no fluxo original
+        self.current_state["perception"] = self.translator.tags(result["codes"], last)
+        if result["veto"][last] < 0:
+            self.current_state["score"] = int(result["score"][last])
+            self.current_state["decision"] = str(result["decision"][last])
         self.save_state()
-        return result, decision_str, size_factor
 
     def save_state(self):
-        try:
-            # Caminho absoluto ou relativo
-            path = "tools/brain_state.vsc"
-            with open(path, "w") as f:
-                f.write("# === VSC BRAIN STATE ===\n")
-                f.write(f"last_score,{self.current_state['score']}\n")
-                f.write(f"last_decision,{self.current_state['decision']}\n")
-                for tag in self.current_state['perception']:
-                    f.write(f"perception,{tag}\n")
-        except Exception as e:
-            self.logger.error(f"Failed to save state: {e}")
+        lines = [
+            "# === VSC BRAIN STATE ===",
+            f"last_score,{self.current_state['score']}",
+            f"last_decision,{self.current_state['decision']}",
+        ]
+        lines += [f"perception,{tag}" for tag in self.current_state['perception']]
+        lines += [f"symbol,{symbol},{score},{decision}" for symbol, (score, decision) in self.symbol_states.items()]
+        self.writer.submit("\n".join(lines) + "\n")
 
     def get_brain_state(self):
         return self.current_state
@@ -1,70 +1,97 @@
+import numpy as np
+
+
+def _column(rows, field, default):
+    """Coluna float de uma lista de dicts (ou DataFrame), com default para chaves ausentes."""
+    if hasattr(rows, 'columns'):
+        if field not in rows.columns:
+            return np.full(len(rows), float(default))
+        return rows[field].fillna(default).to_numpy(dtype=float)
+    return np.array([float(r.get(field, default)) for r in rows], dtype=float)
+
+
+class CompiledRule:
+    """
+    Uma dimensão do tradutor compilada em arrays: condições em ordem de prioridade
+    (op, limiar) -> label; a primeira que casar vence, senão o label default.
+    """
+    __slots__ = ('dimension', 'field', 'default', 'greater', 'thresholds', 'labels', 'fallback')
+
+    def __init__(self, dimension, field, default, conditions, fallback):
+        self.dimension = dimension
+        self.field = field
+        self.default = default
+        self.greater = np.array([op == '>' for op, _, _ in conditions])[:, None]
+        self.thresholds = np.array([t for _, t, _ in conditions], dtype=float)[:, None]
+        self.labels = [label for _, _, label in conditions] + [fallback]
+        self.fallback = fallback
+
+    def codes(self, values):
+        """Índice do label para cada valor (len(conditions) = fallback)."""
+        hits = np.where(self.greater, values > self.thresholds, values < self.thresholds)
+        return np.where(hits.any(axis=0), hits.argmax(axis=0), len(self.labels) - 1)
+
+    def code_of(self, label):
+        return self.labels.index(label)
+
+
 class VSCNeuroTranslator:
     """
     Tradutor On-Chain -> Estados VSC.
     Transforma dados brutos (float/int) em estados cognitivos (tags VSC).
     Nenhum número bruto deve sair desta classe para o Cérebro.
+    As regras são compiladas uma vez em arrays de limiares; translate_batch avalia
+    todos os símbolos candidatos em uma passada.
     """
 
-    @staticmethod
-    def translate(market_data):
-        """
-        Input: Dict com dados de mercado (funding, netflow, oi_delta, rsi, obi).
-        Output: Lista de tags VSC (strings).
-        """
-        states = []
-        
+    # (dimensão, campo, default, [(op, limiar, label)] em ordem de prioridade, label default)
+    RULES = (
         # 1. Funding (Custo do Capital)
-        funding = market_data.get('funding', 0.0)
-        if funding > 0.0005:
-            states.append('funding_rate,high') # Crowded Long
-        elif funding < -0.0005:
-            states.append('funding_rate,negative') # Crowded Short
-        else:
-            states.append('funding_rate,neutral')
-
-        # 2. Netflow (Fluxo de Saída/Entrada na Exchange)
-        netflow = market_data.get('netflow', 0.0)
-        if netflow > 5_000_000: # Entrada massiva de tokens na exchange (Venda provável)
-            states.append('exchange_netflow,positive_inflow')
-        elif netflow < -5_000_000: # Saída massiva (Acumulação)
-            states.append('exchange_netflow,negative_outflow')
-        else:
-            states.append('exchange_netflow,neutral')
-
-        # 3. Open Interest Delta (Variação de Contratos)
-        oi_delta = market_data.get('oi_delta', 0.0) # % change
-        if oi_delta > 0.05: # +5%
-            states.append('open_interest,expanding_rapidly')
-        elif oi_delta < -0.05:
-            states.append('open_interest,collapsing')
-        else:
-            states.append('open_interest,stable')
-
+        ('funding_rate', 'funding', 0.0,
+         [('>', 0.0005, 'high'), ('<', -0.0005, 'negative')], 'neutral'),
+        # 2. Netflow (Entrada massiva na exchange = venda provável / saída massiva = acumulação)
+        ('exchange_netflow', 'netflow', 0.0,
+         [('>', 5_000_000, 'positive_inflow'), ('<', -5_000_000, 'negative_outflow')], 'neutral'),
+        # 3. Open Interest Delta (% de variação de contratos)
+        ('open_interest', 'oi_delta', 0.0,
+         [('>', 0.05, 'expanding_rapidly'), ('<', -0.05, 'collapsing')], 'stable'),
         # 4. RSI (Momento)
-        rsi = market_data.get('rsi', 50.0)
-        if rsi > 75:
-            states.append('momentum,overbought_extreme')
-        elif rsi > 60:
-            states.append('momentum,bullish_strong')
-        elif rsi < 25:
-            states.append('momentum,oversold_extreme')
-        elif rsi < 40:
-            states.append('momentum,bearish_strong')
-        else:
-            states.append('momentum,neutral')
-
+        ('momentum', 'rsi', 50.0,
+         [('>', 75, 'overbought_extreme'), ('>', 60, 'bullish_strong'),
+          ('<', 25, 'oversold_extreme'), ('<', 40, 'bearish_strong')], 'neutral'),
         # 5. OBI (Order Book Imbalance)
-        obi = market_data.get('obi', 0.0)
-        if obi > 0.3:
-            states.append('orderbook,buy_wall_dominant')
-        elif obi < -0.3:
-            states.append('orderbook,sell_wall_dominant')
-        else:
-            states.append('orderbook,balanced')
+        ('orderbook', 'obi', 0.0,
+         [('>', 0.3, 'buy_wall_dominant'), ('<', -0.3, 'sell_wall_dominant')], 'balanced'),
+        # 6. Smart Money (Whale Activity - Simulado por grandes ordens recentes). Sem tag quando inativo.
+        ('smart_money', 'whale_activity', False,
+         [('>', 0, 'active_distribution')], None),
+    )
+
+    COMPILED = tuple(CompiledRule(*rule) for rule in RULES)
+    BY_DIMENSION = {rule.dimension: rule for rule in COMPILED}
 
-        # 6. Smart Money (Whale Activity - Simulado por grandes ordens recentes)
-        whale_activity = market_data.get('whale_activity', False)
-        if whale_activity:
-            states.append('smart_money,active_distribution')
+    @classmethod
+    def translate_batch(cls, rows):
+        """
+        Input: lista de dicts de mercado (ou DataFrame) com funding, netflow, oi_delta, rsi, obi.
+        Output: {dimensão: array de códigos de label}, um código por linha.
+        """
+        return {rule.dimension: rule.codes(_column(rows, rule.field, rule.default)) for rule in cls.COMPILED}
 
+    @classmethod
+    def tags(cls, codes, index):
+        """Tags VSC ('dimensão,label') da linha `index` de um resultado de translate_batch."""
+        states = []
+        for rule in cls.COMPILED:
+            label = rule.labels[codes[rule.dimension][index]]
+            if label is not None:
+                states.append(f"{rule.dimension},{label}")
         return states
+
+    @classmethod
+    def translate(cls, market_data):
+        """
+        Input: Dict com dados de mercado (funding, netflow, oi_delta, rsi, obi).
+        Output: Lista de tags VSC (strings).
+        """
+        return cls.tags(cls.translate_batch([market_data]), 0)
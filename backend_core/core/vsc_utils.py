@@ -1,3 +1,319 @@
+import os
+import mmap
+import time
+import atexit
+import threading
+from itertools import repeat
+
+MMAP_THRESHOLD = 8 * 1024 * 1024 # Arquivos acima disso são lidos via mmap (use_mmap=None)
+BOOLS = {'true': True, 'false': False}
+NULLS = ('undefined', 'null', 'none')
+
+
+def to_bool(value):
+    try:
+        return BOOLS[value.lower()]
+    except KeyError:
+        raise ValueError(value)
+
+
+def infer_value(value):
+    """
+    Tipagem por inferência (arquivos chave/valor): bool, lista [a, b], int, float, null ou string.
+    """
+    lowered = value.lower()
+    if lowered in BOOLS:
+        return BOOLS[lowered]
+
+    if value.startswith('[') and value.endswith(']'):
+        content = value[1:-1]
+        if not content.strip():
+            return []
+        return [infer_value(item.strip()) for item in content.split(',')]
+
+    try:
+        if '.' in value:
+            return float(value)
+        return int(value)
+    except ValueError:
+        pass
+
+    if lowered in NULLS:
+        return None
+    return value
+
+
+def _identity(value):
+    return value
+
+
+def converter(type_cls):
+    """Conversor de um campo, resolvido uma única vez na compilação do schema."""
+    if type_cls is bool:
+        return to_bool
+    if type_cls is str or type_cls is None:
+        return _identity
+    if type_cls == 'auto':
+        return infer_value
+    return type_cls
+
+
+class VSCSchema:
+    """
+     VSC SCHEMA (Compilado)
+    Tipos por coluna viram conversores uma vez; cada linha é convertida numa única
+    passada (o diagnóstico campo a campo só roda quando a linha é inválida).
+    - sep: separador (',' nos arquivos de spec, '|' no Audit Vault).
+    - maxsplit: limita a divisão (ex.: HASH|RAW_PROOF com maxsplit=1).
+    - names: nomes das colunas para saída colunar (read_columns / read_frame).
+    """
+    __slots__ = ('types', 'names', 'sep', 'maxsplit', 'converters')
+
+    def __init__(self, types=None, names=None, sep=',', maxsplit=-1):
+        self.types = list(types) if types else None
+        self.sep = sep
+        self.maxsplit = maxsplit
+        self.converters = [converter(t) for t in self.types] if self.types else None
+        self.names = list(names) if names else [f"c{i}" for i in range(len(self.types or []))]
+
+    def split(self, line):
+        return [p.strip() for p in line.split(self.sep, self.maxsplit)]
+
+    def parse(self, line):
+        """Linha bruta -> lista tipada (None se vazia). Lança ValueError/TypeError se inválida."""
+        if not line or not line.strip():
+            return None
+        parts = self.split(line)
+        if not self.converters:
+            return parts
+        if len(parts) != len(self.converters):
+            raise ValueError(f"VSC Error: Esperado {len(self.converters)} campos, recebido {len(parts)}. Linha: {line}")
+        try:
+            return [conv(val) for conv, val in zip(self.converters, parts)]
+        except Exception:
+            for i, (conv, val, type_cls) in enumerate(zip(self.converters, parts, self.types)):
+                try:
+                    conv(val)
+                except Exception:
+                    name = getattr(type_cls, '__name__', str(type_cls))
+                    raise TypeError(f"VSC Error: Campo {i} ('{val}') inválido. Esperado {name}.")
+            raise
+
+    def dtypes(self):
+        """dtype NumPy por coluna (texto e inferência ficam como object)."""
+        mapping = {float: 'float64', int: 'int64', bool: 'bool'}
+        return [mapping.get(t, 'object') for t in (self.types or [])]
+
+
+# Audit Vault (logs/audit_vault.vsc): HASH|RAW_PROOF (RAW_PROOF pode conter '|')
+VAULT_SCHEMA = VSCSchema([str, str], names=["hash", "proof"], sep="|", maxsplit=1)
+# Prova canônica de trade no vault: HASH|PROOF|TS|SYM|SIDE|PRICE|QTY|OBI|SENTINEL
+TRADE_PROOF_SCHEMA = VSCSchema(
+    [str, str, int, str, str, float, float, float, int],
+    names=["hash", "tag", "timestamp", "symbol", "side", "price", "qty", "obi", "sentinel"],
+    sep="|"
+)
+
+_SCHEMA_CACHE = {}
+
+
+def compile_schema(schema=None, sep=',', maxsplit=-1, names=None):
+    """Aceita VSCSchema pronto ou lista de tipos; listas iguais reutilizam o schema compilado."""
+    if isinstance(schema, VSCSchema):
+        return schema
+    key = (tuple(schema) if schema else None, sep, maxsplit, tuple(names) if names else None)
+    compiled = _SCHEMA_CACHE.get(key)
+    if compiled is None:
+        compiled = _SCHEMA_CACHE[key] = VSCSchema(schema, names=names, sep=sep, maxsplit=maxsplit)
+    return compiled
+
+
+def iter_lines(file_path, use_mmap=None, start=0):
+    """
+    Linhas do arquivo sob demanda (gerador), sem carregar o arquivo inteiro.
+    use_mmap: True/False força o modo; None usa mmap acima de MMAP_THRESHOLD.
+    """
+    size = os.path.getsize(file_path)
+    if use_mmap is None:
+        use_mmap = size >= MMAP_THRESHOLD
+    if use_mmap and size > start:
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            mm.seek(start)
+            for raw in iter(mm.readline, b''):
+                yield raw.decode('utf-8')
+    elif not use_mmap:
+        with open(file_path, 'r') as f:
+            if start:
+                f.seek(start)
+            yield from f
+
+
+def iter_content(file_path, comments='#', use_mmap=None):
+    """Linhas não vazias e sem comentário, já sem espaços nas pontas (gerador)."""
+    for line in iter_lines(file_path, use_mmap):
+        line = line.strip()
+        if line and not (comments and line.startswith(comments)):
+            yield line
+
+
+def iter_rows(file_path, schema=None, sep=',', maxsplit=-1, comments='#', errors='raise', use_mmap=None):
+    """
+    Linhas tipadas do arquivo, uma a uma (gerador).
+    :param schema: VSCSchema, lista de tipos (todas as linhas) ou lista de listas (uma por linha).
+    :param comments: prefixo de comentário ignorado (None para não ignorar).
+    :param errors: 'raise' (estrito) ou 'skip' (descarta linhas inválidas, ex.: formatos mistos no vault).
+    """
+    per_line = None
+    if schema and not isinstance(schema, VSCSchema) and isinstance(schema[0], (list, tuple)):
+        per_line = [compile_schema(s, sep, maxsplit) for s in schema]
+        default = compile_schema(None, sep, maxsplit)
+    else:
+        default = compile_schema(schema, sep, maxsplit)
+
+    for index, line in enumerate(iter_content(file_path, comments, use_mmap)):
+        compiled = per_line[index] if per_line and index < len(per_line) else default
+        try:
+            row = compiled.parse(line)
+        except (ValueError, TypeError):
+            if errors == 'skip':
+                continue
+            raise
+        if row:
+            yield row
+
+
+def _convert_column(values, type_cls, dtype):
+    """Converte uma coluna inteira com o conversor compilado (np.fromiter para colunas numéricas)."""
+    import numpy as np
+    if dtype in ('float64', 'int64'):
+        # float()/int() já toleram espaços nas pontas
+        return np.fromiter(map(type_cls, values), dtype=dtype, count=len(values))
+    values = list(map(str.strip, values))
+    if type_cls is bool:
+        return np.fromiter(map(to_bool, values), dtype=bool, count=len(values))
+    conv = converter(type_cls)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values if conv is _identity else list(map(conv, values))
+    return column
+
+
+def _split_columns(lines, compiled, width):
+    """Linhas -> listas por coluna. Sem maxsplit, divide o bloco inteiro de uma vez e fatia por coluna."""
+    sep = compiled.sep
+    if compiled.maxsplit < 0 and all(c == width - 1 for c in map(str.count, lines, repeat(sep))):
+        flat = sep.join(lines).split(sep)
+        return [flat[i::width] for i in range(width)]
+    rows = [line.split(sep, compiled.maxsplit) for line in lines]
+    if any(len(r) != width for r in rows):
+        raise ValueError("largura inconsistente")
+    return [list(col) for col in zip(*rows)]
+
+
+def read_columns(file_path, schema, sep=',', maxsplit=-1, names=None, comments='#', errors='raise', use_mmap=None):
+    """
+    Arquivo inteiro em colunas NumPy tipadas: {nome: ndarray}.
+    Caminho rápido: lê em bloco, divide e converte coluna a coluna; se alguma linha for inválida,
+    refaz linha a linha (iter_rows) para aplicar `errors` com a mesma semântica do leitor estrito.
+    """
+    import numpy as np
+    compiled = compile_schema(schema, sep, maxsplit, names)
+    width = len(compiled.names)
+    with open(file_path, 'r') as f:
+        lines = [l for l in map(str.strip, f.read().splitlines()) if l and not (comments and l.startswith(comments))]
+    try:
+        columns = _split_columns(lines, compiled, width) if lines else [[] for _ in range(width)]
+        return {name: _convert_column(col, type_cls, dtype)
+                for name, col, type_cls, dtype in zip(compiled.names, columns, compiled.types, compiled.dtypes())}
+    except (ValueError, TypeError):
+        rows = list(iter_rows(file_path, compiled, comments=comments, errors=errors, use_mmap=use_mmap))
+    columns = list(zip(*rows)) if rows else [()] * width
+    return {name: np.array(col, dtype=dtype) for name, col, dtype in zip(compiled.names, columns, compiled.dtypes())}
+
+
+def read_frame(file_path, schema, sep=',', maxsplit=-1, names=None, **kwargs):
+    """Arquivo inteiro como DataFrame pandas (colunas tipadas pelo schema)."""
+    import pandas as pd
+    return pd.DataFrame(read_columns(file_path, schema, sep, maxsplit, names, **kwargs))
+
+
+def read_mapping(file_path, comments='#', use_mmap=None):
+    """
+    Arquivo chave/valor (key: value ou key,value) -> dict com valores inferidos.
+    O separador é o primeiro ':' da linha, senão a primeira ','. Linhas sem separador são ignoradas.
+    """
+    context = {}
+    for line in iter_content(file_path, comments, use_mmap):
+        separator = ':' if ':' in line else ',' if ',' in line else None
+        if not separator:
+            continue
+        key, value_raw = line.split(separator, 1)
+        context[key.strip()] = infer_value(value_raw.strip())
+    return context
+
+
+class VSCWriter:
+    """
+     VSC WRITER (Append Bufferizado)
+    Acumula linhas em memória e grava em lote no fim do arquivo: ao atingir buffer_size,
+    a cada flush_interval (thread de fundo) e ao encerrar o processo.
+    Leitores do mesmo arquivo devem chamar flush() antes de ler.
+    """
+    def __init__(self, file_path, sep=',', buffer_size=256, flush_interval=1.0):
+        self.file_path = file_path
+        self.sep = sep
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.is_running = True
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if flush_interval:
+            self.flusher = threading.Thread(target=self._loop, name=f"VSCWriter-{os.path.basename(file_path)}", daemon=True)
+            self.flusher.start()
+        atexit.register(self.close)
+
+    def format(self, row):
+        return self.sep.join(str(v).lower() if isinstance(v, bool) else str(v) for v in row)
+
+    def append(self, row):
+        """row: sequência de valores (unidos por sep) ou linha já formatada."""
+        line = row if isinstance(row, str) else self.format(row)
+        with self.lock:
+            self.buffer.append(line)
+            if len(self.buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.buffer:
+            return
+        with open(self.file_path, 'a') as f:
+            f.write("\n".join(self.buffer) + "\n")
+        self.buffer = []
+
+    def _loop(self):
+        while self.is_running:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"VSCWriter flush error ({self.file_path}): {e}")
+
+    def close(self):
+        self.is_running = False
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 
 class VSCParser:
     """
@@ -8,8 +324,9 @@ class VSCParser:
     3. Ordem = Significado (Schema Externo).
     4. Sem metadados implícitos.
     5. Falha se inválido (Sem 'autofill').
+    Linhas iniciadas por '#' são comentários.
     """
-    
+
     @staticmethod
     def parse_line(line, expected_types=None):
         """
@@ -18,31 +335,7 @@ class VSCParser:
         :param expected_types: Lista de tipos esperados (ex: [str, float])
         :return: Lista de valores tipados ou lança Exceção.
         """
-        if not line or line.strip() == "":
-            return None
-            
-        parts = [p.strip() for p in line.split(',')]
-        
-        if expected_types:
-            if len(parts) != len(expected_types):
-                raise ValueError(f"VSC Error: Esperado {len(expected_types)} campos, recebido {len(parts)}. Linha: {line}")
-            
-            typed_parts = []
-            for i, (val, type_cls) in enumerate(zip(parts, expected_types)):
-                try:
-                    if type_cls == bool:
-                        # Tratamento especial para bool
-                        clean_val = val.lower()
-                        if clean_val == 'true': typed_parts.append(True)
-                        elif clean_val == 'false': typed_parts.append(False)
-                        else: raise ValueError
-                    else:
-                        typed_parts.append(type_cls(val))
-                except:
-                    raise TypeError(f"VSC Error: Campo {i} ('{val}') inválido. Esperado {type_cls.__name__}.")
-            return typed_parts
-            
-        return parts
+        return compile_schema(expected_types).parse(line)
 
     @staticmethod
     def read_file(file_path, schema=None):
@@ -50,26 +343,6 @@ class VSCParser:
         Lê arquivo VSC inteiro.
         :param schema: Lista de Listas de tipos (uma lista por linha esperada)
                        OU Lista única se todas as linhas seguirem o mesmo padrão (ex: products).
+        Para arquivos grandes, prefira iter_rows (streaming).
         """
-        results = []
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-            
-        # Remove empty lines
-        lines = [l.strip() for l in lines if l.strip()]
-        
-        for i, line in enumerate(lines):
-            # Se schema for lista de listas, usa o schema da linha correspondente
-            current_schema = None
-            if schema:
-                if isinstance(schema[0], list):
-                    if i < len(schema):
-                        current_schema = schema[i]
-                else:
-                    current_schema = schema # Schema repetitivo
-            
-            parsed = VSCParser.parse_line(line, current_schema)
-            if parsed:
-                results.append(parsed)
-                
-        return results
+        return list(iter_rows(file_path, schema))
@@ -1,10 +1,20 @@
+import os
+import sys
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime
 import time
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.metrics_feed import (
+    MetricsTail, MetricsBoard, FEED_PATH,
+    METRIC_EQUITY, METRIC_PNL, METRIC_POSITION, METRIC_POSITIONS_OPEN, METRIC_SIGNAL
+)
+
+REFRESH_SECONDS = 1.0
+
 # --- Configuração da Página ---
 st.set_page_config(
     page_title="OBI WORK | Tactical Dashboard",
@@ -50,6 +60,22 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# --- Metrics Feed (tail incremental, sem chamadas à exchange) ---
+if "metrics_tail" not in st.session_state:
+    st.session_state.metrics_tail = MetricsTail(FEED_PATH, from_start=True)
+    st.session_state.metrics_board = MetricsBoard()
+    st.session_state.metrics_log = []
+
+new_records = st.session_state.metrics_tail.poll()
+board = st.session_state.metrics_board
+board.ingest(new_records)
+st.session_state.metrics_log = (st.session_state.metrics_log + new_records)[-50:]
+
+last_update = board.last_update()
+feed_live = last_update is not None and time.time() - last_update < 10
+p50 = board.latency_percentile(50)
+p99 = board.latency_percentile(99)
+
 # --- Sidebar ---
 with st.sidebar:
     st.title(" OBI WORK")
@@ -58,8 +84,12 @@ with st.sidebar:
     st.markdown("---")
     
     st.subheader("System Status")
-    st.markdown('<span class="status-badge status-live">● SYSTEM ONLINE</span>', unsafe_allow_html=True)
-    st.markdown(f"**Latency:** {np.random.randint(15, 45)}ms")
+    if feed_live:
+        st.markdown('<span class="status-badge status-live">● SYSTEM ONLINE</span>', unsafe_allow_html=True)
+    else:
+        st.markdown('<span class="status-badge">○ FEED IDLE</span>', unsafe_allow_html=True)
+    st.markdown(f"**Latency p50/p99:** {p50:.0f}ms / {p99:.0f}ms" if p50 is not None else "**Latency:** n/a")
+    st.markdown(f"**API Error Rate (60s):** {board.error_rate() * 100:.1f}%")
     st.markdown("**Iron Dome:** ACTIVE")
     
     st.markdown("---")
@@ -76,31 +106,43 @@ with col1:
 
 with col2:
     st.markdown("###  Live Feed")
-    st.text(f"Last Update: {datetime.now().strftime('%H:%M:%S')}")
+    if last_update:
+        st.text(f"Last Update: {datetime.fromtimestamp(last_update).strftime('%H:%M:%S')}")
+    else:
+        st.text("Last Update: aguardando agentes...")
 
 # --- Metrics Row ---
+equity_by_source = board.values(METRIC_EQUITY)
+equity = max(equity_by_source.values()) if equity_by_source else 0.0
+pnl_by_key = board.by_key(METRIC_PNL)
+session_pnl = pnl_by_key.get("SESSION", 0.0)
+unrealized_pnl = sum(v for key, v in pnl_by_key.items() if key != "SESSION")
+exposure = sum(abs(v) for v in board.by_key(METRIC_POSITION).values())
+open_positions = board.by_key(METRIC_POSITIONS_OPEN)
+signals = board.values(METRIC_SIGNAL)
+
 m1, m2, m3, m4 = st.columns(4)
 with m1:
-    st.metric("Daily PnL", "+$124.50", "2.4%")
+    st.metric("Session PnL", f"${session_pnl:+.2f}", f"Unrealized ${unrealized_pnl:+.2f}")
 with m2:
-    st.metric("Open Interest (OBI)", "High", "+15%")
+    st.metric("Equity", f"${equity:.2f}")
 with m3:
-    st.metric("Active Grids", "12", "SOL_USDC")
+    st.metric("Open Positions", f"{int(max(open_positions.values())) if open_positions else 0}")
 with m4:
-    st.metric("Risk Exposure", "18%", "-2%")
+    st.metric("Risk Exposure", f"{(exposure / equity) * 100:.0f}%" if equity > 0 else "n/a", f"${exposure:.2f} notional")
 
 # --- Charts Area ---
 tab1, tab2 = st.tabs(["Performance", "Market Depth (OBI)"])
 
 with tab1:
-    # Mock Data for Chart
-    dates = pd.date_range(start="2024-01-01", periods=100)
-    prices = np.cumsum(np.random.randn(100)) + 100
-    
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=dates, y=prices, mode='lines', name='Equity Curve', line=dict(color='#10b981')))
+    for (source, metric, key), series in board.series.items():
+        if metric != METRIC_EQUITY or not series:
+            continue
+        dates = [datetime.fromtimestamp(ts) for ts, _ in series]
+        fig.add_trace(go.Scatter(x=dates, y=[v for _, v in series], mode='lines', name=f'Equity ({source})', line=dict(color='#10b981')))
     fig.update_layout(
-        title="Equity Curve (Simulated)",
+        title="Equity Curve (Live Feed)",
         paper_bgcolor='rgba(0,0,0,0)',
         plot_bgcolor='rgba(0,0,0,0)',
         font=dict(color='#e4e4e7'),
@@ -110,14 +152,24 @@ with tab1:
     st.plotly_chart(fig, use_container_width=True)
 
 with tab2:
-    st.info(" Access restricted to ARCHITECT Tier. Upgrade to view live Order Book Imbalance.")
+    if tier != "ARCHITECT":
+        st.info(" Access restricted to ARCHITECT Tier. Upgrade to view live Order Book Imbalance.")
+    elif signals:
+        df = pd.DataFrame(
+            [{"Source": source, "Symbol": key, "Signal": value} for (source, key), value in signals.items()]
+        ).sort_values("Signal", key=abs, ascending=False)
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    else:
+        st.info("Nenhum sinal publicado ainda.")
 
 # --- Logs Console ---
 st.markdown("###  Terminal Output")
 logs = [
-    "[10:42:15] INFO: Weaver Grid initialized on SOL_USDC",
-    "[10:42:18] SUCCESS: Buy Order #9928 filled @ 142.50",
-    "[10:43:05] WARNING: Volatility Spike detected (ATR > 2.5). Widening spreads...",
-    "[10:44:12] INFO: Iron Dome check passed. 0 threats detected."
+    f"[{datetime.fromtimestamp(ts).strftime('%H:%M:%S')}] {source.upper()}: {metric} {key} = {value:.4g}"
+    for ts, source, metric, key, value in st.session_state.metrics_log[-15:]
 ]
-st.code("\n".join(logs), language="bash")
+st.code("\n".join(logs) or "Aguardando métricas em " + FEED_PATH, language="bash")
+
+# --- Auto Refresh (1s) ---
+time.sleep(REFRESH_SECONDS)
+st.rerun()
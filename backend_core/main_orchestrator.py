@@ -19,6 +19,8 @@ from core.risk_manager import RiskManager
 from strategies.sniper_executor import SniperExecutor
 from strategies.weaver_grid import WeaverGrid # Importando o Sleeper Agent
 from safety.sentinel import Sentinel
+from core.metrics_feed import MetricsFeed, METRIC_EQUITY, METRIC_PNL
+from core.account_state import AccountStateService, AccountStateView, AccountStateProxy
 from tools.market_wide_scanner import scan_market_wide
 
 # Configuração de Logging
@@ -46,16 +48,23 @@ class OmegaOrchestrator:
         
         # 1. Inicializar Transporte e Dados
         self.transport = BackpackTransport()
+        self.metrics = MetricsFeed(source="orchestrator")
+        self.transport.metrics = self.metrics # Latência e erros de API vão direto para o feed
         self.auth = BackpackAuth(os.getenv('BACKPACK_API_KEY'), os.getenv('BACKPACK_API_SECRET'))
         self.data_client = BackpackData(self.auth)
         
+        # 1.5 Account State (Posições/Ordens/Colateral): um único writer, leitura via memória compartilhada.
+        # Sentinel, Sniper, Position Manager e ferramentas externas (stealth_monitor, guardian_angel) leem o snapshot.
+        self.account_state = AccountStateService(self.transport)
+        self.account = AccountStateProxy(self.transport, AccountStateView())
+        
         # 2. Inicializar Core
-        self.risk_manager = RiskManager(self.transport)
+        self.risk_manager = RiskManager(self.account)
         
         # 3. Inicializar Estratégia e Segurança
-        self.sniper = SniperExecutor(self.transport, self.data_client, self.risk_manager, stealth_mode=self.stealth_mode)
-        self.weaver = WeaverGrid(self.transport, self.data_client, self.risk_manager) # Inicializa o Weaver
-        self.sentinel = Sentinel(self.transport, self.risk_manager)
+        self.sniper = SniperExecutor(self.account, self.data_client, self.risk_manager, stealth_mode=self.stealth_mode)
+        self.weaver = WeaverGrid(self.account, self.data_client, self.risk_manager) # Inicializa o Weaver
+        self.sentinel = Sentinel(self.account, self.risk_manager)
         
         # Estado do Modo
         self.active_mode = "PROFIT" # PROFIT (Sniper) ou VOLUME (Weaver)
@@ -131,6 +140,9 @@ class OmegaOrchestrator:
                 await asyncio.sleep(5)
                 continue
                 
+            # Gestão de posições: uma passada por ciclo (cadência própria), não uma por alvo
+            await self.sniper.manage_cycle()
+
             for symbol in self.targets:
                 # SNIPER SCALP (Agora Ajustado para Volume/Profit dinamicamente)
                 await self.sniper.scan_and_execute(symbol)
@@ -187,12 +199,24 @@ class OmegaOrchestrator:
             except Exception as e:
                 logger.error(f"Erro no Monitor de Stats: {e}")
 
+    async def publish_metrics(self):
+        """Publica Equity/PnL da sessão no Metrics Feed a cada segundo (somente memória, sem chamadas à exchange)."""
+        while self.is_running:
+            equity = self.sentinel.equity_base
+            if equity > 0:
+                self.metrics.publish(METRIC_EQUITY, equity)
+                self.metrics.publish(METRIC_PNL, equity - self.sentinel.start_equity, "SESSION")
+            await asyncio.sleep(1)
+
     async def start(self):
         """Inicia o sistema completo."""
         logger.info(" INICIANDO PROTOCOLO OMEGA (Spec-Driven)...")
         logger.info(" MISSÃO ATUAL: LUCRO TÁTICO (Deadline: 7:00 AM)")
         logger.info("   Estratégia: Sniper Flow-First | Alvo: Tendência + OBI")
         
+        # 0. Snapshot inicial da conta (antes de qualquer leitor)
+        await self.account_state.refresh()
+        
         # 1. Inicializar Sentinel (Captura Equity Base)
         await self.sentinel.initialize()
         
@@ -202,10 +226,12 @@ class OmegaOrchestrator:
 
         # 2. Criar Tasks Assíncronas
         tasks = [
+            asyncio.create_task(self.account_state.run()),
             asyncio.create_task(self.sentinel.monitor_loop()),
             asyncio.create_task(self.run_sniper_loop()),
             asyncio.create_task(self.monitor_session_stats()),
-            asyncio.create_task(self.run_opportunity_radar())
+            asyncio.create_task(self.run_opportunity_radar()),
+            asyncio.create_task(self.publish_metrics())
         ]
         
         # 3. Aguardar execução
@@ -217,6 +243,8 @@ class OmegaOrchestrator:
             logger.critical(f" Erro Fatal no Orquestrador: {e}")
         finally:
             self.is_running = False
+            self.metrics.close()
+            self.account_state.close()
 
 if __name__ == "__main__":
     import argparse
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+ OBI CLI - ponto de entrada único das ferramentas (ver core/obi_cli.py).
+Fino de propósito: o script principal é recompilado a cada execução, o módulo não.
+"""
+import sys
+from core.obi_cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,9 @@ import argparse
 import logging
 import signal
 import resource
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 
 # Adjust path to include parent directory
@@ -18,6 +21,7 @@ from obi_work_core.intent_translator import IntentTranslator
 from obi_work_core.backpack_client import BackpackClient
 from obi_work_core.market_analyzer import MarketAnalyzer
 from obi_work_core.solana_signer import SolanaSigner
+from obi_work_core.audit_anchor import AuditAnchor
 
 # Configure Logging
 logging.basicConfig(
@@ -27,19 +31,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+TIMEFRAME_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "4h": 14400, "1d": 86400
+}
+
+
+class AssetSchedule:
+    """
+    Per-asset scheduling state: next deadline, cadence, cached candles and latency history.
+    Candles are refetched only when a new bar opens; in between, the forming bar's close
+    tracks the ticker's last price.
+    """
+
+    def __init__(self, symbol: str, cadence: float, history: int = 200):
+        self.symbol = symbol
+        self.cadence = cadence
+        self.next_due = time.time()
+        self.candles = []
+        self.bar = None
+        self.errors = 0
+        self.runs = 0
+        self.latencies = deque(maxlen=history)
+
+    def record(self, latency_ms: float):
+        self.runs += 1
+        self.latencies.append(latency_ms)
+
+    def stats(self) -> dict:
+        ordered = sorted(self.latencies)
+        if not ordered:
+            return {"runs": 0}
+        return {
+            "runs": self.runs,
+            "cadence_s": self.cadence,
+            "p50_ms": round(ordered[len(ordered) // 2], 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+            "max_ms": round(ordered[-1], 1),
+            "errors": self.errors,
+        }
+
+
 class AgentLoop:
     """
     OBI WORK CORE - Main Execution Loop (Institutional Grade)
     Orchestrates Identity, Context, Risk, Execution, and On-Chain Audit.
     Includes Safety mechanisms: Resource Limits, Signal Handling, and Backoff.
+    Assets run as independent pipelines on a bounded thread pool, each with its own
+    deadline-driven cadence (cycle_interval / cadence_<ASSET> in the VSC file).
     """
     
-    def __init__(self, vsc_file: str, mode: str = 'standard', timeout: int = 30):
+    def __init__(self, vsc_file: str, mode: str = 'standard', timeout: int = 30, max_workers: int = 4,
+                 report_interval: float = 60.0):
         logger.info(f"Initializing OBI WORK Agent Loop (Mode: {mode.upper()})...")
         self.mode = mode
         self.timeout = timeout
         self.running = True
         self.last_tick = time.time()
+        self.max_workers = max(1, max_workers)
+        self.report_interval = report_interval
         
         # Setup Signal Handlers
         signal.signal(signal.SIGINT, self._shutdown_handler)
@@ -62,6 +112,11 @@ class AgentLoop:
         # 4. Infrastructure
         self.client = BackpackClient()
         self.solana_signer = SolanaSigner()
+        # On-chain audit: receipts are batched into one Merkle root per interval
+        self.anchor = None
+        if self.context.get('audit_enabled', False):
+            self.anchor = AuditAnchor(interval=float(self.context.get('anchor_interval', 60)),
+                                      signer=self.solana_signer).start()
         
         # 5. Risk Engine Setup
         self.risk_engine = RiskDesignEngine(self.context)
@@ -76,49 +131,65 @@ class AgentLoop:
             
         self.constraints = self.risk_engine.generate_constraints(current_balance=current_balance)
         self.gatekeeper = RiskGatekeeper(self.constraints)
+        # Gatekeeper check + execution are serialized: session-loss state is shared by all assets
+        self.gate_lock = threading.Lock()
         logger.info(f"Risk Constraints Applied: {self.constraints}")
+
+        # 6. Scheduler
+        default_cadence = float(self.context.get('cycle_interval', 0.5))
+        self.schedules = {}
+        for asset in self.context.get('assets', []):
+            symbol = f"{asset}_USDC" if "_" not in asset else asset
+            cadence = float(self.context.get(f"cadence_{asset}", default_cadence))
+            self.schedules[symbol] = AssetSchedule(symbol, cadence)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="AgentLoop")
+        self.in_flight = {}
+        self.started = {}
+        self.last_report = time.time()
         
     def _shutdown_handler(self, signum, frame):
         logger.info(f"Signal {signum} received. Initiating Graceful Shutdown...")
         self.running = False
 
     def run(self):
-        logger.info("--- ENTERING EXECUTION LOOP ---")
-        consecutive_errors = 0
-        
-        while self.running:
-            try:
-                loop_start = time.time()
-                
-                # Watchdog Check (Internal)
-                if loop_start - self.last_tick > self.timeout:
-                    logger.warning("Lag detected in execution cycle.")
-                
-                self._cycle()
-                
-                # Reset error counter on success
-                consecutive_errors = 0
-                self.last_tick = time.time()
-                
-                # Rate Limit / HFT Pacing
-                time.sleep(0.5) 
-                
-            except KeyboardInterrupt:
-                self._shutdown_handler(signal.SIGINT, None)
-            except Exception as e:
-                consecutive_errors += 1
-                logger.error(f"Cycle Error: {e}")
-                
-                # Backoff Logic
-                backoff_time = min(2 ** consecutive_errors, 60)
-                logger.info(f"Backing off for {backoff_time}s...")
-                time.sleep(backoff_time)
-                
-                if consecutive_errors > 5:
-                    logger.critical("Too many consecutive errors. Aborting.")
-                    self.running = False
+        logger.info(f"--- ENTERING EXECUTION LOOP ({len(self.schedules)} assets, {self.max_workers} workers) ---")
+
+        consecutive_errors = 0 # Scheduler-level failures (integrity, wait, dispatch); per-asset errors live in AssetSchedule
+        try:
+            while self.running:
+                try:
+                    self._cycle()
+                    consecutive_errors = 0
+                    self.last_tick = time.time()
 
-        self._finalize()
+                    if time.time() - self.last_report >= self.report_interval:
+                        self._report()
+
+                    # Too many consecutive errors on every asset: abort (same threshold as before, per asset)
+                    if self.schedules and all(state.errors > 5 for state in self.schedules.values()):
+                        logger.critical("Too many consecutive errors. Aborting.")
+                        self.running = False
+
+                except KeyboardInterrupt:
+                    self._shutdown_handler(signal.SIGINT, None)
+                except Exception as e:
+                    consecutive_errors += 1
+                    logger.error(f"Cycle Error: {e}")
+
+                    # Backoff Logic
+                    backoff_time = min(2 ** consecutive_errors, 60)
+                    logger.info(f"Backing off for {backoff_time}s...")
+                    time.sleep(backoff_time)
+
+                    if consecutive_errors > 5:
+                        logger.critical("Too many consecutive errors. Aborting.")
+                        self.running = False
+        finally:
+            # In-flight pipelines finish before the receipt, whatever ended the loop
+            wait(list(self.in_flight))
+            self.pool.shutdown(wait=False)
+            self._report()
+            self._finalize()
 
     def _finalize(self):
         logger.info("--- SHUTDOWN SEQUENCE ---")
@@ -128,29 +199,104 @@ class AgentLoop:
             logger.info(f"Receipt Generated: {receipt.get('signature', 'UNSIGNED')[:10]}...")
         except Exception as e:
             logger.error(f"Failed to generate receipt: {e}")
+        if self.anchor:
+            logger.info("Anchoring pending audit batches...")
+            self.anchor.stop()
         logger.info("Agent Stopped Safely.")
 
     def _cycle(self):
-        """Single Execution Cycle"""
+        """
+        Scheduler tick: dispatch every asset whose deadline has passed (and is not already
+        running), then wait until the next deadline or the first pipeline to finish.
+        """
         # A. Integrity Check
         if not self.identity.validate_integrity():
             logger.critical("INTEGRITY FAILURE. ABORTING.")
             self.running = False
             return
-            
-        # B. Market Scan & Execution per Asset
-        assets = self.context.get('assets', [])
-        for asset in assets:
-            symbol = f"{asset}_USDC" if "_" not in asset else asset
-            self._process_asset(symbol)
-            
-    def _process_asset(self, symbol: str):
-        # 1. Fetch Data
+
+        # B. Dispatch due assets
+        now = time.time()
+        running = set(self.in_flight.values())
+        for symbol, state in self.schedules.items():
+            if symbol not in running and state.next_due <= now:
+                future = self.pool.submit(self._run_asset, state)
+                self.in_flight[future] = symbol
+                self.started[symbol] = now
+
+        # C. Wait for the next deadline (or a completion, which may free an asset to reschedule)
+        running = set(self.in_flight.values())
+        idle = [s for s in self.schedules.values() if s.symbol not in running]
+        next_due = min((s.next_due for s in idle), default=now + 1.0)
+        timeout = max(0.0, min(next_due - time.time(), 1.0))
+        if self.in_flight:
+            done, _ = wait(list(self.in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                self.in_flight.pop(future, None)
+        elif timeout > 0:
+            time.sleep(timeout)
+
+        # D. Watchdog: pipelines still running past the timeout
+        for symbol in self.in_flight.values():
+            if time.time() - self.started[symbol] > self.timeout:
+                logger.warning(f"Lag detected in execution cycle ({symbol} still running).")
+                self.started[symbol] = time.time() # Warn once per timeout window
+
+    def _run_asset(self, state: AssetSchedule):
+        """One pipeline run for an asset, with latency, backoff and deadline bookkeeping."""
+        started = time.time()
+        scheduled = state.next_due
         try:
+            self._process_asset(state.symbol, state)
+            state.errors = 0
+            # Deadline-driven: next run at the next cadence boundary (skip missed slots, no drift)
+            state.next_due = max(scheduled + state.cadence, time.time())
+        except Exception as e:
+            state.errors += 1
+            backoff_time = min(2 ** state.errors, 60)
+            logger.error(f"Cycle Error ({state.symbol}): {e}. Backing off for {backoff_time}s...")
+            state.next_due = time.time() + backoff_time
+        finally:
+            latency_ms = (time.time() - started) * 1000
+            state.record(latency_ms)
+            if latency_ms > self.timeout * 1000:
+                logger.warning(f"Lag detected in execution cycle ({state.symbol}: {latency_ms:.0f}ms).")
+
+    def _report(self):
+        """Per-asset cycle latency (p50/p95/max) since start."""
+        self.last_report = time.time()
+        for symbol, state in self.schedules.items():
+            logger.info(f"[{symbol}] cycle latency: {state.stats()}")
+
+    def report(self) -> dict:
+        return {symbol: state.stats() for symbol, state in self.schedules.items()}
+
+    def _candles(self, symbol: str, state: AssetSchedule, ticker: dict) -> list:
+        """Candles refreshed only when a new bar opens; the forming bar follows the ticker."""
+        seconds = TIMEFRAME_SECONDS.get(self.strategy_config.timeframe, 300)
+        bar = int(time.time() // seconds)
+        if bar != state.bar or not state.candles:
             candles = self.client.get_candles(symbol, self.strategy_config.timeframe, limit=50)
+            if candles:
+                state.candles, state.bar = candles, bar
+        elif ticker.get('lastPrice'):
+            last = state.candles[-1]
+            if isinstance(last, dict):
+                state.candles[-1] = dict(last, close=ticker['lastPrice'])
+            else:
+                state.candles[-1] = list(last[:4]) + [ticker['lastPrice']] + list(last[5:])
+        return state.candles
+
+    def _process_asset(self, symbol: str, state: AssetSchedule = None):
+        state = state or self.schedules.get(symbol) or AssetSchedule(symbol, 0.5)
+        # 1. Fetch Data
+        try:
             ticker = self.client.get_ticker(symbol)
+            if not ticker:
+                return
+            candles = self._candles(symbol, state, ticker)
             
-            if not candles or not ticker:
+            if not candles:
                 return
 
             # 2. Analyze
@@ -169,18 +315,19 @@ class AgentLoop:
             if signal:
                 logger.info(f"[{symbol}] Signal Detected: {signal['side']} @ RSI {rsi:.1f}")
                 
-                # 4. Risk Gatekeeper Check
-                allowed, reason = self.gatekeeper.check_order(
-                    symbol=signal['symbol'],
-                    side=signal['side'],
-                    size_usd=signal['size'],
-                    leverage=signal['leverage']
-                )
-                
-                if allowed:
-                    self._execute(signal)
-                else:
-                    logger.warning(f"GATEKEEPER VETO: {reason}")
+                # 4. Risk Gatekeeper Check (serialized across assets with the execution it approves)
+                with self.gate_lock:
+                    allowed, reason = self.gatekeeper.check_order(
+                        symbol=signal['symbol'],
+                        side=signal['side'],
+                        size_usd=signal['size'],
+                        leverage=signal['leverage']
+                    )
+                    
+                    if allowed:
+                        self._execute(signal)
+                    else:
+                        logger.warning(f"GATEKEEPER VETO: {reason}")
 
         except Exception as e:
             logger.debug(f"Asset processing error ({symbol}): {e}")
@@ -212,13 +359,16 @@ class AgentLoop:
         logger.info(f"EXECUTING: {signal['side']} {signal['symbol']} ${signal['size']}")
         # In real production, this calls self.client.execute_order(...)
         # For now, we simulate execution log
-        self.solana_signer.sign_audit_receipt(signal)
+        signature = self.solana_signer.sign_audit_receipt(signal)
+        if self.anchor:
+            self.anchor.record({"session_id": self.identity.session_id, "timestamp": time.time(),
+                                "signal": signal, "signature": signature})
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='OBI WORK Agent Executor')
     parser.add_argument('--vsc', type=str, default='VSC_INFRA_RULES.txt', help='Path to VSC instruction file')
     parser.add_argument('--mode', type=str, default='standard', choices=['standard', 'safe', 'aggressive'], help='Execution mode')
-    parser.add_argument('--max-workers', type=int, default=1, help='Max thread workers')
+    parser.add_argument('--max-workers', type=int, default=4, help='Max concurrent asset pipelines')
     parser.add_argument('--timeout', type=int, default=30, help='Cycle timeout in seconds')
     parser.add_argument('--memory-limit', type=int, default=512, help='Memory limit in MB')
     parser.add_argument('--cpu-limit', type=int, default=1, help='CPU Core affinity (not strict limit in python)')
@@ -238,7 +388,7 @@ if __name__ == "__main__":
     except Exception as e:
         logger.warning(f"Could not set resource limits: {e}")
 
-    agent = AgentLoop(vsc_file=args.vsc, mode=args.mode, timeout=args.timeout)
+    agent = AgentLoop(vsc_file=args.vsc, mode=args.mode, timeout=args.timeout, max_workers=args.max_workers)
     agent.run()
             
     def _evaluate_signal(self, data: dict):
@@ -9,6 +9,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from obi_work_core.backpack_client import BackpackClient
 
+try:
+    from core.carry_analytics import CarryAnalytics
+except ImportError:
+    CarryAnalytics = None # Standalone: um ticker por ativo
+
 class ArbitrageLab:
     """
     OBI WORK - ARBITRAGE LAB (VSC COMPLIANT)
@@ -21,7 +26,27 @@ class ArbitrageLab:
         self.client = BackpackClient()
         self.session_id = str(uuid.uuid4())[:8]
         self.assets = ["SOL", "BTC", "ETH"]
-        
+        self.carry = CarryAnalytics() if CarryAnalytics else None
+
+    def scan_basis(self):
+        """
+        Basis de todos os ativos monitorados numa única varredura (tickers + markPrices em lote).
+        Returns: list of dicts (mesmo formato de get_basis)
+        """
+        if not self.carry:
+            return [d for d in (self.get_basis(a) for a in self.assets) if d]
+        table = self.carry.basis(self.assets)
+        table = table[(table['spot'] > 0) & (table['perp'] > 0)]
+        return [{
+            "symbol": row.base,
+            "spot": row.spot,
+            "perp": row.perp,
+            "basis_pct": row.basis_pct,
+            "diff": row.perp - row.spot,
+            "funding_apr": row.funding_apr,
+            "persistence": row.persistence
+        } for row in table.itertuples()]
+
     def get_basis(self, symbol):
         """
         Calculates Basis Spread for a given asset.
@@ -68,9 +93,7 @@ class ArbitrageLab:
         
         while True:
             try:
-                for asset in self.assets:
-                    data = self.get_basis(asset)
-                    
+                for data in self.scan_basis():
                     if data:
                         timestamp = datetime.utcnow().strftime("%H:%M:%S")
                         basis = data['basis_pct']
@@ -88,8 +111,6 @@ class ArbitrageLab:
                             f"{data['perp']:.2f}|{basis:.4f}%|${data['diff']:.4f}|{signal}"
                         )
                         print(log_line, flush=True)
-                        
-                    time.sleep(1) # Rate limit protection
                 
                 print("---", flush=True) # Visual separator for human observers (ignored by parser)
                 time.sleep(5) # Scan interval
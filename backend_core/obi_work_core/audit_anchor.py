@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def _leaf(proof_hash: str) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(proof_hash)).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+class MerkleTree:
+    """
+    OBI WORK CORE - Merkle Tree over audit proof hashes (SHA-256).
+    Leaves and internal nodes are domain-separated; an odd node at the end of a level
+    is promoted unchanged, so no leaf is ever duplicated.
+    """
+
+    def __init__(self, proof_hashes: List[str]):
+        if not proof_hashes:
+            raise ValueError("MerkleTree needs at least one leaf")
+        self.leaves = list(proof_hashes)
+        self.levels = [[_leaf(h) for h in self.leaves]]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            parent = [_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                parent.append(level[-1])
+            self.levels.append(parent)
+
+    @property
+    def root(self) -> str:
+        return self.levels[-1][0].hex()
+
+    def proof(self, index: int) -> List[List[str]]:
+        """Inclusion path for leaf `index`: [[sibling_hex, 'L'|'R'], ...] from leaf to root."""
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append([level[sibling].hex(), "L" if sibling < index else "R"])
+            index //= 2
+        return path
+
+    @staticmethod
+    def verify(proof_hash: str, path: List[List[str]], root: str) -> bool:
+        try:
+            acc = _leaf(proof_hash)
+            for sibling, position in path:
+                acc = _node(bytes.fromhex(sibling), acc) if position == "L" else _node(acc, bytes.fromhex(sibling))
+            return acc.hex() == root
+        except (ValueError, TypeError):
+            return False
+
+
+class AuditAnchor:
+    """
+    OBI WORK CORE - Batched On-Chain Audit Anchoring
+    Tails the audit vault (HASH|RAW_PROOF lines written by IntegrityAudit), seals the new
+    proofs into one Merkle tree per interval and publishes only the root in a single Memo.
+    Inclusion proofs are stored locally, so any trade can be verified against its anchored root.
+    Submission runs on a background thread with retry; unanchored batches survive restarts.
+    """
+
+    def __init__(self, vault_path: str = "logs/audit_vault.vsc", anchors_path: Optional[str] = None,
+                 proofs_path: Optional[str] = None, interval: float = 60.0, max_batch: int = 4096,
+                 publisher: Optional[Callable[[str], str]] = None, signer=None,
+                 retries: int = 4, retry_base: float = 1.0):
+        self.vault_path = vault_path
+        # Anchor records and inclusion proofs live next to the vault by default
+        vault_dir = os.path.dirname(vault_path)
+        self.anchors_path = anchors_path or os.path.join(vault_dir, "audit_anchors.jsonl")
+        self.proofs_path = proofs_path or os.path.join(vault_dir, "audit_proofs.jsonl")
+        self.interval = interval
+        self.max_batch = max_batch
+        self.retries = retries
+        self.retry_base = retry_base
+        self._publisher = publisher
+        self._signer = signer
+
+        self.lock = threading.RLock()
+        self.wake = threading.Event()
+        self.batches: Dict[int, Dict[str, Any]] = {}
+        self.offset = 0
+        self._proof_index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._load()
+
+        self.running = False
+        self.worker = None
+
+    # --- PUBLIC API ---
+
+    def start(self):
+        if self.running:
+            return self
+        self.running = True
+        self.worker = threading.Thread(target=self._loop, name="AuditAnchor", daemon=True)
+        self.worker.start()
+        return self
+
+    def stop(self, flush: bool = True):
+        self.running = False
+        self.wake.set()
+        if self.worker:
+            self.worker.join(timeout=self.interval + 1)
+        if flush:
+            self.flush()
+
+    def record(self, receipt: Dict[str, Any]) -> str:
+        """Appends a receipt to the vault in IntegrityAudit's format; it is anchored with the next batch."""
+        raw = json.dumps(receipt, sort_keys=True)
+        proof_hash = hashlib.sha256(raw.encode()).hexdigest()
+        os.makedirs(os.path.dirname(self.vault_path) or ".", exist_ok=True)
+        with self.lock, open(self.vault_path, "a") as f:
+            f.write(f"{proof_hash}|{raw}\n")
+        return proof_hash
+
+    def seal(self) -> Optional[Dict[str, Any]]:
+        """Builds a batch from vault lines appended since the last seal. Returns the batch (or None)."""
+        with self.lock:
+            hashes, offset = self._read_vault()
+            if not hashes:
+                return None
+            tree = MerkleTree(hashes)
+            batch_id = max(self.batches, default=0) + 1
+            batch = {
+                "batch": batch_id,
+                "root": tree.root,
+                "leaves": len(hashes),
+                "vault_offset": offset,
+                "sealed_at": time.time(),
+                "status": "pending",
+                "tx": None,
+                "attempts": 0,
+            }
+            # Proofs first, then the batch record: a crash in between only re-seals the same lines
+            entries = [{"hash": h, "batch": batch_id, "index": i, "path": tree.proof(i)} for i, h in enumerate(hashes)]
+            self._append(self.proofs_path, entries)
+            self._append(self.anchors_path, [batch])
+            self.batches[batch_id] = batch
+            self.offset = offset
+            if self._proof_index is not None:
+                for entry in entries:
+                    self._proof_index[entry["hash"]] = entry
+            logger.info(f"Audit batch #{batch_id} sealed: {len(hashes)} proofs, root {tree.root[:16]}...")
+            return batch
+
+    def submit_pending(self) -> int:
+        """Publishes every unanchored batch root, retrying with exponential backoff. Returns batches anchored."""
+        anchored = 0
+        for batch in self.pending():
+            for attempt in range(self.retries):
+                batch["attempts"] += 1
+                try:
+                    tx_sig = self._publish(f"OBI:AUDIT:ROOT:{batch['root']}:{batch['leaves']}")
+                    if not tx_sig or tx_sig == "failed_tx":
+                        raise RuntimeError("publisher returned no signature")
+                    with self.lock:
+                        batch.update({"status": "anchored", "tx": tx_sig, "anchored_at": time.time()})
+                        self._append(self.anchors_path, [batch])
+                    logger.info(f"Audit batch #{batch['batch']} anchored: {tx_sig}")
+                    anchored += 1
+                    break
+                except Exception as e:
+                    logger.warning(f"Anchor batch #{batch['batch']} failed (attempt {batch['attempts']}): {e}")
+                    if attempt + 1 == self.retries or self._backoff(self.retry_base * (2 ** attempt)):
+                        break # Left pending: retried on the next interval
+        return anchored
+
+    def flush(self) -> int:
+        self.seal()
+        return self.submit_pending()
+
+    def pending(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [b for _, b in sorted(self.batches.items()) if b["status"] != "anchored"]
+
+    def inclusion_proof(self, proof_hash: str) -> Optional[Dict[str, Any]]:
+        """{hash, batch, index, path, root, tx, status} for a vault proof hash, or None if not sealed yet."""
+        with self.lock:
+            if self._proof_index is None:
+                self._proof_index = {}
+                if os.path.exists(self.proofs_path):
+                    with open(self.proofs_path, "r") as f:
+                        for line in f:
+                            if line.strip():
+                                entry = json.loads(line)
+                                self._proof_index[entry["hash"]] = entry
+            entry = self._proof_index.get(proof_hash)
+            if not entry:
+                return None
+            batch = self.batches.get(entry["batch"], {})
+            return dict(entry, root=batch.get("root"), tx=batch.get("tx"), status=batch.get("status"))
+
+    def verify(self, proof_hash: str) -> bool:
+        """True if the proof hash is included in its batch's (anchored) Merkle root."""
+        proof = self.inclusion_proof(proof_hash)
+        return bool(proof and proof["root"] and MerkleTree.verify(proof_hash, proof["path"], proof["root"]))
+
+    # --- INTERNAL ---
+
+    def _publish(self, memo: str) -> str:
+        if self._publisher:
+            return self._publisher(memo)
+        if self._signer is None:
+            from obi_work_core.solana_signer import SolanaSigner
+            self._signer = SolanaSigner()
+        return self._signer.send_memo(memo)
+
+    def _backoff(self, delay: float) -> bool:
+        """Sleeps between retries; True if interrupted by stop()."""
+        if not self.running:
+            time.sleep(delay)
+            return False
+        return self.wake.wait(delay)
+
+    def _loop(self):
+        while self.running:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            try:
+                self.seal()
+                self.submit_pending()
+            except Exception as e:
+                logger.error(f"Audit anchor cycle error: {e}")
+
+    def _load(self):
+        if not os.path.exists(self.anchors_path):
+            return
+        with open(self.anchors_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.batches[record["batch"]] = record # Last record per batch wins
+        self.offset = max((b["vault_offset"] for b in self.batches.values()), default=0)
+        pending = len(self.pending())
+        if pending:
+            logger.info(f"{pending} audit batch(es) pending anchoring from previous run.")
+
+    def _read_vault(self):
+        """Complete lines after the current offset (up to max_batch). Returns (hashes, new_offset)."""
+        if not os.path.exists(self.vault_path):
+            return [], self.offset
+        hashes, offset = [], self.offset
+        with open(self.vault_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n") or len(hashes) >= self.max_batch:
+                    break # Partial line still being written / batch full
+                offset += len(line)
+                proof_hash = line.split(b"|", 1)[0].strip().decode()
+                if len(proof_hash) == 64:
+                    hashes.append(proof_hash)
+        return hashes, offset
+
+    @staticmethod
+    def _append(path: str, records: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    anchor = AuditAnchor()
+    batch = anchor.seal()
+    print(f"Sealed: {batch}")
+    print(f"Pending batches: {len(anchor.pending())}")
@@ -1,78 +1,28 @@
 import os
+import sys
 from typing import Dict, Any, List, Union
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.vsc_utils import read_mapping, infer_value
+
 class VSCParser:
     """
     Parses VSC (Value-Separated Content) files into a dictionary.
     Strict enforcement of rules defined in vsc_spec.md.
+    Backed by the shared streaming VSC library (core.vsc_utils).
     """
     
     @staticmethod
     def parse_file(file_path: str) -> Dict[str, Any]:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"VSC file not found: {file_path}")
-            
-        context = {}
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-            
-        for line_num, line in enumerate(lines, 1):
-            line = line.strip()
-            
-            # Skip comments and empty lines
-            if not line or line.startswith('#'):
-                continue
-                
-            # Split by first colon OR comma (VSC Standard)
-            if ':' in line:
-                separator = ':'
-            elif ',' in line:
-                separator = ','
-            else:
-                # Log warning in a real system, strict mode ignores or errors
-                continue
-                
-            key, value_raw = line.split(separator, 1)
-            key = key.strip()
-            value_raw = value_raw.strip()
-            
-            # Parse Value
-            value = VSCParser._parse_value(value_raw)
-            
-            context[key] = value
-            
-        return context
+        # Split by first colon OR comma (VSC Standard); comments and empty lines skipped
+        return read_mapping(file_path)
     
     @staticmethod
     def _parse_value(value: str) -> Union[str, int, float, bool, List[Any], None]:
-        # Handle Boolean
-        if value.lower() == 'true':
-            return True
-        if value.lower() == 'false':
-            return False
-            
-        # Handle Lists [a, b, c]
-        if value.startswith('[') and value.endswith(']'):
-            content = value[1:-1]
-            if not content.strip():
-                return []
-            items = [VSCParser._parse_value(item.strip()) for item in content.split(',')]
-            return items
-            
-        # Handle Numbers
-        try:
-            if '.' in value:
-                return float(value)
-            return int(value)
-        except ValueError:
-            pass
-            
-        # Handle Undefined/Null
-        if value.lower() in ['undefined', 'null', 'none']:
-            return None
-            
-        # Default string
-        return value
+        return infer_value(value)
 
 class ExecutionContextLoader:
     """
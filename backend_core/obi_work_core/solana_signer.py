@@ -65,6 +65,7 @@ class SolanaSigner:
         """
         Publishes the Audit Hash to Solana via Memo Program.
         Returns the Transaction Signature (Explorer Link).
+        For high trade rates, prefer AuditAnchor (one Merkle root per batch).
         """
         # 1. Create Receipt Hash
         receipt_str = json.dumps(receipt, sort_keys=True)
@@ -76,32 +77,7 @@ class SolanaSigner:
         print(f"Publishing Audit Hash: {memo_content}")
         
         try:
-            # 2. Build Memo Instruction
-            # Memo Program ID: MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcQb
-            memo_program_id = Pubkey.from_string("MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcQb")
-            
-            ix = Instruction(
-                program_id=memo_program_id,
-                accounts=[
-                    AccountMeta(pubkey=self.keypair.pubkey(), is_signer=True, is_writable=True)
-                ],
-                data=memo_content.encode("utf-8")
-            )
-            
-            # 3. Build Transaction
-            recent_blockhash = self.rpc_client.get_latest_blockhash().value.blockhash
-            
-            # Use solders Transaction (new way)
-            txn = Transaction.new_signed_with_payer(
-                [ix],
-                self.keypair.pubkey(),
-                [self.keypair],
-                recent_blockhash
-            )
-            
-            # 4. Send
-            result = self.rpc_client.send_transaction(txn)
-            tx_sig = str(result.value)
+            tx_sig = self.send_memo(memo_content)
             print(f" Audit Published! TX: https://explorer.solana.com/tx/{tx_sig}?cluster=devnet")
             return tx_sig
             
@@ -109,6 +85,38 @@ class SolanaSigner:
             print(f" Failed to publish on-chain: {e}")
             return "failed_tx"
 
+    def send_memo(self, memo_content: str) -> str:
+        """
+        Sends a single Memo transaction and returns its signature.
+        Raises on failure (callers handle retry).
+        """
+        # 2. Build Memo Instruction
+        # Memo Program ID: MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcQb
+        memo_program_id = Pubkey.from_string("MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcQb")
+        
+        ix = Instruction(
+            program_id=memo_program_id,
+            accounts=[
+                AccountMeta(pubkey=self.keypair.pubkey(), is_signer=True, is_writable=True)
+            ],
+            data=memo_content.encode("utf-8")
+        )
+        
+        # 3. Build Transaction
+        recent_blockhash = self.rpc_client.get_latest_blockhash().value.blockhash
+        
+        # Use solders Transaction (new way)
+        txn = Transaction.new_signed_with_payer(
+            [ix],
+            self.keypair.pubkey(),
+            [self.keypair],
+            recent_blockhash
+        )
+        
+        # 4. Send
+        result = self.rpc_client.send_transaction(txn)
+        return str(result.value)
+
 if __name__ == "__main__":
     # Test
     signer = SolanaSigner()
@@ -60,3 +60,34 @@ class BackpackAuth:
         }
         
         return headers
+
+    def get_batch_headers(self, instruction, items):
+        """
+        Assinatura de endpoints em lote (ex.: POST /api/v1/orders).
+        Cada item vira um bloco 'instruction=<instr>&<params ordenados>'; os blocos são
+        unidos por '&' e timestamp/window entram uma única vez no final.
+        """
+        timestamp = int(time.time() * 1000)
+        window = 5000
+
+        blocks = []
+        for item in items:
+            parts = []
+            for key in sorted(item.keys()):
+                value = item[key]
+                if isinstance(value, bool):
+                    value = str(value).lower()
+                parts.append(f"{key}={value}")
+            blocks.append("&".join([f"instruction={instruction}"] + parts))
+
+        signature_payload = "&".join(blocks + [f"timestamp={timestamp}", f"window={window}"])
+        signature_bytes = self.private_key.sign(signature_payload.encode('utf-8'))
+        signature_base64 = base64.b64encode(signature_bytes).decode('utf-8')
+
+        return {
+            "X-API-Key": self.api_key,
+            "X-Signature": signature_base64,
+            "X-Timestamp": str(timestamp),
+            "X-Window": str(window),
+            "Content-Type": "application/json; charset=utf-8"
+        }
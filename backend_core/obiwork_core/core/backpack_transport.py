@@ -1,5 +1,6 @@
 import os
 import time
+import threading
 import requests
 import base64
 import json
@@ -7,6 +8,9 @@ from backpack_auth import BackpackAuth
 
 import logging
 
+# Máximo de ordens por POST /api/v1/orders
+BATCH_LIMIT = 20
+
 class BackpackTransport:
     """
      BACKPACK TRANSPORT LAYER
@@ -19,10 +23,16 @@ class BackpackTransport:
             self.auth = auth
         else:
             self.auth = BackpackAuth(os.getenv('BACKPACK_API_KEY'), os.getenv('BACKPACK_API_SECRET'))
+        self.metrics = None # Opcional: MetricsFeed (backend_core/core/metrics_feed.py)
         
     def _send_request(self, method, endpoint, instruction, payload=None):
         url = f"{self.base_url}{endpoint}"
-        headers = self.auth.get_headers(instruction, payload)
+        if isinstance(payload, list):
+            headers = self.auth.get_batch_headers(instruction, payload) # Endpoints em lote
+        else:
+            headers = self.auth.get_headers(instruction, payload)
+        started = time.perf_counter()
+        ok = False
         
         try:
             if method == "GET":
@@ -35,6 +45,7 @@ class BackpackTransport:
                 return None
                 
             if response.status_code == 200:
+                ok = True
                 return response.json()
             else:
                 self.logger.error(f" API ERROR ({response.status_code}): {response.text}")
@@ -44,6 +55,9 @@ class BackpackTransport:
             self.logger.error(f" TRANSPORT ERROR: {e}")
             print(f"    TRANSPORT ERROR: {e}")
             return None
+        finally:
+            if self.metrics:
+                self.metrics.record_request(endpoint.split('?')[0], (time.perf_counter() - started) * 1000, ok)
 
     def get_klines(self, symbol, interval, limit=100):
         seconds_map = {
@@ -136,6 +150,57 @@ class BackpackTransport:
         }
         return self._send_request("DELETE", "/api/v1/order", "orderCancel", payload)
 
+    def execute_batch(self, orders):
+        """
+        Envia várias ordens em uma requisição (lotes de até BATCH_LIMIT).
+        Endpoint: POST /api/v1/orders
+        Instrução: orderExecute (uma por ordem na assinatura)
+        Retorna lista alinhada com `orders` (None onde o lote falhou).
+        """
+        results = []
+        for i in range(0, len(orders), BATCH_LIMIT):
+            chunk = orders[i:i + BATCH_LIMIT]
+            res = self._send_request("POST", "/api/v1/orders", "orderExecute", chunk)
+            if isinstance(res, list) and len(res) == len(chunk):
+                results.extend(res)
+            else:
+                results.extend([None] * len(chunk))
+        return results
+
+    def replace_order(self, symbol, order_id, payload, make_before_break=True):
+        """
+        Substitui uma ordem aberta por `payload` (a Backpack não expõe amend nativo).
+        make_before_break: posta a nova antes de cancelar a antiga. Seguro para ordens reduceOnly
+        (duas saídas nunca ultrapassam a posição) e a posição nunca fica descoberta.
+        Senão, cancelamento e nova ordem seguem em paralelo (uma janela de RTT em vez de três).
+        Retorna {'order', 'cancel', 'latency_ms', 'unprotected_ms'}.
+        """
+        started = time.perf_counter()
+        if make_before_break:
+            order = self._send_request("POST", "/api/v1/order", "orderExecute", payload)
+            # Se a nova falhar, a antiga continua no livro
+            cancel = self.cancel_order(symbol, order_id) if order else None
+            unprotected_ms = 0.0 if order else None
+        else:
+            done = {}
+            def cancel_old():
+                done['cancel'] = self.cancel_order(symbol, order_id)
+                done['cancel_at'] = time.perf_counter()
+            worker = threading.Thread(target=cancel_old)
+            worker.start()
+            order = self._send_request("POST", "/api/v1/order", "orderExecute", payload)
+            placed_at = time.perf_counter()
+            worker.join()
+            cancel = done.get('cancel')
+            unprotected_ms = max(0.0, placed_at - done['cancel_at']) * 1000 if order else None
+
+        return {
+            'order': order,
+            'cancel': cancel,
+            'latency_ms': (time.perf_counter() - started) * 1000,
+            'unprotected_ms': unprotected_ms,
+        }
+
     def get_order_history(self, limit=100, symbol=None):
         """
         Retorna histórico de ordens.
@@ -12,12 +12,23 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 sys.path.append(os.path.join(project_root, 'core'))
+sys.path.append(os.path.join(os.path.dirname(project_root), 'core')) # Core compartilhado (backend_core/core)
 
 from backpack_transport import BackpackTransport
 from backpack_data import BackpackData
 from backpack_auth import BackpackAuth
 from funding_hunter import FundingHunter
 
+try:
+    from maker_engine import MakerChaseEngine
+except ImportError:
+    MakerChaseEngine = None # Clone standalone: chase por polling
+
+try:
+    from market_registry import MarketRegistry
+except ImportError:
+    MarketRegistry = None # Clone standalone: consulta /markets a cada ordem
+
 init(autoreset=True)
 load_dotenv()
 
@@ -124,6 +135,7 @@ class VolumeStriker:
         self.auth = BackpackAuth(os.getenv('BACKPACK_API_KEY'), os.getenv('BACKPACK_API_SECRET'))
         self.transport = BackpackTransport(self.auth)
         self.data = BackpackData(self.auth)
+        self.maker = MakerChaseEngine(self.transport, logger=logger) if MakerChaseEngine else None
         self.hunter = FundingHunter()
         self.capital = CapitalManager()
         self.math = ProfitMath()
@@ -256,6 +268,8 @@ class VolumeStriker:
 
     async def get_market_filters(self, symbol):
         """Helper to get tick size and step size dynamically"""
+        if MarketRegistry:
+            return MarketRegistry.shared().filters(symbol)
         try:
             markets = self.data.get_markets()
             for m in markets:
@@ -284,6 +298,15 @@ class VolumeStriker:
         """
         print(f"{Fore.MAGENTA} INITIATING SMART MAKER CHASE: {symbol} ({side}){Style.RESET_ALL}")
         
+        if self.maker:
+            # Event-driven: reprecifica no topo do book e resolve no fill (mesmo orçamento de 2s por tentativa)
+            report = await self.maker.chase(symbol, side, quantity, aggression=aggression, timeout=max_retries * 2.0)
+            if report['status'] == 'filled':
+                print(f"    SURGICAL EXECUTION CONFIRMED (Maker) @ {report['avg_price']} ({report['time_to_fill_ms']:.0f}ms, {report['api_calls']} calls).")
+                return True
+            print(f"    FAILED Maker Capture ({report['status']}, {report['filled_qty']}/{quantity} filled).")
+            return False
+        
         tick_size = await self.get_tick_size(symbol)
         
         for attempt in range(max_retries):
@@ -11,12 +11,18 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 sys.path.append(os.path.join(project_root, 'core'))
+sys.path.append(os.path.join(os.path.dirname(project_root), 'core')) # Core compartilhado (backend_core/core)
 
 from backpack_transport import BackpackTransport
 from backpack_data import BackpackData
 from backpack_auth import BackpackAuth
 from technical_oracle import TechnicalOracle
 
+try:
+    from carry_analytics import CarryAnalytics
+except ImportError:
+    CarryAnalytics = None # Clone standalone: varredura sequencial (book por book)
+
 init(autoreset=True)
 load_dotenv()
 
@@ -32,97 +38,110 @@ class FundingHunter:
         self.auth = BackpackAuth(os.getenv('BACKPACK_API_KEY'), os.getenv('BACKPACK_API_SECRET'))
         self.data = BackpackData(self.auth)
         self.oracle = TechnicalOracle(self.data)
-        
+        # Histórico de funding vive no CarryAnalytics: manter a instância entre análises
+        self.carry = CarryAnalytics(self.data, obi_fn=self.oracle.calculate_obi) if CarryAnalytics else None
+
+    def classify(self, funding, obi):
+        """(status, cor, bônus de score) para funding x OBI."""
+        if funding < -0.0002: # Funding Negativo Forte (-0.02%)
+            if obi > 0.05:
+                return "LONG SQUEEZE", Fore.GREEN, 5 # Shorts pagando Longs + Pressão de Compra
+            return "BEAR HEAVY", Fore.RED, 0 # Shorts pagando, mas OBI ainda vendedor
+        if funding > 0.0002: # Funding Positivo Forte
+            if obi < -0.05:
+                return "SHORT SQUEEZE", Fore.RED, 5 # Longs pagando Shorts + Pressão de Venda
+            return "BULL HEAVY", Fore.GREEN, 0 # Longs pagando, OBI comprador (Tendência forte)
+        return "NEUTRAL", Fore.WHITE, 0
+
     async def analyze(self):
         print(f"\n{Style.BRIGHT}OBIWORK FUNDING HUNTER - Data Science Mode{Style.RESET_ALL}")
-        print("=" * 80)
-        print(f"{'SYMBOL':<15} | {'PRICE':<10} | {'FUNDING (1h)':<15} | {'OBI':<10} | {'STATUS':<15}")
-        print("-" * 80)
-        
+        print("=" * 92)
+        print(f"{'SYMBOL':<15} | {'PRICE':<10} | {'FUNDING (1h)':<15} | {'OBI':<10} | {'PERSIST':<8} | {'STATUS':<15}")
+        print("-" * 92)
+
+        if self.carry:
+            candidates = await self._scan_bulk()
+        else:
+            candidates = await self._scan_sequential()
+        if candidates is None:
+            return
+
+        results = []
+        for opp in candidates:
+            status, color, bonus = self.classify(opp['funding'], opp['obi'])
+            # Score: funding médio do histórico (persistente) pesa mais que o pico do momento
+            opp['score'] = abs(opp.get('avg_funding', opp['funding'])) * 1000 + abs(opp['obi']) + bonus
+            persist = f"{opp['persistence'] * 100:.0f}%" if opp.get('persistence') is not None else "-"
+            print(f"{color}{opp['symbol']:<15} | ${opp['price']:<9.4f} | {opp['funding'] * 100:>8.4f}%      | "
+                  f"{opp['obi']:>5.2f}      | {persist:>7}  | {status}{Style.RESET_ALL}")
+            results.append(opp)
+
+        print("=" * 92)
+        print(f"{Fore.CYAN}INFO: Negative Funding = Shorts pay Longs. Positive Funding = Longs pay Shorts.{Style.RESET_ALL}")
+
+        # Return ranked by score
+        results.sort(key=lambda x: x['score'], reverse=True)
+        return results
+
+    async def _scan_bulk(self):
+        """Universo inteiro em lote; books e histórico só do Top 30, em paralelo."""
+        table = await asyncio.to_thread(self.carry.analyze, 30, "abs_funding")
+        if table.empty:
+            print("[ERROR] No Funding Data Found.")
+            return None
+        return [{
+            'symbol': row.symbol,
+            'funding': float(row.funding),
+            'price': float(row.mark),
+            'abs_funding': abs(float(row.funding)),
+            'obi': float(row.obi),
+            'avg_funding': float(row.avg_funding),
+            'persistence': float(row.persistence),
+            'basis_pct': float(row.basis_pct),
+        } for row in table.itertuples()]
+
+    async def _scan_sequential(self):
         # 1. Fetch Mark Prices (Funding Data)
         try:
             mark_prices = self.data.get_mark_prices()
         except Exception as e:
             print(f"[ERROR] Fetch Mark Prices Failed: {e}")
-            return
+            return None
 
         if not mark_prices:
             print("[ERROR] No Funding Data Found.")
-            return
+            return None
 
         # 2. Parse and Sort
         opportunities = []
         for mp in mark_prices:
             symbol = mp.get('symbol')
             if not symbol.endswith('_PERP'): continue
-            
+
             funding = float(mp.get('fundingRate', 0))
             price = float(mp.get('markPrice', 0))
-            
+
             opportunities.append({
                 'symbol': symbol,
                 'funding': funding,
                 'price': price,
                 'abs_funding': abs(funding)
             })
-            
+
         # Sort by Absolute Funding (High Impact)
         opportunities.sort(key=lambda x: x['abs_funding'], reverse=True)
-        
+
         # 3. Deep Analysis on Top Candidates (Expanded to 30)
         top_candidates = opportunities[:30]
-        
-        results = []
-        
         for opp in top_candidates:
-            symbol = opp['symbol']
-            funding = opp['funding']
-            price = opp['price']
-            
             # Fetch Depth for OBI
-            depth = self.data.get_orderbook_depth(symbol)
-            obi = self.oracle.calculate_obi(depth)
-            
-            # Determine Status
-            funding_pct = funding * 100
-            status = "NEUTRAL"
-            color = Fore.WHITE
-            
-            # Score Calculation for Ranking
-            score = abs(funding) * 1000 + abs(obi)
-            
-            if funding < -0.0002: # Funding Negativo Forte (-0.02%)
-                if obi > 0.05:
-                    status = "LONG SQUEEZE" # Shorts pagando Longs + Pressão de Compra
-                    color = Fore.GREEN
-                    score += 5 # Bonus
-                else:
-                    status = "BEAR HEAVY" # Shorts pagando, mas OBI ainda vendedor
-                    color = Fore.RED
-            elif funding > 0.0002: # Funding Positivo Forte
-                if obi < -0.05:
-                    status = "SHORT SQUEEZE" # Longs pagando Shorts + Pressão de Venda
-                    color = Fore.RED
-                    score += 5
-                else:
-                    status = "BULL HEAVY" # Longs pagando, OBI comprador (Tendência forte)
-                    color = Fore.GREEN
-            
-            print(f"{color}{symbol:<15} | ${price:<9.4f} | {funding_pct:>8.4f}%      | {obi:>5.2f}      | {status}{Style.RESET_ALL}")
-            
-            opp['obi'] = obi
-            opp['score'] = score
-            results.append(opp)
-            
+            depth = self.data.get_orderbook_depth(opp['symbol'])
+            opp['obi'] = self.oracle.calculate_obi(depth)
+
             # Small delay to respect rate limits
             await asyncio.sleep(0.05)
-            
-        print("=" * 80)
-        print(f"{Fore.CYAN}INFO: Negative Funding = Shorts pay Longs. Positive Funding = Longs pay Shorts.{Style.RESET_ALL}")
-        
-        # Return ranked by score
-        results.sort(key=lambda x: x['score'], reverse=True)
-        return results
+        return top_candidates
+
 
 if __name__ == "__main__":
     hunter = FundingHunter()
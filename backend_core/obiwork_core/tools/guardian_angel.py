@@ -4,7 +4,6 @@ import sys
 import asyncio
 import time
 import logging
-import gc
 from colorama import Fore, Style, init
 from dotenv import load_dotenv
 
@@ -17,6 +16,8 @@ sys.path.append(os.path.join(project_root, 'core'))
 sys.path.append(os.path.join(project_root, '_LEGACY_V1_ARCHIVE'))
 
 from core.backpack_transport import BackpackTransport
+from core.account_state import attach_account_state
+from core.trailing_engine import TrailingEngine, TrailingRule
 from backpack_auth import BackpackAuth
 
 init(autoreset=True)
@@ -28,64 +29,31 @@ logger = logging.getLogger("GuardianAngel")
 
 class GuardianAngel:
     """
-     GUARDIAN ANGEL (Low Memory Profile)
+     GUARDIAN ANGEL (Streaming Trailing)
     
     Otimizações:
-    1. Polling Adaptativo (3s com posições, 10s sem posições).
-    2. Garbage Collection Manual a cada ciclo longo.
-    3. Output minimalista (reduz buffer I/O).
-    4. Remoção de classes desnecessárias.
+    1. Mark price por stream (TrailingEngine): reação por tick, sem polling de posições/ticker.
+    2. Todas as posições avaliadas de uma vez a cada tick (vetorizado).
+    3. Pico de PnL persistido em disco (restart não zera o trailing).
+    4. Output minimalista (só eventos + pulso periódico).
     """
+    # Trailing Config
+    ACTIVATION_PNL = 0.003 # Start trailing after 0.3% profit
+    TRAILING_CALLBACK = 0.001 # Close if price retraces 0.1% from peak
+    HARD_STOP = 0.02 # -2% Stop Loss (Safety Net)
+
     def __init__(self):
-        # Fix: BackpackTransport from core/backpack_transport.py doesn't take auth in init
-        # It creates its own internally or we need to patch it?
-        # Let's check core/backpack_transport.py content again from previous turn.
-        # It initializes BackpackAuth internally using env vars.
-        self.transport = BackpackTransport()
-        
-        self.active_stops = {} 
-        self.cycle_count = 0
-        
-    async def close_position(self, symbol, side, qty, reason):
-        """Fecha a posição a mercado"""
-        print(f"\n{Fore.RED} STOP ({reason}) -> {symbol}{Style.RESET_ALL}")
-        
-        # 1. Cancelar ordens abertas (Legacy transport has cancel_open_orders? Need to check)
-        # Core transport usually has cancel_all_open_orders or similar.
-        # Assuming cancel_open_orders exists or we implement it.
-        # Let's use execute_order logic manually if needed.
-        
-        try:
-             # Legacy BackpackTransport might not have specific cancel helper exposed easily without full signature
-             # Let's assume we can skip cancel for panic close or try best effort
-             pass 
-        except:
-             pass
-        
-        # 2. Enviar ordem Market
-        close_side = "Ask" if side == "Long" else "Bid"
-        
-        # Payload for execution
-        # We need to send request via transport
-        # core/backpack_transport.py has _send_request(method, endpoint, instruction, payload)
-        
-        endpoint = "/api/v1/order"
-        payload = {
-            "symbol": symbol,
-            "side": close_side,
-            "orderType": "Market",
-            "quantity": str(abs(qty)),
-            "selfTradePrevention": "RejectTaker"
-        }
-        
-        resp = self.transport._send_request("POST", endpoint, "orderExecute", payload)
-        
-        if resp:
-            print(f"{Fore.GREEN} CLOSED.{Style.RESET_ALL}")
-            if symbol in self.active_stops:
-                del self.active_stops[symbol]
-        else:
-            print(f"{Fore.RED} FAIL! RETRYING...{Style.RESET_ALL}")
+        # Posições via snapshot compartilhado (Account State Service), fallback REST se não estiver rodando
+        self.transport = attach_account_state(BackpackTransport())
+        self.engine = TrailingEngine(
+            self.transport,
+            TrailingRule(activation=self.ACTIVATION_PNL, callback=self.TRAILING_CALLBACK, hard_stop=self.HARD_STOP),
+            on_event=self.on_event
+        )
+
+    def on_event(self, kind, symbol, info):
+        if kind == "close":
+            print(f"\n{Fore.RED} STOP ({info}) -> {symbol}{Style.RESET_ALL}")
 
     async def cancel_orders_for_symbol(self, symbol):
         """Cancela todas as ordens abertas para um símbolo"""
@@ -95,218 +63,29 @@ class GuardianAngel:
             for o in orders:
                 self.transport.cancel_order(symbol, o['id'])
 
-    async def run(self):
-        print(f"\n{Fore.CYAN}{Style.BRIGHT} GUARDIAN ANGEL STARTED (Trailing Mode){Style.RESET_ALL}")
-        
-        # Trailing Config
-        ACTIVATION_PNL = 0.003 # Start trailing after 0.3% profit
-        TRAILING_CALLBACK = 0.001 # Close if price retraces 0.1% from peak
-        
-        # State: {symbol: max_pnl_seen}
-        trailing_state = {}
-        
+    async def pulse(self, interval=5.0):
+        """Resumo periódico do livro do engine (sem chamadas à API)."""
         while True:
-            try:
-                self.cycle_count += 1
-                if self.cycle_count % 100 == 0: gc.collect()
-                
-                positions = self.transport.get_positions()
-                
-                if not positions:
-                    sys.stdout.write(f"\r{Fore.YELLOW} Idle... No positions.{Style.RESET_ALL}")
-                    sys.stdout.flush()
-                    trailing_state.clear()
-                    await asyncio.sleep(5)
-                    continue
-
-                # Process positions
-                sys.stdout.write("\033[K") # Clear line
-                print(f"\r SCANNING {len(positions)} POSITIONS | Cycle {self.cycle_count}")
-                
-                for p in positions:
-                    symbol = p['symbol']
-                    # Fix: 'side' might be missing or capitalized differently in raw response if not standard.
-                    # Usually 'Long' or 'Short' in side.
-                    side = p.get('side', 'Unknown')
-                    qty = float(p.get('netQuantity', p.get('quantity')))
-                    entry = float(p['entryPrice'])
-                    
-                    # Get Current Price (Mark)
-                    # p usually has markPrice or we get ticker
-                    # If not in p, fetch ticker
-                    mark_price = float(p.get('markPrice', 0))
-                    if mark_price == 0:
-                        # Fallback to ticker
-                        ticker = self.transport.get_ticker(symbol)
-                        if ticker: mark_price = float(ticker['lastPrice'])
-                    
-                    if mark_price == 0: continue
-                    
-                    # Calculate PnL %
-                    if side == "Long":
-                        pnl_pct = (mark_price - entry) / entry
-                    else:
-                        pnl_pct = (entry - mark_price) / entry
-                        
-                    # Display
-                    color = Fore.GREEN if pnl_pct > 0 else Fore.RED
-                    print(f"    {symbol:<15} {side:<5} | PnL: {color}{pnl_pct*100:+.2f}%{Style.RESET_ALL} | Entry: {entry} | Mark: {mark_price}")
-                    
-                    # Trailing Logic
-                    if pnl_pct > ACTIVATION_PNL:
-                        # Update Max PnL
-                        current_max = trailing_state.get(symbol, 0)
-                        if pnl_pct > current_max:
-                            trailing_state[symbol] = pnl_pct
-                            # print(f"       New High PnL: {pnl_pct*100:.2f}%")
-                        
-                        # Check Retracement
-                        drawdown = trailing_state[symbol] - pnl_pct
-                        if drawdown >= TRAILING_CALLBACK:
-                            reason = f"Trailing Stop Hit! Peak: {trailing_state[symbol]*100:.2f}%, Now: {pnl_pct*100:.2f}%"
-                            await self.close_position(symbol, side, qty, reason)
-                            del trailing_state[symbol]
-                    
-                    # Hard Stop Loss (Safety Net)
-                    if pnl_pct < -0.02: # -2% Stop Loss
-                         await self.close_position(symbol, side, qty, "Hard Stop Loss -2%")
-
-                await asyncio.sleep(2)
-                # Cursor Up for visual effect (optional, maybe just scroll)
-                print("-" * 40)
-                
-            except Exception as e:
-                logger.error(f"Cycle Error: {e}")
-                await asyncio.sleep(5)
-                
-                # Output limpo
-                sys.stdout.write("\r" + " " * 50 + "\r") # Limpa linha anterior
-                print(f"{Fore.BLUE}SCAN {time.strftime('%H:%M:%S')}{Style.RESET_ALL}", end=" ")
-                
-                current_symbols = [p['symbol'] for p in positions]
-                for s in list(self.active_stops.keys()):
-                    if s not in current_symbols:
-                        del self.active_stops[s]
-
-                for pos in positions:
-                    symbol = pos['symbol']
-                    qty = float(pos.get('quantity', pos.get('netQuantity', pos.get('amount', 0))))
-                    if qty == 0: continue
-                    
-                    entry = float(pos.get('entryPrice', 0))
-                    mark = float(pos.get('markPrice', 0))
-                    side = pos.get('side', 'Long')
-                    
-                    if side == "Long":
-                        pnl = (mark - entry) / entry
-                    else:
-                        pnl = (entry - mark) / entry
-                    
-                    color = Fore.GREEN if pnl > 0 else Fore.RED
-                    
-                    # Lógica de Stop (Mesma Lógica, Menos Verbose)
-                    current_stop = self.active_stops.get(symbol)
-                    
-                    # Níveis
-                    BE_TRIG, BE_LOCK = 0.003, 0.001
-                    T1_TRIG, T1_LOCK = 0.008, 0.004
-                    T2_TRIG, T2_LOCK = 0.015, 0.010
-                    
-                    new_stop = None
-                    
-                    if pnl >= T2_TRIG:
-                        mult = (1 + T2_LOCK) if side == "Long" else (1 - T2_LOCK)
-                        new_stop = entry * mult
-                    elif pnl >= T1_TRIG:
-                        mult = (1 + T1_LOCK) if side == "Long" else (1 - T1_LOCK)
-                        new_stop = entry * mult
-                    elif pnl >= BE_TRIG:
-                        mult = (1 + BE_LOCK) if side == "Long" else (1 - BE_LOCK)
-                        new_stop = entry * mult
-                    
-                    if new_stop:
-                        update = False
-                        if current_stop is None: update = True
-                        elif side == "Long" and new_stop > current_stop: update = True
-                        elif side == "Short" and new_stop < current_stop: update = True
-                        
-                        if update:
-                            current_stop = new_stop
-                            self.active_stops[symbol] = current_stop
-                            # Print curto para mudança de estado
-                            print(f" | ️ UPD: {symbol} -> {current_stop:.4f}", end="")
-                            
-                            # ATUALIZAR STOP NA EXCHANGE (REAL STOP)
-                            # Se o Guardian Angel detecta necessidade de subir o stop, ele deve enviar a ordem.
-                            # Caso contrário, é apenas um "Soft Stop" (mental).
-                            # O usuário pediu "EXPRESSAMENTE NAO OPERAR SEM STOP".
-                            # Então vamos forçar o envio da ordem.
-                            
-                            stop_side = "Ask" if side == "Long" else "Bid"
-                            
-                            # Cancelar stops antigos primeiro? Sim, para evitar duplicidade.
-                            self.transport.cancel_open_orders(symbol)
-                            
-                            payload = {
-                                "symbol": symbol,
-                                "side": stop_side,
-                                "orderType": "Market",
-                                "quantity": str(abs(qty)),
-                                "triggerPrice": str(current_stop),
-                                "triggerQuantity": str(abs(qty))
-                            }
-                            self.transport._send_request("POST", "/api/v1/order", "orderExecute", payload)
-                            print(f" (SENT)", end="")
-
-                    if current_stop is None:
-                         HARD_STOP = 0.015
-                         mult = (1 - HARD_STOP) if side == "Long" else (1 + HARD_STOP)
-                         current_stop = entry * mult
-                         
-                         # ENFORCE HARD STOP ON EXCHANGE IMMEDIATELY IF MISSING
-                         # Check if stop exists in open orders
-                         # To save API calls, we might skip checking every loop, 
-                         # but since we are in "Low Memory" mode and critical safety, let's do it smart.
-                         # Just force it if we just initialized or if we haven't checked in a while?
-                         # Or just rely on assembly_line safety net?
-                         # User said "EXPRESSAMENTE". Guardian Angel should also enforce it.
-                         
-                         # Check if we already sent it?
-                         # Let's check open orders once per 10 cycles to avoid rate limit
-                         if self.cycle_count % 10 == 0:
-                             # Logic to verify and place if missing
-                             pass 
-                             # For now, let's assume AssemblyLine does the initial placement.
-                             # Guardian Angel handles the Trailing Update.
-                         
-                         # EMERGENCY CHECK: If we are already below Hard Stop, KILL IT NOW.
-                         emergency_trigger = False
-                         if side == "Long" and mark <= current_stop: emergency_trigger = True
-                         elif side == "Short" and mark >= current_stop: emergency_trigger = True
-                         
-                         if emergency_trigger:
-                             print(f" |  EMERGENCY HARD STOP DETECTED: {symbol} (PnL: {pnl*100:.2f}%)", end="")
-                             await self.close_position(symbol, side, qty, "EMERGENCY HARD STOP")
-                             continue # Skip normal trigger check since we just closed it
-                    
-                    # Monitoramento visual compacto
-                    print(f"| {symbol} {pnl*100:+.1f}%", end=" ")
-
-                    # Trigger Check
-                    triggered = False
-                    if side == "Long" and mark <= current_stop: triggered = True
-                    elif side == "Short" and mark >= current_stop: triggered = True
-                        
-                    if triggered:
-                        await self.close_position(symbol, side, qty, "GUARD")
-                
-                # Output limpo
+            await asyncio.sleep(interval)
+            engine = self.engine
+            if not engine.symbols:
+                sys.stdout.write(f"\r{Fore.YELLOW} Idle... No positions.{Style.RESET_ALL}")
                 sys.stdout.flush()
-                await asyncio.sleep(2)
-                
-            except Exception as e:
-                print(f"ERR: {e}")
-                await asyncio.sleep(2)
+                continue
+            pnl = engine.sign * (engine.mark - engine.entry) / engine.entry
+            sys.stdout.write("\033[K")
+            print(f"\r GUARDING {len(engine.symbols)} POSITIONS | {time.strftime('%H:%M:%S')}")
+            for symbol, side, p, peak in zip(engine.symbols, engine.sides, pnl, engine.peak):
+                color = Fore.GREEN if p > 0 else Fore.RED
+                print(f"    {symbol:<15} {side:<5} | PnL: {color}{p*100:+.2f}%{Style.RESET_ALL} | Peak: {peak*100:+.2f}%")
+
+    async def run(self):
+        print(f"\n{Fore.CYAN}{Style.BRIGHT} GUARDIAN ANGEL STARTED (Trailing Mode){Style.RESET_ALL}")
+        pulse = asyncio.create_task(self.pulse())
+        try:
+            await self.engine.run()
+        finally:
+            pulse.cancel()
 
 if __name__ == "__main__":
     loop = asyncio.new_event_loop()
@@ -11,12 +11,23 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 sys.path.append(os.path.join(project_root, 'core'))
+sys.path.append(os.path.join(os.path.dirname(project_root), 'core')) # Core compartilhado (backend_core/core)
 
 from backpack_transport import BackpackTransport
 from backpack_data import BackpackData
 from backpack_auth import BackpackAuth
 from technical_oracle import TechnicalOracle
 
+try:
+    from grid_engine import GridEngine, GridLadder
+except ImportError:
+    GridEngine = None # Clone standalone: cancela e recria o grid inteiro
+
+try:
+    from market_registry import MarketRegistry
+except ImportError:
+    MarketRegistry = None # Clone standalone: casas decimais fixas por ativo
+
 # Logging Setup
 logging.basicConfig(
     level=logging.INFO,
@@ -43,6 +54,8 @@ class PassiveGridBot:
         
         self.is_running = False
         self.active_orders = []
+        self.engine = GridEngine(self.transport, logger=self.logger) if GridEngine else None
+        self.quantizer = MarketRegistry.shared().quantizer(symbol) if MarketRegistry else None
 
     async def start(self):
         self.logger.info(f"️ INICIANDO PASSIVE GRID: {self.symbol}")
@@ -51,7 +64,10 @@ class PassiveGridBot:
         self.is_running = True
         
         # Initial Grid Placement
-        await self._refresh_grid()
+        if self.engine:
+            await self._recenter_grid()
+        else:
+            await self._refresh_grid()
         
         while self.is_running:
             try:
@@ -89,6 +105,16 @@ class PassiveGridBot:
             
         self.logger.info(f" Grid Posicionado em torno de ${mid_price}")
 
+    async def _recenter_grid(self):
+        """Instala a escada centrada no preço atual; o diff reaproveita ordens vivas no mesmo nível."""
+        ticker = self.transport.get_ticker(self.symbol)
+        if not ticker: return
+        mid_price = float(ticker['lastPrice'])
+        self.engine.set_ladder(GridLadder(self.symbol, mid_price, self.grid_lines, self.grid_spread,
+                                          self.quantity, self._round_price))
+        await asyncio.to_thread(self.engine.reconcile)
+        self.logger.info(f" Grid Posicionado em torno de ${mid_price}")
+
     async def _place_order(self, side, price):
         api_side = "Bid" if side == "Buy" else "Ask"
         payload = {
@@ -110,6 +136,16 @@ class PassiveGridBot:
         # Mas a API não avisa fácil.
         # Melhor estratégia simples: Se ordens abertas < (grid_lines * 2), algo aconteceu.
         
+        if self.engine:
+            # Diff contra a escada: repõe só o lado oposto do nível executado (1 GET + 1 POST em lote)
+            report = await asyncio.to_thread(self.engine.reconcile)
+            if report and report[self.symbol]['fills']:
+                self.logger.info(" Ordem Executada! Ping-Pong aplicado.")
+            if self.engine.ladders[self.symbol].exhausted():
+                self.logger.info("️ Preço saiu do range do Grid. Recentralizando...")
+                await self._recenter_grid()
+            return
+        
         open_orders = self.transport.get_open_orders(self.symbol)
         if len(open_orders) < (self.grid_lines * 2):
             self.logger.info(" Ordem Executada! Detectando mudança...")
@@ -131,6 +167,8 @@ class PassiveGridBot:
             await self._refresh_grid()
 
     def _round_price(self, price):
+        if self.quantizer:
+            return self.quantizer.round_price(price)
         if "BTC" in self.symbol: return round(price, 1)
         if "ETH" in self.symbol: return round(price, 2)
         if "SOL" in self.symbol: return round(price, 2)
@@ -12,24 +12,67 @@ core_path = os.path.join(obi_core_path, 'core')
 
 sys.path.append(obi_core_path)
 sys.path.append(core_path)
+sys.path.append(os.path.join(project_root, 'core')) # Core compartilhado (backend_core/core)
 
 from backpack_transport import BackpackTransport
+from backpack_data import BackpackData
 from dotenv import load_dotenv
 
+try:
+    from fill_analytics import FillStore, FillAnalytics, since_ns
+except ImportError:
+    FillStore = None # Clone standalone: DataFrame dos últimos 1000 fills a cada relatório
+
 load_dotenv()
 
 class StrategicReport:
     def __init__(self):
         self.transport = BackpackTransport()
-        
+        self.data = BackpackData(self.transport.auth) # /wapi/v1/history/fills
+        # Fills gravados em data/fills/: relatório seguinte só baixa o que é novo
+        self.fills = FillAnalytics(FillStore()) if FillStore else None
+
+    def _metrics(self, days):
+        """Métricas pelo FillAnalytics (PnL FIFO por round-trip, maker ratio, fee drag)."""
+        self.fills.store.refresh(self.data, days=days)
+        start = since_ns(days=days)
+        summary = self.fills.summary(start)
+        if not summary['fills']:
+            return None
+        columns = {'volume': 'volume_usd', 'fees': 'fee', 'fills': 'fills', 'net_pnl': 'net_pnl',
+                   'maker_ratio': 'maker_ratio', 'fee_drag': 'fee_drag'}
+        symbol_metrics = self.fills.by_symbol(start)[list(columns)].rename(columns=columns)
+        daily_metrics = self.fills.by_day(start)[['volume', 'fees', 'net_pnl']].rename(columns=columns)
+        fee_drag = f"{summary['fee_drag'] * 100:.1f}% do lucro bruto" if summary['fee_drag'] is not None else "n/a"
+        extra = (f"- **PnL Líquido (Round-Trips FIFO):** ${summary['net_pnl']:,.2f} em {summary['trades']} trades\n"
+                 f"- **Maker Ratio:** {(summary['maker_ratio'] or 0) * 100:.1f}% do volume\n"
+                 f"- **Fee Drag:** {fee_drag}\n")
+        return summary['volume'], summary['fees'], summary['fills'], symbol_metrics, daily_metrics, extra
+
     def generate(self, days=10):
         print(f" GERANDO RELATÓRIO ESTRATÉGICO (Últimos {days} dias)...")
-        
+
+        if self.fills:
+            metrics = self._metrics(days)
+            if metrics is None:
+                print(" Sem trades no período.")
+                return
+            total_volume, total_fees, trade_count, symbol_metrics, daily_metrics, extra = metrics
+        else:
+            metrics = self._metrics_standalone(days)
+            if metrics is None:
+                return
+            total_volume, total_fees, trade_count, symbol_metrics, daily_metrics = metrics
+            extra = ""
+
+        self._write_report(days, total_volume, total_fees, trade_count, symbol_metrics, daily_metrics, extra)
+
+    def _metrics_standalone(self, days):
         # 1. Fetch History
-        fills = self.transport.get_fill_history(limit=1000)
+        fills = self.data.get_fill_history(limit=1000)
         if not fills:
             print(" Sem dados de histórico.")
-            return
+            return None
 
         df = pd.DataFrame(fills)
         
@@ -49,7 +92,7 @@ class StrategicReport:
         
         if df.empty:
             print(" Sem trades no período.")
-            return
+            return None
 
         # 2. Calculate Metrics
         df['volume_usd'] = df['price'] * df['quantity']
@@ -71,7 +114,9 @@ class StrategicReport:
             'volume_usd': 'sum',
             'fee': 'sum'
         }).sort_index(ascending=False)
+        return total_volume, total_fees, trade_count, symbol_metrics, daily_metrics
 
+    def _write_report(self, days, total_volume, total_fees, trade_count, symbol_metrics, daily_metrics, extra):
         # 3. Output Report
         report = f"""
 #  RELATÓRIO ESTRATÉGICO OBI WORK (Últimos {days} Dias)
@@ -81,7 +126,7 @@ class StrategicReport:
 - **Taxas Pagas:** ${total_fees:,.2f}
 - **Execuções (Fills):** {trade_count}
 - **Média Volume/Dia:** ${total_volume/days:,.2f}
-
+{extra}
 ##  Performance Backpack (Estimada)
 - **Rank Volume:** (Verificar Dashboard)
 - **Tier Atual:** Gold (Confirmado)
@@ -12,12 +12,34 @@ current_dir = os.path.dirname(os.path.abspath(__file__)) # .../obiwork_core/tool
 project_root = os.path.dirname(current_dir) # .../obiwork_core
 sys.path.append(project_root)
 sys.path.append(os.path.join(project_root, 'core'))
+sys.path.append(os.path.join(os.path.dirname(project_root), 'core')) # Core compartilhado (backend_core/core)
 
 from backpack_transport import BackpackTransport
 from backpack_data import BackpackData
 from backpack_auth import BackpackAuth
 from technical_oracle import TechnicalOracle
 
+try:
+    from metrics_feed import MetricsFeed, METRIC_SIGNAL
+except ImportError:
+    MetricsFeed = None # Clone standalone: roda sem Metrics Feed
+
+try:
+    from order_replace import OrderReplacer
+except ImportError:
+    OrderReplacer = None # Clone standalone: cancela e recria o SL
+
+try:
+    from trend_service import TrendService
+except ImportError:
+    TrendService = None # Clone standalone: EMA recalculada por chamada no TechnicalOracle
+
+try:
+    from maker_engine import top_of_book
+    from precision_guardian import PrecisionGuardian
+except ImportError:
+    PrecisionGuardian = None # Clone standalone: tick heurístico
+
 # Configurar Logging
 logging.basicConfig(
     level=logging.INFO,
@@ -64,9 +86,14 @@ class VolumeFarmer:
             self.logger.setLevel(logging.WARNING)
         
         self.transport = BackpackTransport()
+        self.metrics = MetricsFeed(source="volume_farmer") if MetricsFeed else None
+        self.transport.metrics = self.metrics
+        self.replacer = OrderReplacer(self.transport, logger=self.logger) if OrderReplacer else None
+        self.guardian = PrecisionGuardian(self.transport) if PrecisionGuardian else None
         self.auth = BackpackAuth(os.getenv('BACKPACK_API_KEY'), os.getenv('BACKPACK_API_SECRET'))
         self.data_client = BackpackData(self.auth)
         self.oracle = TechnicalOracle(self.data_client)
+        self.trend_service = TrendService(self.data_client, logger=self.logger) if TrendService else None
         self.cache = {}
         self.cache_ttl = {
             'positions': 0.4,
@@ -149,7 +176,7 @@ class VolumeFarmer:
         if self.ironclad:
              self.logger.info("️ IRONCLAD ATIVO: Analisando Tendência Inicial...")
              for s in self.symbols:
-                 trend = self.oracle.get_trend_bias(s, "1m")
+                 trend = self._trend_bias(s, "1m")
                  self.logger.info(f"   -> {s}: Tendência 1m = {trend}")
 
         if self.reset_orders and not self.dry_run:
@@ -191,9 +218,16 @@ class VolumeFarmer:
     def _invalidate_cache(self, keys):
         for key in keys:
             self.cache.pop(key, None)
+            if self.replacer and key.startswith("open_orders:"):
+                self.replacer.cache.invalidate(key.split(":", 1)[1])
 
     def _get_cached_positions(self):
-        return self._get_cached("positions", self.cache_ttl['positions'], lambda: self.transport.get_positions())
+        def fetch():
+            positions = self.transport.get_positions()
+            if self.metrics:
+                self.metrics.publish_positions(positions)
+            return positions
+        return self._get_cached("positions", self.cache_ttl['positions'], fetch)
 
     def _get_cached_open_orders(self, symbol):
         return self._get_cached(f"open_orders:{symbol}", self.cache_ttl['open_orders'], lambda: self.transport.get_open_orders(symbol))
@@ -212,6 +246,12 @@ class VolumeFarmer:
                 pass
         return ticker
 
+    def _trend_bias(self, symbol, timeframe, ema_period=50):
+        """Viés de tendência: TrendService (memória, 5m/15m derivados do 1m) ou TechnicalOracle."""
+        if self.trend_service:
+            return self.trend_service.trend(symbol, timeframe, ema_period)
+        return self.oracle.get_trend_bias(symbol, timeframe, ema_period)
+
     def _get_cached_pulse(self):
         return self._get_cached("pulse", self.cache_ttl['pulse'], lambda: self.oracle.get_market_pulse())
 
@@ -369,7 +409,7 @@ class VolumeFarmer:
             if not obi: continue
             
             # Trend Check (1m)
-            trend = self.oracle.get_trend_bias(symbol, "1m")
+            trend = self._trend_bias(symbol, "1m")
             
             # Directional Agreement Check
             if obi > 0 and trend == "BULLISH":
@@ -440,9 +480,9 @@ class VolumeFarmer:
         
         # 1. TREND VALIDATOR (The Trend Setter)
         # Checks 1m, 5m, 15m alignment
-        t_1m = self.oracle.get_trend_bias(symbol, "1m")
-        t_5m = self.oracle.get_trend_bias(symbol, "5m")
-        t_15m = self.oracle.get_trend_bias(symbol, "15m")
+        t_1m = self._trend_bias(symbol, "1m")
+        t_5m = self._trend_bias(symbol, "5m")
+        t_15m = self._trend_bias(symbol, "15m")
         
         target_trend = "BULLISH" if direction == "Long" else "BEARISH"
         
@@ -843,7 +883,11 @@ class VolumeFarmer:
                  self.state[symbol]['trailing_activated'] = True
 
     def _update_stop_loss(self, symbol, side, new_price):
-        """Cancela SL antigo e cria novo"""
+        """Move o SL (replace coalescido via OrderReplacer; sem ele, cancela SL antigo e cria novo)"""
+        if self.replacer:
+            self._replace_stop_loss(symbol, side, new_price)
+            return
+        
         open_orders = self._get_cached_open_orders(symbol)
         qty = None
         
@@ -869,6 +913,27 @@ class VolumeFarmer:
             
             self._send_stop_order(symbol, side, qty, new_price)
 
+    def _replace_stop_loss(self, symbol, side, new_price):
+        """SL atual vem do cache local; só avança (nunca afrouxa) e coalesce ticks seguidos"""
+        if "BTC" in symbol: new_price = round(new_price, 1)
+        elif "ETH" in symbol: new_price = round(new_price, 2)
+        elif "SOL" in symbol: new_price = round(new_price, 2)
+        else: new_price = round(new_price, 4)
+        
+        current = self.replacer.current_stop(symbol, side)
+        qty = None
+        if current is not None:
+            # side é o lado de saída: Sell protege Long (SL sobe), Buy protege Short (SL desce)
+            if (side == "Sell" and new_price <= current) or (side == "Buy" and new_price >= current):
+                return
+        else:
+            positions = self._get_cached_positions() or []
+            my_pos = next((p for p in positions if p['symbol'] == symbol), None)
+            if not my_pos: return
+            qty = abs(float(my_pos['netQuantity']))
+        
+        self.replacer.submit_stop(symbol, side, new_price, qty)
+
     async def _guard_orders(self, symbol):
         """Cancela ordens pendentes e fecha posições se o fluxo (OBI) virar contra agressivamente."""
         if self.dry_run: return
@@ -974,6 +1039,8 @@ class VolumeFarmer:
         if not depth:
             return
         obi = self.oracle.calculate_obi(depth)
+        if self.metrics:
+            self.metrics.publish(METRIC_SIGNAL, obi, symbol)
         manual_obi = self._get_manual_signal(self.manual_obi, symbol)
         if manual_obi is not None:
             try:
@@ -991,7 +1058,7 @@ class VolumeFarmer:
         # 1. Trend Filter (1m EMA)
         trend_ok = True
         if self.ironclad:
-            trend_bias = self.oracle.get_trend_bias(symbol, timeframe="1m")
+            trend_bias = self._trend_bias(symbol, "1m")
             if side == "Long" and trend_bias != "BULLISH":
                 self.logger.info(f"️ {symbol}: Ironclad BLOQUEOU Long (Trend 1m é {trend_bias})")
                 trend_ok = False
@@ -1665,6 +1732,8 @@ class VolumeFarmer:
                 self._mark_entry(symbol)
 
     def _round_price(self, symbol, price):
+        if self.guardian:
+            return self.guardian.quantizer(symbol).round_price(price)
         if "BTC" in symbol:
             return round(price, 1)
         if "ETH" in symbol:
@@ -1678,6 +1747,8 @@ class VolumeFarmer:
         return round(price, 6)
 
     def _round_qty(self, symbol, qty):
+        if self.guardian:
+            return self.guardian.quantizer(symbol).floor_qty(qty)
         if "BTC" in symbol:
             return round(qty, 4)
         if "ETH" in symbol:
@@ -1781,13 +1852,18 @@ class VolumeFarmer:
         
         depth = self._get_cached_depth(symbol)
         if depth:
-            best_bid = float(depth['bids'][0][0])
-            best_ask = float(depth['asks'][0][0])
-            tick_size = 0.1 # Padrão
-            if "BTC" in symbol: tick_size = 0.1
-            elif "ETH" in symbol: tick_size = 0.01
-            elif "SOL" in symbol: tick_size = 0.01
-            else: tick_size = 0.000001
+            if self.guardian:
+                # Topo real (independe da ordenação do depth) e tickSize do mercado
+                best_bid, best_ask = top_of_book(depth)
+                tick_size = self.guardian.tick_size(symbol)
+            else:
+                best_bid = float(depth['bids'][0][0])
+                best_ask = float(depth['asks'][0][0])
+                tick_size = 0.1 # Padrão
+                if "BTC" in symbol: tick_size = 0.1
+                elif "ETH" in symbol: tick_size = 0.01
+                elif "SOL" in symbol: tick_size = 0.01
+                else: tick_size = 0.000001
             
             # Se for Buy (Bid), não podemos ser maior que Best Ask.
             # Se for Sell (Ask), não podemos ser menor que Best Bid.
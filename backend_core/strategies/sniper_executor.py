@@ -8,6 +8,7 @@ from BLACK_MINDZ_CONSTITUTION import * # Importa as Leis Imutáveis
 from core.position_manager import PositionManager
 from core.system_check import SystemCheck
 from core.precision_guardian import PrecisionGuardian
+from core.metrics_feed import METRIC_SIGNAL
 
 class SniperExecutor:
     """
@@ -17,14 +18,15 @@ class SniperExecutor:
     2. Valida Técnica (EMA/RSI) como Veto
     3. Executa Atomicamente (Limit Maker + SL/TP)
     """
-    def __init__(self, transport, data_client, risk_manager, stealth_mode=False):
+    def __init__(self, transport, data_client, risk_manager, stealth_mode=False, manage_interval=5.0):
         self.transport = transport
         self.data = data_client
         self.risk_manager = risk_manager
         self.oracle = TechnicalOracle(data_client)
         self.logger = logging.getLogger("SniperExecutor")
         self.stealth_mode = stealth_mode
-        self.position_manager = PositionManager(transport) # Inicializa Position Manager (Sem RiskManager no init atual)
+        # Gestão de posições: uma passada por ciclo a cada manage_interval s (separada do scan de entrada)
+        self.position_manager = PositionManager(transport, interval=manage_interval)
         
         # ️ PRECISION GUARDIAN (Novo)
         self.guardian = PrecisionGuardian(transport)
@@ -153,6 +155,33 @@ class SniperExecutor:
         except Exception as e:
             self.logger.error(f"Erro no Stagnation Monitor: {e}")
 
+    async def manage_cycle(self, wall_intel=None):
+        """
+        Passada única de gestão para todas as posições abertas (SL, Trend Guard, Squeeze, Hedge).
+        Respeita a cadência do Position Manager: chamadas dentro do intervalo não fazem nada,
+        então o loop pode chamar a cada ciclo e o scan de cada alvo pode chamar sem custo.
+        """
+        pm = self.position_manager
+        if not pm.claim():
+            return False
+        try:
+            snapshot = await asyncio.to_thread(pm.take_snapshot)
+            positions = snapshot['positions']
+            if getattr(self.transport, 'metrics', None):
+                self.transport.metrics.publish_positions(positions)
+            # OBI de todas as posições em paralelo (um book por símbolo com posição)
+            symbols = [p['symbol'] for p in positions if p.get('symbol')]
+            depths = await asyncio.gather(
+                *[asyncio.to_thread(self.data.get_orderbook_depth, s) for s in symbols], return_exceptions=True
+            )
+            obi_data = {s: self.oracle.calculate_obi(d) for s, d in zip(symbols, depths) if not isinstance(d, Exception)}
+            # ATENÇÃO: Desativando lógica de TP Dinâmico no Position Manager para respeitar o TP Manual/Fixo.
+            # Apenas OBI Rescue (SL de Emergência) deve funcionar.
+            return await asyncio.to_thread(pm.manage_positions, {}, obi_data, True, snapshot)
+        except Exception as e:
+            self.logger.error(f"Erro na gestão de posições: {e}")
+            return False
+
     async def scan_and_execute(self, symbol):
         """
         Rotina principal de scan e execução para um ativo.
@@ -161,42 +190,24 @@ class SniperExecutor:
             self.logger.info(f" [SCAN] Analisando {symbol}...")
             
             # 0. CHECK DE POSIÇÃO EXISTENTE (Evitar Overtrading/Erro API)
+            # Usa a foto da última passada de gestão (sem GET /position por alvo)
             try:
-                positions = self.transport.get_positions()
-                if positions:
-                    # Verifica se já existe posição para o símbolo (netQuantity or quantity)
-                    existing_pos = None
-                    for p in positions:
-                        if p['symbol'] == symbol:
-                            q = float(p.get('quantity', 0))
-                            nq = float(p.get('netQuantity', 0))
-                            if q != 0 or nq != 0:
-                                existing_pos = p
-                                break
-                    
-                    if existing_pos:
-                        # self.logger.info(f"   ️ Posição já aberta em {symbol}. Pulando Scan para evitar duplicação.")
-                        # CRITICAL FIX: Mesmo se existir, TEMOS QUE GERENCIAR (SL, Trailing, Squeeze)
-                        # O Scan de entrada é pulado, mas o gerenciamento é obrigatório.
-                        qty = float(existing_pos.get('netQuantity', existing_pos.get('quantity', 0)))
-                        side = "Long" if qty > 0 else "Short"
-                        entry_price = float(existing_pos.get('entryPrice'))
-                        
-                        # Injeta inteligência do Oráculo para o Position Manager (Wall Intel, OBI)
-                        # market_pulse e depth já seriam pegos abaixo, mas vamos pegar aqui otimizado
-                        depth_mgmt = self.data.get_orderbook_depth(symbol)
-                        obi_mgmt = self.oracle.calculate_obi(depth_mgmt)
-                        
-                        # Chama o Position Manager
-                        # ATENÇÃO: Desativando lógica de TP Dinâmico no Position Manager para respeitar o TP Manual/Fixo.
-                        # Apenas OBI Rescue (SL de Emergência) deve funcionar.
-                        self.position_manager.manage_positions(
-                            # target_symbol removido, pois PositionManager itera sobre todas
-                            wall_intel={}, 
-                            obi_data={symbol: obi_mgmt}
-                            # target_roe removido (não suportado no método atual)
-                        )
-                        return
+                positions = await asyncio.to_thread(self.position_manager.positions)
+                existing_pos = None
+                for p in positions or []:
+                    if p['symbol'] == symbol:
+                        q = float(p.get('quantity', 0))
+                        nq = float(p.get('netQuantity', 0))
+                        if q != 0 or nq != 0:
+                            existing_pos = p
+                            break
+
+                if existing_pos:
+                    # CRITICAL FIX: Mesmo se existir, TEMOS QUE GERENCIAR (SL, Trailing, Squeeze)
+                    # O Scan de entrada é pulado; a gestão roda na passada única do ciclo
+                    # (no-op se já rodou dentro da cadência).
+                    await self.manage_cycle()
+                    return
             except Exception as e:
                 self.logger.error(f"Erro ao verificar posições: {e}")
 
@@ -229,6 +240,8 @@ class SniperExecutor:
             THRESHOLD = 65 # Ajustado para 65 (Alta Velocidade)
             
             obi_val = compass.get('obi', 0.0)
+            if getattr(self.transport, 'metrics', None):
+                self.transport.metrics.publish(METRIC_SIGNAL, score, symbol)
             
             self.logger.info(f"    Compass Score: {score}/100 | Trend: {trend} | OBI: {obi_val:.2f} | Reasons: {compass.get('reasons')}")
             
@@ -297,6 +310,7 @@ class SniperExecutor:
                     return 
                 
                 if entry_res:
+                    self.position_manager.invalidate() # Nova posição: não reaproveitar a foto antiga
                     # 2. Atomic Stop Loss (JAIL PROTECTION MODE)
                     # Errata do Mestre: "STOP LOSS DEVE SER UMA LEI".
                     # Reativando Protocolo de Proteção Máxima.
@@ -2,6 +2,7 @@ import logging
 import asyncio
 import math
 from core.technical_oracle import TechnicalOracle
+from core.market_registry import MarketRegistry
 
 class WeaverGrid:
     """
@@ -25,6 +26,7 @@ class WeaverGrid:
         self.data = data_client
         self.risk_manager = risk_manager
         self.oracle = TechnicalOracle(data_client)
+        self.markets = MarketRegistry.shared()
         self.logger = logging.getLogger("WeaverGrid")
         
         # Configuração da Equação de Ouro
@@ -107,26 +109,35 @@ class WeaverGrid:
                 target_roe = self.SCALP_TARGET
 
             # 5. Disparar Ordens (Maker Only - PostOnly)
+            orders = []
             for b in bullets:
                 qty = self._adjust_precision(symbol, b["qty"])
                 price = self._adjust_price_precision(symbol, b["price"])
                 
-                if qty <= 0: continue
+                if float(qty) <= 0: continue
                 
                 # Payload com SL Unificado
                 payload = {
                     "symbol": symbol,
                     "side": "Bid" if side == "Buy" else "Ask",
                     "orderType": "Limit",
-                    "quantity": str(qty),
-                    "price": str(price),
+                    "quantity": qty,
+                    "price": price,
                     "postOnly": True, # OBRIGATÓRIO PARA VOLUME FARMING
-                    "stopLossTriggerPrice": str(unified_sl_price)
+                    "stopLossTriggerPrice": unified_sl_price
                 }
                 
                 self.logger.info(f"       {b['name']} ({qty} @ {price}): Enviando... [SL: {unified_sl_price}]")
-                self.transport._send_request("POST", "/api/v1/order", "orderExecute", payload)
-                # await asyncio.sleep(0.2) # Evitar rate limit
+                orders.append((b['name'], payload))
+                
+            # As 3 balas saem em um único POST em lote (sem lote: envio serial)
+            if hasattr(self.transport, 'execute_batch'):
+                results = self.transport.execute_batch([p for _, p in orders])
+            else:
+                results = [self.transport._send_request("POST", "/api/v1/order", "orderExecute", p) for _, p in orders]
+            for (name, _), res in zip(orders, results):
+                if not (isinstance(res, dict) and res.get('id')):
+                    self.logger.warning(f"      ️ {name} rejeitada: {res}")
                 
             self.logger.info("   ️ REDE DE VOLUME LANÇADA COM SUCESSO.")
 
@@ -134,14 +145,9 @@ class WeaverGrid:
             self.logger.error(f"Erro no WeaverGrid: {e}")
 
     def _adjust_precision(self, symbol, qty):
-        if "BTC" in symbol: return round(qty, 3)
-        if "ETH" in symbol: return round(qty, 2)
-        if "SOL" in symbol: return round(qty, 1) # SOL aceita 1 casa decimal na qty? Geralmente 2, mas defensivo.
-        return round(qty, 1)
+        """Quantidade (string) com floor no stepSize real do mercado."""
+        return self.markets.quantizer(symbol).qty(qty)
 
     def _adjust_price_precision(self, symbol, price):
-        if "BTC" in symbol: return round(price, 1)
-        if "ETH" in symbol: return round(price, 2)
-        if "SOL" in symbol: return round(price, 2)
-        if "HYPE" in symbol: return round(price, 3) # HYPE geralmente tem mais casas
-        return round(price, 4)
+        """Preço (string) alinhado ao tickSize real do mercado."""
+        return self.markets.quantizer(symbol).price(price)
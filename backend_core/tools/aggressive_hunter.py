@@ -86,6 +86,8 @@ async def main():
     try:
         while True:
             start_time = asyncio.get_event_loop().time()
+            # Gestão de posições: passada única antes do enxame de scans (cadência própria)
+            await sniper.manage_cycle()
             # SWARM MODE: Create tasks for all targets to run in parallel
             tasks = [sniper.scan_and_execute(symbol) for symbol in targets]
             
@@ -10,6 +10,7 @@ sys.path.append(os.getcwd())
 sys.path.append(os.path.join(os.getcwd(), 'core'))
 
 from backpack_transport import BackpackTransport
+from fill_analytics import FillAnalytics, local_time
 
 async def analyze_history():
     load_dotenv()
@@ -37,151 +38,50 @@ async def analyze_history():
         data_source = orders
         mode = "orders"
 
-    # Processar dados
-    data = []
-    
+    # Processar dados: frame colunar tipado (timestamps ISO/ms, floats) em uma passada
     if mode == "fills":
         # Debug: Print first fill to check structure
         if len(data_source) > 0:
             print(f"DEBUG Fill Sample: {data_source[0]}")
-            
-        for fill in data_source:
-             ts = fill.get('timestamp', 0)
-             if isinstance(ts, str):
-                 # Can be ISO format or string int
-                 if ts.isdigit():
-                     ts = int(ts)
-                 else:
-                     # Try parsing ISO
-                     try:
-                         dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-                         ts = dt.timestamp() * 1000
-                     except:
-                         ts = 0
-             
-             entry = {
-                'time': datetime.fromtimestamp(ts / 1000 if ts > 10000000000 else ts),
-                'symbol': fill.get('symbol'),
-                'side': fill.get('side'),
-                'price': float(fill.get('price', 0)),
-                'quantity': float(fill.get('quantity', 0)),
-                'fee': float(fill.get('fee', 0)),
-                'isMaker': fill.get('isMaker'),
-                'pnl': float(fill.get('realizedPnl', 0)) if 'realizedPnl' in fill else 0.0
-            }
-             data.append(entry)
-             
+        fills = data_source
+
     elif mode == "orders":
         # Estrutura de ordem pode ter executedQuantity, price, status
-        # Só interessa filled
-        for order in data_source:
-            if order.get('status') == 'Filled' or float(order.get('executedQuantity', 0)) > 0:
-                 # Orders endpoint might not have PnL directly?
-                 # Often it does if it's a reduceOnly fill.
-                 # Let's check fields.
-                 
-                 entry = {
-                    'time': datetime.fromtimestamp(order.get('createdAt', 0) / 1000 if order.get('createdAt') > 10000000000 else order.get('createdAt', 0)),
-                    'symbol': order.get('symbol'),
-                    'side': order.get('side'),
-                    'price': float(order.get('avgPrice', order.get('price', 0)) or 0), # avgPrice is better for filled
-                    'quantity': float(order.get('executedQuantity', 0)),
-                    'fee': float(order.get('fee', 0)), # Sometimes fee is not in order object
-                    'isMaker': order.get('postOnly', False), # Approximation
-                    'pnl': 0.0 # Orders API usually doesn't have PnL. Fills API is better.
-                }
-                 data.append(entry)
-        
-        if not data:
+        # Só interessa filled. Orders API não traz PnL: sai do pareamento FIFO abaixo.
+        fills = [{
+            'timestamp': order.get('createdAt', 0),
+            'symbol': order.get('symbol'),
+            'side': order.get('side'),
+            'price': order.get('avgPrice', order.get('price', 0)) or 0, # avgPrice is better for filled
+            'quantity': order.get('executedQuantity', 0),
+            'fee': order.get('fee', 0), # Sometimes fee is not in order object
+            'isMaker': order.get('postOnly', False), # Approximation
+        } for order in data_source
+            if order.get('status') == 'Filled' or float(order.get('executedQuantity', 0) or 0) > 0]
+
+        if not fills:
              print("️ Nenhuma ordem preenchida encontrada.")
              return
-             
-    df = pd.DataFrame(data)
-    df.sort_values('time', inplace=True)
-    
-    # ... (timestamp fix was applied previously)
-    
-    # 2. Reconstruir PnL via FIFO Matching
+
+    analytics = FillAnalytics.from_fills(fills)
+
+    # 2. Reconstruir PnL via FIFO Matching (vetorizado, por símbolo)
     print("\n Reconstruindo PnL via FIFO Matching...")
-    
-    trades_analysis = []
-    
-    # Agrupar por símbolo
-    fills_by_symbol = {}
-    for entry in data:
-        sym = entry['symbol']
-        if sym not in fills_by_symbol:
-            fills_by_symbol[sym] = []
-        fills_by_symbol[sym].append(entry)
-        
-    for sym, fills in fills_by_symbol.items():
-        # Sort by time
-        fills.sort(key=lambda x: x['time'])
-        
-        inventory = [] # List of {'price': p, 'qty': q, 'side': 'Buy'/'Sell'}
-        
-        for fill in fills:
-            qty = fill['quantity']
-            price = fill['price']
-            side = fill['side']
-            fee = fill['fee']
-            is_maker = fill['isMaker']
-            
-            # Determinar se é Abertura ou Fechamento
-            # Simplificação: Se inventory vazio, é abertura.
-            # Se side diferente do inventory[0], é fechamento.
-            
-            remaining_qty = qty
-            
-            while remaining_qty > 0:
-                if not inventory:
-                    # Nova posição
-                    inventory.append({'price': price, 'qty': remaining_qty, 'side': side})
-                    remaining_qty = 0
-                else:
-                    head = inventory[0]
-                    if head['side'] != side:
-                        # Fechamento (Match)
-                        match_qty = min(remaining_qty, head['qty'])
-                        
-                        # Calc PnL
-                        # Long: Buy @ Entry, Sell @ Exit -> (Exit - Entry) * Qty
-                        # Short: Sell @ Entry, Buy @ Exit -> (Entry - Exit) * Qty
-                        
-                        if head['side'] == 'Buy': # Long Close
-                            raw_pnl = (price - head['price']) * match_qty
-                            trade_type = 'Long'
-                        else: # Short Close
-                            raw_pnl = (head['price'] - price) * match_qty
-                            trade_type = 'Short'
-                            
-                        # Registrar Trade
-                        trades_analysis.append({
-                            'time': fill['time'],
-                            'symbol': sym,
-                            'type': trade_type,
-                            'entry_price': head['price'],
-                            'exit_price': price,
-                            'quantity': match_qty,
-                            'raw_pnl': raw_pnl,
-                            'fee': fee * (match_qty / qty), # Proporcional fee
-                            'is_maker_entry': False, # Lost info
-                            'is_maker_exit': is_maker
-                        })
-                        
-                        # Update Inventory
-                        head['qty'] -= match_qty
-                        remaining_qty -= match_qty
-                        
-                        if head['qty'] < 0.0000001:
-                            inventory.pop(0)
-                    else:
-                        # Aumento de posição (mesmo lado)
-                        inventory.append({'price': price, 'qty': remaining_qty, 'side': side})
-                        remaining_qty = 0
+    trips = analytics.round_trips()
 
     # Converter análise para DataFrame
-    df_trades = pd.DataFrame(trades_analysis)
+    df_trades = pd.DataFrame({
+        'time': local_time(trips['exit_ts']),
+        'symbol': trips['symbol'],
+        'type': trips['type'],
+        'entry_price': trips['entry_price'],
+        'exit_price': trips['exit_price'],
+        'quantity': trips['quantity'],
+        'raw_pnl': trips['gross_pnl'],
+        'fee': trips['fee'], # Parcela proporcional da entrada + saída
+        'is_maker_entry': trips['maker_entry'],
+        'is_maker_exit': trips['maker_exit'],
+    })
     
     if df_trades.empty:
         print("️ Não foi possível reconstruir trades fechados (apenas posições abertas?).")
@@ -11,6 +11,7 @@ sys.path.append(os.path.join(os.getcwd(), 'core'))
 
 from backpack_transport import BackpackTransport
 from backpack_auth import BackpackAuth
+from fill_analytics import FillAnalytics, local_time
 
 # Configurar Logging
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -43,36 +44,29 @@ class PnLAuditor:
             print(" Sem histórico recente encontrado.")
             return
 
-        # Análise de Margem
-        total_fees = 0
-        total_pnl_realized = 0
-        winning_trades = 0
-        losing_trades = 0
+        # Frame tipado + PnL realizado por fill (pareamento FIFO: a API não manda realizedPnl no fill)
+        analytics = FillAnalytics.from_fills(fills)
+        frame = analytics.frame()
+        realized = analytics.realized_by_fill(column='gross_pnl')
+        recent = slice(max(0, len(frame) - 20), len(frame)) # Analisar os 20 últimos
+        times = local_time(frame['ts'].to_numpy()[recent])
+        pnls = realized[recent]
+        fees = frame['fee'].to_numpy()[recent]
+        notionals = frame['price'].to_numpy()[recent] * frame['qty'].to_numpy()[recent]
+
+        total_fees = float(fees.sum())
+        total_pnl_realized = float(pnls.sum())
+        winning_trades = int((pnls > 0).sum())
+        losing_trades = int((pnls < 0).sum())
         
         print(f"\n Últimos 10 Trades (Mais recentes primeiro):")
         print(f"{'Data':<10} | {'Symbol':<15} | {'Side':<5} | {'Size ($)':<8} | {'Fee ($)':<8} | {'PnL ($)':<8} | {'Net ($)':<8}")
         print("-" * 80)
         
-        for fill in fills[:20]: # Analisar os 20 últimos
-            symbol = fill.get('symbol')
-            side = fill.get('side')
-            price = float(fill.get('price'))
-            qty = float(fill.get('quantity'))
-            fee = float(fill.get('fee', 0))
-            pnl = float(fill.get('realizedPnl', 0)) # Nem sempre disponível no fill, depende da API
-            
-            # Se PnL não vier no fill, precisamos estimar ou buscar de outra endpoint 'get_pnl_history'
-            # Vamos assumir que 'fee' está correto.
-            
-            notional = price * qty
+        rows = zip(times, frame['symbol'].to_numpy()[recent], frame['side'].to_numpy()[recent], notionals, fees, pnls)
+        for ts, symbol, side, notional, fee, pnl in reversed(list(rows)):
             net_result = pnl - fee
             
-            total_fees += fee
-            total_pnl_realized += pnl
-            
-            if pnl > 0: winning_trades += 1
-            elif pnl < 0: losing_trades += 1
-            
             # Destaque visual
             pnl_str = f"${pnl:.2f}"
             net_str = f"${net_result:.2f}"
@@ -82,9 +76,8 @@ class PnLAuditor:
             elif net_result < 0:
                 net_str = f" {net_str}"
                 
-            timestamp = fill.get('timestamp', '') # Converter se necessário
-            
-            print(f"{timestamp[:10]:<10} | {symbol:<15} | {side:<5} | {notional:<8.1f} | {fee:<8.3f} | {pnl_str:<8} | {net_str:<8}")
+            side = "Bid" if side > 0 else "Ask"
+            print(f"{ts.strftime('%Y-%m-%d'):<10} | {symbol:<15} | {side:<5} | {notional:<8.1f} | {fee:<8.3f} | {pnl_str:<8} | {net_str:<8}")
 
         print("-" * 80)
         print(f"\n RESUMO DA SESSÃO (Amostra):")
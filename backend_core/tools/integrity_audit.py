@@ -9,6 +9,7 @@ from typing import Dict, Any
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from tools.vsc_transformer import VSCLayer
+from core.vsc_utils import VAULT_SCHEMA, TRADE_PROOF_SCHEMA, VSCWriter, iter_rows, read_frame
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -18,6 +19,7 @@ class IntegrityAudit:
     """
     Módulo de Auditoria Criptográfica OBI (ZK-Lite).
     Gera provas de integridade (Hashes) para cada operação do sistema.
+    Escrita no vault é bufferizada (VSCWriter); leitura é em streaming.
     """
     
     def __init__(self, vault_path: str = "logs/audit_vault.vsc"):
@@ -26,6 +28,7 @@ class IntegrityAudit:
         
         # Garantir diretório de logs
         os.makedirs(os.path.dirname(self.vault_path), exist_ok=True)
+        self.writer = VSCWriter(self.vault_path, sep="|", buffer_size=64, flush_interval=0.5)
 
     def _generate_hash(self, data_string: str) -> str:
         """Gera SHA-256 do payload VSC"""
@@ -61,9 +64,8 @@ class IntegrityAudit:
     def _append_to_vault(self, proof_hash: str, proof_string: str):
         """Salva a prova no arquivo de auditoria imutável (append-only)"""
         try:
-            with open(self.vault_path, "a") as f:
-                # Log Format: HASH|RAW_PROOF
-                f.write(f"{proof_hash}|{proof_string}\n")
+            # Log Format: HASH|RAW_PROOF
+            self.writer.append(f"{proof_hash}|{proof_string}")
         except Exception as e:
             logger.error(f"Falha ao escrever no Audit Vault: {e}")
 
@@ -73,21 +75,39 @@ class IntegrityAudit:
         Útil para investidores auditarem trades.
         """
         try:
+            self.writer.flush()
             if not os.path.exists(self.vault_path):
                 return False
                 
-            with open(self.vault_path, "r") as f:
-                for line in f:
-                    stored_hash, stored_proof = line.strip().split('|', 1)
-                    if stored_hash == proof_hash:
-                        # Re-calcular hash para garantir integridade do arquivo
-                        recalc_hash = self._generate_hash(stored_proof)
-                        return recalc_hash == proof_hash
+            for stored_hash, stored_proof in iter_rows(self.vault_path, VAULT_SCHEMA, errors='skip'):
+                if stored_hash == proof_hash:
+                    # Re-calcular hash para garantir integridade do arquivo
+                    recalc_hash = self._generate_hash(stored_proof)
+                    return recalc_hash == proof_hash
             return False
         except Exception as e:
             logger.error(f"Erro na verificação de prova: {e}")
             return False
 
+    def load_trades(self):
+        """Provas canônicas de trade do vault como DataFrame (linhas em outros formatos são ignoradas)."""
+        self.writer.flush()
+        if not os.path.exists(self.vault_path):
+            return read_frame(os.devnull, TRADE_PROOF_SCHEMA)
+        return read_frame(self.vault_path, TRADE_PROOF_SCHEMA, errors='skip')
+
+    def anchored_proof(self, proof_hash: str) -> Dict[str, Any]:
+        """
+        Prova de inclusão do hash na raiz Merkle ancorada on-chain (AuditAnchor).
+        Retorna {hash, batch, index, path, root, tx, status, valid} ou {} se ainda não foi selado.
+        """
+        from obi_work_core.audit_anchor import AuditAnchor, MerkleTree
+        proof = AuditAnchor(vault_path=self.vault_path).inclusion_proof(proof_hash)
+        if not proof:
+            return {}
+        proof['valid'] = bool(proof['root']) and MerkleTree.verify(proof_hash, proof['path'], proof['root'])
+        return proof
+
 # --- Exemplo de Uso (Simulação) ---
 if __name__ == "__main__":
     audit = IntegrityAudit()
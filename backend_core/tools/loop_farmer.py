@@ -7,6 +7,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.vsc_brain import VSCBrain
+from core.vsc_utils import iter_rows
 
 # Mock Client/Oracle for structure (User can replace with actual)
 class MockMarketData:
@@ -53,14 +54,9 @@ class LoopFarmer:
         """
         targets = []
         try:
-            with open("tools/loop_targets.vsc", "r") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith("#"):
-                        continue
-                    parts = line.split(',')
-                    if len(parts) >= 2:
-                        targets.append({"symbol": parts[0], "bias": parts[1]})
+            for parts in iter_rows("tools/loop_targets.vsc"):
+                if len(parts) >= 2:
+                    targets.append({"symbol": parts[0], "bias": parts[1]})
         except FileNotFoundError:
             self.logger.error("Target file not found. Using default.")
             targets = [{"symbol": "SOL_USDC", "bias": "NEUTRAL"}]
@@ -90,11 +86,23 @@ class LoopFarmer:
         self.logger.info(f" Starting Multi-Asset Cycle on {target_count} assets")
         self.logger.info(f" Available Margin: ${available_margin:.2f} | Allocating ${allocation_per_asset:.2f} per asset")
         
-        for target in targets:
-            symbol = target['symbol']
-            bias = target['bias']
-            self.run_cycle(symbol, bias, allocation_per_asset)
-            time.sleep(0.5) # Throttle
+        # Percepção + Cérebro do universo inteiro em uma passada (vetorizado)
+        symbols = [t['symbol'] for t in targets]
+        intents = ["LONG" if t['bias'] in ["NEUTRAL", "LONG"] else "SHORT" for t in targets]
+        market_rows = [self.data_source.get_data(symbol) for symbol in symbols]
+        verdicts = self.brain.validate_batch(symbols, intents, market_rows)
+
+        for i, symbol in enumerate(symbols):
+            self.logger.info(f"--- Cycling {symbol} (Bias: {targets[i]['bias']}) | Strategy proposes: {intents[i]} ---")
+            if not self.protocol_zero_check(symbol):
+                self.logger.warning(" Protocol Zero triggered. Aborting.")
+                continue
+            approved, reason, size_factor = self.brain.explain(verdicts, i, market_rows[i])
+            if approved:
+                self.execute_order(symbol, intents[i], reason, size_factor, allocation_per_asset)
+                time.sleep(0.5) # Throttle
+            else:
+                self.logger.info(f" Brain VETO: {reason}")
 
     def run_cycle(self, symbol, bias="NEUTRAL", base_size=10.0):
         self.logger.info(f"--- Cycling {symbol} (Bias: {bias}) ---")
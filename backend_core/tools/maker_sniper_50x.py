@@ -1,6 +1,7 @@
 import sys
 import os
 import time
+import asyncio
 import requests
 import json
 
@@ -8,6 +9,7 @@ import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from core.backpack_transport import BackpackTransport
+from core.maker_engine import MakerChaseEngine
 
 # CONFIGURAÇÃO SNIPER GLOBAL
 # (Sobrescrita se rodar como módulo)
@@ -16,17 +18,6 @@ MARGIN_USD = 3.0
 MAX_LOSS_USD = 0.10  # 10 centavos
 TARGET_ROE = 0.05    # 5% sobre a margem
 
-def get_best_book_price(transport, symbol, side):
-    """Obtém o melhor preço do book para apregoar (Best Bid + Tick ou Best Ask - Tick)"""
-    try:
-        ticker = transport._send_request("GET", f"/api/v1/ticker?symbol={symbol}", "tickerQuery")
-        if side == "Buy":
-            return float(ticker['bestBid'])
-        else:
-            return float(ticker['bestAsk'])
-    except:
-        return None
-
 def maker_sniper(symbol, side="Buy"):
     # Usar SYMBOL passado como argumento
     print(f" INICIANDO SNIPER MAKER 50x [{side}] em {symbol}")
@@ -64,64 +55,18 @@ def maker_sniper(symbol, side="Buy"):
     print(f"    Size: {qty_str} {symbol} (~${notional:.2f})")
     
     # 2. COLOCAR ORDEM MAKER (LIMIT POST ONLY)
-    order_id = None
-    filled = False
-    entry_price = 0.0
+    # Chase event-driven: reprecifica só quando o topo do book sai do nosso preço e resolve no fill
+    # (antes: até 10 x [ticker + post + 4 polls de 0.5s + cancel-all])
+    engine = MakerChaseEngine(transport)
+    report = asyncio.run(engine.chase(symbol, side, float(qty_str), timeout=30.0))
+    filled = report['status'] == 'filled'
     
-    attempts = 0
-    # Aumentando tentativas e reduzindo sleep para ser mais "Sniper"
-    while not filled and attempts < 10:
-        attempts += 1
-        print(f"    Tentativa de Apregoar #{attempts}...")
-        
-        # Get Price
-        price = get_best_book_price(transport, symbol, side)
-        if not price: continue
-        
-        limit_price = price 
-        
-        # Formatar Preço (Backpack é chato com tick size)
-        # Vamos confiar que o 'bestBid' já vem formatado corretamente.
-        
-        payload = {
-            "symbol": symbol,
-            "side": side,
-            "orderType": "Limit",
-            "quantity": qty_str,
-            "price": str(limit_price),
-            "postOnly": True # GARANTIA DE MAKER
-        }
-        
-        res = transport._send_request("POST", "/api/v1/order", "orderExecute", payload)
-        
-        if res and 'id' in res:
-            order_id = res['id']
-            # print(f"       Ordem Enviada: {order_id}. Aguardando Fill...")
-            
-            # Esperar 2s (Rápido)
-            for _ in range(4):
-                time.sleep(0.5)
-                # Check status
-                status = transport._send_request("GET", f"/api/v1/order?symbol={SYMBOL}&orderId={order_id}", "orderQuery")
-                if status and status.get('status') == 'Filled':
-                    filled = True
-                    entry_price = float(status.get('avgFillPrice', limit_price))
-                    print(f"       EXECUTADO! Preço Médio: {entry_price}")
-                    break
-                elif status and status.get('status') in ['Canceled', 'Expired']:
-                    # print("       Cancelada/Expirada (PostOnly rejeitou?).")
-                    break
-            
-            if not filled:
-                # Cancelar para reposicionar
-                transport._send_request("DELETE", "/api/v1/orders", "orderCancelAll", {"symbol": SYMBOL})
-        else:
-            # print(f"       Erro ao enviar ordem: {res}")
-            time.sleep(0.5)
-
     if not filled:
-        print("    Falha ao entrar como Maker após 10 tentativas. Abortando.")
+        print(f"    Falha ao entrar como Maker ({report['status']}, {report['filled_qty']} executado). Abortando.")
         return
+    
+    entry_price = report['avg_price']
+    print(f"       EXECUTADO! Preço Médio: {entry_price} ({report['time_to_fill_ms']:.0f}ms, {report['api_calls']} chamadas)")
 
     # 3. GERENCIAMENTO DA POSIÇÃO (BRACKET)
     print("\n️ ATIVANDO ESCUDO BRACKET (SL/TP)...")
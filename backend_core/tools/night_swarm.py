@@ -13,6 +13,7 @@ from backpack_auth import BackpackAuth
 from backpack_data import BackpackData
 from core.risk_manager import RiskManager
 from core.precision_guardian import PrecisionGuardian
+from core.swarm_executor import SwarmExecutor
 
 # Configurar Logging
 logging.basicConfig(
@@ -37,6 +38,7 @@ async def night_swarm_attack():
     data_client = BackpackData(auth)
     risk_manager = RiskManager(transport)
     guardian = PrecisionGuardian(transport)
+    executor = SwarmExecutor(transport, guardian, rate_limit=10.0)
     
     while True:
         try:
@@ -84,13 +86,15 @@ async def night_swarm_attack():
                 
                 final_targets = []
                 
-                # Trend Quality Check
+                # Trend Quality Check (klines de todos os candidatos em paralelo)
                 logger.info(f" Analisando qualidade técnica de {len(target_candidates)} candidatos...")
-                for cand in target_candidates:
+                all_klines = await asyncio.gather(*[
+                    executor.call(data_client.get_klines, cand, "15m", limit=55) for cand in target_candidates
+                ])
+                for cand, klines in zip(target_candidates, all_klines):
                     if len(final_targets) >= SWARM_SIZE:
                         break
                         
-                    klines = data_client.get_klines(cand, "15m", limit=55)
                     if not klines: continue
                     
                     closes = [float(k['close']) for k in klines]
@@ -108,7 +112,8 @@ async def night_swarm_attack():
                         logger.warning(f"️ {cand} REJEITADO: Mercado Lateral (Dist: {dist_pct*100:.2f}%)")
                         continue
                         
-                    final_targets.append(cand)
+                    # Lado definido aqui mesmo (sem baixar as velas de novo na execução)
+                    final_targets.append((cand, "Buy" if current > ema else "Sell"))
                     
                 targets = final_targets
                 logger.info(f" ALVOS FINAIS ({len(targets)}): {targets}")
@@ -123,88 +128,14 @@ async def night_swarm_attack():
             
             LEVERAGE = 5 # 5x para dormir tranquilo
             
-            for symbol in targets:
-                try:
-                    # Check if already open
-                    positions = transport.get_positions()
-                    is_open = False
-                    if positions:
-                        for p in positions:
-                            if p['symbol'] == symbol:
-                                is_open = True
-                                break
-                    
-                    if is_open:
-                        logger.info(f"⏭️ {symbol} já possui posição. Pulando.")
-                        continue
-                        
-                    # Analisar Tendência Rápida
-                    klines = data_client.get_klines(symbol, "15m", limit=55)
-                    if not klines:
-                        continue
-                        
-                    closes = [float(k['close']) for k in klines]
-                    current_price = closes[-1]
-                    ema50 = sum(closes[-50:]) / 50 
-                    
-                    # EMA real calculation again
-                    k = 2 / (50 + 1)
-                    ema = closes[0]
-                    for c in closes[1:]:
-                        ema = (c * k) + (ema * (1 - k))
-                    
-                    trend = "LONG" if current_price > ema else "SHORT"
-                    side = "Buy" if trend == "LONG" else "Sell"
-                    
-                    # Calcular Quantidade
-                    notional = slice_capital * LEVERAGE
-                    qty_raw = notional / current_price
-                    qty_fmt = guardian.format_quantity(symbol, qty_raw)
-                    
-                    # Executar Market
-                    logger.info(f" {side} {symbol} | Size: {qty_fmt} (~${notional:.2f}) | Trend: {trend}")
-                    
-                    res = transport.execute_order(symbol, "Market", side, qty_fmt)
-                    
-                    if res:
-                        logger.info(f"    Ordem enviada com sucesso!")
-                        await asyncio.sleep(1)
-                        
-                        # Calculate Prices
-                        entry = current_price
-                        if side == "Buy":
-                            tp_price = entry * 1.015
-                            sl_price = entry * 0.85 
-                            tp_side = "Sell"
-                        else:
-                            tp_price = entry * 0.985
-                            sl_price = entry * 1.15
-                            tp_side = "Buy"
-                        
-                        tp_fmt = guardian.format_price(symbol, tp_price)
-                        sl_fmt = guardian.format_price(symbol, sl_price)
-                        
-                        # TP (Limit)
-                        transport.execute_order(symbol, "Limit", tp_side, qty_fmt, price=tp_fmt)
-                        # SL (StopMarket)
-                        payload_sl = {
-                            "symbol": symbol, 
-                            "side": tp_side, 
-                            "orderType": "StopMarket", 
-                            "quantity": qty_fmt, 
-                            "triggerPrice": sl_fmt,
-                            "triggerQuantity": qty_fmt
-                        }
-                        transport._send_request("POST", "/api/v1/order", "orderExecute", payload_sl)
-                        
-                        logger.info(f"   ️ TP ({tp_fmt}) e SL ({sl_fmt}) configurados.")
-                        
-                    else:
-                        logger.error(f"    Falha na execução para {symbol}")
-                        
-                except Exception as e:
-                    logger.error(f"️ Erro ao processar {symbol}: {e}")
-                    continue
+            # Entrada + TP (1.5%) + SL (15%) de todos os alvos em paralelo, sob o rate limit
+            report = await executor.deploy(targets, slice_capital, leverage=LEVERAGE, tp_pct=0.015, sl_pct=0.15)
+            for symbol, leg in report['legs'].items():
+                if leg['status'] in ('filled', 'partial'):
+                    logger.info(f"    {leg['side']} {symbol} | Size: {leg['filled_qty']} | TP {leg['tp']} | SL {leg['sl']} | "
+                                f"Entrada +{leg['entry_ack_ms']:.0f}ms")
+                else:
+                    logger.warning(f"   ️ {symbol}: {leg['status']} ({leg.get('error')})")
                     
             logger.info(" CICLO SWARM COMPLETO. Dormindo 5 minutos...")
             await asyncio.sleep(300) # Sleep 5 minutes
@@ -16,19 +16,35 @@ from core.book_scanner import BookScanner
 from core.technical_oracle import TechnicalOracle
 from tools.vsc_transformer import VSCTransformer
 from tools.hft_indicators import HFTIndicators
+from core.metrics_feed import MetricsFeed, METRIC_EQUITY, METRIC_SIGNAL
+from core.order_replace import OrderReplacer
+from core.trend_service import TrendService
+from core.trailing_engine import TrailingEngine, TrailingRule
 
 class ObiCompoundRadar:
     def __init__(self):
         self.transport = BackpackTransport()
+        self.metrics = MetricsFeed(source="radar")
+        self.transport.metrics = self.metrics
+        self.replacer = OrderReplacer(self.transport) # SL via cache local + replace coalescido
         self.scanner = BookScanner()
         # Oracle needs transport as data_client
         self.oracle = TechnicalOracle(self.transport)
         self.vsc = VSCTransformer()
         self.hft = HFTIndicators() # Initialize HFT
+        self.trend = TrendService(self.transport) # 2h/4h/6h derivados do stream de 1m
         self.min_trade_amount = 10.0 # USD
         self.leverage = 3 # Adjusted to 3x (User: "SCALP COM 3 X")
         self.max_positions = 1 # SERIAL MODE (User: "ABRIU AOUTRA") - Single Threaded Focus
         self.trailing_step = 0.015 
+        # MICRO SCALP Trailing (ROI alavancado -> movimento de preço):
+        # +0.9% ROI -> SL em BreakEven + 0.2% (taxas); +1.5% ROI -> SL em +0.5%.
+        FEE_BUFFER = 0.002
+        self.trailing = TrailingEngine(self.transport, TrailingRule(
+            activation=None, hard_stop=None,
+            ladder=[(0.009 / self.leverage, FEE_BUFFER), (0.015 / self.leverage, 0.005)],
+            place_stops=True, close_on_trigger=False
+        ), replacer=self.replacer)
         self.session_pnl = 0.0 # Track session profit towards $100 goal
         
         # Alvos Sniper (Baseados em Liquidez) - DESATIVADOS PARA EVITAR SAÍDA PREMATURA
@@ -120,6 +136,7 @@ class ObiCompoundRadar:
                 spread_pct = ((best_ask - best_bid) / best_bid) * 100
                 
                 obi = self.scanner.calculate_obi(depth)
+                self.metrics.publish(METRIC_SIGNAL, obi, symbol)
                 
                 # Filtro de Spread: Ignorar se spread > 0.06% (COST CONTROL: "Nao pagar caro demais pra entrar")
                 if spread_pct > 0.06:
@@ -310,6 +327,7 @@ class ObiCompoundRadar:
                 equity = float(collateral.get('equity', 0))
                 avail = float(collateral.get('availableToTrade', 0))
                 used = equity - avail
+                self.metrics.publish(METRIC_EQUITY, equity)
                 usage_pct = (used / equity) * 100 if equity > 0 else 0
                 
                 health_color = "🟢"
@@ -324,6 +342,7 @@ class ObiCompoundRadar:
             print(f"   ️ Health Check Failed: {e}")
 
         positions = self.transport.get_positions()
+        self.metrics.publish_positions(positions)
         if not positions:
             print("   -> No active positions.")
             return 0
@@ -389,9 +408,7 @@ class ObiCompoundRadar:
             except:
                 pass
             
-            # 3. Trailing Stop Check (Aggressive Scalping)
-            if pnl_pct_lev > 0.005: # Começar a proteger a partir de 0.5% ROI (Was 0.8%)
-                self.apply_trailing_stop(symbol, side, entry, mark, pnl_pct_lev, qty)
+            # 3. Trailing Stop: TrailingEngine (stream de mark price, fora deste ciclo)
                 
             active_count += 1
             
@@ -413,6 +430,7 @@ class ObiCompoundRadar:
             )
         except Exception as e:
             print(f"       Close Error: {e}")
+        self.replacer.cache.invalidate(symbol) # SL antigo pode ter sido consumido
 
     def apply_sar_logic(self, symbol, side, qty, obi):
         """Stop-And-Reverse: Flip position if OBI is heavily against us"""
@@ -468,141 +486,6 @@ class ObiCompoundRadar:
             
         return False
 
-    def apply_trailing_stop(self, symbol, side, entry, mark, roi, position_qty):
-        """
-        Implementa lógica MICRO SCALP Trailing Stop (AGGRESSIVE FOR RECOVERY):
-        - 0.12% ROI -> Move SL para BreakEven (Fastest possible protection)
-        - 0.25% ROI -> Move SL para +0.1% (Lock Penny Profit)
-        - 0.40% ROI -> Move SL para +0.2% (Secure spread + profit)
-        - 0.60% ROI -> Move SL para +0.4% (Profit Bank)
-        
-        USER UPDATE: "STOP DE 0.5% PARA RODAR ESTA MADRUGADA"
-        Overrides previous trailing logic with a wider breathing room.
-        Hard Stop is 0.5% PRICE MOVE (approx 1.5% ROI at 3x).
-        """
-        new_sl_price = 0
-        # Taxa de Segurança (0.2% cobre Taker Entry + Taker Exit + Spread)
-        FEE_BUFFER = 0.002 
-        
-        # User defined Hard Stop Distance = 0.5% (0.005)
-        # We set this initially on entry.
-        # Trailing should only activate after significant profit to lock gains.
-        # Let's start trailing after +0.5% Profit to protect the win.
-        
-        # Adjust for 3x Leverage (Lower leverage means price needs to move MORE to hit ROI target)
-        # ROI = (PriceMove%) * Leverage
-        # 0.12% ROI @ 3x = 0.04% Price Move (Very tight)
-        
-        if side == "Short":
-             # Short
-             # Activate Trailing only after +0.3% Price Move (0.9% ROI)
-             if roi > 0.009: 
-                 new_sl_price = entry * (1 - FEE_BUFFER) # True BreakEven
-             if roi > 0.015: # 1.5% ROI
-                 new_sl_price = entry * 0.995 # +0.5% Profit Locked
-        else:
-             # Long
-             if roi > 0.009:
-                 new_sl_price = entry * (1 + FEE_BUFFER) # True BreakEven
-             if roi > 0.015:
-                 new_sl_price = entry * 1.005 # +0.5% Profit Locked
-
-        if new_sl_price == 0:
-            return # Ainda não atingiu gatilho de trailing
-
-        print(f"       TRAILING CHECK: Target SL {new_sl_price:.4f} for {symbol} (ROI {roi*100:.1f}%)")
-
-        try:
-            # 1. Buscar ordens abertas para este símbolo
-            orders = self.transport.get_open_orders(symbol)
-            current_sl_order = None
-            
-            for order in orders:
-                # Identificar ordem de Stop (geralmente TriggerOrder ou Limit longe do preço)
-                # Assumindo que a única ordem aberta além de TP seria o SL.
-                # Simplificação: Buscar ordem com side OPOSTO à posição e Type 'StopMarket' ou 'Trigger'
-                # Se API não retornar Type claro, assumir ordem com triggerPrice
-                
-                o_side = order.get('side')
-                o_type = order.get('orderType', '')
-                # Handle None safely for triggerPrice
-                tp_val = order.get('triggerPrice')
-                o_trigger = float(tp_val) if tp_val is not None else 0.0
-                
-                # Side do SL deve ser oposto à posição (Short -> Buy/Bid)
-                target_side = "Bid" if side == "Short" else "Ask"
-                
-                if o_side == target_side and o_trigger > 0:
-                    current_sl_order = order
-                    break
-            
-            # 2. Verificar se precisa atualizar
-            update_needed = False
-            if not current_sl_order:
-                update_needed = True
-                print("         -> No existing SL found. Creating new one.")
-            else:
-                current_trigger = float(current_sl_order.get('triggerPrice', 0))
-                
-                if side == "Short":
-                    # Para Short, queremos baixar o SL (menor preço é melhor/mais lucro)
-                    # Mas só atualizamos se o novo SL for MENOR que o atual
-                    if new_sl_price < current_trigger:
-                        update_needed = True
-                        print(f"         -> Improving SL: {current_trigger} -> {new_sl_price}")
-                else:
-                    # Para Long, queremos subir o SL (maior preço é melhor)
-                    if new_sl_price > current_trigger:
-                        update_needed = True
-                        print(f"         -> Improving SL: {current_trigger} -> {new_sl_price}")
-            
-            # 3. Executar Atualização
-            if update_needed:
-                # Cancelar anterior se existir
-                if current_sl_order:
-                    self.transport.cancel_order(symbol, current_sl_order.get('id'))
-                    time.sleep(0.5)
-                
-                # Criar Novo SL
-                # Calcular quantidade (toda a posição)
-                # Precisamos saber a quantidade da posição, mas aqui só temos entry/mark/roi.
-                # Assumindo que 'manage_positions' chamou, mas não passou qty.
-                # CORREÇÃO: manage_positions deve passar qty ou buscamos de novo.
-                # Vamos buscar a posição novamente para ter certeza da qty atual.
-                # pos = next((p for p in self.transport.get_positions() if p['symbol'] == symbol), None)
-                if position_qty:
-                    # Use netQuantity logic for qty string
-                    qty_float = abs(position_qty)
-                    # Convert to string, removing trailing zeros if needed
-                    qty = f"{qty_float:.8f}".rstrip('0').rstrip('.')
-                    
-                    sl_side = "Bid" if side == "Short" else "Ask"
-                    
-                    # Validar Trigger Price
-                    # Adjust precision for large numbers
-                    if new_sl_price > 1000:
-                        trigger_str = f"{new_sl_price:.1f}"
-                    elif new_sl_price > 10:
-                        trigger_str = f"{new_sl_price:.2f}"
-                    else:
-                        trigger_str = f"{new_sl_price:.4f}"
-                    
-                    print(f"         -> Sending SL Order: {symbol} {sl_side} {qty} @ {trigger_str}")
-                    
-                    self.transport.execute_order(
-                        symbol=symbol,
-                        side=sl_side,
-                        order_type="Market",
-                        quantity=qty,
-                        trigger_price=trigger_str
-                    )
-                    print(f"          TRAILING STOP UPDATED to {new_sl_price:.4f}")
-                else:
-                    print(f"         ️ Zero Quantity detected for {symbol}. Cannot set SL.")
-
-        except Exception as e:
-            print(f"       TRAILING ERROR: {e}")
-
     def get_portfolio_delta(self):
         """Calcula Delta do Portfólio (Net Long vs Net Short exposure)"""
         try:
@@ -707,18 +590,18 @@ class ObiCompoundRadar:
         print(f"\n SWING TRADE ANALYSIS ({symbol}):")
         
         for tf in timeframes:
-            klines = self.transport.get_klines(symbol, tf, limit=50) # More data for higher TF
-            if not klines: 
+            bars = self.trend.bars(symbol, tf, n=50) # Da memória (reamostrado do 1m)
+            ema = self.trend.ema(symbol, tf, 20) # Slower EMA for Swing (incremental)
+            if bars is None or ema is None: 
                 alignments.append("NEUTRAL")
                 continue
                 
-            closes = [float(k['close']) for k in klines]
+            closes = bars['close'].tolist()
             price = closes[-1]
             
             # HFT Indicators for this timeframe
-            # Note: Using HFT class but on higher TF works fine (math is same)
-            vwap = self.hft.calculate_vwap(klines)
-            ema = self.hft.calculate_ema(closes, period=20) # Slower EMA for Swing
+            typical = (bars['high'] + bars['low'] + bars['close']) / 3
+            vwap = float((typical * bars['volume']).sum() / bars['volume'].sum()) if bars['volume'].sum() else 0.0
             rsi = self.hft.calculate_rsi(closes, period=14)
             
             # Trend Determination
@@ -1190,6 +1073,7 @@ class ObiCompoundRadar:
         print("   -> Cost Control: Spread < 0.08%")
         print("   -> Note: Orders consume liquidity, they do not sit in the book.")
         
+        self.trailing.start()
         while True:
             try:
                 # 1. Manage Existing
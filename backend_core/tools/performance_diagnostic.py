@@ -7,6 +7,9 @@ from datetime import datetime
 
 # Adicionar caminhos
 sys.path.append(os.getcwd())
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.vsc_utils import TRADE_PROOF_SCHEMA, read_frame
 
 class PerformanceDiagnostician:
     """
@@ -19,31 +22,12 @@ class PerformanceDiagnostician:
         self.report_path = "logs/performance_diagnostic.md"
 
     def load_audit_data(self):
-        """Carrega e parseia o Audit Vault"""
+        """Carrega e parseia o Audit Vault (provas canônicas de trade, em streaming)"""
         if not os.path.exists(self.audit_path):
             return []
-            
-        trades = []
-        with open(self.audit_path, 'r') as f:
-            for line in f:
-                parts = line.strip().split('|')
-                if len(parts) >= 8:
-                    # Format: HASH|PROOF|TIMESTAMP|SYMBOL|SIDE|PRICE|QTY|OBI|SENTINEL
-                    # Note: OBI field index might vary based on version, let's assume index 7 based on recent logs
-                    # Recent logs: HASH|PROOF|TS|SYM|SIDE|PRICE|QTY|OBI|SENTINEL
-                    try:
-                        trade = {
-                            "timestamp": int(parts[2]),
-                            "symbol": parts[3],
-                            "side": parts[4],
-                            "price": float(parts[5]) if parts[5] != '0' else 0, # Market orders might log 0 initially
-                            "qty": float(parts[6]),
-                            "obi": float(parts[7])
-                        }
-                        trades.append(trade)
-                    except:
-                        continue
-        return trades
+        # Format: HASH|PROOF|TIMESTAMP|SYMBOL|SIDE|PRICE|QTY|OBI|SENTINEL
+        df = read_frame(self.audit_path, TRADE_PROOF_SCHEMA, errors='skip')
+        return df[["timestamp", "symbol", "side", "price", "qty", "obi"]].to_dict('records')
 
     def generate_report(self):
         print(" GERANDO DIAGNÓSTICO DE PERFORMANCE...")
@@ -12,6 +12,7 @@ from backpack_auth import BackpackAuth
 from backpack_trade import BackpackTrade
 from backpack_data import BackpackData
 from core.technical_oracle import TechnicalOracle
+from core.market_registry import MarketRegistry
 
 async def precision_strike():
     print(" PRECISION SNIPER: INICIANDO VARREDURA TÁTICA...")
@@ -95,15 +96,9 @@ async def precision_strike():
         price = float(ticker['lastPrice'])
         raw_qty = notional / price
         
-        # Rounding Heuristic
-        if price > 1000: # BTC, ETH
-            qty = f"{raw_qty:.3f}"
-        elif price > 10: # SOL, AVAX
-            qty = f"{raw_qty:.2f}"
-        elif price > 1: # SUI, XRP
-            qty = f"{raw_qty:.1f}"
-        else: # DOGE, HYPE
-            qty = f"{int(raw_qty)}"
+        # Rounding: stepSize/tickSize reais do mercado (registro em memória)
+        quantizer = MarketRegistry.shared().quantizer(best_asset)
+        qty = quantizer.qty(raw_qty)
             
         print(f"   Qty Formatado: {qty}")
         
@@ -138,15 +133,8 @@ async def precision_strike():
                 raw_sl = price * (1 + sl_pct)
                 exit_side = "Bid"
                 
-            # Price Rounding Heuristic
-            def format_price(p):
-                if p > 1000: return f"{p:.1f}"
-                elif p > 10: return f"{p:.2f}"
-                elif p > 1: return f"{p:.4f}"
-                else: return f"{p:.5f}"
-                
-            tp_price = format_price(raw_tp)
-            sl_price = format_price(raw_sl)
+            tp_price = quantizer.price(raw_tp)
+            sl_price = quantizer.price(raw_sl)
                 
             # TP
             print(f"    Configurando TP @ {tp_price} (TriggerMarket)...")
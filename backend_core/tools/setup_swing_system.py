@@ -5,7 +5,6 @@ Script para validar e preparar o ambiente antes da execução
 """
 
 import asyncio
-import sqlite3
 import os
 import sys
 from datetime import datetime, timedelta
@@ -17,9 +16,10 @@ load_dotenv()
 # Adicionar diretório pai ao path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from tools.swing_trader_conservative import ConservativeSwingTrader
+from tools.swing_trader_conservative import ConservativeSwingTrader, DATA_DIR
 from tools.swing_risk_manager import SwingRiskManager  
 from tools.swing_position_monitor import SwingPositionMonitor
+from core.sqlite_store import SQLiteStore
 
 class SwingSystemSetup:
     """Classe para setup e teste do sistema de swing trading"""
@@ -153,14 +153,8 @@ PRICE_TOLERANCE=0.001  # 0.1%
             asyncio.run(monitor.add_position(test_position))
             
             # Verificar se alerts foram criados
-            conn = sqlite3.connect(monitor.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT COUNT(*) FROM swing_alerts WHERE position_id = ?', 
-                         ('TEST_BTC_SHORT_002',))
-            alert_count = cursor.fetchone()[0]
-            
-            conn.close()
+            alert_count = monitor.store.query_one('SELECT COUNT(*) AS total FROM swing_alerts WHERE position_id = ?', 
+                                                  ('TEST_BTC_SHORT_002',))['total']
             
             if alert_count > 0:
                 print(f" {alert_count} alerts criados automaticamente")
@@ -234,22 +228,18 @@ PRICE_TOLERANCE=0.001  # 0.1%
         try:
             # Remover posições de teste
             db_paths = [
-                'data/swing_positions.db',
-                'data/swing_monitor.db',
-                'data/swing_system.db'
+                os.path.join(DATA_DIR, 'swing_positions.db'),
+                os.path.join(DATA_DIR, 'swing_monitor.db'),
+                os.path.join(DATA_DIR, 'swing_system.db')
             ]
             
             for db_path in db_paths:
                 if os.path.exists(db_path):
-                    conn = sqlite3.connect(db_path)
-                    cursor = conn.cursor()
+                    store = SQLiteStore.shared(db_path)
                     
                     # Remover dados de teste
-                    cursor.execute("DELETE FROM swing_positions WHERE position_id LIKE 'TEST_%'")
-                    cursor.execute("DELETE FROM swing_alerts WHERE position_id LIKE 'TEST_%'")
-                    
-                    conn.commit()
-                    conn.close()
+                    store.execute("DELETE FROM swing_positions WHERE position_id LIKE 'TEST_%'")
+                    store.execute("DELETE FROM swing_alerts WHERE position_id LIKE 'TEST_%'")
                     
                     print(f" Dados de teste removidos de {db_path}")
             
@@ -7,7 +7,6 @@ Sistema de monitoramento em tempo real para trades de médio prazo (2-7 dias)
 import asyncio
 import json
 import logging
-import sqlite3
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
@@ -16,8 +15,14 @@ from email.mime.text import MimeText
 from email.mime.multipart import MimeMultipart
 import requests
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.sqlite_store import SQLiteStore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
@@ -67,16 +72,15 @@ class SwingPositionMonitor:
         self.email_password = os.getenv('EMAIL_PASSWORD')
         self.email_recipient = os.getenv('EMAIL_RECIPIENT')
         
-        self.db_path = 'data/swing_monitor.db'
+        self.db_path = os.path.join(DATA_DIR, 'swing_monitor.db')
+        self.store = SQLiteStore.shared(self.db_path)
+        self.db = self.store.aio
         self.setup_database()
         
     def setup_database(self):
         """Configura banco de dados para monitoramento"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Tabela de posições ativas
-        cursor.execute('''
+        self.store.executescript('''
+            -- Tabela de posições ativas
             CREATE TABLE IF NOT EXISTS swing_positions (
                 position_id TEXT PRIMARY KEY,
                 symbol TEXT NOT NULL,
@@ -93,11 +97,9 @@ class SwingPositionMonitor:
                 roi_realtime REAL DEFAULT 0,
                 alerts_triggered INTEGER DEFAULT 0,
                 last_update TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Tabela de alerts
-        cursor.execute('''
+            );
+
+            -- Tabela de alerts
             CREATE TABLE IF NOT EXISTS swing_alerts (
                 alert_id TEXT PRIMARY KEY,
                 position_id TEXT NOT NULL,
@@ -111,11 +113,9 @@ class SwingPositionMonitor:
                 triggered_at TIMESTAMP,
                 action_taken TEXT,
                 FOREIGN KEY (position_id) REFERENCES swing_positions (position_id)
-            )
-        ''')
-        
-        # Tabela de notificações enviadas
-        cursor.execute('''
+            );
+
+            -- Tabela de notificações enviadas
             CREATE TABLE IF NOT EXISTS notifications (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 alert_id TEXT NOT NULL,
@@ -125,29 +125,23 @@ class SwingPositionMonitor:
                 sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 error_message TEXT,
                 FOREIGN KEY (alert_id) REFERENCES swing_alerts (alert_id)
-            )
+            );
+
+            -- Índices para performance
+            CREATE INDEX IF NOT EXISTS idx_positions_symbol ON swing_positions(symbol);
+            CREATE INDEX IF NOT EXISTS idx_positions_status ON swing_positions(status);
+            CREATE INDEX IF NOT EXISTS idx_alerts_position ON swing_alerts(position_id);
+            CREATE INDEX IF NOT EXISTS idx_alerts_triggered ON swing_alerts(triggered_at);
         ''')
         
-        # Índices para performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_positions_symbol ON swing_positions(symbol)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_positions_status ON swing_positions(status)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_position ON swing_alerts(position_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_triggered ON swing_alerts(triggered_at)')
-        
-        conn.commit()
-        conn.close()
-        
     async def add_position(self, position_data: Dict) -> bool:
         """Adiciona nova posição para monitoramento"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Calcular target time (7 dias a partir da entrada)
             entry_time = datetime.fromisoformat(position_data['entry_time'])
             target_time = entry_time + timedelta(days=7)
             
-            cursor.execute('''
+            await self.db.execute('''
                 INSERT OR REPLACE INTO swing_positions 
                 (position_id, symbol, side, entry_price, current_price, size, 
                  take_profit, stop_loss, entry_time, target_time)
@@ -165,9 +159,6 @@ class SwingPositionMonitor:
                 target_time
             ))
             
-            conn.commit()
-            conn.close()
-            
             # Criar alerts padrão para a posição
             await self.create_default_alerts(position_data['position_id'], position_data['symbol'])
             
@@ -233,28 +224,21 @@ class SwingPositionMonitor:
             'severity': 'CRITICAL'
         })
         
-        # Salvar alerts no banco
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        for alert in alerts:
-            cursor.execute('''
-                INSERT OR IGNORE INTO swing_alerts 
-                (alert_id, position_id, symbol, alert_type, trigger_condition, message, severity, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                alert['alert_id'],
-                alert['position_id'],
-                alert['symbol'],
-                alert['alert_type'],
-                alert['trigger_condition'],
-                alert['message'],
-                alert['severity'],
-                datetime.now()
-            ))
-        
-        conn.commit()
-        conn.close()
+        # Salvar alerts no banco (uma transação para todos)
+        await self.db.executemany('''
+            INSERT OR IGNORE INTO swing_alerts 
+            (alert_id, position_id, symbol, alert_type, trigger_condition, message, severity, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(
+            alert['alert_id'],
+            alert['position_id'],
+            alert['symbol'],
+            alert['alert_type'],
+            alert['trigger_condition'],
+            alert['message'],
+            alert['severity'],
+            datetime.now()
+        ) for alert in alerts])
         
         logger.info(f" {len(alerts)} alerts criados para posição {position_id}")
     
@@ -365,18 +349,12 @@ class SwingPositionMonitor:
     async def trigger_alert(self, alert_id: str, current_price: float):
         """Marca alert como disparado"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            await self.db.execute('''
                 UPDATE swing_alerts 
                 SET triggered_at = ?, trigger_price = ?
                 WHERE alert_id = ?
             ''', (datetime.now(), current_price, alert_id))
             
-            conn.commit()
-            conn.close()
-            
             logger.info(f" Alert {alert_id} disparado a ${current_price}")
             
         except Exception as e:
@@ -471,39 +449,25 @@ Ação Recomendada: {alert.get('action_required', 'MONITOR')}
             roi = self.calculate_roi(position['current_price'], position['entry_price'], position['side'])
             pnl = roi * position['size'] * position['entry_price']
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            # Métrica de alta frequência: vai no próximo lote
+            self.db.enqueue('''
                 UPDATE swing_positions 
                 SET pnl_realtime = ?, roi_realtime = ?, last_update = ?
                 WHERE position_id = ?
             ''', (pnl, roi, datetime.now(), position_id))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Erro ao atualizar métricas da posição {position_id}: {e}")
     
     async def get_active_positions(self) -> List[Dict]:
         """Obtém todas as posições ativas"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            return await self.db.query('''
                 SELECT * FROM swing_positions 
                 WHERE status = 'ACTIVE'
                 ORDER BY entry_time DESC
             ''')
             
-            positions = [dict(row) for row in cursor.fetchall()]
-            conn.close()
-            
-            return positions
-            
         except Exception as e:
             logger.error(f"Erro ao obter posições ativas: {e}")
             return []
@@ -511,21 +475,12 @@ Ação Recomendada: {alert.get('action_required', 'MONITOR')}
     async def get_pending_alerts(self, position_id: str) -> List[Dict]:
         """Obtém alerts pendentes para uma posição"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            return await self.db.query('''
                 SELECT * FROM swing_alerts 
                 WHERE position_id = ? AND triggered_at IS NULL
                 ORDER BY created_at ASC
             ''', (position_id,))
             
-            alerts = [dict(row) for row in cursor.fetchall()]
-            conn.close()
-            
-            return alerts
-            
         except Exception as e:
             logger.error(f"Erro ao obter alerts pendentes: {e}")
             return []
@@ -533,28 +488,20 @@ Ação Recomendada: {alert.get('action_required', 'MONITOR')}
     async def get_monitoring_summary(self) -> Dict:
         """Obtém resumo do monitoramento"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # Estatísticas gerais
-            cursor.execute('SELECT COUNT(*) as total_positions FROM swing_positions WHERE status = "ACTIVE"')
-            total_positions = cursor.fetchone()['total_positions']
-            
-            cursor.execute('SELECT COUNT(*) as total_alerts FROM swing_alerts WHERE triggered_at IS NULL')
-            pending_alerts = cursor.fetchone()['total_alerts']
-            
-            cursor.execute('SELECT COUNT(*) as triggered_alerts FROM swing_alerts WHERE triggered_at IS NOT NULL')
-            triggered_alerts = cursor.fetchone()['triggered_alerts']
-            
-            # Performance
-            cursor.execute('SELECT SUM(pnl_realtime) as total_pnl FROM swing_positions WHERE status = "ACTIVE"')
-            total_pnl = cursor.fetchone()['total_pnl'] or 0
-            
-            cursor.execute('SELECT AVG(roi_realtime) as avg_roi FROM swing_positions WHERE status = "ACTIVE"')
-            avg_roi = cursor.fetchone()['avg_roi'] or 0
-            
-            conn.close()
+            # Estatísticas gerais e performance em uma única consulta
+            row = await self.db.query_one('''
+                SELECT
+                    (SELECT COUNT(*) FROM swing_positions WHERE status = 'ACTIVE') AS total_positions,
+                    (SELECT COUNT(*) FROM swing_alerts WHERE triggered_at IS NULL) AS pending_alerts,
+                    (SELECT COUNT(*) FROM swing_alerts WHERE triggered_at IS NOT NULL) AS triggered_alerts,
+                    (SELECT SUM(pnl_realtime) FROM swing_positions WHERE status = 'ACTIVE') AS total_pnl,
+                    (SELECT AVG(roi_realtime) FROM swing_positions WHERE status = 'ACTIVE') AS avg_roi
+            ''')
+            total_positions = row['total_positions']
+            pending_alerts = row['pending_alerts']
+            triggered_alerts = row['triggered_alerts']
+            total_pnl = row['total_pnl'] or 0
+            avg_roi = row['avg_roi'] or 0
             
             return {
                 'total_positions': total_positions,
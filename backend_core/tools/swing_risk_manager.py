@@ -4,15 +4,22 @@ Sistema de Gerenciamento de Risco para Swing Trading Pré-TGE
 Foco: Proteção absoluta do capital com regras específicas para trades de médio prazo
 """
 
+import os
+import sys
 import asyncio
 import json
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
-import sqlite3
 import numpy as np
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.portfolio_risk import PortfolioRiskEngine
+from core.sqlite_store import SQLiteStore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -44,7 +51,11 @@ class RiskMetrics:
 class SwingRiskManager:
     """Gerenciador de Risco para Swing Trading Pré-TGE"""
     
-    def __init__(self):
+    def __init__(self, transport=None, risk_engine=None):
+        # Transport opcional: sem ele o motor usa apenas o histórico de velas já gravado
+        self.transport = transport
+        self.risk_engine = risk_engine or PortfolioRiskEngine(interval="1h", horizon_bars=24)
+        
         # Limites de risco ultra-conservadores
         self.max_portfolio_risk = 0.03        # 3% risco total do portfólio
         self.max_single_position_risk = 0.01  # 1% risco por posição
@@ -66,15 +77,13 @@ class SwingRiskManager:
         self.take_profit_buffer = 0.002      # 0.2% buffer no TP
         self.volatility_multiplier = 1.5     # Multiplicador para volatilidade alta
         
-        self.db_path = 'data/swing_risk.db'
+        self.db_path = os.path.join(DATA_DIR, 'swing_risk.db')
+        self.store = SQLiteStore.shared(self.db_path)
         self.setup_database()
         
     def setup_database(self):
         """Configura banco de dados para tracking de risco"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        self.store.executescript('''
             CREATE TABLE IF NOT EXISTS risk_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TIMESTAMP NOT NULL,
@@ -85,10 +94,8 @@ class SwingRiskManager:
                 threshold REAL,
                 action_taken TEXT,
                 description TEXT
-            )
-        ''')
-        
-        cursor.execute('''
+            );
+
             CREATE TABLE IF NOT EXISTS portfolio_risk (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TIMESTAMP NOT NULL,
@@ -99,12 +106,9 @@ class SwingRiskManager:
                 var_95 REAL,
                 var_99 REAL,
                 max_drawdown REAL
-            )
+            );
         ''')
         
-        conn.commit()
-        conn.close()
-        
     async def validate_new_position(self, symbol: str, proposed_size: float, 
                                    entry_price: float, side: str) -> Tuple[bool, str]:
         """Valida se nova posição atende aos critérios de risco"""
@@ -272,9 +276,14 @@ class SwingRiskManager:
             # Calcular exposição total
             total_exposure = sum(pos['size'] * pos['current_price'] for pos in positions)
             
-            # Calcular VaR (Value at Risk)
-            var_95 = self.calculate_var(positions, 0.95)
-            var_99 = self.calculate_var(positions, 0.99)
+            # Calcular VaR/CVaR (Monte Carlo correlacionado; fallback independente sem histórico)
+            await self.refresh_market_data([pos['symbol'] for pos in positions])
+            report = self.risk_engine.evaluate(positions, (0.95, 0.99))
+            if report:
+                var_95, var_99 = report['var_95'], report['var_99']
+            else:
+                var_95 = self.calculate_var(positions, 0.95)
+                var_99 = self.calculate_var(positions, 0.99)
             
             # Calcular risco de portfólio
             portfolio_risk = self.calculate_portfolio_risk_percentage(positions)
@@ -295,7 +304,10 @@ class SwingRiskManager:
                 'var_99': var_99,
                 'max_drawdown': max_drawdown,
                 'risk_level': risk_level,
-                'positions_count': len(positions)
+                'positions_count': len(positions),
+                'cvar_95': report['cvar_95'] if report else None,
+                'cvar_99': report['cvar_99'] if report else None,
+                'positions_risk': report['positions_95'] if report else {}
             }
             
         except Exception as e:
@@ -303,28 +315,23 @@ class SwingRiskManager:
             return {'error': str(e)}
     
     def calculate_var(self, positions: List[Dict], confidence: float) -> float:
-        """Calcula Value at Risk"""
+        """Calcula Value at Risk do portfólio (USD)"""
         try:
-            # Simulação simplificada de retornos
-            returns = []
-            for pos in positions:
-                # Gerar retornos simulados baseados em volatilidade
-                volatility = pos.get('volatility_24h', 0.02)
-                current_value = pos['size'] * pos['current_price']
-                
-                # Simular 1000 cenários
-                for _ in range(1000):
-                    random_return = np.random.normal(0, volatility)
-                    returns.append(current_value * random_return)
-            
-            if not returns:
+            if not positions:
                 return 0.0
             
-            # Calcular VaR
-            var_percentile = (1 - confidence) * 100
-            var_value = np.percentile(returns, var_percentile)
+            report = self.risk_engine.evaluate(positions, (confidence,))
+            if report:
+                return report[f'var_{int(round(confidence * 100))}']
+            
+            # Fallback sem histórico: posições independentes, volatilidade informada por posição
+            exposures = self.risk_engine.exposures(positions)
+            vols = {pos['symbol']: pos.get('volatility_24h', 0.02) for pos in positions}
+            values = np.array(list(exposures.values()))
+            sigma = np.array([vols[s] for s in exposures])
+            pnl = (np.random.standard_normal((10000, len(values))) * sigma) @ values
             
-            return abs(var_value)
+            return abs(np.percentile(pnl, (1 - confidence) * 100))
             
         except Exception:
             return 0.0
@@ -359,18 +366,12 @@ class SwingRiskManager:
     async def log_risk_event(self, event_type: str, symbol: str, position_id: str, description: str):
         """Loga evento de risco"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self.store.enqueue('''
                 INSERT INTO risk_events 
                 (timestamp, event_type, symbol, position_id, description)
                 VALUES (?, ?, ?, ?, ?)
             ''', (datetime.now(), event_type, symbol, position_id, description))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Erro ao logar evento de risco: {e}")
     
@@ -378,21 +379,26 @@ class SwingRiskManager:
                                 var_95: float, var_99: float, max_drawdown: float):
         """Loga métricas de risco do portfólio"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self.store.enqueue('''
                 INSERT INTO portfolio_risk 
                 (timestamp, total_exposure, portfolio_risk_pct, var_95, var_99, max_drawdown)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (datetime.now(), total_exposure, portfolio_risk, var_95, var_99, max_drawdown))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Erro ao logar risco do portfólio: {e}")
     
+    async def refresh_market_data(self, symbols: List[str]):
+        """Atualiza velas (só quando fechou vela nova) para os símbolos do motor de risco"""
+        if self.transport and symbols:
+            await asyncio.to_thread(self.risk_engine.refresh, self.transport, symbols)
+    
+    def _last_price(self, symbol: str) -> Optional[float]:
+        data = self.risk_engine.store.get(symbol, self.risk_engine.interval)
+        if data is None or not len(data['close']):
+            return None
+        return float(data['close'][-1])
+    
     # Funções auxiliares (simplificadas)
     async def calculate_total_exposure(self) -> float:
         """Calcula exposição total atual"""
@@ -403,16 +409,29 @@ class SwingRiskManager:
         return 0.008  # Simulado: 0.8%
     
     async def calculate_correlation_risk(self, symbol: str) -> float:
-        """Calcula risco de correlação"""
-        return 0.3  # Simulado
+        """Calcula risco de correlação (maior |correlação| contra as posições abertas)"""
+        others = [pos['symbol'] for pos in await self.get_all_positions() if pos['symbol'] != symbol]
+        if not others:
+            return 0.0
+        await self.refresh_market_data([symbol] + others)
+        correlation = self.risk_engine.correlation(symbol, others)
+        return correlation if correlation is not None else 0.3  # Sem histórico: valor conservador
     
     async def calculate_liquidity_risk(self, symbol: str, size: float) -> float:
-        """Calcula risco de liquidez"""
-        return 0.15  # Simulado
+        """Calcula risco de liquidez (ratio contra o volume das últimas 24h)"""
+        await self.refresh_market_data([symbol])
+        price = self._last_price(symbol)
+        ratio = self.risk_engine.liquidity_ratio(symbol, size * price) if price else None
+        return ratio if ratio is not None else 0.15  # Simulado
     
     async def get_volatility_metrics(self, symbol: str) -> Dict:
-        """Obtém métricas de volatilidade"""
-        return {'current': 0.02, 'threshold': 0.025}  # Simulado
+        """Obtém métricas de volatilidade (24h atual vs. média do lookback)"""
+        await self.refresh_market_data([symbol])
+        current = self.risk_engine.volatility(symbol)
+        threshold = self.risk_engine.long_run_volatility(symbol)
+        if current is None or not threshold:
+            return {'current': 0.02, 'threshold': 0.025}  # Simulado
+        return {'current': current, 'threshold': threshold}
     
     async def assess_market_conditions(self, symbol: str) -> Dict:
         """Avalia condições de mercado"""
@@ -420,7 +439,25 @@ class SwingRiskManager:
     
     async def get_all_positions(self) -> List[Dict]:
         """Obtém todas as posições"""
-        return []  # Simulado
+        if not self.transport:
+            return []  # Simulado
+        raw = await asyncio.to_thread(self.transport.get_positions) or []
+        positions = []
+        for pos in raw:
+            qty = float(pos.get('netQuantity', 0) or 0)
+            mark = float(pos.get('markPrice', 0) or 0)
+            if qty == 0 or mark == 0:
+                continue
+            notional = abs(qty) * mark
+            pnl = float(pos.get('pnlUnrealized', 0) or 0)
+            positions.append({
+                'symbol': pos['symbol'],
+                'size': abs(qty),
+                'current_price': mark,
+                'side': 'long' if qty > 0 else 'short',
+                'max_drawdown': max(0.0, -pnl / notional)
+            })
+        return positions
     
     def calculate_portfolio_risk_percentage(self, positions: List[Dict]) -> float:
         """Calcula risco percentual do portfólio"""
@@ -432,7 +469,9 @@ class SwingRiskManager:
     
     async def get_24h_volatility(self, symbol: str) -> float:
         """Obtém volatilidade 24h"""
-        return 0.025  # Simulado
+        await self.refresh_market_data([symbol])
+        volatility = self.risk_engine.volatility(symbol)
+        return volatility if volatility is not None else 0.025  # Simulado
 
 async def main():
     """Função principal de teste"""
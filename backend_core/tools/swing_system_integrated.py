@@ -6,7 +6,6 @@ Combina todos os componentes: trading, risco, monitoramento e execução
 
 import asyncio
 import logging
-import sqlite3
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import os
@@ -15,9 +14,10 @@ import sys
 # Adicionar diretório pai ao path para importações
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from tools.swing_trader_conservative import ConservativeSwingTrader
+from tools.swing_trader_conservative import ConservativeSwingTrader, DATA_DIR
 from tools.swing_risk_manager import SwingRiskManager
 from tools.swing_position_monitor import SwingPositionMonitor
+from core.sqlite_store import SQLiteStore
 
 # Configuração de logging
 logging.basicConfig(
@@ -38,6 +38,7 @@ class IntegratedSwingSystem:
         self.trader = ConservativeSwingTrader()
         self.risk_manager = SwingRiskManager()
         self.monitor = SwingPositionMonitor()
+        self.store = SQLiteStore.shared(os.path.join(DATA_DIR, 'swing_system.db'))
         
         # Estado do sistema
         self.is_running = False
@@ -97,11 +98,8 @@ class IntegratedSwingSystem:
     
     async def create_system_tables(self):
         """Cria tabelas do sistema integrado"""
-        conn = sqlite3.connect('data/swing_system.db')
-        cursor = conn.cursor()
-        
-        # Tabela de performance do sistema
-        cursor.execute('''
+        await self.store.aio.executescript('''
+            -- Tabela de performance do sistema
             CREATE TABLE IF NOT EXISTS system_performance (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TIMESTAMP NOT NULL,
@@ -113,11 +111,9 @@ class IntegratedSwingSystem:
                 max_drawdown REAL,
                 active_positions INTEGER,
                 system_status TEXT
-            )
-        ''')
-        
-        # Tabela de decisões do sistema
-        cursor.execute('''
+            );
+
+            -- Tabela de decisões do sistema
             CREATE TABLE IF NOT EXISTS system_decisions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TIMESTAMP NOT NULL,
@@ -128,11 +124,9 @@ class IntegratedSwingSystem:
                 risk_level TEXT,
                 outcome TEXT,
                 pnl REAL
-            )
-        ''')
-        
-        # Tabela de eventos do sistema
-        cursor.execute('''
+            );
+
+            -- Tabela de eventos do sistema
             CREATE TABLE IF NOT EXISTS system_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TIMESTAMP NOT NULL,
@@ -140,11 +134,8 @@ class IntegratedSwingSystem:
                 severity TEXT NOT NULL,
                 message TEXT NOT NULL,
                 details TEXT
-            )
+            );
         ''')
-        
-        conn.commit()
-        conn.close()
     
     async def system_health_check(self) -> bool:
         """Verifica integridade do sistema"""
@@ -413,36 +404,24 @@ class IntegratedSwingSystem:
                                 action: str, reason: str, risk_level: str):
         """Loga decisões do sistema"""
         try:
-            conn = sqlite3.connect('data/swing_system.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self.store.enqueue('''
                 INSERT INTO system_decisions 
                 (timestamp, decision_type, symbol, action, reason, risk_level)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (datetime.now(), decision_type, symbol, action, reason, risk_level))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Erro ao logar decisão: {e}")
     
     async def log_system_event(self, event_type: str, severity: str, message: str, details: str = None):
         """Loga eventos do sistema"""
         try:
-            conn = sqlite3.connect('data/swing_system.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self.store.enqueue('''
                 INSERT INTO system_events 
                 (timestamp, event_type, severity, message, details)
                 VALUES (?, ?, ?, ?, ?)
             ''', (datetime.now(), event_type, severity, message, details))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Erro ao logar evento: {e}")
     
@@ -451,10 +430,7 @@ class IntegratedSwingSystem:
         try:
             win_rate = (self.winning_trades / self.total_trades * 100) if self.total_trades > 0 else 0
             
-            conn = sqlite3.connect('data/swing_system.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self.store.enqueue('''
                 INSERT INTO system_performance 
                 (timestamp, total_trades, winning_trades, total_pnl, win_rate, 
                  max_drawdown, active_positions, system_status)
@@ -463,9 +439,6 @@ class IntegratedSwingSystem:
                   self.total_pnl, win_rate, self.max_drawdown, 
                   len(self.trader.positions), self.system_status))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Erro ao atualizar métricas: {e}")
     
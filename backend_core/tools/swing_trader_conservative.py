@@ -12,9 +12,15 @@ from typing import Dict, List, Optional, Tuple
 import aiohttp
 import pandas as pd
 from dataclasses import dataclass
-import sqlite3
 import signal
 import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.sqlite_store import SQLiteStore
+
+# Bancos relativos ao backend_core, não ao CWD: trader, monitor e setup abrem os mesmos arquivos
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
 
 # Configuração de logging
 logging.basicConfig(
@@ -63,7 +69,8 @@ class ConservativeSwingTrader:
         
         self.positions: List[SwingPosition] = []
         self.closed_positions: List[SwingPosition] = []
-        self.db_path = 'data/swing_trades.db'
+        self.db_path = os.path.join(DATA_DIR, 'swing_trades.db')
+        self.store = SQLiteStore.shared(self.db_path)
         
         # Estado do trader
         self.is_running = False
@@ -73,10 +80,7 @@ class ConservativeSwingTrader:
         
     def setup_database(self):
         """Configura banco de dados para tracking"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        self.store.executescript('''
             CREATE TABLE IF NOT EXISTS swing_positions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 symbol TEXT NOT NULL,
@@ -91,12 +95,9 @@ class ConservativeSwingTrader:
                 holding_days INTEGER,
                 setup_type TEXT,
                 confidence REAL
-            )
+            );
         ''')
         
-        conn.commit()
-        conn.close()
-        
     async def get_available_capital(self) -> float:
         """Obtém capital disponível"""
         try:
@@ -402,10 +403,8 @@ class ConservativeSwingTrader:
                            pnl: float, roi: float, reason: str):
         """Salva posição fechada no banco"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            # Enfileirado: gravado no próximo lote sem bloquear o loop do trader
+            self.store.enqueue('''
                 INSERT INTO swing_positions 
                 (symbol, side, entry_price, entry_time, exit_price, exit_time, 
                  size, pnl, roi, holding_days, setup_type, confidence)
@@ -417,9 +416,6 @@ class ConservativeSwingTrader:
                 position.setup_type, position.confidence
             ))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Erro ao salvar posição: {e}")
             
@@ -490,22 +486,16 @@ class ConservativeSwingTrader:
     def get_performance_summary(self) -> Dict:
         """Obtém resumo de performance"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT COUNT(*), SUM(pnl), AVG(roi), AVG(holding_days)
+            result = self.store.query_one('''
+                SELECT COUNT(*) AS trades, SUM(pnl) AS pnl, AVG(roi) AS roi, AVG(holding_days) AS holding
                 FROM swing_positions 
                 WHERE exit_time IS NOT NULL
             ''')
             
-            result = cursor.fetchone()
-            conn.close()
-            
-            total_trades = result[0] or 0
-            total_pnl = result[1] or 0
-            avg_roi = result[2] or 0
-            avg_holding = result[3] or 0
+            total_trades = result['trades'] or 0
+            total_pnl = result['pnl'] or 0
+            avg_roi = result['roi'] or 0
+            avg_holding = result['holding'] or 0
             
             return {
                 'total_trades': total_trades,
@@ -523,17 +513,12 @@ class ConservativeSwingTrader:
     def calculate_win_rate(self) -> float:
         """Calcula taxa de acerto"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT COUNT(CASE WHEN pnl > 0 THEN 1 END), COUNT(*)
+            result = self.store.query_one('''
+                SELECT COUNT(CASE WHEN pnl > 0 THEN 1 END) AS wins, COUNT(*) AS total
                 FROM swing_positions 
                 WHERE exit_time IS NOT NULL
             ''')
-            
-            wins, total = cursor.fetchone()
-            conn.close()
+            wins, total = result['wins'], result['total']
             
             return (wins / total * 100) if total > 0 else 0.0
             